@@ -3,7 +3,7 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.html import format_html
 from django.http import HttpResponse
 import csv
-from .models import User, UserProfile
+from .models import ProvisioningJob, User, UserProfile
 
 
 @admin.register(User)
@@ -101,3 +101,19 @@ class UserProfileAdmin(admin.ModelAdmin):
         else:
             return format_html('<span style="color: red;">✗ Yashirin</span>')
     show_contact_info.short_description = 'Aloqa ma\'lumotlari'
+
+
+@admin.register(ProvisioningJob)
+class ProvisioningJobAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'status', 'created_users', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('filename', 'created_by__username')
+    readonly_fields = ('id', 'roster', 'filename', 'default_class', 'status', 'report', 'created_by',
+                       'created_at', 'finished_at')
+    
+    def created_users(self, obj):
+        return obj.report.get('created_users', 0)
+    created_users.short_description = 'Yaratilgan foydalanuvchilar'
+    
+    def has_add_permission(self, request):
+        return False
@@ -1,4 +1,5 @@
 from django.urls import path
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from . import api_views
 
 urlpatterns = [
@@ -7,6 +8,8 @@ urlpatterns = [
     path('logout/', api_views.LogoutAPIView.as_view(), name='api_logout'),
     path('register/', api_views.RegisterAPIView.as_view(), name='api_register'),
     path('profile/', api_views.ProfileAPIView.as_view(), name='api_profile'),
+    path('token/', TokenObtainPairView.as_view(), name='api_token_obtain'),
+    path('token/refresh/', TokenRefreshView.as_view(), name='api_token_refresh'),
     path('change-password/', api_views.ChangePasswordAPIView.as_view(), name='api_change_password'),
     
     # User management (admin only)
@@ -14,4 +17,6 @@ urlpatterns = [
     path('students/', api_views.StudentListAPIView.as_view(), name='api_students'),
     path('teachers/', api_views.TeacherListAPIView.as_view(), name='api_teachers'),
     path('users/<int:user_id>/toggle-active/', api_views.ToggleUserActiveAPIView.as_view(), name='api_toggle_user_active'),
+    path('users/provision/', api_views.ProvisionUsersAPIView.as_view(), name='api_provision_users'),
+    path('users/provision/<uuid:job_id>/', api_views.ProvisioningJobAPIView.as_view(), name='api_provisioning_job'),
 ]
@@ -1,16 +1,25 @@
+import os
+
 from rest_framework import generics, status, permissions
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import login, logout
+from django.db import transaction
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 
-from .models import User, UserProfile
+from .listing import LeanListMixin, PrefixSearchFilter
+from .models import ProvisioningJob, User, UserProfile
+from .permissions import IsTeacherOrAdmin
+from .provisioning import SUPPORTED_EXTENSIONS, RosterFormatError, job_credentials, provision_users
+from .ratelimit import limit_request
 from .serializers import (
     UserSerializer, UserProfileSerializer, RegisterSerializer,
     LoginSerializer, ChangePasswordSerializer, ProfileUpdateSerializer,
     StudentSerializer, TeacherSerializer
 )
+from .tasks import provision_roster
 
 
 class RegisterAPIView(generics.CreateAPIView):
@@ -20,6 +29,7 @@ class RegisterAPIView(generics.CreateAPIView):
     permission_classes = [permissions.AllowAny]
 
     def create(self, request, *args, **kwargs):
+        limit_request('register_ip', request)
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
@@ -35,7 +45,7 @@ class LoginAPIView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def post(self, request):
-        serializer = LoginSerializer(data=request.data)
+        serializer = LoginSerializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         
         user = serializer.validated_data['user']
@@ -90,40 +100,40 @@ class ChangePasswordAPIView(APIView):
         }, status=status.HTTP_200_OK)
 
 
-class UserListAPIView(generics.ListAPIView):
+class UserListAPIView(LeanListMixin, generics.ListAPIView):
     """API view for listing all users (admin only)"""
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ['role', 'is_active']
-    search_fields = ['username', 'email', 'first_name', 'last_name']
+    filter_backends = [DjangoFilterBackend, PrefixSearchFilter, OrderingFilter]
+    filterset_fields = ['role', 'is_active', 'school_class']
+    prefix_search_fields = ['username', 'student_id']
     ordering_fields = ['date_joined', 'last_login', 'username']
     ordering = ['-date_joined']
 
 
-class StudentListAPIView(generics.ListAPIView):
+class StudentListAPIView(LeanListMixin, generics.ListAPIView):
     """API view for listing students (teacher/admin only)"""
     serializer_class = StudentSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ['is_active']
-    search_fields = ['username', 'email', 'first_name', 'last_name']
-    ordering_fields = ['date_joined', 'last_login', 'username']
+    permission_classes = [IsTeacherOrAdmin]
+    filter_backends = [DjangoFilterBackend, PrefixSearchFilter, OrderingFilter]
+    filterset_fields = ['is_active', 'school_class']
+    prefix_search_fields = ['username', 'student_id']
+    ordering_fields = ['date_joined', 'last_login', 'username', 'school_class']
     ordering = ['-date_joined']
 
     def get_queryset(self):
         return User.objects.filter(role='student')
 
 
-class TeacherListAPIView(generics.ListAPIView):
+class TeacherListAPIView(LeanListMixin, generics.ListAPIView):
     """API view for listing teachers (admin only)"""
     queryset = User.objects.filter(role='teacher')
     serializer_class = TeacherSerializer
     permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, PrefixSearchFilter, OrderingFilter]
     filterset_fields = ['is_active']
-    search_fields = ['username', 'email', 'first_name', 'last_name']
+    prefix_search_fields = ['username']
     ordering_fields = ['date_joined', 'last_login', 'username']
     ordering = ['-date_joined']
 
@@ -136,7 +146,7 @@ class ToggleUserActiveAPIView(APIView):
         try:
             user = User.objects.get(id=user_id)
             user.is_active = not user.is_active
-            user.save()
+            user.save(update_fields=['is_active', 'updated_at'])
             
             return Response({
                 'message': f'User {"activated" if user.is_active else "deactivated"} successfully',
@@ -147,3 +157,78 @@ class ToggleUserActiveAPIView(APIView):
             return Response({
                 'error': 'User not found'
             }, status=status.HTTP_404_NOT_FOUND)
+
+
+class ProvisionUsersAPIView(APIView):
+    """
+    API view for creating accounts in bulk from a CSV/XLSX roster (admin only).
+    Dry runs are validated in the request; real uploads are queued for a
+    Celery worker and answered with a job to poll.
+    """
+    permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({
+                'error': 'No file uploaded'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        default_class = str(request.data.get('school_class', '')).strip()
+        if len(default_class) > 10:
+            return Response({
+                'error': 'school_class: at most 10 characters'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        extension = os.path.splitext(upload.name)[1].lower()
+        if extension not in SUPPORTED_EXTENSIONS:
+            return Response({
+                'error': f"Unsupported file type '{extension}'. Use one of: {', '.join(SUPPORTED_EXTENSIONS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes'):
+            try:
+                report = provision_users(upload, upload.name, default_class=default_class, dry_run=True)
+            except RosterFormatError as exc:
+                return Response({
+                    'error': str(exc)
+                }, status=status.HTTP_400_BAD_REQUEST)
+            return Response(
+                report.as_dict(),
+                status=status.HTTP_400_BAD_REQUEST if report.errors else status.HTTP_200_OK
+            )
+
+        job = ProvisioningJob(filename=upload.name[:255], default_class=default_class, created_by=request.user)
+        job.roster.save(f"{job.pk}{extension}", upload, save=False)
+        job.save()
+        transaction.on_commit(lambda: provision_roster.delay(str(job.pk)))
+        return Response(provisioning_job_state(job, request), status=status.HTTP_202_ACCEPTED)
+
+
+def provisioning_job_state(job, request):
+    """Status of a provisioning job; generated passwords go only to its creator"""
+    data = {
+        'job_id': str(job.pk),
+        'status': job.status,
+        'filename': job.filename,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+        'report': job.report,
+    }
+    if job.status == 'completed' and job.created_by_id == request.user.pk:
+        data['report'] = {**job.report, 'credentials': job_credentials(job)}
+    return data
+
+
+class ProvisioningJobAPIView(APIView):
+    """API view for polling a roster upload (admin only)"""
+    permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
+
+    def get(self, request, job_id):
+        try:
+            job = ProvisioningJob.objects.get(pk=job_id)
+        except ProvisioningJob.DoesNotExist:
+            return Response({
+                'error': 'Job not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        return Response(provisioning_job_state(job, request))
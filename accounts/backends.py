@@ -0,0 +1,60 @@
+"""
+Authentication backend with a short-lived user cache and login rate limits.
+
+Django calls ``backend.get_user(id)`` on every authenticated request (the
+session only stores the id), which costs one User query per request. The
+user is cached for AUTH_USER_CACHE_TIMEOUT seconds and dropped from the
+cache whenever it is saved or deleted (accounts.signals), so logins,
+password changes and deactivation take effect immediately on the process
+that made them and within the timeout elsewhere when the cache is
+per-process.
+
+authenticate() consults accounts.ratelimit before hashing anything.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from . import ratelimit
+
+USER_CACHE_PREFIX = 'auth-user:'
+
+
+def _user_cache_key(user_id):
+    return f"{USER_CACHE_PREFIX}{user_id}"
+
+
+def get_cached_user(user_id):
+    """The user with this primary key, or None"""
+    key = _user_cache_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        User = get_user_model()
+        try:
+            user = User._default_manager.get(pk=user_id)
+        except (User.DoesNotExist, ValueError, TypeError):
+            return None
+        cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+    return user
+
+
+def forget_cached_user(user_id):
+    cache.delete(_user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(get_user_model().USERNAME_FIELD)
+        ratelimit.check_login(request, username)
+        user = super().authenticate(request, username=username, password=password, **kwargs)
+        if user is None:
+            ratelimit.login_failed(request, username)
+        else:
+            ratelimit.login_succeeded(username)
+        return user
+    
+    def get_user(self, user_id):
+        user = get_cached_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
@@ -0,0 +1,102 @@
+"""
+Lean list endpoints for users.
+
+Teachers and admins page through student lists all day. The regular
+ListAPIView path loads full User rows (password hash, image, every date)
+and builds a ModelSerializer per page. Here the query selects only the
+serialized columns with values_list(), and rows become dicts through a
+RowSerializer compiled once per serializer class. The output is identical
+because non-trivial columns (dates, choices, ...) still go through the
+serializer's own field.
+
+PrefixSearchFilter replaces the ``icontains`` SearchFilter with a range
+scan (``username >= term AND username < term + U+FFFF``) that any B-tree
+index on username/student_id can serve. It is case-sensitive.
+"""
+from django.db import models
+from django.db.models import Q
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.response import Response
+
+PREFIX_SENTINEL = '\uffff'
+
+# Values that reach the client unchanged, so no to_representation() call is needed
+PASSTHROUGH_FIELDS = (
+    models.AutoField, models.BigAutoField, models.IntegerField, models.CharField,
+    models.EmailField, models.BooleanField, models.TextField,
+)
+
+
+class RowSerializer:
+    """Serialize values_list() rows the same way ``serializer_class`` would"""
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        model = serializer_class.Meta.model
+        self.keys = []
+        self.columns = []
+        converters = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            source = field.source if field.source != '*' else name
+            model_field = model._meta.get_field(source)
+            self.keys.append(name)
+            self.columns.append(model_field.attname)
+            passthrough = isinstance(model_field, PASSTHROUGH_FIELDS) and not model_field.choices
+            converters.append(None if passthrough else field.to_representation)
+        self.converters = [(index, convert) for index, convert in enumerate(converters) if convert is not None]
+
+    def serialize(self, rows):
+        keys, converters = self.keys, self.converters
+        if not converters:
+            return [dict(zip(keys, row)) for row in rows]
+        data = []
+        for row in rows:
+            row = list(row)
+            for index, convert in converters:
+                if row[index] is not None:
+                    row[index] = convert(row[index])
+            data.append(dict(zip(keys, row)))
+        return data
+
+
+class PrefixSearchFilter(BaseFilterBackend):
+    """``?search=<prefix>`` on the view's ``prefix_search_fields``, as index range scans"""
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '').strip()
+        fields = getattr(view, 'prefix_search_fields', ())
+        if not term or not fields:
+            return queryset
+        condition = Q()
+        for name in fields:
+            condition |= Q(**{f'{name}__gte': term, f'{name}__lt': term + PREFIX_SENTINEL})
+        return queryset.filter(condition)
+
+
+class LeanListMixin:
+    """
+    ListAPIView mixin that serves the list from projected rows.
+    Set ``lean = False`` to go through ``serializer_class`` as usual.
+    """
+    lean = True
+    _row_serializers = {}
+
+    def get_row_serializer(self):
+        serializer_class = self.get_serializer_class()
+        row_serializer = self._row_serializers.get(serializer_class)
+        if row_serializer is None:
+            row_serializer = self._row_serializers[serializer_class] = RowSerializer(serializer_class)
+        return row_serializer
+
+    def list(self, request, *args, **kwargs):
+        if not self.lean:
+            return super().list(request, *args, **kwargs)
+        row_serializer = self.get_row_serializer()
+        queryset = self.filter_queryset(self.get_queryset()).values_list(*row_serializer.columns)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(row_serializer.serialize(page))
+        return Response(row_serializer.serialize(queryset))
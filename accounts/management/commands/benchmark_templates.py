@@ -0,0 +1,121 @@
+import time
+from django.conf import settings
+from django.contrib.auth.forms import AuthenticationForm
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from accounts.models import User, UserProfile
+from accounts.views import dashboard_context
+from examinations.models import Category, Test, TestAttempt
+
+BASE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+MODES = (
+    # (label, cached loader, fragment cache)
+    ('parse per render', False, False),
+    ('cached loader', True, False),
+    ('+ fragments', True, True),
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Time page templates with representative contexts, with and without template caching'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renders', type=int, default=200, help='Renders per template and mode')
+
+    def backend(self, cached_loader):
+        config = settings.TEMPLATES[0]
+        options = {key: value for key, value in config['OPTIONS'].items() if key != 'loaders'}
+        options['loaders'] = [('django.template.loaders.cached.Loader', BASE_LOADERS)] if cached_loader else BASE_LOADERS
+        return DjangoTemplates({
+            'NAME': f'benchmark-{cached_loader}', 'DIRS': config['DIRS'], 'APP_DIRS': False, 'OPTIONS': options,
+        })
+
+    def seed(self):
+        teacher = User.objects.create(username='__bench_teacher__', role='teacher', first_name='Ustoz')
+        student = User.objects.create(username='__bench_student__', role='student', first_name="O'quvchi")
+        admin = User.objects.create(username='__bench_admin__', role='admin', is_staff=True)
+        category = Category.objects.create(name='__bench_category__')
+        tests = [
+            Test.objects.create(
+                title=f'Benchmark test {i}', description='Algebra va geometriya bo\'yicha savollar ' * 3,
+                category=category, time_limit=45, pass_mark=60, created_by=teacher, status='published',
+            )
+            for i in range(6)
+        ]
+        for test in tests[:5]:
+            TestAttempt.objects.create(test=test, user=student, status='completed', total_score=7,
+                                       percentage_score=70.0, is_passed=True)
+        return teacher, student, admin
+
+    def scenarios(self, teacher, student, admin):
+        def dashboard(user):
+            context = dashboard_context(user)
+            for value in context.values():
+                if isinstance(value, QuerySet):
+                    len(value)  # run the view's queries up front; only rendering is timed
+            return context
+
+        return [
+            ('home.html', 'guest', None, {}),
+            ('home.html', 'student', student, {}),
+            ('registration/login.html', 'guest', None, {'form': AuthenticationForm()}),
+            ('accounts/dashboard.html', 'student', student, dashboard(student)),
+            ('accounts/dashboard.html', 'teacher', teacher, dashboard(teacher)),
+            ('accounts/dashboard.html', 'admin', admin, dashboard(admin)),
+            ('accounts/profile.html', 'student', student, {'profile': UserProfile.objects.get(user=student)}),
+        ]
+
+    def time_render(self, backend, name, request, context, renders):
+        """Milliseconds and queries per render, looking the template up each time like render() does"""
+        backend.get_template(name).render(context, request)  # warm-up: loader cache and fragments
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for i in range(renders):
+                backend.get_template(name).render(context, request)
+            elapsed = time.perf_counter() - started
+        return elapsed / renders * 1000, len(queries) / renders
+
+    def run(self, renders):
+        factory = RequestFactory()
+        results = []
+        for name, audience, user, context in self.scenarios(*self.seed()):
+            row = []
+            for label, cached_loader, fragments in MODES:
+                backend = self.backend(cached_loader)
+                caches['templates'].clear()
+                request = factory.get('/')
+                request.user = user or AnonymousUser()
+                with override_settings(TEMPLATE_FRAGMENT_TIMEOUT=3600 if fragments else 0):
+                    row.append(self.time_render(backend, name, request, context, renders))
+            results.append((f'{name} ({audience})', row))
+        return results
+
+    def handle(self, *args, **options):
+        renders = options['renders']
+        try:
+            with transaction.atomic():
+                raise Rollback(self.run(renders))
+        except Rollback as result:
+            results = result.args[0]
+        caches['templates'].clear()
+
+        self.stdout.write(f"{renders} renders per template and mode, milliseconds per render")
+        header = ''.join(f'{label:>18}' for label, _, _ in MODES)
+        self.stdout.write(f"{'template':<40}{header}{'speedup':>9}{'queries':>9}")
+        for label, row in results:
+            timings = ''.join(f'{ms:>18.2f}' for ms, queries in row)
+            speedup = row[0][0] / row[-1][0]
+            self.stdout.write(f'{label:<40}{timings}{speedup:>8.1f}x{row[-1][1]:>9.1f}')
@@ -0,0 +1,74 @@
+import time
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+from accounts.api_views import StudentListAPIView, UserListAPIView
+from accounts.models import User
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare the lean (values_list) user lists with the ModelSerializer path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=5000)
+        parser.add_argument('--requests', type=int, default=200)
+
+    def seed(self, students):
+        password = make_password(None)
+        User.objects.bulk_create(
+            [
+                User(
+                    username=f'__bench_{i:06d}', password=password, email=f'bench{i}@example.com',
+                    first_name=f'Ism{i}', last_name=f'Familiya{i}', role='student',
+                    student_id=f'__B{i:06d}', school_class=f'{5 + i % 7}-{"ABCD"[i % 4]}',
+                )
+                for i in range(students)
+            ],
+            batch_size=1000,
+        )
+        return User.objects.create(username='__bench_admin__', role='admin', is_staff=True)
+
+    def time_view(self, view_class, lean, admin, query, requests):
+        view = view_class.as_view(lean=lean)
+        factory = APIRequestFactory()
+        started = time.perf_counter()
+        for i in range(requests):
+            request = factory.get('/', query)
+            force_authenticate(request, admin)
+            response = view(request)
+            assert response.status_code == 200, response.data
+            response.render()
+        return time.perf_counter() - started, response.data
+
+    def handle(self, *args, **options):
+        requests = options['requests']
+        scenarios = [
+            ('students, page 3', StudentListAPIView, {'page': 3}),
+            ('students, class 9-A', StudentListAPIView, {'school_class': '9-A'}),
+            ('students, prefix search', StudentListAPIView, {'search': '__bench_001'}),
+            ('all users, page 3', UserListAPIView, {'page': 3}),
+        ]
+        try:
+            with transaction.atomic():
+                admin = self.seed(options['students'])
+                results = []
+                for label, view_class, query in scenarios:
+                    classic, classic_data = self.time_view(view_class, False, admin, query, requests)
+                    lean, lean_data = self.time_view(view_class, True, admin, query, requests)
+                    assert classic_data == lean_data, f'{label}: lean output differs'
+                    results.append((label, classic, lean))
+                raise Rollback(results)
+        except Rollback as result:
+            results = result.args[0]
+
+        self.stdout.write(f"{options['students']} students, {requests} requests per scenario")
+        self.stdout.write(f"{'scenario':<26}{'serializer req/s':>18}{'lean req/s':>12}{'speedup':>9}")
+        for label, classic, lean in results:
+            self.stdout.write(
+                f"{label:<26}{requests / classic:>18.0f}{requests / lean:>12.0f}{classic / lean:>8.1f}x"
+            )
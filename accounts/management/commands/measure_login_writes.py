@@ -0,0 +1,76 @@
+import time
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+from django.test.utils import CaptureQueriesContext
+from accounts.models import UserProfile
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+def legacy_save_user_profile(sender, instance, **kwargs):
+    """The receiver this project used to have: saves the profile on every user save"""
+    if hasattr(instance, 'profile'):
+        instance.profile.save()
+    else:
+        UserProfile.objects.get_or_create(user=instance)
+
+
+class Command(BaseCommand):
+    help = 'Measure queries and time per login / user save, with and without the legacy profile receiver'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def measure(self, iterations, legacy):
+        """Average (queries, writes, ms) per operation against a throwaway user"""
+        if legacy:
+            post_save.connect(legacy_save_user_profile, sender=User, dispatch_uid='legacy-profile-save')
+        try:
+            with transaction.atomic():
+                User.objects.create(username='__login_benchmark__')
+                results = {}
+                operations = {
+                    'login (update_last_login)': lambda user: update_last_login(None, user),
+                    'toggle is_active': lambda user: (setattr(user, 'is_active', not user.is_active), user.save()),
+                }
+                for name, operation in operations.items():
+                    queries = writes = 0
+                    started = time.perf_counter()
+                    for _ in range(iterations):
+                        # A fresh instance per request, like the auth middleware loads it
+                        user = User.objects.get(username='__login_benchmark__')
+                        with CaptureQueriesContext(connection) as captured:
+                            operation(user)
+                        queries += len(captured)
+                        writes += sum(
+                            1 for query in captured
+                            if query['sql'].lstrip().upper().startswith(('UPDATE', 'INSERT', 'DELETE'))
+                        )
+                    elapsed = time.perf_counter() - started
+                    results[name] = (queries / iterations, writes / iterations, elapsed * 1000 / iterations)
+                raise Rollback(results)
+        except Rollback as result:
+            return result.args[0]
+        finally:
+            if legacy:
+                post_save.disconnect(sender=User, dispatch_uid='legacy-profile-save')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        before = self.measure(iterations, legacy=True)
+        after = self.measure(iterations, legacy=False)
+
+        self.stdout.write(f"{'operation':<28}{'':>8}{'queries':>10}{'writes':>8}{'ms':>9}")
+        for name in before:
+            for label, values in (('before', before[name]), ('after', after[name])):
+                queries, writes, ms = values
+                self.stdout.write(f"{name:<28}{label:>8}{queries:>10.1f}{writes:>8.1f}{ms:>9.3f}")
+        saved = before['login (update_last_login)'][1] - after['login (update_last_login)'][1]
+        self.stdout.write(self.style.SUCCESS(f"{saved:.1f} fewer writes per login"))
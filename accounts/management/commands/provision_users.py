@@ -0,0 +1,59 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from accounts.provisioning import RosterFormatError, provision_users
+
+
+class Command(BaseCommand):
+    help = 'Create student/teacher accounts in bulk from a CSV or XLSX class roster'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to a .csv or .xlsx roster')
+        parser.add_argument('--class', dest='default_class', default='',
+                            help='school_class for rows that leave it empty, e.g. 9-A')
+        parser.add_argument('--workers', type=int, help='Password hashing threads (default: CPU count)')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--credentials-out',
+                            help='Write generated passwords to this CSV file (username,password)')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, do not write anything')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                report = provision_users(
+                    fileobj, options['path'],
+                    default_class=options['default_class'],
+                    batch_size=options['batch_size'],
+                    workers=options['workers'],
+                    dry_run=options['dry_run'],
+                )
+        except (OSError, RosterFormatError) as exc:
+            raise CommandError(str(exc))
+
+        for error in report.errors:
+            self.stdout.write(self.style.ERROR(f"Line {error.line}: {'; '.join(error.messages)}"))
+
+        summary = (
+            f"{report.total_rows} rows, {report.valid_rows} valid, "
+            f"{report.created_users} users / {report.created_profiles} profiles created "
+            f"in {report.elapsed:.2f}s ({report.rows_per_second:.0f} rows/s, "
+            f"hashing {report.hashing_seconds:.2f}s)"
+        )
+        if report.errors:
+            raise CommandError(f"Provisioning aborted, nothing was written. {summary}")
+        if report.dry_run:
+            self.stdout.write(self.style.SUCCESS(f"Dry run OK: {summary}"))
+            return
+
+        if report.credentials:
+            if options['credentials_out']:
+                with open(options['credentials_out'], 'w', newline='', encoding='utf-8') as out:
+                    writer = csv.writer(out)
+                    writer.writerow(['username', 'password'])
+                    writer.writerows(report.credentials)
+                self.stdout.write(f"{len(report.credentials)} generated passwords written to {options['credentials_out']}")
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f"{len(report.credentials)} passwords were generated; use --credentials-out to keep them"
+                ))
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,26 @@
+from django.http import HttpResponse, JsonResponse
+
+from .ratelimit import RateLimited
+
+
+class RateLimitMiddleware:
+    """
+    Turn RateLimited raised outside DRF (admin and auth login, register
+    page) into a 429 response. DRF views handle it themselves.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, RateLimited):
+            return None
+        if request.path.startswith('/api/'):
+            response = JsonResponse({'detail': str(exception.detail)}, status=429)
+        else:
+            response = HttpResponse(exception.detail, status=429, content_type='text/plain; charset=utf-8')
+        response['Retry-After'] = str(exception.wait)
+        return response
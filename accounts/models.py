@@ -1,6 +1,11 @@
+import copy
+import uuid
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from buxoro_test_system.images import validate_image_upload
+
 class User(AbstractUser):
     """
     Custom User model with additional fields for test system
@@ -17,7 +22,10 @@ class User(AbstractUser):
     school_class = models.CharField(max_length=10, blank=True, null=True, help_text="Student's class (e.g., 9-A, 10-B)")
     student_id = models.CharField(max_length=20, blank=True, null=True, unique=True)
     is_active_student = models.BooleanField(default=True)
-    profile_image = models.ImageField(upload_to='profiles/', blank=True, null=True)
+    profile_image = models.ImageField(upload_to='profiles/', blank=True, null=True,
+                                      validators=[validate_image_upload])
+    profile_image_hash = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
+    profile_image_widths = models.JSONField(default=list, blank=True, editable=False)
     
     # Additional fields for analytics
     created_at = models.DateTimeField(auto_now_add=True)
@@ -47,12 +55,35 @@ class User(AbstractUser):
         db_table = 'accounts_user'
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        indexes = [
+            # Class rosters in the student list
+            models.Index(fields=['role', 'school_class']),
+        ]
+
+
+class UserProfileManager(models.Manager):
+    """
+    Single creation path for profiles. Works for one user or thousands:
+    one INSERT per batch, and users that already have a profile are skipped
+    by the database rather than checked with a SELECT first.
+    """
+    
+    def ensure_for(self, users, batch_size=500):
+        # user_id rather than user: assigning the relation would cache this
+        # pk-less instance as ``user.profile``
+        return self.bulk_ensure([self.model(user_id=user.pk) for user in users], batch_size=batch_size)
+    
+    def bulk_ensure(self, profiles, batch_size=500):
+        return self.bulk_create(profiles, batch_size=batch_size, ignore_conflicts=True)
 
 
 class UserProfile(models.Model):
     """
     Extended profile information for users
     """
+    # Not compared for dirty tracking
+    UNTRACKED_FIELDS = ('id', 'user', 'created_at', 'updated_at')
+    
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     bio = models.TextField(max_length=500, blank=True)
     location = models.CharField(max_length=30, blank=True)
@@ -78,6 +109,49 @@ class UserProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = UserProfileManager()
+    
+    @classmethod
+    def tracked_field_names(cls):
+        return [
+            field.attname for field in cls._meta.concrete_fields
+            if field.name not in cls.UNTRACKED_FIELDS
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot()
+        return instance
+    
+    def _snapshot(self):
+        self._loaded_values = {
+            name: copy.deepcopy(self.__dict__[name])
+            for name in self.tracked_field_names() if name in self.__dict__
+        }
+    
+    def changed_fields(self):
+        """Tracked fields that differ from the loaded values (all of them for unsaved profiles)"""
+        loaded = getattr(self, '_loaded_values', None)
+        if self._state.adding or loaded is None:
+            return self.tracked_field_names()
+        return [name for name, value in loaded.items() if getattr(self, name) != value]
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._snapshot()
+    
+    def save_changes(self):
+        """Write only the changed fields; returns False when there was nothing to write"""
+        if self._state.adding:
+            self.save()
+            return True
+        changed = self.changed_fields()
+        if not changed:
+            return False
+        self.save(update_fields=changed + ['updated_at'])
+        return True
+    
     def __str__(self):
         return f"Profile of {self.user.username}"
     
@@ -85,3 +159,36 @@ class UserProfile(models.Model):
         db_table = 'accounts_userprofile'
         verbose_name = 'User Profile'
         verbose_name_plural = 'User Profiles'
+
+
+class ProvisioningJob(models.Model):
+    """
+    A roster upload whose accounts are created by a Celery worker
+    (accounts.tasks.provision_roster)
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('rejected', 'Rejected'),  # invalid rows, nothing was written
+        ('failed', 'Failed'),
+    )
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    roster = models.FileField(upload_to='rosters/', blank=True)  # deleted once processed
+    filename = models.CharField(max_length=255)
+    default_class = models.CharField(max_length=10, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    report = models.JSONField(default=dict, blank=True)  # ProvisionReport.as_dict(), without credentials
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='provisioning_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    
+    def __str__(self):
+        return f"{self.filename} ({self.get_status_display()})"
+    
+    class Meta:
+        db_table = 'accounts_provisioningjob'
+        verbose_name = 'Provisioning Job'
+        verbose_name_plural = 'Provisioning Jobs'
+        ordering = ['-created_at']
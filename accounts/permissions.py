@@ -0,0 +1,12 @@
+from rest_framework import permissions
+
+
+class IsTeacherOrAdmin(permissions.BasePermission):
+    """Allow teachers, administrators and superusers"""
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(
+            user and user.is_authenticated and
+            (user.role in ('teacher', 'admin') or user.is_superuser)
+        )
@@ -0,0 +1,408 @@
+"""
+Bulk user provisioning from class rosters (CSV or XLSX).
+
+Roster columns (header names):
+    student_id          required for students, unique
+    school_class        e.g. 9-A
+    first_name, last_name, email
+    username            defaults to the student id
+    password            generated when empty (returned in the report)
+    role                student (default) or teacher
+    grade_level         stored on the profile
+
+Rows are validated against each other and against existing accounts in
+a few IN queries (usernames compared case-insensitively, as the login
+backend does). Password hashing, by far the most expensive step, runs in
+a thread pool (PBKDF2 releases the GIL, and threads also work inside
+Celery's daemonic prefork workers, which cannot start processes); users
+and profiles are then inserted with bulk_create,
+which skips the per-instance post_save signals. Like the question
+importer, any invalid row rolls the whole roster back, including rows
+that clash with accounts created while the roster was being processed.
+
+Uploads through the API become a ProvisioningJob that a Celery worker
+runs (accounts.tasks); generated passwords are kept in the cache for
+PROVISIONING_CREDENTIALS_TIMEOUT seconds for the admin who uploaded the
+roster, and never stored in the database. The web process can only read
+them back from a shared cache (CACHE_IS_SHARED); without one, jobs fail
+before creating any account.
+"""
+import csv
+import io
+import logging
+import os
+import secrets
+import string
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.validators import validate_email
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .models import ProvisioningJob, User, UserProfile
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = ('.csv', '.xlsx')
+ROLES = ('student', 'teacher')
+PASSWORD_ALPHABET = string.ascii_letters + string.digits
+GENERATED_PASSWORD_LENGTH = 10
+HASH_CHUNK_SIZE = 50
+CREDENTIALS_PREFIX = 'provisioning-credentials:'
+
+
+class RosterFormatError(ValueError):
+    """The file cannot be read as a roster at all"""
+
+
+class ProvisioningUnavailable(Exception):
+    """Background provisioning cannot hand generated passwords back"""
+
+
+@dataclass
+class RowError:
+    line: int
+    messages: list
+
+    def as_dict(self):
+        return {'line': self.line, 'errors': self.messages}
+
+
+@dataclass
+class ProvisionReport:
+    dry_run: bool = False
+    total_rows: int = 0
+    valid_rows: int = 0
+    created_users: int = 0
+    created_profiles: int = 0
+    errors: list = field(default_factory=list)
+    credentials: list = field(default_factory=list)  # [(username, generated password)]
+    hashing_seconds: float = 0.0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        if not self.elapsed:
+            return 0.0
+        return self.total_rows / self.elapsed
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def as_dict(self, include_credentials=True):
+        data = {
+            'dry_run': self.dry_run,
+            'total_rows': self.total_rows,
+            'valid_rows': self.valid_rows,
+            'created_users': self.created_users,
+            'created_profiles': self.created_profiles,
+            'errors': [error.as_dict() for error in self.errors],
+            'hashing_seconds': round(self.hashing_seconds, 3),
+            'elapsed_seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+        if include_credentials:
+            data['credentials'] = [
+                {'username': username, 'password': password} for username, password in self.credentials
+            ]
+        return data
+
+
+# Readers ---------------------------------------------------------------
+
+def _normalize_header(value):
+    return str(value or '').strip().lower().replace(' ', '_')
+
+
+def _clean(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheet cells turn student ids like 1024 into 1024.0
+        value = int(value)
+    return str(value).strip()
+
+
+def iter_csv_rows(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    header = [_normalize_header(name) for name in next(reader, [])]
+    for line, values in enumerate(reader, start=2):
+        if not any(value.strip() for value in values):
+            continue
+        yield line, dict(zip(header, values))
+
+
+def iter_xlsx_rows(fileobj):
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [_normalize_header(name) for name in next(rows, ())]
+        for line, values in enumerate(rows, start=2):
+            if all(value in (None, '') for value in values):
+                continue
+            yield line, dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def read_roster_rows(fileobj, filename):
+    """Yield (line, row) pairs from an uploaded or opened binary file"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        return iter_csv_rows(fileobj)
+    if extension == '.xlsx':
+        return iter_xlsx_rows(fileobj)
+    raise RosterFormatError(
+        f"Unsupported file type '{extension}'. Use one of: {', '.join(SUPPORTED_EXTENSIONS)}"
+    )
+
+
+# Validation ------------------------------------------------------------
+
+def validate_row(row, default_class=''):
+    """Turn a raw roster row into account data. Returns (data, errors)."""
+    errors = []
+    data = {
+        'student_id': _clean(row.get('student_id')),
+        'school_class': _clean(row.get('school_class')) or default_class,
+        'first_name': _clean(row.get('first_name')),
+        'last_name': _clean(row.get('last_name')),
+        'email': _clean(row.get('email')).lower(),
+        'role': _clean(row.get('role')).lower() or 'student',
+        'password': _clean(row.get('password')),
+        'grade_level': _clean(row.get('grade_level')),
+    }
+    data['username'] = _clean(row.get('username')) or data['student_id'].lower()
+
+    if data['role'] not in ROLES:
+        errors.append(f"role: unknown role '{data['role']}'")
+    if data['role'] == 'student' and not data['student_id']:
+        errors.append('student_id: required for students')
+    if not data['username']:
+        errors.append('username: required when there is no student_id')
+    elif len(data['username']) > 150:
+        errors.append('username: at most 150 characters')
+    if len(data['student_id']) > 20:
+        errors.append('student_id: at most 20 characters')
+    if len(data['school_class']) > 10:
+        errors.append('school_class: at most 10 characters')
+    if data['email']:
+        try:
+            validate_email(data['email'])
+        except ValidationError:
+            errors.append(f"email: '{data['email']}' is not a valid address")
+    if data['password'] and len(data['password']) < 8:
+        errors.append('password: at least 8 characters')
+    return data, errors
+
+
+def _find_conflicts(rows):
+    """
+    Duplicates inside the roster and clashes with existing accounts.
+    Returns {line: [messages]}.
+    """
+    conflicts = {}
+    seen = {'username': {}, 'student_id': {}}
+    for line, data in rows:
+        for name in seen:
+            value = data[name].lower() if name == 'username' else data[name]
+            if not value:
+                continue
+            if value in seen[name]:
+                conflicts.setdefault(line, []).append(f"{name}: '{data[name]}' repeats line {seen[name][value]}")
+            else:
+                seen[name][value] = line
+
+    usernames = [data['username'].lower() for line, data in rows]
+    student_ids = [data['student_id'] for line, data in rows if data['student_id']]
+    taken_usernames, taken_ids = set(), set()
+    for start in range(0, len(usernames), 900):
+        taken_usernames.update(
+            User.objects.annotate(username_lower=Lower('username'))
+            .filter(username_lower__in=usernames[start:start + 900])
+            .values_list('username_lower', flat=True)
+        )
+    for start in range(0, len(student_ids), 900):
+        taken_ids.update(
+            User.objects.filter(student_id__in=student_ids[start:start + 900]).values_list('student_id', flat=True)
+        )
+
+    for line, data in rows:
+        if data['username'].lower() in taken_usernames:
+            conflicts.setdefault(line, []).append(f"username: '{data['username']}' already exists")
+        if data['student_id'] and data['student_id'] in taken_ids:
+            conflicts.setdefault(line, []).append(f"student_id: '{data['student_id']}' already exists")
+    return conflicts
+
+
+# Password hashing ------------------------------------------------------
+
+def _hash_chunk(passwords):
+    return [make_password(password) for password in passwords]
+
+
+def hash_passwords(passwords, workers=None):
+    """Hash passwords in parallel threads, preserving order"""
+    workers = workers or settings.PROVISIONING_WORKERS or os.cpu_count() or 1
+    chunks = [passwords[start:start + HASH_CHUNK_SIZE] for start in range(0, len(passwords), HASH_CHUNK_SIZE)]
+    if workers <= 1 or len(chunks) <= 1:
+        return [hashed for chunk in chunks for hashed in _hash_chunk(chunk)]
+    with ThreadPoolExecutor(max_workers=min(workers, len(chunks)), thread_name_prefix='provisioning') as pool:
+        return [hashed for chunk in pool.map(_hash_chunk, chunks) for hashed in chunk]
+
+
+def generate_password():
+    return ''.join(secrets.choice(PASSWORD_ALPHABET) for _ in range(GENERATED_PASSWORD_LENGTH))
+
+
+# Provisioning ----------------------------------------------------------
+
+class RosterProvisioner:
+    def __init__(self, default_class='', batch_size=500, workers=None, dry_run=False):
+        self.default_class = default_class
+        self.batch_size = batch_size
+        self.workers = workers
+        self.dry_run = dry_run
+
+    def run(self, rows):
+        report = ProvisionReport(dry_run=self.dry_run)
+        started = time.perf_counter()
+
+        valid = []
+        for line, raw in rows:
+            report.total_rows += 1
+            data, errors = validate_row(raw, self.default_class)
+            if errors:
+                report.errors.append(RowError(line, errors))
+            else:
+                valid.append((line, data))
+
+        conflicts = _find_conflicts(valid)
+        for line, messages in sorted(conflicts.items()):
+            report.errors.append(RowError(line, messages))
+        report.errors.sort(key=lambda error: error.line)
+        valid = [(line, data) for line, data in valid if line not in conflicts]
+        report.valid_rows = len(valid)
+
+        if self.dry_run or report.errors:
+            report.elapsed = time.perf_counter() - started
+            return report
+
+        passwords = []
+        for line, data in valid:
+            if not data['password']:
+                data['password'] = generate_password()
+                report.credentials.append((data['username'], data['password']))
+            passwords.append(data['password'])
+
+        hashing_started = time.perf_counter()
+        hashed = hash_passwords(passwords, self.workers)
+        report.hashing_seconds = time.perf_counter() - hashing_started
+
+        try:
+            users, profiles = self.create(valid, hashed)
+        except IntegrityError:
+            # Accounts created since the conflict check: report the rows
+            # that clash now, like any other conflict
+            conflicts = _find_conflicts(valid)
+            report.errors = [RowError(line, messages) for line, messages in sorted(conflicts.items())] or [
+                RowError(0, ['accounts could not be created; upload the roster again'])
+            ]
+            report.valid_rows = len(valid) - len(conflicts)
+            report.credentials = []
+            report.elapsed = time.perf_counter() - started
+            return report
+        report.created_users = len(users)
+        report.created_profiles = len(profiles)
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def create(self, valid, hashed):
+        with transaction.atomic():
+            users = User.objects.bulk_create(
+                [
+                    User(
+                        username=data['username'],
+                        password=password,
+                        email=data['email'],
+                        first_name=data['first_name'],
+                        last_name=data['last_name'],
+                        role=data['role'],
+                        school_class=data['school_class'] or None,
+                        student_id=data['student_id'] or None,
+                    )
+                    for (line, data), password in zip(valid, hashed)
+                ],
+                batch_size=self.batch_size,
+            )
+            profiles = UserProfile.objects.bulk_ensure(
+                [
+                    UserProfile(user=user, grade_level=data['grade_level'])
+                    for user, (line, data) in zip(users, valid)
+                ],
+                batch_size=self.batch_size,
+            )
+        return users, profiles
+
+
+def provision_users(fileobj, filename, default_class='', batch_size=500, workers=None, dry_run=False):
+    """Read a roster file and create its accounts"""
+    rows = read_roster_rows(fileobj, filename)
+    provisioner = RosterProvisioner(default_class=default_class, batch_size=batch_size,
+                                    workers=workers, dry_run=dry_run)
+    return provisioner.run(rows)
+
+
+# Background jobs -------------------------------------------------------
+
+def _credentials_key(job_id):
+    return f"{CREDENTIALS_PREFIX}{job_id}"
+
+
+def job_credentials(job):
+    """Generated passwords of a completed job while they are still cached"""
+    return cache.get(_credentials_key(job.pk), [])
+
+
+def run_provisioning_job(job):
+    """
+    Provision a claimed ProvisioningJob's roster and record the outcome on
+    the job. The roster file is deleted afterwards since it may hold
+    passwords. Returns the job's final status.
+    """
+    try:
+        if not settings.CACHE_IS_SHARED:
+            # Generated passwords would stay in this worker's cache, out of the admin's reach
+            raise ProvisioningUnavailable('Provisioning jobs need a cache shared with the web process (CACHE_URL)')
+        with job.roster.open('rb') as stored:
+            content = io.BytesIO(stored.read())
+        report = provision_users(content, job.filename, default_class=job.default_class)
+    except (RosterFormatError, ProvisioningUnavailable) as exc:
+        job.status, job.report = 'failed', {'error': str(exc)}
+    except Exception:
+        logger.exception('Provisioning job %s failed', job.pk)
+        job.status, job.report = 'failed', {'error': 'Provisioning failed'}
+    else:
+        job.status = 'rejected' if report.errors else 'completed'
+        job.report = report.as_dict(include_credentials=False)
+        if report.credentials:
+            cache.set(
+                _credentials_key(job.pk),
+                [{'username': username, 'password': password} for username, password in report.credentials],
+                settings.PROVISIONING_CREDENTIALS_TIMEOUT,
+            )
+    job.finished_at = timezone.now()
+    job.roster.delete(save=False)
+    job.save()
+    return job.status
@@ -0,0 +1,165 @@
+"""
+Sliding-window rate limits kept in the default cache.
+
+Each limit is two fixed-window counters (current and previous window); the
+previous one is weighted by how much of it still overlaps the sliding
+window. That is one ``get_many`` to check and an ``add``/``incr`` to count,
+so a rejected request costs a cache round trip and never reaches password
+hashing. Counters live in Redis when CACHE_URL is set and in the
+per-process LocMem cache otherwise.
+
+Scopes and the settings holding their rates ("30/m", "5/15m", ...):
+
+    login_ip         LOGIN_RATE_PER_IP       failed logins from an IP
+    login_username   LOGIN_FAILURE_RATE      failed logins for a username
+    register_ip      REGISTER_RATE_PER_IP    registrations from an IP
+    certificate_ip   CERTIFICATE_VERIFY_RATE public certificate lookups
+
+Login limits are enforced in CachedModelBackend.authenticate, so they cover
+the login API, token endpoint, admin and auth views alike. Only failures are
+counted: a whole school behind one NAT address signs in successfully from
+the same IP.
+"""
+import hashlib
+import math
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import Throttled
+
+KEY_PREFIX = 'ratelimit:'
+RATE_SETTINGS = {
+    'login_ip': 'LOGIN_RATE_PER_IP',
+    'login_username': 'LOGIN_FAILURE_RATE',
+    'register_ip': 'REGISTER_RATE_PER_IP',
+    'certificate_ip': 'CERTIFICATE_VERIFY_RATE',
+}
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class RateLimited(Throttled):
+    """Raised when a limit is exceeded; DRF turns it into a 429 with Retry-After"""
+    default_detail = 'Too many attempts. Try again later.'
+
+
+def parse_rate(rate):
+    """'30/m' -> (30, 60), '5/15m' -> (5, 900)"""
+    count, period = rate.split('/')
+    multiplier = period[:-1] or '1'
+    return int(count), int(multiplier) * PERIODS[period[-1]]
+
+
+class SlidingWindowCounter:
+    def __init__(self, scope, limit, window):
+        self.scope = scope
+        self.limit = limit
+        self.window = window
+
+    def _base_key(self, ident):
+        # Usernames may hold characters some cache backends reject in keys
+        digest = hashlib.blake2b(str(ident).encode(), digest_size=10).hexdigest()
+        return f"{KEY_PREFIX}{self.scope}:{digest}"
+
+    def _window(self, ident, now):
+        index, offset = divmod(now, self.window)
+        base = self._base_key(ident)
+        return f"{base}:{int(index)}", f"{base}:{int(index) - 1}", offset / self.window
+
+    def count(self, ident, now=None):
+        current_key, previous_key, elapsed = self._window(ident, now or time.time())
+        counts = cache.get_many([current_key, previous_key])
+        return counts.get(current_key, 0) + counts.get(previous_key, 0) * (1 - elapsed)
+
+    def retry_after(self, now=None):
+        offset = (now or time.time()) % self.window
+        return max(1, math.ceil(self.window - offset))
+
+    def check(self, ident, now=None):
+        """Raise RateLimited if ``ident`` is already at the limit"""
+        now = now or time.time()
+        if self.count(ident, now) >= self.limit:
+            raise RateLimited(wait=self.retry_after(now))
+
+    def hit(self, ident, now=None):
+        current_key = self._window(ident, now or time.time())[0]
+        cache.add(current_key, 0, self.window * 2)
+        try:
+            return cache.incr(current_key)
+        except ValueError:
+            # Expired between add() and incr()
+            cache.set(current_key, 1, self.window * 2)
+            return 1
+
+    def check_and_hit(self, ident, now=None):
+        now = now or time.time()
+        self.check(ident, now)
+        self.hit(ident, now)
+
+    def reset(self, ident, now=None):
+        current_key, previous_key, elapsed = self._window(ident, now or time.time())
+        cache.delete_many([current_key, previous_key])
+
+
+@lru_cache(maxsize=None)
+def _counter(scope, rate):
+    return SlidingWindowCounter(scope, *parse_rate(rate))
+
+
+def get_counter(scope):
+    """Counter for ``scope`` with its currently configured rate, or None when limiting is off"""
+    if not settings.ENABLE_RATE_LIMITING:
+        return None
+    return _counter(scope, getattr(settings, RATE_SETTINGS[scope]))
+
+
+def client_ip(request):
+    """
+    The client address. Behind RATELIMIT_TRUSTED_PROXIES reverse proxies the
+    address those proxies appended to X-Forwarded-For is used instead.
+    """
+    proxies = settings.RATELIMIT_TRUSTED_PROXIES
+    if proxies:
+        forwarded = [part.strip() for part in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if part.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def limit_request(scope, request):
+    """Count a request against a per-IP scope, raising RateLimited when over"""
+    counter = get_counter(scope)
+    if counter is not None:
+        counter.check_and_hit(client_ip(request))
+
+
+def _username_ident(username):
+    return str(username).strip().lower()
+
+
+def check_login(request, username):
+    """Called before any password is checked"""
+    ip_counter = get_counter('login_ip')
+    if ip_counter is None:
+        return
+    if username:
+        get_counter('login_username').check(_username_ident(username))
+    if request is not None:
+        ip_counter.check(client_ip(request))
+
+
+def login_failed(request, username):
+    counter = get_counter('login_username')
+    if counter is None:
+        return
+    if username:
+        counter.hit(_username_ident(username))
+    if request is not None:
+        get_counter('login_ip').hit(client_ip(request))
+
+
+def login_succeeded(username):
+    counter = get_counter('login_username')
+    if counter is not None and username:
+        counter.reset(_username_ident(username))
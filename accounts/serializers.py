@@ -1,3 +1,4 @@
+from django.contrib.auth import authenticate
 from rest_framework import serializers
 from .models import User, UserProfile
 
@@ -32,6 +33,15 @@ class LoginSerializer(serializers.Serializer):
     username = serializers.CharField()
     password = serializers.CharField(write_only=True)
 
+    def validate(self, attrs):
+        user = authenticate(
+            request=self.context.get('request'), username=attrs['username'], password=attrs['password']
+        )
+        if user is None:
+            raise serializers.ValidationError('Invalid username or password')
+        attrs['user'] = user
+        return attrs
+
 
 class ChangePasswordSerializer(serializers.Serializer):
     old_password = serializers.CharField(write_only=True)
@@ -48,7 +58,7 @@ class ProfileUpdateSerializer(serializers.ModelSerializer):
 class StudentSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'first_name', 'last_name']
+        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'student_id', 'school_class']
 
 
 class TeacherSerializer(serializers.ModelSerializer):
@@ -1,24 +1,57 @@
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
+from buxoro_test_system import images
+from .backends import forget_cached_user
 from .models import UserProfile
 
 User = get_user_model()
 
 @receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
     """
     Create user profile when user is created
     """
-    if created:
-        UserProfile.objects.get_or_create(user=instance)
+    if created and not raw:
+        UserProfile.objects.ensure_for([instance])
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
+def save_user_profile(sender, instance, created, raw=False, **kwargs):
     """
-    Save user profile when user is saved
+    Save the user's profile only if it was loaded and edited alongside the
+    user. Plain user saves (logins, activation toggles) don't touch it.
     """
-    if hasattr(instance, 'profile'):
-        instance.profile.save()
-    else:
-        UserProfile.objects.get_or_create(user=instance)
+    if created or raw or not User.profile.related.is_cached(instance):
+        return
+    profile = User.profile.related.get_cached_value(instance)
+    if profile is not None:
+        profile.save_changes()
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Drop the cached copy used by CachedModelBackend / CachedJWTAuthentication
+    """
+    forget_cached_user(instance.pk)
+
+
+@receiver(pre_save, sender=User)
+def detect_new_profile_image(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._process_image = images.reset_if_replaced(
+            instance, 'profile_image', 'profile_image_hash', 'profile_image_widths'
+        )
+
+
+@receiver(post_save, sender=User)
+def process_profile_image(sender, instance, raw=False, **kwargs):
+    """
+    Resize new profile photos in the background after commit
+    """
+    if not raw and getattr(instance, '_process_image', False):
+        instance._process_image = False
+        images.schedule_processing(
+            instance, 'profile_image', 'profile_image_hash', 'profile_image_widths', settings.PROFILE_IMAGE_WIDTHS
+        )
@@ -0,0 +1,13 @@
+from celery import shared_task
+
+from .models import ProvisioningJob
+from .provisioning import run_provisioning_job
+
+
+@shared_task
+def provision_roster(job_id):
+    """Create the accounts of an uploaded roster (accounts.provisioning)"""
+    # Claimed atomically so a redelivered message cannot run a job twice
+    if not ProvisioningJob.objects.filter(pk=job_id, status='pending').update(status='running'):
+        return None
+    return run_provisioning_job(ProvisioningJob.objects.get(pk=job_id))
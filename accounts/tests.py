@@ -1,3 +1,324 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+import uuid
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import provisioning, ratelimit
+from .authentication import CachedJWTAuthentication
+from .backends import CachedModelBackend
+from .models import ProvisioningJob, User, UserProfile
+from .provisioning import provision_users
+from .serializers import StudentSerializer
+from .tasks import provision_roster
+
+ROSTER = (
+    "student_id,first_name,last_name,school_class,password\n"
+    "S1,Ali,Valiyev,9-A,\n"
+    "S2,Vali,Aliyev,,maxfiy-parol\n"
+)
+
+
+def roster(content=ROSTER, name='roster.csv'):
+    return SimpleUploadedFile(name, content.encode('utf-8'), content_type='text/csv')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], CACHE_IS_SHARED=True)
+class RosterProvisioningTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.admin = User.objects.create_user('admin', password='x', role='admin', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def post(self, upload, **data):
+        return self.client.post('/api/accounts/users/provision/', {'file': upload, **data}, format='multipart')
+
+    def test_roster_creates_accounts(self):
+        report = provision_users(roster(), 'roster.csv', default_class='9-B')
+        self.assertEqual((report.created_users, report.created_profiles, report.errors), (2, 2, []))
+        self.assertEqual([username for username, password in report.credentials], ['s1'])
+        vali = User.objects.get(username='s2')
+        self.assertEqual(vali.school_class, '9-B')
+        self.assertTrue(vali.check_password('maxfiy-parol'))
+        self.assertTrue(hasattr(vali, 'profile'))
+
+    def test_usernames_clash_regardless_of_case(self):
+        User.objects.create_user('S1', password='x')
+        report = provision_users(roster(), 'roster.csv')
+        self.assertEqual([error.as_dict() for error in report.errors],
+                         [{'line': 2, 'errors': ["username: 's1' already exists"]}])
+        self.assertEqual(User.objects.count(), 2)
+
+    def test_accounts_created_during_the_run_become_row_errors(self):
+        checks = iter([lambda rows: {}, provisioning._find_conflicts])
+        User.objects.create_user('other', password='x', student_id='S2')
+        with mock.patch.object(provisioning, '_find_conflicts', side_effect=lambda rows: next(checks)(rows)):
+            report = provision_users(roster(), 'roster.csv')
+        self.assertEqual([error.as_dict() for error in report.errors],
+                         [{'line': 3, 'errors': ["student_id: 'S2' already exists"]}])
+        self.assertEqual((report.created_users, report.credentials), (0, []))
+        self.assertFalse(User.objects.filter(username='s1').exists())
+
+    def test_dry_run_answers_in_the_request(self):
+        response = self.post(roster(), dry_run='true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['valid_rows'], 2)
+        self.assertFalse(ProvisioningJob.objects.exists())
+        self.assertEqual(self.post(roster(name='roster.txt')).status_code, 400)
+
+    def test_upload_is_provisioned_by_a_worker(self):
+        with mock.patch.object(provision_roster, 'delay', side_effect=provision_roster) as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.post(roster(), school_class='10-A')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job_id']
+        self.assertEqual(response.json()['status'], 'pending')
+        delay.assert_called_once_with(job_id)
+
+        response = self.client.get(f'/api/accounts/users/provision/{job_id}/')
+        self.assertEqual(response.status_code, 200)
+        state = response.json()
+        self.assertEqual((state['status'], state['report']['created_users']), ('completed', 2))
+        self.assertEqual([item['username'] for item in state['report']['credentials']], ['s1'])
+        self.assertTrue(User.objects.get(username='s1').check_password(state['report']['credentials'][0]['password']))
+        self.assertEqual(User.objects.get(username='s2').school_class, '10-A')
+
+        job = ProvisioningJob.objects.get(pk=job_id)
+        self.assertNotIn('credentials', job.report)
+        self.assertFalse(job.roster)
+        # Redelivered messages do not run a job twice
+        self.assertIsNone(provision_roster(job_id))
+
+        other = User.objects.create_user('admin2', password='x', role='admin', is_staff=True)
+        self.client.force_authenticate(other)
+        self.assertNotIn('credentials', self.client.get(f'/api/accounts/users/provision/{job_id}/').json()['report'])
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_jobs_fail_without_a_shared_cache(self):
+        with mock.patch.object(provision_roster, 'delay', side_effect=provision_roster), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.post(roster())
+        state = self.client.get(f"/api/accounts/users/provision/{response.json()['job_id']}/").json()
+        self.assertEqual(state['status'], 'failed')
+        self.assertIn('CACHE_URL', state['report']['error'])
+        self.assertFalse(User.objects.filter(username__in=['s1', 's2']).exists())
+
+    def test_passwords_are_hashed_in_parallel_in_order(self):
+        passwords = [f'parol-{number}' for number in range(provisioning.HASH_CHUNK_SIZE * 3)]
+        # Also inside a daemonic Celery prefork worker
+        with mock.patch('multiprocessing.current_process', return_value=mock.Mock(daemon=True)), \
+                mock.patch.object(provisioning, 'ThreadPoolExecutor', wraps=provisioning.ThreadPoolExecutor) as pool:
+            hashed = provisioning.hash_passwords(passwords, workers=3)
+        pool.assert_called_once()
+        self.assertEqual(len(hashed), len(passwords))
+        for password, encoded in zip(passwords[::25], hashed[::25]):
+            self.assertTrue(check_password(password, encoded))
+
+    def test_rejected_roster(self):
+        with mock.patch.object(provision_roster, 'delay', side_effect=provision_roster), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.post(roster(ROSTER + "S1,Takror,,,\n"))
+        state = self.client.get(f"/api/accounts/users/provision/{response.json()['job_id']}/").json()
+        self.assertEqual(state['status'], 'rejected')
+        self.assertEqual(state['report']['errors'][0]['line'], 4)
+        self.assertEqual(User.objects.count(), 1)
+
+
+class UserProfileWriteTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ali', password='x')
+
+    def profile_queries(self, action):
+        with CaptureQueriesContext(connection) as queries:
+            action()
+        return [query['sql'] for query in queries if 'accounts_userprofile' in query['sql']]
+
+    def test_created_once_through_one_path(self):
+        self.assertEqual(UserProfile.objects.filter(user=self.user).count(), 1)
+        UserProfile.objects.ensure_for([self.user, User.objects.create_user('vali')])
+        self.assertEqual(UserProfile.objects.count(), 2)
+
+    def test_plain_user_saves_leave_the_profile_alone(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.last_login = timezone.now()
+        self.assertEqual(self.profile_queries(user.save), [])
+
+        user = User.objects.select_related('profile').get(pk=self.user.pk)
+        user.first_name = 'Ali'
+        self.assertEqual(self.profile_queries(user.save), [])
+
+    def test_edited_profile_writes_only_changed_fields(self):
+        user = User.objects.select_related('profile').get(pk=self.user.pk)
+        user.profile.bio = 'Matematika'
+        [update] = self.profile_queries(user.save)
+        self.assertIn('"bio"', update)
+        self.assertNotIn('"location"', update)
+        self.assertEqual(UserProfile.objects.get(user=self.user).bio, 'Matematika')
+
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertFalse(profile.save_changes())
+        profile.subjects_of_interest.append('fizika')
+        self.assertTrue(profile.save_changes())
+        self.assertEqual(UserProfile.objects.get(user=self.user).subjects_of_interest, ['fizika'])
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('ali', password='maxfiy-parol')
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    def authenticate(self):
+        request = RequestFactory().get('/api/tests/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        return CachedJWTAuthentication().authenticate(request)
+
+    def test_bearer_tokens_need_no_query_once_cached(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate()[0], self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate()[0], self.user)
+
+    def test_saved_users_drop_out_of_the_cache(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+        self.user.delete()
+        self.assertIsNone(CachedModelBackend().get_user(self.user.pk))
+
+    def test_session_users_come_from_the_cache(self):
+        backend = CachedModelBackend()
+        self.assertEqual(backend.get_user(self.user.pk), self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(backend.get_user(self.user.pk), self.user)
+        self.assertEqual(settings.SESSION_ENGINE, 'django.contrib.sessions.backends.cached_db')
+
+    def test_token_endpoint(self):
+        response = APIClient().post('/api/accounts/token/', {'username': 'ali', 'password': 'maxfiy-parol'})
+        self.assertEqual(response.status_code, 200)
+        url = f'/api/tests/attempts/{uuid.uuid4()}/heartbeat/'
+        client = APIClient()
+        self.assertEqual(client.post(url).status_code, 401)
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+        self.assertEqual(client.post(url).status_code, 404)
+
+
+@override_settings(ENABLE_RATE_LIMITING=True, LOGIN_FAILURE_RATE='3/15m', LOGIN_RATE_PER_IP='20/m',
+                   REGISTER_RATE_PER_IP='2/h', RATELIMIT_TRUSTED_PROXIES=0)
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('ali', password='maxfiy-parol')
+
+    def login(self, password, username='ali', **extra):
+        return self.client.post('/api/accounts/login/', {'username': username, 'password': password}, **extra)
+
+    def test_sliding_window(self):
+        self.assertEqual(ratelimit.parse_rate('5/15m'), (5, 900))
+        counter = ratelimit.SlidingWindowCounter('test', 4, 60)
+        for _ in range(4):
+            counter.check_and_hit('ip', now=600)
+        with self.assertRaises(ratelimit.RateLimited):
+            counter.check('ip', now=630)
+        # Half of the previous window still counts
+        self.assertEqual(counter.count('ip', now=690), 2)
+        counter.check('ip', now=690)
+        self.assertEqual(counter.count('ip', now=720), 0)
+
+    def test_failed_logins_lock_the_username_before_hashing(self):
+        for _ in range(3):
+            self.assertEqual(self.login('noto\'g\'ri').status_code, 400)
+        with mock.patch.object(User, 'check_password') as check_password:
+            response = self.login('maxfiy-parol', username='ALI')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        check_password.assert_not_called()
+
+    def test_successful_login_resets_the_failures(self):
+        for _ in range(2):
+            self.login('noto\'g\'ri')
+        self.assertEqual(self.login('maxfiy-parol').status_code, 200)
+        for _ in range(2):
+            self.login('noto\'g\'ri')
+        self.assertEqual(self.login('maxfiy-parol').status_code, 200)
+
+    @override_settings(LOGIN_RATE_PER_IP='2/m', RATELIMIT_TRUSTED_PROXIES=1)
+    def test_per_ip_limits(self):
+        self.login('noto\'g\'ri', username='a', HTTP_X_FORWARDED_FOR='10.0.0.1')
+        self.login('noto\'g\'ri', username='b', HTTP_X_FORWARDED_FOR='10.0.0.1')
+        self.assertEqual(self.login('maxfiy-parol', HTTP_X_FORWARDED_FOR='10.0.0.1').status_code, 429)
+        self.assertEqual(self.login('maxfiy-parol', HTTP_X_FORWARDED_FOR='10.0.0.2').status_code, 200)
+
+    @override_settings(LOGIN_RATE_PER_IP='5/m')
+    def test_successful_logins_from_one_ip_are_not_limited(self):
+        # A class signing in from behind one school NAT
+        for number in range(12):
+            User.objects.create_user(f'oquvchi{number}', password='maxfiy-parol')
+            self.assertEqual(self.login('maxfiy-parol', username=f'oquvchi{number}').status_code, 200)
+        for number in range(5):
+            self.login('noto\'g\'ri', username=f'oquvchi{number}')
+        self.assertEqual(self.login('maxfiy-parol', username='oquvchi11').status_code, 429)
+
+    def test_registration_limit(self):
+        for _ in range(2):
+            self.assertEqual(self.client.post('/api/accounts/register/', {}).status_code, 400)
+        self.assertEqual(self.client.post('/api/accounts/register/', {}).status_code, 429)
+
+    @override_settings(ENABLE_RATE_LIMITING=False)
+    def test_disabled(self):
+        for _ in range(5):
+            self.login('noto\'g\'ri')
+        self.assertEqual(self.login('maxfiy-parol').status_code, 200)
+
+
+class LeanListingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user('teacher', password='x', role='teacher')
+        for username, student_id, school_class in (('ali', 'S100', '9-A'), ('alisher', 'S200', '9-B'),
+                                                   ('vali', 'S101', '9-A')):
+            User.objects.create_user(username, password='x', role='student', student_id=student_id,
+                                     school_class=school_class, email=f'{username}@maktab.uz')
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def students(self, **params):
+        response = self.client.get('/api/accounts/students/', params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return data['results'] if isinstance(data, dict) else data
+
+    def test_rows_match_the_model_serializer(self):
+        expected = StudentSerializer(User.objects.filter(role='student').order_by('-date_joined'), many=True).data
+        self.assertEqual(self.students(), json.loads(json.dumps(expected, cls=DjangoJSONEncoder)))
+
+    def test_prefix_search_and_class_filter(self):
+        self.assertEqual({row['username'] for row in self.students(search='ali')}, {'ali', 'alisher'})
+        self.assertEqual({row['username'] for row in self.students(search='S10')}, {'ali', 'vali'})
+        self.assertEqual({row['username'] for row in self.students(school_class='9-A')}, {'ali', 'vali'})
+        self.assertEqual(self.students(search='ali', school_class='9-B')[0]['username'], 'alisher')
+
+    def test_students_cannot_list(self):
+        self.client.force_authenticate(User.objects.get(username='ali'))
+        self.assertEqual(self.client.get('/api/accounts/students/').status_code, 403)
+        self.assertEqual(self.client.get('/api/accounts/users/').status_code, 403)
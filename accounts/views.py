@@ -6,6 +6,7 @@ from django.views.generic import CreateView
 from django.urls import reverse_lazy
 from django.http import JsonResponse
 from .models import User, UserProfile
+from .ratelimit import limit_request
 from .serializers import RegisterSerializer
 
 
@@ -17,6 +18,7 @@ def placeholder_view(request):
 def register_view(request):
     """User registration view"""
     if request.method == 'POST':
+        limit_request('register_ip', request)
         username = request.POST.get('username')
         email = request.POST.get('email')
         first_name = request.POST.get('first_name')
@@ -93,35 +95,42 @@ def profile_view(request):
     return render(request, 'accounts/profile.html', {'profile': profile})
 
 
-def dashboard_view(request):
-    """User dashboard view"""
-    if not request.user.is_authenticated:
-        return redirect('home')
-    
+def dashboard_context(user):
+    """Context for accounts/dashboard.html; related rows are fetched here, not from the template"""
+    from django.db.models import Count
     from examinations.models import Test, TestAttempt, Category
     
     context = {
-        'user': request.user,
-        'available_tests': Test.objects.filter(status='published', is_active=True)[:6],
+        'user': user,
+        'available_tests': Test.objects.filter(status='published').annotate(question_count=Count('questions'))[:6],
         'categories': Category.objects.filter(is_active=True)[:4],
     }
     
-    if request.user.role == 'student':
+    if user.role == 'student':
         # Get student's test attempts and results
         context['recent_attempts'] = TestAttempt.objects.filter(
-            user=request.user
-        ).order_by('-started_at')[:5]
+            user=user
+        ).select_related('test').order_by('-started_at')[:5]
         
-    elif request.user.role == 'teacher':
+    elif user.role == 'teacher':
         # Get teacher's tests and statistics
         context['my_tests'] = Test.objects.filter(
-            created_by=request.user
-        ).order_by('-created_at')[:5]
+            created_by=user
+        ).annotate(attempt_count=Count('attempts')).order_by('-created_at')[:5]
         
-    elif request.user.role == 'admin':
+    elif user.role == 'admin':
         # Get admin statistics
         context['total_tests'] = Test.objects.count()
         context['total_attempts'] = TestAttempt.objects.count()
         context['total_users'] = User.objects.count()
     
+    return context
+
+
+def dashboard_view(request):
+    """User dashboard view"""
+    if not request.user.is_authenticated:
+        return redirect('home')
+    
+    context = dashboard_context(request.user)
     return render(request, 'accounts/dashboard.html', context)
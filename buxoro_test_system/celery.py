@@ -0,0 +1,17 @@
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'buxoro_test_system.settings')
+
+app = Celery('buxoro_test_system')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
+
+
+@app.on_after_finalize.connect
+def connect_tracing(sender, **kwargs):
+    # Imported late: tracing needs configured Django settings
+    from .tracing import connect_celery_signals
+
+    connect_celery_signals()
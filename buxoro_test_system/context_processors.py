@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.utils.translation import get_language
+
+
+def fragment_cache(request):
+    """
+    Timeout and vary key for the {% cache %} fragments of base.html and
+    home.html: they differ only by language and by the visitor's role.
+    """
+    user = getattr(request, 'user', None)
+    audience = user.role if user is not None and user.is_authenticated else 'guest'
+    return {
+        'fragment_cache_timeout': settings.TEMPLATE_FRAGMENT_TIMEOUT,
+        'fragment_cache_vary': f"{get_language()}:{audience}",
+    }
@@ -0,0 +1,130 @@
+"""
+Liveness and readiness probes.
+
+    /healthz   the process is up and serving; no I/O at all
+    /readyz    the instance can do useful work: database and cache answer,
+               all migrations are applied and the Celery broker accepts a
+               connection (within HEALTH_CHECK_TIMEOUT seconds). The web
+               process therefore needs the real CELERY_BROKER_URL and
+               CACHE_URL, as docker-compose.yml sets them.
+
+The Docker HEALTHCHECK polls /healthz, so an outage of a shared service
+does not get every container restarted; /readyz is for the load balancer.
+The probes are unauthenticated, so /readyz reports only ok/fail per
+check and the reasons for failures go to the log.
+
+HealthCheckMiddleware sits first in MIDDLEWARE and answers both paths
+itself, so probes skip host validation, the HTTPS redirect, sessions, CSRF
+and authentication. Readiness results are kept per process for
+HEALTH_CHECK_CACHE_SECONDS: polling every second from several places costs
+one round of checks per interval, and concurrent probes wait for the
+running round instead of starting their own.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse, JsonResponse
+
+LIVENESS_PATHS = ('/healthz', '/healthz/')
+READINESS_PATHS = ('/readyz', '/readyz/')
+CACHE_PROBE_KEY = 'health:probe'
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_last_report = None
+_last_checked = 0.0
+_migrations_applied = False
+
+
+def check_database():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+def check_cache():
+    cache.set(CACHE_PROBE_KEY, 1, 30)
+    if cache.get(CACHE_PROBE_KEY) != 1:
+        raise RuntimeError('cache did not return the probe value')
+
+
+def check_migrations():
+    # Once applied they stay applied for this process: new migrations only
+    # arrive with new code, which means new workers
+    global _migrations_applied
+    if _migrations_applied:
+        return
+    from django.db.migrations.executor import MigrationExecutor
+
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    if plan:
+        raise RuntimeError(f'{len(plan)} unapplied migration(s)')
+    _migrations_applied = True
+
+
+def check_broker():
+    from buxoro_test_system.celery import app
+
+    with app.connection_for_write(connect_timeout=settings.HEALTH_CHECK_TIMEOUT) as broker:
+        broker.ensure_connection(max_retries=0, timeout=settings.HEALTH_CHECK_TIMEOUT)
+
+
+CHECKS = (
+    ('database', check_database),
+    ('cache', check_cache),
+    ('migrations', check_migrations),
+    ('broker', check_broker),
+)
+
+
+def run_checks():
+    checks = {}
+    for name, check in CHECKS:
+        started = time.perf_counter()
+        try:
+            check()
+        except Exception:
+            elapsed = (time.perf_counter() - started) * 1000
+            logger.warning('Readiness check %s failed after %.1f ms', name, elapsed, exc_info=True)
+            checks[name] = 'fail'
+        else:
+            checks[name] = 'ok'
+    return {
+        'status': 'ok' if all(result == 'ok' for result in checks.values()) else 'unavailable',
+        'checks': checks,
+    }
+
+
+def readiness():
+    """The latest readiness report, re-checked at most every HEALTH_CHECK_CACHE_SECONDS"""
+    global _last_report, _last_checked
+    max_age = settings.HEALTH_CHECK_CACHE_SECONDS
+    if _last_report is not None and time.monotonic() - _last_checked < max_age:
+        return _last_report
+    with _lock:
+        if _last_report is None or time.monotonic() - _last_checked >= max_age:
+            _last_report = run_checks()
+            _last_checked = time.monotonic()
+        return _last_report
+
+
+class HealthCheckMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        path = request.path_info
+        if path in LIVENESS_PATHS:
+            response = HttpResponse('ok', content_type='text/plain')
+        elif path in READINESS_PATHS:
+            report = readiness()
+            response = JsonResponse(report, status=200 if report['status'] == 'ok' else 503)
+        else:
+            return self.get_response(request)
+        response['Cache-Control'] = 'no-store'
+        return response
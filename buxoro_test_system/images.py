@@ -0,0 +1,226 @@
+"""
+Image pipeline for question images and profile photos.
+
+Uploads are validated against ALLOWED_IMAGE_EXTENSIONS, MAX_FILE_UPLOAD_SIZE
+and MAX_IMAGE_PIXELS. After the saving transaction commits, a small thread
+pool (Pillow releases the GIL while decoding, resizing and encoding)
+builds downscaled WebP and JPEG variants.
+
+Variants are stored by content hash::
+
+    image-variants/ab/<sha256>/640.webp
+    image-variants/ab/<sha256>/640.jpg
+
+so the same photo uploaded for twenty questions is resized and stored
+once. A duplicate upload is also pointed at the first stored copy of the
+original and its own copy is deleted. The model keeps the hash and the
+generated widths; serializers turn them into srcset strings without
+touching storage.
+"""
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+VARIANT_ROOT = 'image-variants'
+FORMATS = (
+    # (extension, Pillow format, save options)
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+_executor = None
+
+
+def validate_image_name(name):
+    extension = os.path.splitext(name)[1].lower().lstrip('.')
+    allowed = [ext.strip().lower() for ext in settings.ALLOWED_IMAGE_EXTENSIONS]
+    if extension not in allowed:
+        raise ValidationError(
+            f"Unsupported image type '.{extension}'. Allowed: {', '.join(allowed)}", code='invalid_extension'
+        )
+
+
+def validate_image_upload(upload):
+    """
+    Model field validator for uploaded images. Files already in storage
+    were checked when they were uploaded and are not downloaded again on
+    every ``full_clean``.
+    """
+    validate_image_name(upload.name)
+    if getattr(upload, '_committed', False):
+        return
+    if upload.size > settings.MAX_FILE_UPLOAD_SIZE:
+        raise ValidationError(
+            f"Image is larger than {settings.MAX_FILE_UPLOAD_SIZE // (1024 * 1024)} MB", code='file_too_large'
+        )
+
+    from PIL import Image
+
+    position = upload.tell() if hasattr(upload, 'tell') else 0
+    try:
+        with Image.open(upload) as image:
+            width, height = image.size
+    except Exception:
+        raise ValidationError('Upload a valid image.', code='invalid_image')
+    finally:
+        upload.seek(position)
+    if width * height > settings.MAX_IMAGE_PIXELS:
+        raise ValidationError(f"Image is too large ({width}x{height} pixels)", code='too_many_pixels')
+
+
+def content_hash(field_file):
+    digest = hashlib.sha256()
+    with field_file.open('rb') as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def variant_name(image_hash, width, extension):
+    return f"{VARIANT_ROOT}/{image_hash[:2]}/{image_hash}/{width}.{extension}"
+
+
+def target_widths(original_width, widths):
+    """Configured widths below the original, plus the original (capped) so nothing is upscaled"""
+    targets = sorted(width for width in widths if width < original_width)
+    largest = min(original_width, max(widths))
+    if largest not in targets:
+        targets.append(largest)
+    return targets
+
+
+def build_variants(field_file, image_hash, widths):
+    """Write the variants of one image unless they exist already; returns the widths"""
+    from PIL import Image, ImageOps
+
+    with field_file.open('rb') as handle:
+        with Image.open(handle) as source:
+            # Phone photos are often stored sideways with an EXIF rotation flag
+            image = ImageOps.exif_transpose(source)
+            image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+            targets = target_widths(image.width, widths)
+            largest = targets[-1]
+            if all(default_storage.exists(variant_name(image_hash, largest, ext)) for ext, _, _ in FORMATS):
+                return targets
+
+            for width in targets:
+                height = max(1, round(image.height * width / image.width))
+                resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+                for extension, image_format, options in FORMATS:
+                    output = resized
+                    if image_format == 'JPEG' and output.mode != 'RGB':
+                        # JPEG has no alpha: flatten onto white
+                        background = Image.new('RGB', output.size, (255, 255, 255))
+                        background.paste(output, mask=output.getchannel('A'))
+                        output = background
+                    buffer = BytesIO()
+                    output.save(buffer, image_format, **options)
+                    name = variant_name(image_hash, width, extension)
+                    if default_storage.exists(name):
+                        default_storage.delete(name)
+                    default_storage.save(name, ContentFile(buffer.getvalue()))
+    return targets
+
+
+def process_image(model, pk, field_name, hash_field, widths_field, widths):
+    """
+    Hash the stored image, reuse an identical earlier upload if there is
+    one, build variants and record hash and widths on the row.
+    """
+    instance = model._default_manager.filter(pk=pk).only(field_name).first()
+    if instance is None:
+        return None
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return None
+    name = field_file.name
+
+    image_hash = content_hash(field_file)
+    # The earliest row with the same content owns the canonical copy
+    duplicate = (
+        model._default_manager.filter(**{hash_field: image_hash}, pk__lt=pk)
+        .exclude(**{field_name: name})
+        .order_by('pk').values_list(field_name, flat=True).first()
+    )
+    updates = {hash_field: image_hash}
+    if duplicate and default_storage.exists(duplicate):
+        updates[field_name] = duplicate
+    updates[widths_field] = build_variants(field_file, image_hash, widths)
+
+    # Only if the image was not replaced again in the meantime
+    updated = model._default_manager.filter(pk=pk, **{field_name: name}).update(**updates)
+    if updated and field_name in updates and not model._default_manager.filter(**{field_name: name}).exists():
+        default_storage.delete(name)
+    return image_hash
+
+
+def _run(*args):
+    try:
+        return process_image(*args)
+    except Exception:
+        logger.exception('Image variant generation failed for %s pk=%s', args[0].__name__, args[1])
+        raise
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.IMAGE_WORKERS, thread_name_prefix='image-variants')
+    return _executor
+
+
+def schedule_processing(instance, field_name, hash_field, widths_field, widths):
+    """Queue variant generation once the current transaction commits"""
+    args = (type(instance), instance.pk, field_name, hash_field, widths_field, tuple(widths))
+    transaction.on_commit(lambda: get_executor().submit(_run, *args))
+
+
+def reset_if_replaced(instance, field_name, hash_field, widths_field):
+    """
+    pre_save helper: forget hash and variants when a new file is assigned,
+    an uploaded storage key is attached (``instance._direct_upload``) or the
+    image is cleared. Returns True when the image needs processing.
+    """
+    field_file = getattr(instance, field_name)
+    direct_upload = instance.__dict__.pop('_direct_upload', False)
+    if field_file and (direct_upload or not field_file._committed):
+        setattr(instance, hash_field, '')
+        setattr(instance, widths_field, [])
+        return True
+    if not field_file and getattr(instance, hash_field):
+        setattr(instance, hash_field, '')
+        setattr(instance, widths_field, [])
+    return False
+
+
+def image_sources(field_file, image_hash, widths, request=None):
+    """
+    Serialized image: the original URL plus ``srcset`` strings per format
+    once variants exist. Clients render ``<img loading="lazy">`` /
+    ``<picture>`` from this without knowing the storage layout.
+    """
+    if not field_file:
+        return None
+
+    def absolute(url):
+        return request.build_absolute_uri(url) if request is not None else url
+
+    data = {'original': absolute(field_file.url), 'srcset': {}, 'fallback': absolute(field_file.url)}
+    if image_hash and widths:
+        for extension, _, _ in FORMATS:
+            data['srcset'][extension] = ', '.join(
+                f"{absolute(default_storage.url(variant_name(image_hash, width, extension)))} {width}w"
+                for width in widths
+            )
+        data['fallback'] = absolute(default_storage.url(variant_name(image_hash, widths[-1], 'jpg')))
+    return data
@@ -0,0 +1,256 @@
+"""
+Structured, non-blocking logging.
+
+Request threads only put records on an in-memory queue (QueueLogHandler);
+a listener thread per process formats them as JSON lines and writes them
+to the size-rotated log file and the console. Each line carries the
+request context set by RequestContextMiddleware:
+
+    {"ts": "2025-03-02T08:15:04.120Z", "level": "INFO", "logger": "buxoro_test_system.requests",
+     "message": "POST /api/tests/attempts/.../auto-save/ 200", "request_id": "9f1c...", "user_id": 42,
+     "attempt_id": "5b0e...", "event": "attempt_auto_save", "status": 200, "duration_ms": 18.4}
+
+Code can add fields for the rest of the request with bind(), e.g.
+``bind(attempt_id=attempt.pk)``.
+
+High-volume INFO events (heartbeats, timing batches, ...) are sampled by
+SamplingFilter at the rates in LOG_SAMPLE_RATES; kept records carry
+``sample_rate`` so counts can be scaled back up. Warnings and errors are
+never dropped.
+"""
+import contextvars
+import copy
+import datetime
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from logging.handlers import QueueListener, RotatingFileHandler
+
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject, empty
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; rotation is then per process only
+    fcntl = None
+
+request_logger = logging.getLogger('buxoro_test_system.requests')
+
+_context = contextvars.ContextVar('log_context', default=None)
+
+# Attributes every LogRecord has; anything else was passed in ``extra``
+RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def bind(**fields):
+    """Add fields to every record logged for the rest of the current request"""
+    context = _context.get()
+    if context is not None:
+        context['fields'].update(fields)
+
+
+def _user_id(request):
+    # Only a user that was already loaded; logging must not query the database
+    user = request.__dict__.get('user')
+    if isinstance(user, SimpleLazyObject):
+        user = None if user._wrapped is empty else user._wrapped
+    return getattr(user, 'pk', None)
+
+
+class RequestContextFilter(logging.Filter):
+    """Copy the current request's context onto the record, in the thread that logs it"""
+
+    def filter(self, record):
+        context = _context.get()
+        if context is not None:
+            record.request_id = context['request_id']
+            request = context['request']
+            if request is not None:
+                record.user_id = _user_id(request)
+                match = request.resolver_match
+                if match is not None and 'attempt_id' in match.kwargs:
+                    record.attempt_id = str(match.kwargs['attempt_id'])
+            for name, value in context['fields'].items():
+                setattr(record, name, value)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of INFO/DEBUG records whose ``event`` is in LOG_SAMPLE_RATES"""
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = settings.LOG_SAMPLE_RATES.get(getattr(record, 'event', None))
+        if rate is None:
+            return True
+        if random.random() >= rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; extra record attributes become fields"""
+
+    def format(self, record):
+        data = {
+            'ts': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc)
+            .isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in RECORD_ATTRIBUTES and value is not None:
+                data[name] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        if record.stack_info:
+            data['stack'] = record.stack_info
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SharedRotatingFileHandler(RotatingFileHandler):
+    """
+    Size-based rotation for one file written by several processes (gunicorn
+    workers): rollover happens under a file lock, and a process notices
+    that another one rotated the file and reopens it.
+    """
+
+    def _reopen_if_rotated(self):
+        if self.stream is None:
+            return
+        try:
+            current = os.stat(self.baseFilename).st_ino
+        except FileNotFoundError:
+            current = None
+        if current != os.fstat(self.stream.fileno()).st_ino:
+            self.stream.close()
+            self.stream = self._open()
+
+    def shouldRollover(self, record):
+        self._reopen_if_rotated()
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        if fcntl is None:
+            return super().doRollover()
+        with open(f'{self.baseFilename}.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # Another process may have rotated while we waited
+                self._reopen_if_rotated()
+                if self.stream is not None and os.path.getsize(self.baseFilename) < self.maxBytes:
+                    return
+                super().doRollover()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class QueueLogHandler(logging.Handler):
+    """
+    Hands records to a QueueListener thread that feeds the handlers named
+    in ``targets`` (configured elsewhere in LOGGING). The listener starts
+    on first use in each process, so it also runs in workers forked after
+    the master configured logging (gunicorn preload_app).
+
+    A plain Handler rather than a QueueHandler subclass: dictConfig on
+    Python 3.12+ builds its own listener for those.
+    """
+
+    def __init__(self, targets, maxsize=10000):
+        super().__init__()
+        self.targets = targets
+        self.maxsize = maxsize
+        self.queue = None
+        self.listener = None
+        self.dropped = 0
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _start(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # logging._handlers: handlers by LOGGING name (logging.getHandlerByName on 3.12)
+            handlers = [logging._handlers[name] for name in self.targets if name in logging._handlers]
+            self.queue = queue.Queue(self.maxsize)
+            self.listener = QueueListener(self.queue, *handlers, respect_handler_level=True)
+            self.listener.start()
+            self._pid = os.getpid()
+
+    def prepare(self, record):
+        # Merge the message here, keep the traceback as text, and drop
+        # objects (the request) the listener thread has no business touching
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        record.__dict__.pop('request', None)
+        return record
+
+    def emit(self, record):
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except queue.Full:
+            # Never block a request on logging
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+        self.listener = None
+        self._pid = None
+        super().close()
+
+
+class RequestContextMiddleware:
+    """
+    Give each request an id (X-Request-ID from the proxy or a new one),
+    make it and the user/attempt ids available to log records, and log
+    one line per request with its duration.
+
+    The access line is always INFO: ``django.request`` already logs 4xx
+    responses as warnings and 5xx as errors, so failures are not reported
+    twice; access lines of sampled events are sampled whatever their status.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.headers.get('X-Request-ID', '')[:64] or uuid.uuid4().hex
+        request.request_id = request_id
+        token = _context.set({'request_id': request_id, 'request': request, 'fields': {}})
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            response['X-Request-ID'] = request_id
+            self.log_request(request, response.status_code, time.perf_counter() - started)
+            return response
+        finally:
+            _context.reset(token)
+
+    def log_request(self, request, status, elapsed):
+        match = request.resolver_match
+        request_logger.info(
+            '%s %s %s', request.method, request.path, status,
+            extra={
+                'event': match.url_name if match is not None else None,
+                'status': status,
+                'duration_ms': round(elapsed * 1000, 1),
+            },
+        )
@@ -0,0 +1,11 @@
+from rest_framework.renderers import JSONRenderer
+
+from .tracing import span
+
+
+class TracedJSONRenderer(JSONRenderer):
+    """JSONRenderer with a trace span for serializing the response body"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with span('serialize.json'):
+            return super().render(data, accepted_media_type, renderer_context)
@@ -10,8 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 from decouple import config
+from celery.schedules import crontab
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,6 +47,7 @@ THIRD_PARTY_APPS = [
     'rest_framework',
     'corsheaders',
     'django_filters',
+    'compressor',
 ]
 
 LOCAL_APPS = [
@@ -52,35 +55,55 @@ LOCAL_APPS = [
     'examinations',
     'questions',
     'results',
+    'profiling',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    # /healthz and /readyz are answered before anything below runs
+    'buxoro_test_system.health.HealthCheckMiddleware',
+    # Request id, user/attempt ids and timing for log records
+    'buxoro_test_system.log.RequestContextMiddleware',
+    # Sampled request traces (TRACE_SAMPLE_RATE)
+    'buxoro_test_system.tracing.TracingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Staff-requested request profiles (profiling app); idle without live rules
+    'profiling.middleware.ProfilingMiddleware',
+    'accounts.middleware.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'buxoro_test_system.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    # Parse each template once per process instead of on every render
+    TEMPLATE_LOADERS = [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'buxoro_test_system.context_processors.fragment_cache',
             ],
+            'loaders': TEMPLATE_LOADERS,
         },
     },
 ]
@@ -141,11 +164,77 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
+STATICFILES_FINDERS = [
+    'django.contrib.staticfiles.finders.FileSystemFinder',
+    'django.contrib.staticfiles.finders.AppDirectoriesFinder',
+    'compressor.finders.CompressorFinder',
+]
+
+# Production build (see Dockerfile), with DEBUG=False:
+#   manage.py collectstatic           hashed names + manifest, .gz/.br copies -> staticfiles/
+#   manage.py compress                minified bundles of {% compress %} blocks -> staticfiles/CACHE/
+#   python -m whitenoise.compress staticfiles/CACHE    .gz/.br copies of the bundles
+# WhiteNoise then serves precompressed files with far-future immutable headers.
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+
+WHITENOISE_MAX_AGE = config('WHITENOISE_MAX_AGE', default=3600, cast=int)  # unhashed files only
+# Manifest-hashed names (main.d996599ad542.css) and compressor bundles
+# (CACHE/js/output.3bf602d175c2.js) never change under the same URL
+WHITENOISE_IMMUTABLE_FILE_TEST = r'\.[0-9a-f]{12}\.\w+$'
+
+# django-compressor: offline bundles in production, plain tags while developing
+COMPRESS_ENABLED = config('COMPRESS_ENABLED', default=not DEBUG, cast=bool)
+COMPRESS_OFFLINE = COMPRESS_ENABLED
+COMPRESS_ROOT = STATIC_ROOT
+COMPRESS_URL = STATIC_URL
+COMPRESS_FILTERS = {
+    'css': ['compressor.filters.css_default.CssAbsoluteFilter', 'compressor.filters.cssmin.rCSSMinFilter'],
+    'js': ['compressor.filters.jsmin.rJSMinFilter'],
+}
 
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# S3 or an S3-compatible service (MinIO, moto) for media when a bucket is
+# configured; see buxoro_test_system.storage for direct uploads/downloads
+AWS_STORAGE_BUCKET_NAME = config('AWS_STORAGE_BUCKET_NAME', default='')
+MEDIA_UPLOAD_URL_EXPIRE = config('MEDIA_UPLOAD_URL_EXPIRE', default=600, cast=int)
+MEDIA_DOWNLOAD_URL_EXPIRE = config('MEDIA_DOWNLOAD_URL_EXPIRE', default=300, cast=int)
+MEDIA_UPLOAD_WORKERS = config('MEDIA_UPLOAD_WORKERS', default=4, cast=int)
+
+if AWS_STORAGE_BUCKET_NAME:
+    from boto3.s3.transfer import TransferConfig
+
+    STORAGES['default'] = {'BACKEND': 'storages.backends.s3.S3Storage'}
+    AWS_S3_ENDPOINT_URL = config('AWS_S3_ENDPOINT_URL', default='') or None
+    AWS_S3_REGION_NAME = config('AWS_S3_REGION_NAME', default='') or None
+    AWS_ACCESS_KEY_ID = config('AWS_ACCESS_KEY_ID', default='') or None
+    AWS_SECRET_ACCESS_KEY = config('AWS_SECRET_ACCESS_KEY', default='') or None
+    AWS_S3_ADDRESSING_STYLE = config('AWS_S3_ADDRESSING_STYLE', default='path' if AWS_S3_ENDPOINT_URL else 'auto')
+    AWS_S3_SIGNATURE_VERSION = 's3v4'
+    AWS_DEFAULT_ACL = None  # private objects, read through signed URLs
+    AWS_QUERYSTRING_AUTH = True
+    AWS_QUERYSTRING_EXPIRE = MEDIA_DOWNLOAD_URL_EXPIRE
+    AWS_S3_FILE_OVERWRITE = False
+    # Files above 8 MB go up as multipart uploads with parallel parts
+    AWS_S3_TRANSFER_CONFIG = TransferConfig(
+        multipart_threshold=8 * 1024 * 1024,
+        multipart_chunksize=8 * 1024 * 1024,
+        max_concurrency=config('AWS_S3_MAX_CONCURRENCY', default=8, cast=int),
+    )
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -154,12 +243,19 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.User'
 
+# get_user() is served from a short-lived cache (accounts.backends)
+AUTHENTICATION_BACKENDS = ['accounts.backends.CachedModelBackend']
+AUTH_USER_CACHE_TIMEOUT = config('AUTH_USER_CACHE_TIMEOUT', default=60, cast=int)
+
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'accounts.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
-    ],
+    ] + (
+        # Basic auth hashes the password on every request: browsable API only
+        ['rest_framework.authentication.BasicAuthentication'] if DEBUG else []
+    ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
@@ -171,11 +267,18 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'buxoro_test_system.renderers.TracedJSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
 }
 
+# Signed access tokens for the exam API (api/accounts/token/)
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=config('JWT_ACCESS_MINUTES', default=30, cast=int)),
+    'REFRESH_TOKEN_LIFETIME': timedelta(hours=config('JWT_REFRESH_HOURS', default=24, cast=int)),
+    'AUTH_HEADER_TYPES': ('Bearer',),
+}
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -186,47 +289,148 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Cache
+# Redis when CACHE_URL is set, otherwise a per-process LocMem cache
+CACHE_URL = config('CACHE_URL', default='')
+
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'buxoro-test-system',
+        }
+    }
+# Whether every process (gunicorn workers, Celery) sees the same default
+# cache. Code that coordinates processes through it checks this instead
+# of trusting a per-process cache.
+CACHE_IS_SHARED = config('CACHE_IS_SHARED', default=bool(CACHE_URL), cast=bool)
+
+# Rendered template fragments ({% cache %} in base.html/home.html) stay in
+# process memory: they are small, read on every page and change only with
+# a deploy, which restarts the workers
+CACHES['templates'] = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'template-fragments',
+}
+TEMPLATE_FRAGMENT_TIMEOUT = config('TEMPLATE_FRAGMENT_TIMEOUT', default=0 if DEBUG else 3600, cast=int)
+HOME_PAGE_CACHE_TIMEOUT = config('HOME_PAGE_CACHE_TIMEOUT', default=0 if DEBUG else 600, cast=int)
+
 # Session settings
+# cached_db reads sessions from the cache and only falls back to the table on a miss
+SESSION_ENGINE = config('SESSION_ENGINE', default='django.contrib.sessions.backends.cached_db')
 SESSION_COOKIE_AGE = config('SESSION_COOKIE_AGE', default=3600, cast=int)
 SESSION_EXPIRE_AT_BROWSER_CLOSE = config('SESSION_EXPIRE_AT_BROWSER_CLOSE', default=True, cast=bool)
 
-# Logging
+# Logging: request threads enqueue records; a listener thread per process
+# writes them as JSON lines (buxoro_test_system.log)
+LOG_FILE = config('LOG_FILE', default=str(BASE_DIR / 'logs' / 'django.log'))
+LOG_MAX_BYTES = config('LOG_MAX_BYTES', default=20 * 1024 * 1024, cast=int)
+LOG_BACKUP_COUNT = config('LOG_BACKUP_COUNT', default=5, cast=int)
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+# Fraction of INFO request lines kept per URL name
+LOG_SAMPLE_RATES = {
+    'attempt_heartbeat': config('LOG_SAMPLE_HEARTBEAT', default=0.01, cast=float),
+    'attempt_timings': config('LOG_SAMPLE_TIMINGS', default=0.05, cast=float),
+    'attempt_auto_save': config('LOG_SAMPLE_AUTO_SAVE', default=0.1, cast=float),
+}
+
+# Attempt lifecycle tracing (buxoro_test_system.tracing); spans go to
+# TRACE_FILE as JSON lines, summarised by ``manage.py trace_summary``
+TRACE_SAMPLE_RATE = config('TRACE_SAMPLE_RATE', default=0.0, cast=float)  # 0 = off
+# Follow an incoming traceparent's sampled flag even when TRACE_SAMPLE_RATE is 0
+TRACE_TRUST_PARENT = config('TRACE_TRUST_PARENT', default=False, cast=bool)
+TRACE_FILE = config('TRACE_FILE', default=str(BASE_DIR / 'logs' / 'traces.jsonl'))
+TRACE_CONSOLE = config('TRACE_CONSOLE', default=False, cast=bool)
+TRACE_MAX_SPANS = config('TRACE_MAX_SPANS', default=2000, cast=int)  # per trace
+TRACE_SERVICE_NAME = config('TRACE_SERVICE_NAME', default='buxoro-test-system')
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'filters': {
+        'request_context': {
+            '()': 'buxoro_test_system.log.RequestContextFilter',
+        },
+        'sampling': {
+            '()': 'buxoro_test_system.log.SamplingFilter',
+        },
+    },
     'formatters': {
-        'verbose': {
-            'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
-            'style': '{',
+        'json': {
+            '()': 'buxoro_test_system.log.JsonFormatter',
         },
         'simple': {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'raw': {
+            'format': '{message}',
+            'style': '{',
+        },
     },
     'handlers': {
         'file': {
             'level': 'INFO',
-            'class': 'logging.FileHandler',
-            'filename': BASE_DIR / 'logs' / 'django.log',
-            'formatter': 'verbose',
+            'class': 'buxoro_test_system.log.SharedRotatingFileHandler',
+            'filename': LOG_FILE,
+            'maxBytes': LOG_MAX_BYTES,
+            'backupCount': LOG_BACKUP_COUNT,
+            'formatter': 'json',
+            'delay': True,
         },
         'console': {
             'level': 'DEBUG',
             'class': 'logging.StreamHandler',
-            'formatter': 'simple',
+            'formatter': 'simple' if DEBUG else 'json',
+        },
+        'queue': {
+            'class': 'buxoro_test_system.log.QueueLogHandler',
+            'targets': ['file', 'console'],
+            'filters': ['request_context', 'sampling'],
+        },
+        'trace_file': {
+            'class': 'buxoro_test_system.log.SharedRotatingFileHandler',
+            'filename': TRACE_FILE,
+            'maxBytes': LOG_MAX_BYTES,
+            'backupCount': LOG_BACKUP_COUNT,
+            'formatter': 'raw',
+            'delay': True,
+        },
+        'trace_console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'raw',
+        },
+        'trace_queue': {
+            'class': 'buxoro_test_system.log.QueueLogHandler',
+            'targets': ['trace_file', 'trace_console'] if TRACE_CONSOLE else ['trace_file'],
         },
     },
     'loggers': {
         'django': {
-            'handlers': ['file', 'console'],
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+        'buxoro_test_system.traces': {
+            'handlers': ['trace_queue'],
             'level': 'INFO',
-            'propagate': True,
+            'propagate': False,
         },
         'buxoro_test_system': {
-            'handlers': ['file', 'console'],
-            'level': 'DEBUG',
-            'propagate': True,
+            'handlers': ['queue'],
+            'level': 'DEBUG' if DEBUG else LOG_LEVEL,
+            'propagate': False,
+        },
+        **{
+            app: {'handlers': ['queue'], 'level': LOG_LEVEL, 'propagate': False}
+            for app in ('accounts', 'examinations', 'questions', 'results', 'profiling')
         },
     },
 }
@@ -239,18 +443,67 @@ if not DEBUG:
     SECURE_CONTENT_TYPE_NOSNIFF = True
     X_FRAME_OPTIONS = 'DENY'
 
+# Startup import budget per process kind, checked by ``manage.py import_profile``
+STARTUP_IMPORT_BUDGET_MS = {
+    'django': 750,
+    'wsgi': 950,
+    'api': 1400,
+    'celery': 850,
+}
+# Heavy libraries that must only be imported by the code paths that use them
+STARTUP_LAZY_MODULES = ['numpy', 'reportlab', 'openpyxl', 'xlsxwriter', 'PIL', 'boto3']
+
+# Request profiling (profiling app): how often workers re-read the live rules
+PROFILING_RULES_REFRESH = config('PROFILING_RULES_REFRESH', default=5, cast=float)
+
+# Health probes (buxoro_test_system.health)
+HEALTH_CHECK_CACHE_SECONDS = config('HEALTH_CHECK_CACHE_SECONDS', default=5, cast=float)
+HEALTH_CHECK_TIMEOUT = config('HEALTH_CHECK_TIMEOUT', default=2, cast=float)  # broker connect
+
 # Test system specific settings
 TEST_AUTO_SAVE_INTERVAL = config('TEST_AUTO_SAVE_INTERVAL', default=30, cast=int)
 MAX_FILE_UPLOAD_SIZE = config('MAX_FILE_UPLOAD_SIZE', default=10485760, cast=int)  # 10MB
 ALLOWED_IMAGE_EXTENSIONS = config('ALLOWED_IMAGE_EXTENSIONS', default='jpg,jpeg,png,gif').split(',')
+MAX_IMAGE_PIXELS = config('MAX_IMAGE_PIXELS', default=40_000_000, cast=int)
+
+# Resized WebP/JPEG variants (buxoro_test_system.images)
+IMAGE_WORKERS = config('IMAGE_WORKERS', default=2, cast=int)
+QUESTION_IMAGE_WIDTHS = [320, 640, 1024]
+PROFILE_IMAGE_WIDTHS = [64, 128, 256]
 ALLOWED_DOCUMENT_EXTENSIONS = config('ALLOWED_DOCUMENT_EXTENSIONS', default='pdf,doc,docx').split(',')
 
+# Question bank search
+QUESTION_SEARCH_CONFIG = config('QUESTION_SEARCH_CONFIG', default='simple')  # PostgreSQL text search configuration
+QUESTION_SEARCH_MAX_RESULTS = config('QUESTION_SEARCH_MAX_RESULTS', default=500, cast=int)
+
+# Computerized adaptive testing
+CAT_MIN_QUESTIONS = config('CAT_MIN_QUESTIONS', default=5, cast=int)
+CAT_MAX_QUESTIONS = config('CAT_MAX_QUESTIONS', default=30, cast=int)
+CAT_TARGET_SE = config('CAT_TARGET_SE', default=0.3, cast=float)  # stop once the ability estimate is this precise
+CAT_RANDOMESQUE_ITEMS = config('CAT_RANDOMESQUE_ITEMS', default=3, cast=int)  # pick among the N most informative
+
 # Anti-cheating settings
 MONITOR_BROWSER_FOCUS = config('MONITOR_BROWSER_FOCUS', default=True, cast=bool)
 TRACK_IP_ADDRESS = config('TRACK_IP_ADDRESS', default=True, cast=bool)
 ENABLE_RATE_LIMITING = config('ENABLE_RATE_LIMITING', default=True, cast=bool)
 MAX_LOGIN_ATTEMPTS = config('MAX_LOGIN_ATTEMPTS', default=5, cast=int)
 
+# Sliding-window limits (accounts.ratelimit), counted in the default cache
+LOGIN_FAILURE_RATE = config('LOGIN_FAILURE_RATE', default=f'{MAX_LOGIN_ATTEMPTS}/15m')  # per username
+LOGIN_RATE_PER_IP = config('LOGIN_RATE_PER_IP', default='20/m')  # failed logins only
+REGISTER_RATE_PER_IP = config('REGISTER_RATE_PER_IP', default='10/h')
+RATELIMIT_TRUSTED_PROXIES = config('RATELIMIT_TRUSTED_PROXIES', default=0, cast=int)  # X-Forwarded-For hops to trust
+
+# Bulk account provisioning: password hashing threads (0 = CPU count)
+# for manage.py provision_users, and how long the generated passwords of an
+# API upload stay available to the admin who sent it (seconds)
+PROVISIONING_WORKERS = config('PROVISIONING_WORKERS', default=0, cast=int)
+PROVISIONING_CREDENTIALS_TIMEOUT = config('PROVISIONING_CREDENTIALS_TIMEOUT', default=3600, cast=int)
+
+# Public certificate verification
+CERTIFICATE_VERIFY_RATE = config('CERTIFICATE_VERIFY_RATE', default='30/m')
+CERTIFICATE_VERIFY_CACHE_TIMEOUT = config('CERTIFICATE_VERIFY_CACHE_TIMEOUT', default=300, cast=int)
+
 # Site settings
 SITE_NAME = config('SITE_NAME', default='Buxoro Bilimdonlar Maktabi')
 SITE_URL = config('SITE_URL', default='http://localhost:8000')
@@ -262,3 +515,20 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    'daily-analytics-reports': {
+        'task': 'results.tasks.generate_periodic_reports',
+        'schedule': crontab(hour=1, minute=0),
+        'args': ('daily',),
+    },
+    'weekly-analytics-reports': {
+        'task': 'results.tasks.generate_periodic_reports',
+        'schedule': crontab(hour=1, minute=30, day_of_week='mon'),
+        'args': ('weekly',),
+    },
+    'monthly-analytics-reports': {
+        'task': 'results.tasks.generate_periodic_reports',
+        'schedule': crontab(hour=2, minute=0, day_of_month='1'),
+        'args': ('monthly',),
+    },
+}
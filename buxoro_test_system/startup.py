@@ -0,0 +1,24 @@
+"""
+Work a gunicorn worker would otherwise do on its first requests.
+
+With preload_app the master calls warm_up() once before forking (see
+gunicorn.conf.py), so the URLconf with every view module, DRF's default
+classes and the base templates are loaded a single time and shared
+copy-on-write, instead of being imported again by each worker while it
+serves its first requests. ``manage.py import_profile`` shows the cost.
+"""
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+WARM_TEMPLATES = ('base.html', 'home.html')
+
+
+def warm_up():
+    from rest_framework.settings import api_settings
+
+    get_resolver().url_patterns
+    for name in ('DEFAULT_AUTHENTICATION_CLASSES', 'DEFAULT_PERMISSION_CLASSES', 'DEFAULT_RENDERER_CLASSES',
+                 'DEFAULT_PARSER_CLASSES', 'DEFAULT_FILTER_BACKENDS', 'DEFAULT_PAGINATION_CLASS'):
+        getattr(api_settings, name)
+    for template in WARM_TEMPLATES:
+        get_template(template)
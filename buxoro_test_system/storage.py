@@ -0,0 +1,137 @@
+"""
+Media storage helpers.
+
+Media files live on local disk unless AWS_STORAGE_BUCKET_NAME is set, in
+which case default storage is S3 or any S3-compatible service (MinIO,
+moto, ...) at AWS_S3_ENDPOINT_URL. Either way file bytes should not pass
+through gunicorn workers more than necessary:
+
+* clients upload straight to the bucket with a presigned POST
+  (presigned_upload) and then hand the returned key to the API;
+* downloads are answered with a redirect to a short-lived signed URL
+  (download_redirect);
+* files generated on the server (report XLSX/PDF, certificate PDFs) are
+  written with save_files, which uploads several files at once; S3Storage
+  splits large ones into concurrent multipart uploads
+  (AWS_S3_TRANSFER_CONFIG).
+
+On local disk presigned_upload falls back to a signed token for the API's
+own upload endpoint, and downloads redirect to MEDIA_URL.
+"""
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.http import Http404, HttpResponseRedirect
+from django.utils.text import get_valid_filename
+
+UPLOAD_TOKEN_SALT = 'buxoro_test_system.storage.upload'
+UPLOAD_KEY_SALT = 'buxoro_test_system.storage.upload_key'
+
+
+def is_remote(storage=None):
+    """True when ``storage`` (default storage) is S3-backed"""
+    try:
+        from storages.backends.s3 import S3Storage
+    except ImportError:
+        return False
+    return isinstance(storage if storage is not None else default_storage, S3Storage)
+
+
+def upload_key(prefix, filename):
+    """An unguessable storage name under ``prefix`` that keeps the file's name"""
+    name = get_valid_filename(os.path.basename(filename or '')) or 'upload'
+    return f"{prefix.strip('/')}/{uuid.uuid4().hex}/{name}"
+
+
+def presigned_upload(key, max_size, content_type='', expires=None):
+    """
+    Presigned POST for uploading ``key`` straight to the bucket, or None
+    when storage is local. The client sends ``fields`` plus the file (as
+    the last form field, named ``file``) to ``url``.
+    """
+    if not is_remote():
+        return None
+    expires = expires or settings.MEDIA_UPLOAD_URL_EXPIRE
+    fields = {}
+    conditions = [['content-length-range', 1, max_size]]
+    if content_type:
+        fields['Content-Type'] = content_type
+        conditions.append({'Content-Type': content_type})
+    storage = default_storage
+    post = storage.connection.meta.client.generate_presigned_post(
+        storage.bucket_name,
+        storage._normalize_name(key),
+        Fields=fields,
+        Conditions=conditions,
+        ExpiresIn=expires,
+    )
+    return {'url': post['url'], 'fields': post['fields'], 'expires_in': expires}
+
+
+def sign_local_upload(key, max_size):
+    return signing.dumps({'key': key, 'max_size': max_size}, salt=UPLOAD_TOKEN_SALT)
+
+
+def read_local_upload(token):
+    """(key, max_size) of a sign_local_upload() token; raises signing.BadSignature"""
+    data = signing.loads(token, salt=UPLOAD_TOKEN_SALT, max_age=settings.MEDIA_UPLOAD_URL_EXPIRE)
+    return data['key'], data['max_size']
+
+
+def sign_upload_key(key, user):
+    """``key`` signed to ``user``; clients hand this back instead of the bare key"""
+    return signing.dumps(key, salt=f'{UPLOAD_KEY_SALT}:{user.pk}')
+
+
+def read_upload_key(token, user):
+    """Storage key of a sign_upload_key() token issued to ``user``; raises signing.BadSignature"""
+    return signing.loads(token, salt=f'{UPLOAD_KEY_SALT}:{user.pk}')
+
+
+def signed_download_url(field_file, filename=None, expires=None):
+    """
+    URL for downloading a stored file. On S3 it is signed, expires after
+    MEDIA_DOWNLOAD_URL_EXPIRE seconds and asks for ``filename`` as the
+    attachment name; on local disk it is the plain MEDIA_URL address.
+    """
+    storage = field_file.storage
+    if not is_remote(storage):
+        return field_file.url
+    parameters = {}
+    if filename:
+        parameters['ResponseContentDisposition'] = f'attachment; filename="{get_valid_filename(filename)}"'
+    return storage.url(
+        field_file.name, parameters=parameters, expire=expires or settings.MEDIA_DOWNLOAD_URL_EXPIRE
+    )
+
+
+def download_redirect(field_file, filename=None):
+    """302 to the file instead of streaming it through the worker"""
+    if not field_file:
+        raise Http404('File not found')
+    response = HttpResponseRedirect(signed_download_url(field_file, filename))
+    # Signed URLs expire; intermediaries must not hand out stale ones
+    response['Cache-Control'] = 'private, no-store'
+    return response
+
+
+def _save(field_file, name, content):
+    field_file.save(name, content, save=False)
+    return field_file.name
+
+
+def save_files(files, workers=None):
+    """
+    Store ``[(field_file, name, content), ...]`` concurrently without saving
+    their model instances; returns the stored names in order.
+    """
+    files = list(files)
+    workers = min(workers or settings.MEDIA_UPLOAD_WORKERS, len(files))
+    if workers <= 1:
+        return [_save(*item) for item in files]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='media-upload') as pool:
+        return list(pool.map(lambda item: _save(*item), files))
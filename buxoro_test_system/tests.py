@@ -0,0 +1,395 @@
+import json
+import logging
+import os
+import re
+import runpy
+import shutil
+import sys
+import tempfile
+from io import BytesIO
+from logging.handlers import BufferingHandler
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils.translation import get_language
+from PIL import Image
+
+from accounts.models import User
+from . import health, images, log, tracing
+from .context_processors import fragment_cache
+
+PRODUCTION_STORAGES = {
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+
+
+def png(size=(40, 30), name='photo.png', color='red'):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class StaticAssetTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.static_root, ignore_errors=True)
+        cls.production = override_settings(
+            DEBUG=False, STATIC_ROOT=cls.static_root, STORAGES=PRODUCTION_STORAGES, WHITENOISE_AUTOREFRESH=False,
+            WHITENOISE_USE_FINDERS=False,
+            # The project's own assets only; admin and DRF files are slow to compress
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+        )
+        cls.production.enable()
+        cls.addClassCleanup(cls.production.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_collectstatic_writes_hashed_and_precompressed_files(self):
+        url = staticfiles_storage.url('css/main.css')
+        self.assertRegex(url, r'^/static/css/main\.[0-9a-f]{12}\.css$')
+        name = url[len(settings.STATIC_URL):]
+        for suffix in ('', '.gz', '.br'):
+            self.assertTrue(staticfiles_storage.exists(name + suffix), name + suffix)
+
+    def test_hashed_files_are_immutable(self):
+        test = re.compile(settings.WHITENOISE_IMMUTABLE_FILE_TEST)
+        self.assertTrue(test.search('css/main.d996599ad542.css'))
+        self.assertTrue(test.search('CACHE/js/output.3bf602d175c2.js'))
+        self.assertFalse(test.search('css/main.css'))
+
+        url = staticfiles_storage.url('js/main.js')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Content-Encoding'], 'br')
+        response.close()
+
+        response = self.client.get('/static/js/main.js')
+        self.assertEqual(response['Cache-Control'], f'max-age={settings.WHITENOISE_MAX_AGE}, public')
+        response.close()
+
+
+class ImageValidationTests(SimpleTestCase):
+    def assertRejected(self, upload, code):
+        with self.assertRaises(ValidationError) as caught:
+            images.validate_image_upload(upload)
+        self.assertEqual(caught.exception.code, code)
+
+    def test_uploads_are_checked_by_name_size_and_content(self):
+        images.validate_image_upload(png())
+        self.assertRejected(png(name='photo.svg'), 'invalid_extension')
+        self.assertRejected(SimpleUploadedFile('photo.png', b'not an image'), 'invalid_image')
+        with override_settings(MAX_IMAGE_PIXELS=100):
+            self.assertRejected(png(), 'too_many_pixels')
+        with override_settings(MAX_FILE_UPLOAD_SIZE=10):
+            self.assertRejected(png(), 'file_too_large')
+
+
+class ImagePipelineTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def make_user(self, username, upload):
+        user = User.objects.create_user(username, password='x', profile_image=upload)
+        images.process_image(User, user.pk, 'profile_image', 'profile_image_hash', 'profile_image_widths', (16, 32))
+        return User.objects.get(pk=user.pk)
+
+    def test_stored_images_are_not_reopened_on_clean(self):
+        user = self.make_user('ali', png())
+        with mock.patch('PIL.Image.open') as image_open:
+            user.clean_fields()
+        image_open.assert_not_called()
+
+        user.profile_image = SimpleUploadedFile('photo.png', b'not an image')
+        with self.assertRaises(ValidationError):
+            user.clean_fields()
+
+    def test_variants_are_built_once_per_content(self):
+        first = self.make_user('ali', png())
+        second = self.make_user('vali', png(name='copy.png'))
+        self.assertEqual(first.profile_image_widths, [16, 32])
+        self.assertEqual(second.profile_image_hash, first.profile_image_hash)
+        self.assertEqual(second.profile_image.name, first.profile_image.name)
+        for width in first.profile_image_widths:
+            self.assertTrue(default_storage.exists(images.variant_name(first.profile_image_hash, width, 'webp')))
+
+
+@override_settings(TEMPLATE_FRAGMENT_TIMEOUT=60, HOME_PAGE_CACHE_TIMEOUT=60)
+class TemplateCachingTests(TestCase):
+    def setUp(self):
+        caches['templates'].clear()
+        self.addCleanup(caches['templates'].clear)
+
+    def test_fragments_vary_by_language_and_role(self):
+        request = RequestFactory().get('/')
+        request.user = User(role='teacher')
+        context = fragment_cache(request)
+        self.assertEqual(context['fragment_cache_timeout'], 60)
+        self.assertEqual(context['fragment_cache_vary'], f'{get_language()}:teacher')
+
+        request.user = mock.Mock(is_authenticated=False)
+        self.assertEqual(fragment_cache(request)['fragment_cache_vary'], f'{get_language()}:guest')
+
+    def test_anonymous_home_page_is_served_from_the_cache(self):
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Cookie', response['Vary'])
+        key = f'home-page:{get_language()}'
+        self.assertEqual(caches['templates'].get(key), response.content)
+
+        caches['templates'].set(key, b'cached home')
+        self.assertEqual(self.client.get('/').content, b'cached home')
+
+    def test_signed_in_users_get_their_own_fragments(self):
+        self.client.get('/')
+        User.objects.create_user('student', password='x', role='student')
+        self.client.login(username='student', password='x')
+        response = self.client.get('/')
+        self.assertContains(response, 'fa-tachometer-alt')
+        self.assertContains(response, 'student')
+        self.assertNotEqual(response.content, caches['templates'].get(f'home-page:{get_language()}'))
+
+
+class ServerProfileTests(SimpleTestCase):
+    def load(self, **environ):
+        with mock.patch.dict('os.environ', environ), mock.patch('multiprocessing.cpu_count', return_value=4):
+            return runpy.run_path(str(settings.BASE_DIR / 'gunicorn.conf.py'))
+
+    def test_profiles_pick_worker_class_and_size(self):
+        config = self.load()
+        self.assertEqual((config['worker_class'], config['workers'], config['threads']), ('gthread', 5, 4))
+        self.assertTrue(config['preload_app'])
+        self.assertEqual(config['max_requests_jitter'], config['max_requests'] // 10)
+
+        config = self.load(GUNICORN_PROFILE='sync')
+        self.assertEqual((config['worker_class'], config['workers']), ('sync', 9))
+        config = self.load(GUNICORN_PROFILE='uvicorn', WEB_CONCURRENCY='2')
+        self.assertEqual(config['wsgi_app'], 'buxoro_test_system.asgi:application')
+        self.assertEqual((config['worker_class'], config['workers']), ('uvicorn.workers.UvicornWorker', 2))
+
+    def test_unknown_profile_is_refused(self):
+        with self.assertRaises(RuntimeError):
+            self.load(GUNICORN_PROFILE='eventlet')
+
+
+class ReadinessTests(TestCase):
+    def setUp(self):
+        health._last_report = None
+        self.addCleanup(setattr, health, '_last_report', None)
+
+    def test_ready_when_every_check_passes(self):
+        check_broker = mock.Mock()
+        with mock.patch.object(health, 'CHECKS', health.CHECKS[:-1] + (('broker', check_broker),)):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        self.assertEqual(response.json(), {
+            'status': 'ok', 'checks': {'database': 'ok', 'cache': 'ok', 'migrations': 'ok', 'broker': 'ok'},
+        })
+        check_broker.assert_called_once()
+
+        response = self.client.get('/healthz')
+        self.assertEqual((response.status_code, response.content), (200, b'ok'))
+
+    def test_unavailable_checks_fail_without_details(self):
+        check_broker = mock.Mock(side_effect=ConnectionRefusedError('redis://:secret@10.0.0.5:6379'))
+        with mock.patch.object(health, 'CHECKS', health.CHECKS[:-1] + (('broker', check_broker),)), \
+                self.assertLogs('buxoro_test_system.health', 'WARNING') as logs:
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['status'], 'unavailable')
+        self.assertEqual(response.json()['checks']['broker'], 'fail')
+        self.assertNotIn(b'secret', response.content)
+        self.assertIn('secret', logs.output[0])
+
+        # Cached for HEALTH_CHECK_CACHE_SECONDS; liveness does not depend on it
+        self.assertEqual(self.client.get('/readyz').status_code, 503)
+        check_broker.assert_called_once()
+        self.assertEqual(self.client.get('/healthz').status_code, 200)
+
+
+def make_record(message='hello', level=logging.INFO, **extra):
+    return logging.makeLogRecord({
+        'name': 'buxoro_test_system.test', 'levelno': level, 'levelname': logging.getLevelName(level),
+        'msg': message, **extra,
+    })
+
+
+class StructuredLoggingTests(SimpleTestCase):
+    def test_request_context_reaches_records(self):
+        records = []
+
+        def view(request):
+            log.bind(attempt_id='a1')
+            record = make_record()
+            log.RequestContextFilter().filter(record)
+            records.append(record)
+            return HttpResponse('ok')
+
+        request = RequestFactory().get('/', HTTP_X_REQUEST_ID='req-1')
+        request.user = User(pk=7)
+        with self.assertLogs('buxoro_test_system.requests', 'INFO') as logs:
+            response = log.RequestContextMiddleware(view)(request)
+        self.assertEqual(response['X-Request-ID'], 'req-1')
+        [record] = records
+        self.assertEqual((record.request_id, record.user_id, record.attempt_id), ('req-1', 7, 'a1'))
+        self.assertEqual(logs.records[0].status, 200)
+
+        # Outside a request nothing is added, and bind() is a no-op
+        log.bind(attempt_id='a2')
+        record = make_record()
+        log.RequestContextFilter().filter(record)
+        self.assertFalse(hasattr(record, 'request_id'))
+
+    def test_failed_requests_are_reported_once(self):
+        with self.assertLogs('buxoro_test_system.requests', 'INFO') as access, \
+                self.assertLogs('django.request', 'WARNING') as failures:
+            self.client.get('/no-such-page/')
+        [line] = access.records
+        self.assertEqual((line.levelno, line.status), (logging.INFO, 404))
+        self.assertEqual(len(failures.records), 1)
+
+    def test_new_request_ids_are_generated(self):
+        request = RequestFactory().get('/')
+        with self.assertLogs('buxoro_test_system.requests', 'INFO'):
+            response = log.RequestContextMiddleware(lambda request: HttpResponse(status=404))(request)
+        self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+
+    @override_settings(LOG_SAMPLE_RATES={'attempt_heartbeat': 0.0, 'attempt_timings': 1.0})
+    def test_sampling_drops_only_listed_info_events(self):
+        sampling = log.SamplingFilter()
+        self.assertFalse(sampling.filter(make_record(event='attempt_heartbeat')))
+        self.assertTrue(sampling.filter(make_record(event='attempt_heartbeat', level=logging.WARNING)))
+        self.assertTrue(sampling.filter(make_record(event='question_list')))
+        kept = make_record(event='attempt_timings')
+        self.assertTrue(sampling.filter(kept))
+        self.assertEqual(kept.sample_rate, 1.0)
+
+    def test_json_lines_carry_extra_fields(self):
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            record = make_record('saved %s', args=('x',), status=200, user_id=None, exc_info=sys.exc_info())
+        data = json.loads(log.JsonFormatter().format(record))
+        self.assertEqual((data['message'], data['level'], data['status']), ('saved x', 'INFO', 200))
+        self.assertNotIn('user_id', data)
+        self.assertIn('ValueError: boom', data['exc'])
+        self.assertTrue(data['ts'].endswith('Z'))
+
+    def test_queue_handler_feeds_named_handlers(self):
+        target = BufferingHandler(100)
+        target.name = 'test-target'
+        self.addCleanup(target.close)
+        handler = log.QueueLogHandler(['test-target'])
+        handler.emit(make_record('%s done', args=('import',), request=object()))
+        handler.close()
+        [record] = target.buffer
+        self.assertEqual((record.msg, record.args), ('import done', None))
+        self.assertFalse(hasattr(record, 'request'))
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = log.QueueLogHandler([], maxsize=1)
+        handler._start()
+        handler.listener.stop()  # nothing drains the queue any more
+        handler.emit(make_record())
+        handler.emit(make_record())
+        self.assertEqual(handler.dropped, 1)
+        handler.listener = None
+        handler.close()
+
+    def test_rotation_is_shared_between_processes(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        filename = os.path.join(directory, 'app.log')
+        first = log.SharedRotatingFileHandler(filename, maxBytes=50, backupCount=2)
+        second = log.SharedRotatingFileHandler(filename, maxBytes=50, backupCount=2)
+        self.addCleanup(first.close)
+        self.addCleanup(second.close)
+
+        second.emit(make_record('x' * 10))
+        first.emit(make_record('a' * 60))
+        first.emit(make_record('b' * 10))
+        # The second handler writes to the new file, not the rotated one
+        second.emit(make_record('c' * 10))
+        with open(filename) as current:
+            self.assertEqual(current.read().split(), ['b' * 10, 'c' * 10])
+        self.assertTrue(os.path.exists(filename + '.1'))
+
+
+class TracingTests(TestCase):
+    PARENT = '00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01'
+
+    def traced_request(self, view, **headers):
+        request = RequestFactory().get('/attempt/', **headers)
+        with self.assertLogs('buxoro_test_system.traces', 'INFO') as logs:
+            response = tracing.TracingMiddleware(view)(request)
+        return response, [json.loads(record.getMessage()) for record in logs.records]
+
+    def test_incoming_parents_are_followed_only_while_tracing_is_on(self):
+        with override_settings(TRACE_SAMPLE_RATE=0.0, TRACE_TRUST_PARENT=False):
+            self.assertIsNone(tracing._sample(self.PARENT))
+            self.assertIsNone(tracing._sample())
+        with override_settings(TRACE_SAMPLE_RATE=0.0, TRACE_TRUST_PARENT=True):
+            self.assertEqual(tracing._sample(self.PARENT), ('0af7651916cd43dd8448eb211c80319c', 'b7ad6b7169203331'))
+        with override_settings(TRACE_SAMPLE_RATE=1.0):
+            self.assertIsNone(tracing._sample(self.PARENT[:-2] + '00'))
+            trace_id, parent_id = tracing._sample('garbage')
+            self.assertEqual((len(trace_id), parent_id), (32, None))
+
+    @override_settings(TRACE_SAMPLE_RATE=0.0)
+    def test_untraced_requests_export_nothing(self):
+        request = RequestFactory().get('/', HTTP_TRACEPARENT=self.PARENT)
+        with self.assertNoLogs('buxoro_test_system.traces'):
+            response = tracing.TracingMiddleware(lambda request: HttpResponse('ok'))(request)
+        self.assertNotIn('X-Trace-ID', response)
+
+    @override_settings(TRACE_SAMPLE_RATE=1.0)
+    def test_request_spans_queries_and_steps(self):
+        @tracing.traced('attempt.step', attempt='attempt_id')
+        def step(attempt_id):
+            return User.objects.count()
+
+        def view(request):
+            step(attempt_id=5)
+            return HttpResponse('ok')
+
+        response, spans = self.traced_request(view, HTTP_TRACEPARENT=self.PARENT)
+        by_name = {span['name']: span for span in spans}
+        self.assertEqual(set(by_name), {'GET /attempt/', 'attempt.step', 'db SELECT accounts_user'})
+        root = by_name['GET /attempt/']
+        self.assertEqual(response['X-Trace-ID'], root['traceId'])
+        self.assertEqual((root['traceId'], root['parentSpanId']), tuple(self.PARENT.split('-')[1:3]))
+        self.assertEqual(root['attributes']['http.status_code'], 200)
+        self.assertEqual(by_name['attempt.step']['parentSpanId'], root['spanId'])
+        self.assertEqual(by_name['db SELECT accounts_user']['parentSpanId'], by_name['attempt.step']['spanId'])
+        # The attempt named by one step labels the whole trace
+        self.assertEqual({span['attributes']['attempt.id'] for span in spans}, {'5'})
+
+    @override_settings(TRACE_SAMPLE_RATE=1.0)
+    def test_errors_and_task_headers(self):
+        def view(request):
+            headers = {}
+            tracing.inject_traceparent(headers=headers)
+            self.assertEqual(headers['traceparent'], tracing.current_span().traceparent)
+            with self.assertRaises(KeyError), tracing.span('lookup'):
+                raise KeyError('missing')
+            return HttpResponse(status=502)
+
+        response, spans = self.traced_request(view)
+        by_name = {span['name']: span for span in spans}
+        self.assertEqual(by_name['lookup']['status']['code'], 'ERROR')
+        self.assertEqual(by_name['GET /attempt/']['status'], {'code': 'ERROR', 'message': '502'})
@@ -0,0 +1,330 @@
+"""
+Request and task tracing for the attempt lifecycle.
+
+A small tracer whose spans follow the OpenTelemetry data model (trace and
+span ids, parent, kind, start/end in unix nanoseconds, attributes,
+status) and whose context travels in W3C ``traceparent`` headers, so
+traces join up with a proxy or client that sends one and can be shipped
+to an OpenTelemetry collector (filelog receiver) as they are.
+
+Finished traces are written one span per JSON line through the
+``buxoro_test_system.traces`` logger: by default to TRACE_FILE via the
+same non-blocking queue and rotating file handler as the application log,
+and to the console with TRACE_CONSOLE. Nothing leaves the machine.
+
+    TracingMiddleware      one root span per request ("POST attempt_auto_save")
+    database wrapper       a child span per ORM query ("db SELECT examinations_testattempt")
+    TracedJSONRenderer     response serialization (buxoro_test_system.renderers)
+    Celery signals         one root span per task, parented to the request
+                           that queued it
+    traced() / span()      lifecycle steps: attempt saves, timing folds,
+                           adaptive scoring, results, certificates
+
+Every span in a trace carries ``attempt.id`` once any step of it names an
+attempt (the URL kwarg, a task's ``attempt_id``, a traced model), so
+``manage.py trace_summary`` can break down where time goes per attempt.
+
+Traces are sampled at the root with TRACE_SAMPLE_RATE (0 turns tracing
+off); unsampled requests pay for one random() call. The sampled flag of an
+incoming ``traceparent`` is followed only while tracing is on, or with
+TRACE_TRUST_PARENT when a trusted proxy makes the sampling decision, so
+clients cannot switch tracing on by sending the header.
+"""
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import re
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from . import log
+
+trace_logger = logging.getLogger('buxoro_test_system.traces')
+
+_current = contextvars.ContextVar('trace_span', default=None)
+
+TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+SQL_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE|JOIN)\s+"?([\w.]+)"?', re.IGNORECASE)
+
+
+def _new_id(nbytes):
+    return os.urandom(nbytes).hex()
+
+
+def _attempt_id(value):
+    """Attempt id from a TestAttempt, an object linked to one, or an id"""
+    if value is None:
+        return None
+    if hasattr(value, 'attempt_id'):
+        return str(value.attempt_id)
+    if hasattr(value, '_meta'):
+        return str(value.pk) if value.pk is not None else None
+    if hasattr(value, 'attempt'):
+        return _attempt_id(value.attempt)
+    return str(value)
+
+
+class Trace:
+    """Spans of one trace recorded in this process, exported when its local root ends"""
+
+    def __init__(self, trace_id):
+        self.trace_id = trace_id
+        self.attempt_id = None
+        self.spans = []
+        self.dropped = 0
+
+    def add(self, span):
+        if len(self.spans) < settings.TRACE_MAX_SPANS:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+
+    def export(self):
+        resource = {'service.name': settings.TRACE_SERVICE_NAME, 'process.pid': os.getpid()}
+        for span in self.spans:
+            if self.attempt_id is not None:
+                span.attributes.setdefault('attempt.id', self.attempt_id)
+            trace_logger.info(json.dumps(span.as_dict(resource), ensure_ascii=False, default=str))
+
+
+class Span:
+    def __init__(self, trace, name, parent_id=None, kind='INTERNAL', attributes=None):
+        self.trace = trace
+        self.name = name
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.status = None
+        self.start = time.time_ns()
+        self.end = None
+
+    @property
+    def traceparent(self):
+        return f'00-{self.trace.trace_id}-{self.span_id}-01'
+
+    def set_attribute(self, name, value):
+        self.attributes[name] = value
+
+    def set_attempt(self, attempt_id):
+        if attempt_id is not None:
+            self.attributes['attempt.id'] = attempt_id
+            if self.trace.attempt_id is None:
+                self.trace.attempt_id = attempt_id
+
+    def set_error(self, exc):
+        self.status = {'code': 'ERROR', 'message': f'{type(exc).__name__}: {exc}'[:500]}
+
+    def finish(self):
+        self.end = time.time_ns()
+        self.trace.add(self)
+
+    def as_dict(self, resource):
+        return {
+            'traceId': self.trace.trace_id,
+            'spanId': self.span_id,
+            'parentSpanId': self.parent_id or '',
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': self.start,
+            'endTimeUnixNano': self.end,
+            'attributes': self.attributes,
+            'status': self.status or {'code': 'UNSET'},
+            'resource': resource,
+        }
+
+
+def current_span():
+    return _current.get()
+
+
+def _sample(traceparent=None):
+    """(trace id, remote parent span id) for a sampled trace, or None"""
+    rate = settings.TRACE_SAMPLE_RATE
+    match = TRACEPARENT.match(traceparent or '')
+    if match and (rate > 0 or settings.TRACE_TRUST_PARENT):
+        trace_id, parent_id, flags = match.groups()
+        return (trace_id, parent_id) if int(flags, 16) & 1 else None
+    if rate > 0 and random.random() < rate:
+        return _new_id(16), None
+    return None
+
+
+@contextlib.contextmanager
+def span(name, attempt_id=None, **attributes):
+    """
+    Child span of the current one; a no-op when nothing is being traced.
+
+        with tracing.span('results.grade', attempt_id=attempt.pk, questions=count):
+            ...
+    """
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, parent.span_id, attributes=attributes)
+    child.set_attempt(_attempt_id(attempt_id))
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as exc:
+        child.set_error(exc)
+        raise
+    finally:
+        _current.reset(token)
+        child.finish()
+
+
+def traced(name, attempt=None):
+    """
+    Decorator form of span(). ``attempt`` names the argument that
+    identifies the attempt (a TestAttempt, an object with ``attempt_id`` or
+    ``attempt``, or the id itself):
+
+        @traced('attempt.fold_timings', attempt='attempt')
+        def fold_timings(attempt, final=False): ...
+    """
+    def decorator(func):
+        signature = inspect.signature(func) if attempt else None
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return func(*args, **kwargs)
+            attempt_value = None
+            if signature is not None:
+                attempt_value = signature.bind_partial(*args, **kwargs).arguments.get(attempt)
+            with span(name, attempt_id=attempt_value):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def root_span(name, kind, traceparent=None, attributes=None):
+    """
+    Start a trace (or continue a remote one) around a request or task and
+    export it at the end. Yields None when the trace is not sampled.
+    """
+    sampled = _sample(traceparent)
+    if sampled is None or _current.get() is not None:
+        yield None
+        return
+    trace_id, parent_id = sampled
+    trace = Trace(trace_id)
+    root = Span(trace, name, parent_id, kind=kind, attributes=attributes)
+    token = _current.set(root)
+    try:
+        with contextlib.ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(_query_span))
+            yield root
+    except BaseException as exc:
+        root.set_error(exc)
+        raise
+    finally:
+        _current.reset(token)
+        root.finish()
+        if trace.dropped:
+            root.set_attribute('trace.dropped_spans', trace.dropped)
+        trace.export()
+
+
+def _query_span(execute, sql, params, many, context):
+    parent = _current.get()
+    if parent is None:
+        return execute(sql, params, many, context)
+    operation = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else 'QUERY'
+    table = SQL_TABLE.search(sql)
+    name = f"db {operation} {table.group(1)}" if table else f'db {operation}'
+    query = Span(parent.trace, name, parent.span_id, kind='CLIENT', attributes={
+        'db.system': context['connection'].vendor,
+        'db.statement': sql[:1000],
+    })
+    if many:
+        query.set_attribute('db.executemany', True)
+    try:
+        return execute(sql, params, many, context)
+    except Exception as exc:
+        query.set_error(exc)
+        raise
+    finally:
+        query.finish()
+
+
+class TracingMiddleware:
+    """
+    Root span per request, named after the route ("GET testresult-list").
+    Continues the trace of an incoming ``traceparent`` header and returns
+    the trace id in ``X-Trace-ID``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with root_span(f'{request.method} {request.path}', 'SERVER',
+                       traceparent=request.headers.get('traceparent'),
+                       attributes={'http.method': request.method, 'http.target': request.path}) as root:
+            if root is None:
+                return self.get_response(request)
+            log.bind(trace_id=root.trace.trace_id)
+            response = self.get_response(request)
+            match = request.resolver_match
+            if match is not None:
+                root.name = f'{request.method} {match.url_name or match.route}'
+                root.set_attribute('http.route', match.route)
+                if 'attempt_id' in match.kwargs:
+                    root.set_attempt(str(match.kwargs['attempt_id']))
+            root.set_attribute('http.status_code', response.status_code)
+            if response.status_code >= 500:
+                root.status = {'code': 'ERROR', 'message': str(response.status_code)}
+            response['X-Trace-ID'] = root.trace.trace_id
+            return response
+
+
+# Celery: spans for tasks, with the publishing request as their parent
+
+_task_spans = {}
+
+
+def inject_traceparent(headers=None, **kwargs):
+    current = _current.get()
+    if current is not None and headers is not None:
+        headers['traceparent'] = current.traceparent
+
+
+def start_task_span(task_id=None, task=None, kwargs=None, **extra):
+    context = root_span(f'celery.task {task.name}', 'CONSUMER',
+                        traceparent=getattr(task.request, 'traceparent', None),
+                        attributes={'celery.task_id': task_id})
+    root = context.__enter__()
+    if root is None:
+        context.__exit__(None, None, None)
+        return
+    root.set_attempt(_attempt_id((kwargs or {}).get('attempt_id')))
+    _task_spans[task_id] = (context, root)
+
+
+def end_task_span(task_id=None, state=None, **extra):
+    context, root = _task_spans.pop(task_id, (None, None))
+    if context is not None:
+        root.set_attribute('celery.state', state)
+        if state == 'FAILURE':
+            root.status = {'code': 'ERROR', 'message': 'task failed'}
+        context.__exit__(None, None, None)
+
+
+def connect_celery_signals():
+    from celery import signals
+
+    signals.before_task_publish.connect(inject_traceparent, weak=False)
+    signals.task_prerun.connect(start_task_span, weak=False)
+    signals.task_postrun.connect(end_task_span, weak=False)
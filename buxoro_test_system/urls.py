@@ -6,19 +6,26 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from django.views.generic import TemplateView
+from .views import HomeView
 
 urlpatterns = [
     # Admin interface
     path('admin/', admin.site.urls),
     
     # Main website views
-    path('', TemplateView.as_view(template_name='home.html'), name='home'),
+    path('', HomeView.as_view(), name='home'),
     path('accounts/', include('accounts.urls')),
     path('tests/', include('examinations.urls')),
     path('questions/', include('questions.urls')),
     path('results/', include('results.urls')),
     
+    # REST API
+    path('api/accounts/', include('accounts.api_urls')),
+    path('api/tests/', include('examinations.api_urls')),
+    path('api/questions/', include('questions.api_urls')),
+    path('api/results/', include('results.api_urls')),
+    path('api/profiling/', include('profiling.api_urls')),
+    
     # Django's built-in authentication views
     path('auth/', include('django.contrib.auth.urls')),
 ]
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.translation import get_language
+from django.views.generic import TemplateView
+
+
+class HomeView(TemplateView):
+    """
+    Home page. Visitors without a session or pending messages all see the
+    same page, so it is cached whole per language and served without
+    touching the session; everyone else gets the template with its cached
+    fragments.
+    """
+    template_name = 'home.html'
+
+    def can_use_page_cache(self, request):
+        # The page has no form, so a CSRF cookie alone does not matter
+        return (
+            settings.HOME_PAGE_CACHE_TIMEOUT > 0
+            and not set(request.COOKIES) - {settings.CSRF_COOKIE_NAME}
+        )
+
+    def get(self, request, *args, **kwargs):
+        if not self.can_use_page_cache(request):
+            return super().get(request, *args, **kwargs)
+
+        cache = caches['templates']
+        key = f"home-page:{get_language()}"
+        content = cache.get(key)
+        if content is None:
+            response = super().get(request, *args, **kwargs).render()
+            cache.set(key, response.content, settings.HOME_PAGE_CACHE_TIMEOUT)
+        else:
+            response = HttpResponse(content)
+        patch_vary_headers(response, ['Cookie'])
+        return response
+
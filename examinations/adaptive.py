@@ -0,0 +1,257 @@
+"""
+Computerized adaptive testing for ``adaptive`` tests.
+
+Each attempt starts at ability 0 and is given, one at a time, the unseen
+question with the highest Fisher information at its current ability
+estimate. After every response the ability is re-estimated (EAP on a fixed
+quadrature grid) and the test stops once the standard error reaches
+CAT_TARGET_SE, CAT_MAX_QUESTIONS have been given or the pool runs out.
+
+Item parameters come from questions.irt. They are loaded once per test
+into NumPy arrays (ItemPool) and kept in process memory until a new
+calibration or a question added to or removed from the bank bumps the
+calibration version, so choosing the next item is a single vectorized pass
+without database access.
+
+State lives in ``attempt.answers_data['adaptive']``; answers are stored
+as graded QuestionAnswer rows and the attempt is scored when it stops.
+Only auto-graded question types take part, since every response must be
+scored before the next question is chosen.
+"""
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from buxoro_test_system.tracing import traced
+from questions.irt import AUTO_GRADED_TYPES, probability, information, item_parameters, calibration_version
+from questions.models import Question, QuestionAnswer
+
+QUADRATURE = np.linspace(-4.0, 4.0, 81)
+LOG_PRIOR = -0.5 * QUADRATURE ** 2  # standard normal, up to a constant
+
+
+class AdaptiveError(ValueError):
+    """The response does not match the state of the adaptive attempt"""
+
+
+class ItemPool:
+    """Calibrated parameters of a test's questions as aligned arrays"""
+
+    def __init__(self, question_ids, discrimination, difficulty):
+        self.question_ids = np.asarray(question_ids, dtype=np.int64)
+        self.discrimination = np.asarray(discrimination, dtype=np.float64)
+        self.difficulty = np.asarray(difficulty, dtype=np.float64)
+        self.positions = {int(pk): index for index, pk in enumerate(self.question_ids)}
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def indices(self, question_ids):
+        """Pool positions of the given questions; unknown ids are dropped"""
+        return np.array(
+            [self.positions[pk] for pk in question_ids if pk in self.positions],
+            dtype=np.intp,
+        )
+
+    def select(self, theta, administered=(), top_k=1, rng=None):
+        """
+        Id of the most informative unseen question at ``theta``, or None.
+
+        With ``top_k`` > 1 one of the k best is chosen at random
+        ("randomesque" exposure control).
+        """
+        info = information(theta, self.discrimination, self.difficulty)
+        used = self.indices(administered)
+        info[used] = -np.inf
+        available = len(self) - len(used)
+        if available <= 0:
+            return None
+
+        k = min(max(top_k, 1), available)
+        if k == 1:
+            best = int(np.argmax(info))
+        else:
+            candidates = np.argpartition(info, -k)[-k:]
+            best = int((rng or np.random.default_rng()).choice(candidates))
+        return int(self.question_ids[best])
+
+    def estimate(self, question_ids, responses):
+        """
+        EAP ability estimate and its standard error for a response pattern
+        """
+        positions = [self.positions.get(pk) for pk in question_ids]
+        known = [index for index, position in enumerate(positions) if position is not None]
+        if not known:
+            return 0.0, 1.0
+
+        index = np.array([positions[i] for i in known], dtype=np.intp)
+        y = np.array([responses[i] for i in known], dtype=np.float64)[:, None]
+        p = probability(QUADRATURE[None, :], self.discrimination[index, None], self.difficulty[index, None])
+        log_posterior = LOG_PRIOR + (y * np.log(p) + (1.0 - y) * np.log1p(-p)).sum(axis=0)
+        weights = np.exp(log_posterior - log_posterior.max())
+        weights /= weights.sum()
+
+        theta = float((QUADRATURE * weights).sum())
+        se = float(np.sqrt(((QUADRATURE - theta) ** 2 * weights).sum()))
+        return theta, se
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def load_item_pool(test):
+    return ItemPool(*item_parameters(Question.objects.filter(test=test, question_type__in=AUTO_GRADED_TYPES)))
+
+
+def get_item_pool(test):
+    """Preloaded pool for ``test``, reloaded when the calibration version changes"""
+    version = calibration_version()
+    cached = _pools.get(test.pk)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    pool = load_item_pool(test)
+    with _pools_lock:
+        _pools[test.pk] = (version, pool)
+    return pool
+
+
+class AdaptiveSession:
+    """
+    Drive one adaptive attempt.
+
+        session = AdaptiveSession(attempt)
+        question = session.next_question()
+        ...
+        session.submit(question.pk, choice_ids=[...])
+    """
+
+    def __init__(self, attempt, pool=None):
+        if not attempt.test.is_adaptive:
+            raise AdaptiveError("Test is not adaptive")
+        self.attempt = attempt
+        self.pool = pool if pool is not None else get_item_pool(attempt.test)
+        self.state = attempt.answers_data.setdefault('adaptive', {
+            'items': [],
+            'responses': [],
+            'theta': 0.0,
+            'se': 1.0,
+            'current': None,
+            'finished': False,
+        })
+
+    @property
+    def ability(self):
+        return self.state['theta']
+
+    @property
+    def standard_error(self):
+        return self.state['se']
+
+    @property
+    def is_finished(self):
+        return self.state['finished']
+
+    def _save(self):
+        self.attempt.save(update_fields=['answers_data', 'current_question_index'])
+
+    def _should_stop(self):
+        given = len(self.state['items'])
+        if given >= settings.CAT_MAX_QUESTIONS or given >= len(self.pool):
+            return True
+        return given >= settings.CAT_MIN_QUESTIONS and self.state['se'] <= settings.CAT_TARGET_SE
+
+    @traced('attempt.select_question', attempt='self')
+    def next_question_id(self):
+        """Id of the question to show now, or None once the test is finished"""
+        if self.state['finished']:
+            return None
+        if self.state['current'] is not None:
+            return self.state['current']
+
+        question_id = None
+        if not self._should_stop():
+            question_id = self.pool.select(
+                self.state['theta'],
+                administered=self.state['items'],
+                top_k=settings.CAT_RANDOMESQUE_ITEMS,
+            )
+        self.state['current'] = question_id
+        if question_id is None:
+            self.complete()
+        else:
+            self._save()
+        return question_id
+
+    def next_question(self):
+        question_id = self.next_question_id()
+        if question_id is None:
+            return None
+        return Question.objects.prefetch_related('choices').get(pk=question_id)
+
+    @traced('attempt.grade_response', attempt='self')
+    def record_response(self, question_id, is_correct):
+        """Score the current question and update the ability estimate"""
+        if self.state['current'] != question_id:
+            raise AdaptiveError("Answer does not belong to the current question")
+
+        self.state['items'].append(question_id)
+        self.state['responses'].append(1 if is_correct else 0)
+        self.state['current'] = None
+        self.state['theta'], self.state['se'] = self.pool.estimate(self.state['items'], self.state['responses'])
+        self.attempt.current_question_index = len(self.state['items'])
+        if self._should_stop():
+            self.complete()
+        else:
+            self._save()
+        return self.state['theta'], self.state['se']
+
+    def record_answer(self, answer):
+        """Convenience wrapper for a graded QuestionAnswer"""
+        return self.record_response(answer.question_id, answer.is_correct)
+
+    def submit(self, question_id, choice_ids=(), numeric_answer=None, text_answer='', matching_pairs=None):
+        """Store and grade the answer to the current question, then move on"""
+        if self.state['finished'] or self.state['current'] != question_id:
+            raise AdaptiveError("Answer does not belong to the current question")
+        question = Question.objects.get(pk=question_id)
+        choices = list(question.choices.filter(pk__in=choice_ids))
+        if len(choices) != len(set(choice_ids)):
+            raise AdaptiveError("Unknown choice for this question")
+
+        with transaction.atomic():
+            answer = QuestionAnswer(
+                attempt=self.attempt, question=question, numeric_answer=numeric_answer,
+                text_answer=text_answer or '', matching_pairs=matching_pairs or {},
+            )
+            answer.save()
+            if choices:
+                # Choice answers are graded once the selection is stored
+                answer.selected_choices.set(choices)
+                answer.save(update_fields=['is_correct', 'points_awarded', 'last_modified_at'])
+            self.record_answer(answer)
+        return answer
+
+    @traced('attempt.complete', attempt='self')
+    def complete(self):
+        """Finish the attempt and score it from its graded answers"""
+        attempt = self.attempt
+        self.state['current'] = None
+        self.state['finished'] = True
+        if attempt.status != 'in_progress':
+            self._save()
+            return
+        totals = attempt.answers.aggregate(points=Sum('points_awarded'), possible=Sum('question__points'))
+        attempt.total_score = totals['points'] or 0.0
+        attempt.max_possible_score = totals['possible'] or 0
+        if attempt.max_possible_score:
+            attempt.percentage_score = 100.0 * attempt.total_score / attempt.max_possible_score
+        attempt.is_passed = attempt.percentage_score >= attempt.test.pass_mark
+        attempt.status = 'completed'
+        attempt.finished_at = timezone.now()
+        attempt.save()
@@ -3,7 +3,7 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.http import HttpResponse
 import csv
-from .models import Category, Test, TestAttempt, TestSession
+from .models import Category, Test, TestAttempt, TestSession, TestVariant
 
 
 @admin.register(Category)
@@ -88,7 +88,7 @@ class TestAdmin(admin.ModelAdmin):
 @admin.register(TestAttempt)
 class TestAttemptAdmin(admin.ModelAdmin):
     list_display = ('test', 'user', 'total_score', 'percentage_score', 'is_passed', 'status', 'started_at')
-    list_filter = ('is_passed', 'status', 'started_at')
+    list_filter = ('is_passed', 'status', 'school_class', 'started_at')
     search_fields = ('test__title', 'user__username', 'user__first_name', 'user__last_name')
     readonly_fields = ('started_at', 'finished_at', 'time_spent', 'auto_graded_at', 'manually_graded_at')
     date_hierarchy = 'started_at'
@@ -153,3 +153,15 @@ class TestSessionAdmin(admin.ModelAdmin):
     list_filter = ('is_active', 'last_activity')
     search_fields = ('attempt__test__title', 'attempt__user__username')
     readonly_fields = ('last_activity',)
+
+
+@admin.register(TestVariant)
+class TestVariantAdmin(admin.ModelAdmin):
+    list_display = ('test', 'variant_number', 'question_count', 'expected_difficulty', 'total_points', 'expected_time', 'is_active', 'created_at')
+    list_filter = ('is_active', 'test__category', 'created_at')
+    search_fields = ('test__title',)
+    readonly_fields = ('question_ids', 'choice_seed', 'expected_difficulty', 'total_points', 'expected_time', 'category_counts', 'created_at')
+    
+    def question_count(self, obj):
+        return obj.question_count
+    question_count.short_description = 'Savollar soni'
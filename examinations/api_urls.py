@@ -0,0 +1,13 @@
+from django.urls import path
+from .api_views import (
+    AttemptAutoSaveAPIView, AttemptTimingAPIView, AttemptHeartbeatAPIView, AdaptiveAttemptStartAPIView,
+    AdaptiveAttemptAPIView,
+)
+
+urlpatterns = [
+    path('attempts/<uuid:attempt_id>/auto-save/', AttemptAutoSaveAPIView.as_view(), name='attempt_auto_save'),
+    path('attempts/<uuid:attempt_id>/timings/', AttemptTimingAPIView.as_view(), name='attempt_timings'),
+    path('attempts/<uuid:attempt_id>/heartbeat/', AttemptHeartbeatAPIView.as_view(), name='attempt_heartbeat'),
+    path('<int:test_id>/adaptive/start/', AdaptiveAttemptStartAPIView.as_view(), name='adaptive_attempt_start'),
+    path('attempts/<uuid:attempt_id>/adaptive/', AdaptiveAttemptAPIView.as_view(), name='adaptive_attempt'),
+]
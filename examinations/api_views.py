@@ -0,0 +1,161 @@
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from accounts.ratelimit import client_ip
+from .models import Test, TestAttempt
+from .serializers import AdaptiveAnswerSerializer, AttemptQuestionSerializer
+from . import timing
+
+MAX_SUSPICIOUS_EVENTS = 200
+
+
+class OwnAttemptMixin:
+    """Resolve the requesting student's in-progress attempt"""
+
+    def get_attempt(self, attempt_id):
+        attempt = get_object_or_404(TestAttempt, pk=attempt_id, user=self.request.user)
+        if attempt.status != 'in_progress':
+            return attempt, Response({'error': 'Test already finished'}, status=status.HTTP_409_CONFLICT)
+        return attempt, None
+
+
+class AttemptAutoSaveAPIView(OwnAttemptMixin, APIView):
+    """API view for periodic answer auto-save"""
+
+    def post(self, request, attempt_id):
+        attempt, error = self.get_attempt(attempt_id)
+        if error:
+            return error
+
+        data = request.data
+        update_fields = []
+        if isinstance(data.get('answers'), dict):
+            attempt.answers_data['answers'] = data['answers']
+            update_fields.append('answers_data')
+        if 'current_question' in data:
+            try:
+                attempt.current_question_index = max(int(data['current_question']), 0)
+                update_fields.append('current_question_index')
+            except (TypeError, ValueError):
+                pass
+        if isinstance(data.get('suspicious_activity'), list):
+            attempt.suspicious_activity['events'] = data['suspicious_activity'][-MAX_SUSPICIOUS_EVENTS:]
+            update_fields.append('suspicious_activity')
+        if update_fields:
+            attempt.save(update_fields=update_fields)
+
+        timing.buffer_events(attempt.pk, timing.clean_events(data.get('timing_events')))
+        timed = timing.fold_timings(attempt)
+        return Response({'status': 'saved', 'timed_answers': timed})
+
+
+class AttemptTimingAPIView(APIView):
+    """API view for buffering per-question dwell events (no database writes)"""
+
+    def post(self, request, attempt_id):
+        if not TestAttempt.objects.filter(pk=attempt_id, user=request.user, status='in_progress').exists():
+            return Response({'error': 'Attempt not found'}, status=status.HTTP_404_NOT_FOUND)
+        events = timing.clean_events(request.data.get('events'))
+        buffered = timing.buffer_events(attempt_id, events)
+        return Response({'accepted': len(events), 'buffered': buffered}, status=status.HTTP_202_ACCEPTED)
+
+
+class AttemptHeartbeatAPIView(APIView):
+    """API view for the test page heartbeat"""
+
+    def post(self, request, attempt_id):
+        if not TestAttempt.objects.filter(pk=attempt_id, user=request.user, status='in_progress').exists():
+            return Response({'error': 'Attempt not found'}, status=status.HTTP_404_NOT_FOUND)
+        timing.buffer_events(attempt_id, timing.clean_events(request.data.get('timing_events')))
+        return Response({'status': 'ok'})
+
+
+def adaptive_state(session, request):
+    """Current question of an adaptive attempt, or its score once finished"""
+    attempt = session.attempt
+    question = session.next_question() if attempt.status == 'in_progress' else None
+    data = {
+        'attempt_id': str(attempt.pk),
+        'answered': len(session.state['items']),
+        'finished': question is None,
+        'question': AttemptQuestionSerializer(question, context={'request': request}).data if question else None,
+    }
+    if question is None:
+        data.update({
+            'total_score': attempt.total_score,
+            'max_possible_score': attempt.max_possible_score,
+            'percentage_score': round(attempt.percentage_score, 1),
+            'is_passed': attempt.is_passed,
+            'ability': round(session.ability, 3),
+            'standard_error': round(session.standard_error, 3),
+        })
+    return data
+
+
+class AdaptiveAttemptStartAPIView(APIView):
+    """API view for starting (or resuming) an attempt at an adaptive test"""
+
+    def post(self, request, test_id):
+        test = get_object_or_404(Test, pk=test_id, test_type='adaptive', status='published')
+        attempt = TestAttempt.objects.filter(test=test, user=request.user, status='in_progress').first()
+        created = attempt is None
+        if created:
+            if TestAttempt.objects.filter(test=test, user=request.user).count() >= test.max_attempts:
+                return Response({'error': 'No attempts left for this test'}, status=status.HTTP_403_FORBIDDEN)
+            attempt = TestAttempt.objects.create(
+                test=test,
+                user=request.user,
+                ip_address=client_ip(request) if settings.TRACK_IP_ADDRESS else None,
+                user_agent=request.META.get('HTTP_USER_AGENT', ''),
+            )
+        from .adaptive import AdaptiveSession
+
+        data = adaptive_state(AdaptiveSession(attempt), request)
+        return Response(data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+class AdaptiveAttemptAPIView(APIView):
+    """API view for the current question of an adaptive attempt (GET) and answering it (POST)"""
+
+    def get_session(self, attempt_id):
+        # Imported here: it loads NumPy, which the URLconf must not pull
+        # into every worker at startup (STARTUP_LAZY_MODULES)
+        from .adaptive import AdaptiveSession
+
+        attempt = get_object_or_404(TestAttempt.objects.select_related('test'), pk=attempt_id, user=self.request.user)
+        if not attempt.test.is_adaptive:
+            return None, Response({'error': 'Test is not adaptive'}, status=status.HTTP_400_BAD_REQUEST)
+        return AdaptiveSession(attempt), None
+
+    def get(self, request, attempt_id):
+        session, error = self.get_session(attempt_id)
+        if error:
+            return error
+        return Response(adaptive_state(session, request))
+
+    def post(self, request, attempt_id):
+        from .adaptive import AdaptiveError
+
+        session, error = self.get_session(attempt_id)
+        if error:
+            return error
+        if session.attempt.status != 'in_progress':
+            return Response({'error': 'Test already finished'}, status=status.HTTP_409_CONFLICT)
+
+        serializer = AdaptiveAnswerSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            session.submit(
+                data['question'],
+                choice_ids=data['choices'],
+                numeric_answer=data['numeric_answer'],
+                text_answer=data['text_answer'],
+                matching_pairs=data['matching_pairs'],
+            )
+        except AdaptiveError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_409_CONFLICT)
+        return Response(adaptive_state(session, request))
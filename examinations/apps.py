@@ -5,3 +5,6 @@ class ExaminationsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "examinations"
     verbose_name = "Test Examinations"
+    
+    def ready(self):
+        import examinations.signals
@@ -0,0 +1,266 @@
+"""
+Test assembly from a question pool.
+
+A blueprint gives the number of questions, the target difficulty (expected
+proportion of correct answers), category coverage and time/points budgets.
+Each variant is built by stratified greedy selection: category quotas are
+filled from a seeded random walk over the stratum, always taking the
+candidate in a small look-ahead window that keeps the running difficulty
+closest to the target and fits the remaining budget. Items already used by
+earlier variants are penalised, which spreads exposure across the pool.
+
+Variants are stored as TestVariant ordering plans (a list of question ids),
+never as copied Question rows.
+"""
+import heapq
+import random
+import time
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+from questions.models import Question
+from .models import TestVariant
+
+# Expected proportion correct when a question has too few responses
+DIFFICULTY_PRIORS = {'easy': 0.8, 'medium': 0.6, 'hard': 0.4}
+MIN_RESPONSES = 20
+DEFAULT_SECONDS = 60
+WINDOW_SIZE = 8
+EXPOSURE_PENALTY = 0.1
+
+
+class AssemblyError(ValueError):
+    """The pool cannot satisfy the blueprint"""
+
+
+@dataclass(frozen=True)
+class PoolItem:
+    id: int
+    category_id: int
+    p_value: float
+    points: int
+    seconds: int
+
+
+@dataclass
+class Blueprint:
+    question_count: int
+    target_difficulty: float = 0.6
+    category_weights: dict = field(default_factory=dict)  # {category_id: weight}; empty = pool proportions
+    max_seconds: int = None
+    max_points: int = None
+
+
+@dataclass
+class AssembledVariant:
+    question_ids: list
+    expected_difficulty: float
+    total_points: int
+    expected_time: int
+    category_counts: dict
+
+
+def load_pool(queryset):
+    """
+    Read the pool in one query using the cached per-question statistics
+    """
+    rows = queryset.values_list(
+        'id', 'test__category_id', 'difficulty', 'points', 'time_limit',
+        'times_answered', 'times_correct', 'average_time_spent',
+        'statistics__total_attempts', 'statistics__difficulty_index',
+    )
+    pool = []
+    for (pk, category_id, difficulty, points, time_limit, answered, correct,
+         average_time, stats_attempts, difficulty_index) in rows:
+        if stats_attempts and stats_attempts >= MIN_RESPONSES:
+            p_value = difficulty_index / 100.0
+        elif answered >= MIN_RESPONSES:
+            p_value = correct / answered
+        else:
+            p_value = DIFFICULTY_PRIORS.get(difficulty, 0.6)
+        seconds = int(round(average_time)) or time_limit or DEFAULT_SECONDS
+        pool.append(PoolItem(pk, category_id, p_value, points, seconds))
+    return pool
+
+
+def category_quotas(pool, blueprint):
+    """Split question_count over categories with the largest-remainder method"""
+    available = {}
+    for item in pool:
+        available[item.category_id] = available.get(item.category_id, 0) + 1
+
+    weights = blueprint.category_weights or available
+    weights = {category: weight for category, weight in weights.items() if weight > 0}
+    missing = [category for category in weights if category not in available]
+    if missing:
+        raise AssemblyError(f"No questions in the pool for categories {missing}")
+
+    total_weight = float(sum(weights.values()))
+    exact = {category: blueprint.question_count * weight / total_weight for category, weight in weights.items()}
+    quotas = {category: int(value) for category, value in exact.items()}
+    remainder = blueprint.question_count - sum(quotas.values())
+    for category in sorted(exact, key=lambda c: exact[c] - quotas[c], reverse=True)[:remainder]:
+        quotas[category] += 1
+
+    for category, quota in quotas.items():
+        if quota > available[category]:
+            raise AssemblyError(
+                f"Category {category} needs {quota} questions but the pool has {available[category]}"
+            )
+    return quotas
+
+
+class TestAssembler:
+    def __init__(self, pool, blueprint, seed=None):
+        if blueprint.question_count < 1:
+            raise AssemblyError("question_count must be positive")
+        if blueprint.question_count > len(pool):
+            raise AssemblyError(
+                f"Pool has {len(pool)} questions, blueprint needs {blueprint.question_count}"
+            )
+        self.blueprint = blueprint
+        self.quotas = category_quotas(pool, blueprint)
+        self.strata = {category: [] for category in self.quotas}
+        for item in pool:
+            if item.category_id in self.strata:
+                self.strata[item.category_id].append(item)
+        # (PoolItem attribute, limit) for every budget the blueprint sets
+        self.budgets = [
+            (name, limit)
+            for name, limit in (('seconds', blueprint.max_seconds), ('points', blueprint.max_points))
+            if limit is not None
+        ]
+        # Fill the most constrained categories first
+        self.order = sorted(self.quotas, key=lambda c: self.quotas[c] / len(self.strata[c]), reverse=True)
+        # Least each budget needs for the categories after each position
+        self.later = {name: [0] * len(self.order) for name, limit in self.budgets}
+        for name, limit in self.budgets:
+            for position in range(len(self.order) - 2, -1, -1):
+                category = self.order[position + 1]
+                cheapest = heapq.nsmallest(self.quotas[category], (getattr(item, name) for item in self.strata[category]))
+                self.later[name][position] = self.later[name][position + 1] + sum(cheapest)
+        self.exposure = {}
+        self.variants_built = 0
+        self.rng = random.Random(seed)
+
+    def _fits(self, item, state, reserve):
+        """
+        Whether taking ``item`` still leaves room for the cheapest way to fill
+        every remaining slot from the items eligible for it
+        """
+        for name, limit in self.budgets:
+            value = getattr(item, name)
+            later, smallest, need = reserve[name]
+            reserved = later
+            if need > 0:
+                # The ``need`` cheapest other items of this category
+                if value <= smallest[need - 1]:
+                    reserved += sum(smallest) - value
+                else:
+                    reserved += sum(smallest[:need])
+            if state[name] + value + reserved > limit:
+                return False
+        return True
+
+    def _score(self, item, state):
+        """Distance of the running mean from the target, plus exposure penalty"""
+        mean = (state['difficulty'] + item.p_value) / (state['count'] + 1)
+        exposure = self.exposure.get(item.id, 0) / max(self.variants_built, 1)
+        return abs(mean - self.blueprint.target_difficulty) + EXPOSURE_PENALTY * exposure
+
+    def build_variant(self):
+        state = {'count': 0, 'difficulty': 0.0, 'seconds': 0, 'points': 0}
+        selected = []
+
+        for position, category in enumerate(self.order):
+            candidates = self.strata[category][:]
+            self.rng.shuffle(candidates)
+            for slot in range(self.quotas[category]):
+                need = self.quotas[category] - slot - 1
+                reserve = {
+                    name: (
+                        self.later[name][position],
+                        heapq.nsmallest(need + 1, (getattr(item, name) for item in candidates)),
+                        need,
+                    )
+                    for name, limit in self.budgets
+                }
+                best_index, best_score = None, None
+                checked = 0
+                for index, item in enumerate(candidates):
+                    if not self._fits(item, state, reserve):
+                        continue
+                    score = self._score(item, state)
+                    if best_score is None or score < best_score:
+                        best_index, best_score = index, score
+                    checked += 1
+                    if checked >= WINDOW_SIZE:
+                        break
+                if best_index is None:
+                    raise AssemblyError("Time or points budget cannot be met with this pool")
+
+                item = candidates.pop(best_index)
+                selected.append(item)
+                state['count'] += 1
+                state['difficulty'] += item.p_value
+                state['seconds'] += item.seconds
+                state['points'] += item.points
+
+        for item in selected:
+            self.exposure[item.id] = self.exposure.get(item.id, 0) + 1
+        self.variants_built += 1
+
+        # Present easier questions first, shuffled within difficulty bands
+        selected.sort(key=lambda item: (-round(item.p_value, 1), self.rng.random()))
+        category_counts = {}
+        for item in selected:
+            category_counts[str(item.category_id)] = category_counts.get(str(item.category_id), 0) + 1
+        return AssembledVariant(
+            question_ids=[item.id for item in selected],
+            expected_difficulty=state['difficulty'] / state['count'],
+            total_points=state['points'],
+            expected_time=state['seconds'],
+            category_counts=category_counts,
+        )
+
+
+def assemble_variants(test, blueprint, count, pool_queryset=None, seed=None, replace=True):
+    """
+    Build ``count`` variants of ``test`` and store them as TestVariant plans.
+
+    The pool defaults to every question in the test's category. ``replace``
+    deletes the current variants no attempt has used and retires the rest.
+    Returns (variants, elapsed_seconds).
+    """
+    started = time.perf_counter()
+    if pool_queryset is None:
+        pool_queryset = Question.objects.filter(test__category=test.category)
+    if blueprint.max_seconds is None:
+        blueprint.max_seconds = test.time_limit * 60
+
+    assembler = TestAssembler(load_pool(pool_queryset), blueprint, seed=seed)
+    plans = [assembler.build_variant() for _ in range(count)]
+
+    with transaction.atomic():
+        if replace:
+            # Attempts keep the plan they were served; only unused variants go
+            current = test.variants.filter(is_active=True)
+            current.filter(attempts__isnull=True).delete()
+            current.update(is_active=False)
+        last = test.variants.order_by('-variant_number').values_list('variant_number', flat=True).first()
+        first_number = (last or 0) + 1
+        variants = TestVariant.objects.bulk_create([
+            TestVariant(
+                test=test,
+                variant_number=first_number + index,
+                question_ids=plan.question_ids,
+                choice_seed=assembler.rng.randrange(2 ** 31),
+                expected_difficulty=plan.expected_difficulty,
+                total_points=plan.total_points,
+                expected_time=plan.expected_time,
+                category_counts=plan.category_counts,
+            )
+            for index, plan in enumerate(plans)
+        ])
+    return variants, time.perf_counter() - started
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+from examinations.models import Test
+from examinations.assembly import AssemblyError, Blueprint, assemble_variants
+from questions.models import Question
+
+
+class Command(BaseCommand):
+    help = 'Assemble parallel variants of a test from a question pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('test_id', type=int)
+        parser.add_argument('--count', type=int, default=10, help='Number of variants')
+        parser.add_argument('--questions', type=int, required=True, help='Questions per variant')
+        parser.add_argument('--target', type=float, default=0.6,
+                            help='Target expected proportion of correct answers (0-1)')
+        parser.add_argument('--categories', default='',
+                            help='Category coverage as id:weight pairs, e.g. "1:2,3:1" (default: test category)')
+        parser.add_argument('--max-points', type=int)
+        parser.add_argument('--seed', type=int)
+        parser.add_argument('--append', action='store_true', help='Keep existing variants')
+
+    def parse_categories(self, value):
+        weights = {}
+        for part in filter(None, value.split(',')):
+            category, _, weight = part.partition(':')
+            try:
+                weights[int(category)] = float(weight or 1)
+            except ValueError:
+                raise CommandError(f"Invalid category weight '{part}'")
+        return weights
+
+    def handle(self, *args, **options):
+        try:
+            test = Test.objects.select_related('category').get(pk=options['test_id'])
+        except Test.DoesNotExist:
+            raise CommandError(f"Test {options['test_id']} not found")
+
+        weights = self.parse_categories(options['categories'])
+        pool = Question.objects.filter(test__category_id__in=list(weights) or [test.category_id])
+        blueprint = Blueprint(
+            question_count=options['questions'],
+            target_difficulty=options['target'],
+            category_weights=weights,
+            max_points=options['max_points'],
+        )
+
+        try:
+            variants, elapsed = assemble_variants(
+                test, blueprint, options['count'], pool_queryset=pool,
+                seed=options['seed'], replace=not options['append'],
+            )
+        except AssemblyError as exc:
+            raise CommandError(str(exc))
+
+        difficulties = [variant.expected_difficulty for variant in variants]
+        self.stdout.write(
+            f"Expected difficulty {min(difficulties):.3f}-{max(difficulties):.3f} "
+            f"(target {blueprint.target_difficulty:.2f})"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(variants)} variants of '{test.title}' assembled in {elapsed:.2f}s"
+        ))
@@ -0,0 +1,124 @@
+import os
+import re
+import subprocess
+import sys
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What each kind of process imports before it can do any work
+TARGETS = {
+    # every manage.py command
+    'django': 'import django; django.setup()',
+    # a gunicorn worker: WSGI handler with the middleware chain
+    'wsgi': 'from buxoro_test_system.wsgi import application',
+    # a worker's first API request: URLconf, views and DRF settings classes
+    'api': (
+        'from buxoro_test_system.wsgi import application\n'
+        'from django.urls import get_resolver\n'
+        'from rest_framework.settings import api_settings\n'
+        'get_resolver().url_patterns\n'
+        'api_settings.DEFAULT_AUTHENTICATION_CLASSES, api_settings.DEFAULT_RENDERER_CLASSES\n'
+        'api_settings.DEFAULT_FILTER_BACKENDS'
+    ),
+    # a Celery worker: the app and every tasks module
+    'celery': (
+        'import django; django.setup()\n'
+        'from buxoro_test_system.celery import app\n'
+        'app.loader.import_default_modules()'
+    ),
+}
+
+# Environment each process kind runs with (docker-compose.yml)
+TARGET_ENV = {
+    'celery': {'CELERY_SKIP_CHECKS': '1'},
+}
+
+LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def parse_importtime(output):
+    """[(depth, module, self_us, cumulative_us)] in the order -X importtime prints them"""
+    entries = []
+    for line in output.splitlines():
+        match = LINE.match(line)
+        if match:
+            entries.append((len(match.group(3)) // 2, match.group(4), int(match.group(1)), int(match.group(2))))
+    return entries
+
+
+def importer_chain(entries, index):
+    """Modules that (transitively) imported entries[index], nearest first"""
+    depth, chain = entries[index][0], []
+    for entry_depth, module, *_ in entries[index + 1:]:
+        if entry_depth < depth:
+            chain.append(module)
+            depth = entry_depth
+            if depth == 0:
+                break
+    return chain
+
+
+class Command(BaseCommand):
+    help = (
+        'Profile import time at startup (python -X importtime) for manage.py, gunicorn workers, '
+        'the first API request and Celery workers, and check it against STARTUP_IMPORT_BUDGET_MS '
+        'and STARTUP_LAZY_MODULES. Exits non-zero when a budget is exceeded.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--targets', nargs='+', choices=list(TARGETS), default=list(TARGETS))
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per target; the median is reported')
+        parser.add_argument('--top', type=int, default=12, help='Packages to list per target')
+        parser.add_argument('--budget-ms', type=float, default=None,
+                            help='One budget for every target (default: STARTUP_IMPORT_BUDGET_MS)')
+        parser.add_argument('--no-check', action='store_true', help='Report only; never fail')
+
+    def run_target(self, target):
+        env = {**os.environ, 'PYTHONDONTWRITEBYTECODE': '1', **TARGET_ENV.get(target, {})}
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'buxoro_test_system.settings')
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', TARGETS[target]],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            raise CommandError(f'Import run failed:\n{completed.stderr[-2000:]}')
+        return parse_importtime(completed.stderr)
+
+    def handle(self, *args, **options):
+        budgets = settings.STARTUP_IMPORT_BUDGET_MS
+        lazy_modules = set(settings.STARTUP_LAZY_MODULES)
+        failures = []
+
+        for target in options['targets']:
+            runs = [self.run_target(target) for _ in range(max(options['repeat'], 1))]
+            ranked = sorted(((sum(entry[2] for entry in entries) / 1000, entries) for entries in runs),
+                            key=lambda run: run[0])
+            total, entries = ranked[len(ranked) // 2]
+
+            packages = Counter()
+            for depth, module, self_us, cumulative_us in entries:
+                packages[module.split('.')[0]] += self_us
+
+            budget = options['budget_ms'] if options['budget_ms'] is not None else budgets.get(target)
+            verdict = '' if budget is None else (' OK' if total <= budget else ' OVER BUDGET')
+            budget_text = '' if budget is None else f' (budget {budget:.0f} ms)'
+            self.stdout.write(
+                f"\n{target}: {total:.0f} ms in {len(entries)} modules{budget_text}{verdict}"
+            )
+            for package, self_us in packages.most_common(options['top']):
+                self.stdout.write(f"  {self_us / 1000:>8.1f} ms  {package}")
+
+            if budget is not None and total > budget:
+                failures.append(f'{target}: {total:.0f} ms > {budget:.0f} ms')
+            for index, (depth, module, self_us, cumulative_us) in enumerate(entries):
+                if module in lazy_modules:
+                    chain = ' <- '.join(importer_chain(entries, index)[:5])
+                    self.stdout.write(self.style.WARNING(
+                        f"  {module} imported at startup ({cumulative_us / 1000:.1f} ms) via {chain}"
+                    ))
+                    failures.append(f'{target}: {module} imported at startup via {chain}')
+
+        if failures and not options['no_check']:
+            raise CommandError('Startup budget exceeded:\n  ' + '\n  '.join(failures))
@@ -0,0 +1,189 @@
+import http.client
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+PROFILES = ('sync', 'gthread', 'uvicorn')
+DEFAULT_HEADERS = {
+    'Host': 'localhost',
+    # As if behind nginx: no HTTPS redirect when DEBUG is off
+    'X-Forwarded-Proto': 'https',
+}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def process_tree(pid):
+    """pid and all its descendants, from /proc"""
+    pids, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        try:
+            with open(f'/proc/{current}/task/{current}/children') as handle:
+                pending.extend(int(child) for child in handle.read().split())
+        except OSError:
+            continue
+    return pids
+
+
+def memory_mb(pid):
+    """
+    Proportional set size of the server (master + workers). Pages shared
+    copy-on-write after preloading are split between the processes instead
+    of being counted once per worker, as RSS would.
+    """
+    total_kb = 0
+    for process in process_tree(pid):
+        try:
+            with open(f'/proc/{process}/smaps_rollup') as handle:
+                for line in handle:
+                    if line.startswith('Pss:'):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return total_kb / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Start gunicorn with each worker profile from gunicorn.conf.py and compare throughput, '
+        'latency and memory under concurrent load. The client runs on the same machine, so '
+        'compare profiles with each other rather than reading the numbers as capacity.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', choices=PROFILES, default=list(PROFILES))
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Path to request, repeatable (default: /healthz and /)')
+        parser.add_argument('--header', action='append', default=[], help="Extra header, e.g. 'Authorization: Bearer ...'")
+        parser.add_argument('--concurrency', type=int, default=32, help='Concurrent client connections')
+        parser.add_argument('--duration', type=float, default=15.0, help='Seconds of load per profile')
+        parser.add_argument('--port', type=int, default=8765)
+
+    def start_server(self, profile, port, log):
+        env = {**os.environ, 'GUNICORN_PROFILE': profile, 'GUNICORN_BIND': f'127.0.0.1:{port}'}
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', str(settings.BASE_DIR / 'gunicorn.conf.py')],
+            cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                log.seek(0)
+                raise CommandError(f"gunicorn ({profile}) exited:\n{log.read().decode(errors='replace')[-2000:]}")
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+                connection.request('GET', '/healthz', headers=DEFAULT_HEADERS)
+                if connection.getresponse().status == 200:
+                    return process
+            except OSError:
+                pass
+            time.sleep(0.2)
+        self.stop_server(process)
+        raise CommandError(f'gunicorn ({profile}) did not become ready within 60 seconds')
+
+    def stop_server(self, process):
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=40)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def client(self, port, paths, headers, deadline, latencies, errors, lock):
+        connection = None
+        own_latencies, own_errors = [], 0
+        index = 0
+        while time.monotonic() < deadline:
+            path = paths[index % len(paths)]
+            index += 1
+            started = time.perf_counter()
+            try:
+                if connection is None:
+                    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    own_errors += 1
+                if response.getheader('Connection', '').lower() == 'close':
+                    connection.close()
+                    connection = None
+            except (OSError, http.client.HTTPException):
+                own_errors += 1
+                if connection is not None:
+                    connection.close()
+                connection = None
+                continue
+            own_latencies.append((time.perf_counter() - started) * 1000)
+        if connection is not None:
+            connection.close()
+        with lock:
+            latencies.extend(own_latencies)
+            errors.append(own_errors)
+
+    def run_load(self, port, paths, headers, concurrency, duration):
+        latencies, errors, lock = [], [], threading.Lock()
+        started = time.monotonic()
+        deadline = started + duration
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for i in range(concurrency):
+                pool.submit(self.client, port, paths, headers, deadline, latencies, errors, lock)
+        elapsed = time.monotonic() - started
+        latencies.sort()
+        return {
+            'requests': len(latencies),
+            'rps': len(latencies) / elapsed,
+            'p50': percentile(latencies, 0.50),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+            'errors': sum(errors),
+        }
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/healthz', '/']
+        headers = dict(DEFAULT_HEADERS)
+        for header in options['header']:
+            name, _, value = header.partition(':')
+            headers[name.strip()] = value.strip()
+
+        results = []
+        for profile in options['profiles']:
+            with tempfile.TemporaryFile() as log:
+                process = self.start_server(profile, options['port'], log)
+                try:
+                    # One pass per path so lazy imports and caches are warm
+                    self.run_load(options['port'], paths, headers, 1, 1.0)
+                    result = self.run_load(options['port'], paths, headers,
+                                           options['concurrency'], options['duration'])
+                    result['memory'] = memory_mb(process.pid)
+                finally:
+                    self.stop_server(process)
+            results.append((profile, result))
+            self.stdout.write(f"{profile}: {result['requests']} requests")
+
+        self.stdout.write(
+            f"\n{options['concurrency']} connections, {options['duration']:.0f}s per profile, paths: {', '.join(paths)}"
+        )
+        self.stdout.write(
+            f"{'profile':<10}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}{'PSS MB':>9}"
+        )
+        for profile, result in results:
+            self.stdout.write(
+                f"{profile:<10}{result['rps']:>9.0f}{result['p50']:>9.1f}{result['p95']:>9.1f}"
+                f"{result['p99']:>9.1f}{result['errors']:>8}{result['memory']:>9.0f}"
+            )
@@ -0,0 +1,156 @@
+import json
+import os
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def read_spans(path):
+    """Spans from the trace file and its rotated backups, oldest first"""
+    paths = [f'{path}.{n}' for n in range(settings.LOG_BACKUP_COUNT, 0, -1)] + [path]
+    spans = []
+    for name in paths:
+        if not os.path.exists(name):
+            continue
+        with open(name, encoding='utf-8') as handle:
+            for line in handle:
+                try:
+                    span = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by rotation or a crash
+                if isinstance(span, dict) and span.get('traceId') and span.get('endTimeUnixNano'):
+                    spans.append(span)
+    return spans
+
+
+class Command(BaseCommand):
+    help = (
+        'Summarise traced attempts (TRACE_FILE, see buxoro_test_system.tracing): a flame-style tree '
+        'of where time goes across requests and tasks, and the slowest stages by self time.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=20, help='Last N traced attempts (default 20)')
+        parser.add_argument('--file', default=None, help='Trace file (default: TRACE_FILE)')
+        parser.add_argument('--depth', type=int, default=4, help='Tree depth to show')
+        parser.add_argument('--top', type=int, default=15, help='Rows in the slowest-stages table')
+
+    def select_traces(self, spans, attempt_count):
+        traces = defaultdict(list)
+        for span in spans:
+            traces[span['traceId']].append(span)
+
+        attempt_end = {}
+        trace_attempt = {}
+        for trace_id, trace_spans in traces.items():
+            attempt_id = next(
+                (span['attributes']['attempt.id'] for span in trace_spans if span.get('attributes', {}).get('attempt.id')),
+                None,
+            )
+            if attempt_id is None:
+                continue
+            trace_attempt[trace_id] = attempt_id
+            end = max(span['endTimeUnixNano'] for span in trace_spans)
+            attempt_end[attempt_id] = max(end, attempt_end.get(attempt_id, 0))
+
+        attempts = set(sorted(attempt_end, key=attempt_end.get)[-attempt_count:])
+        selected = {trace_id: traces[trace_id] for trace_id, attempt_id in trace_attempt.items() if attempt_id in attempts}
+        return attempts, selected, trace_attempt
+
+    def aggregate(self, traces):
+        """(stats per root-to-span name path, stats per span name, total ms per trace)"""
+        paths = defaultdict(lambda: {'calls': 0, 'total': 0.0, 'self': 0.0})
+        stages = defaultdict(lambda: {'durations': [], 'self': 0.0})
+        trace_totals = {}
+
+        for trace_id, trace_spans in traces.items():
+            by_id = {span['spanId']: span for span in trace_spans}
+            children = defaultdict(list)
+            roots = []
+            for span in trace_spans:
+                parent = span.get('parentSpanId')
+                if parent and parent in by_id:
+                    children[parent].append(span)
+                else:
+                    roots.append(span)
+
+            def walk(span, path):
+                duration = (span['endTimeUnixNano'] - span['startTimeUnixNano']) / 1e6
+                child_time = sum(
+                    (child['endTimeUnixNano'] - child['startTimeUnixNano']) / 1e6 for child in children[span['spanId']]
+                )
+                self_time = max(duration - child_time, 0.0)
+                path = path + (span['name'],)
+                paths[path]['calls'] += 1
+                paths[path]['total'] += duration
+                paths[path]['self'] += self_time
+                stages[span['name']]['durations'].append(duration)
+                stages[span['name']]['self'] += self_time
+                for child in children[span['spanId']]:
+                    walk(child, path)
+                return duration
+
+            trace_totals[trace_id] = sum(walk(root, ()) for root in roots)
+        return paths, stages, trace_totals
+
+    def write_tree(self, paths, depth):
+        grand_total = sum(stats['total'] for path, stats in paths.items() if len(path) == 1) or 1.0
+        children = defaultdict(list)
+        for path in paths:
+            children[path[:-1]].append(path)
+
+        def write(parent):
+            for path in sorted(children[parent], key=lambda p: paths[p]['total'], reverse=True):
+                stats = paths[path]
+                label = '  ' * (len(path) - 1) + path[-1]
+                bar = '█' * max(1, round(30 * stats['total'] / grand_total))
+                self.stdout.write(
+                    f"{label[:58]:<58}{stats['calls']:>7}{stats['total']:>11.1f}{stats['self']:>11.1f}  {bar}"
+                )
+                if len(path) < depth:
+                    write(path)
+
+        self.stdout.write(f"{'span':<58}{'calls':>7}{'total ms':>11}{'self ms':>11}")
+        write(())
+
+    def handle(self, *args, **options):
+        path = options['file'] or settings.TRACE_FILE
+        spans = read_spans(path)
+        if not spans:
+            raise CommandError(f'No spans in {path}. Is TRACE_SAMPLE_RATE above 0?')
+
+        attempts, traces, trace_attempt = self.select_traces(spans, options['attempts'])
+        if not traces:
+            raise CommandError('No traced spans are linked to an attempt yet.')
+        paths, stages, trace_totals = self.aggregate(traces)
+
+        self.stdout.write(
+            f"{len(attempts)} attempt(s), {len(traces)} trace(s), {sum(len(s) for s in traces.values())} spans\n"
+        )
+        self.write_tree(paths, options['depth'])
+
+        total_self = sum(stage['self'] for stage in stages.values()) or 1.0
+        self.stdout.write("\nSlowest stages by self time")
+        self.stdout.write(f"{'stage':<50}{'calls':>7}{'self ms':>11}{'share':>8}{'mean ms':>10}{'p95 ms':>9}{'max ms':>9}")
+        ranked = sorted(stages.items(), key=lambda item: item[1]['self'], reverse=True)[:options['top']]
+        for name, stage in ranked:
+            durations = sorted(stage['durations'])
+            self.stdout.write(
+                f"{name[:50]:<50}{len(durations):>7}{stage['self']:>11.1f}{stage['self'] / total_self:>8.1%}"
+                f"{sum(durations) / len(durations):>10.1f}{percentile(durations, 0.95):>9.1f}{durations[-1]:>9.1f}"
+            )
+
+        per_attempt = defaultdict(float)
+        for trace_id, total in trace_totals.items():
+            per_attempt[trace_attempt[trace_id]] += total
+        self.stdout.write('\nSlowest attempts (traced time)')
+        for attempt_id, total in sorted(per_attempt.items(), key=lambda item: item[1], reverse=True)[:5]:
+            self.stdout.write(f'{attempt_id:<40}{total:>11.1f} ms')
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('examinations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('variant_number', models.PositiveIntegerField()),
+                ('question_ids', models.JSONField(default=list)),
+                ('choice_seed', models.PositiveIntegerField(default=0, help_text='Seed for shuffling choices')),
+                ('expected_difficulty', models.FloatField(default=0.0, help_text='Expected proportion of correct answers')),
+                ('total_points', models.PositiveIntegerField(default=0)),
+                ('expected_time', models.PositiveIntegerField(default=0, help_text='Expected time in seconds')),
+                ('category_counts', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='examinations.test')),
+            ],
+            options={
+                'verbose_name': 'Test Variant',
+                'verbose_name_plural': 'Test Variants',
+                'db_table': 'examinations_testvariant',
+                'ordering': ['test', 'variant_number'],
+                'unique_together': {('test', 'variant_number')},
+            },
+        ),
+        migrations.AddField(
+            model_name='testattempt',
+            name='variant',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attempts', to='examinations.testvariant'),
+        ),
+    ]
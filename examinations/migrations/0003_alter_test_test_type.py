@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('examinations', '0002_test_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='test',
+            name='test_type',
+            field=models.CharField(choices=[('one_time', 'One Time'), ('repeatable', 'Repeatable'), ('practice', 'Practice Mode'), ('adaptive', 'Adaptive (CAT)')], default='one_time', max_length=20),
+        ),
+    ]
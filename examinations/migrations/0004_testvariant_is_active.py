@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('examinations', '0003_alter_test_test_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testvariant',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:04
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_school_class(apps, schema_editor):
+    # Existing attempts take the student's current class, as the rollups did
+    TestAttempt = apps.get_model('examinations', 'TestAttempt')
+    User = apps.get_model('accounts', 'User')
+
+    school_class = User.objects.filter(pk=models.OuterRef('user_id')).values('school_class')[:1]
+    TestAttempt.objects.update(school_class=Coalesce(models.Subquery(school_class), models.Value('')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('examinations', '0004_testvariant_is_active'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testattempt',
+            name='school_class',
+            field=models.CharField(blank=True, help_text="Student's class when the attempt started or was completed", max_length=10),
+        ),
+        migrations.RunPython(backfill_school_class, migrations.RunPython.noop),
+    ]
@@ -5,6 +5,8 @@ from django.utils.text import slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
 import uuid
 
+from buxoro_test_system.tracing import traced
+
 User = get_user_model()
 
 
@@ -52,6 +54,7 @@ class Test(models.Model):
         ('one_time', 'One Time'),
         ('repeatable', 'Repeatable'),
         ('practice', 'Practice Mode'),
+        ('adaptive', 'Adaptive (CAT)'),
     )
     
     DIFFICULTY_CHOICES = (
@@ -119,6 +122,10 @@ class Test(models.Model):
     def is_published(self):
         return self.status == 'published'
     
+    @property
+    def is_adaptive(self):
+        return self.test_type == 'adaptive'
+    
     @property
     def duration_display(self):
         hours = self.time_limit // 60
@@ -167,6 +174,9 @@ class TestAttempt(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='in_progress')
     is_passed = models.BooleanField(default=False)
     
+    # Group the attempt counts towards in results.rollups and reports
+    school_class = models.CharField(max_length=10, blank=True, help_text="Student's class when the attempt started or was completed")
+    
     # Security and monitoring
     ip_address = models.GenericIPAddressField(blank=True, null=True)
     user_agent = models.TextField(blank=True)
@@ -185,10 +195,54 @@ class TestAttempt(models.Model):
     # Feedback
     instructor_feedback = models.TextField(blank=True)
     
+    # Assembled variant served to this attempt, if any
+    variant = models.ForeignKey('TestVariant', on_delete=models.SET_NULL, blank=True, null=True, related_name='attempts')
+    
+    # Columns whose last saved values post_save handlers can compare against
+    # (results.rollups, examinations.timing) via ``_loaded_values``
+    TRACKED_FIELDS = ('status', 'percentage_score', 'is_passed', 'time_spent', 'finished_at', 'school_class')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values) if name in cls.TRACKED_FIELDS
+        }
+        return instance
+    
+    def _stored_values(self):
+        """
+        Tracked columns as stored; those missing from the snapshot (deferred
+        with ``.only()``, or an instance not loaded from the database) are read
+        before the save overwrites them
+        """
+        loaded = dict(getattr(self, '_loaded_values', None) or {})
+        missing = [name for name in self.TRACKED_FIELDS if name not in loaded]
+        if missing:
+            stored = type(self)._base_manager.filter(pk=self.pk).values(*missing).first()
+            loaded.update(stored or {})
+        return loaded
+    
+    @traced('attempt.save', attempt='self')
     def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields).isdisjoint(self.TRACKED_FIELDS):
+            # Auto-saves and the like: nothing the snapshot covers is written
+            return super().save(*args, **kwargs)
+        self._loaded_values = {} if self._state.adding else self._stored_values()
         if self.finished_at and not self.time_spent:
             self.time_spent = int((self.finished_at - self.started_at).total_seconds())
+        if self._state.adding or (self.status == 'completed' and self._loaded_values.get('status') != 'completed'):
+            # The class at completion, so later class changes leave the rollups alone
+            self.school_class = self.user.school_class or ''
+            if update_fields is not None:
+                kwargs['update_fields'] = update_fields = [*update_fields, 'school_class']
+        deferred = self.get_deferred_fields()
         super().save(*args, **kwargs)
+        self._loaded_values = {**self._loaded_values, **{
+            name: getattr(self, name) for name in self.TRACKED_FIELDS
+            if name not in deferred and (update_fields is None or name in update_fields)
+        }}
     
     @property
     def duration_display(self):
@@ -243,3 +297,46 @@ class TestSession(models.Model):
         db_table = 'examinations_testsession'
         verbose_name = 'Test Session'
         verbose_name_plural = 'Test Sessions'
+
+
+class TestVariant(models.Model):
+    """
+    Assembled variant of a test, stored as an ordering plan over question ids
+    (see examinations.assembly)
+    """
+    test = models.ForeignKey(Test, on_delete=models.CASCADE, related_name='variants')
+    variant_number = models.PositiveIntegerField()
+    
+    # Ordering plan
+    question_ids = models.JSONField(default=list)
+    choice_seed = models.PositiveIntegerField(default=0, help_text="Seed for shuffling choices")
+    
+    # Expected characteristics from question statistics
+    expected_difficulty = models.FloatField(default=0.0, help_text="Expected proportion of correct answers")
+    total_points = models.PositiveIntegerField(default=0)
+    expected_time = models.PositiveIntegerField(default=0, help_text="Expected time in seconds")
+    category_counts = models.JSONField(default=dict)
+    
+    # Replaced variants that attempts still point to are kept, but retired
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def get_questions(self):
+        """Questions in plan order"""
+        from questions.models import Question
+        questions = Question.objects.in_bulk(self.question_ids)
+        return [questions[pk] for pk in self.question_ids if pk in questions]
+    
+    @property
+    def question_count(self):
+        return len(self.question_ids)
+    
+    def __str__(self):
+        return f"{self.test.title} - Variant {self.variant_number}"
+    
+    class Meta:
+        db_table = 'examinations_testvariant'
+        verbose_name = 'Test Variant'
+        verbose_name_plural = 'Test Variants'
+        ordering = ['test', 'variant_number']
+        unique_together = ['test', 'variant_number']
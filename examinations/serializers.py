@@ -0,0 +1,28 @@
+from rest_framework import serializers
+from questions.models import Question, Choice
+
+
+class AttemptChoiceSerializer(serializers.ModelSerializer):
+    """Choice as shown to a student, without the answer key"""
+    
+    class Meta:
+        model = Choice
+        fields = ['id', 'text', 'order']
+
+
+class AttemptQuestionSerializer(serializers.ModelSerializer):
+    """Question as shown to a student during an attempt"""
+    choices = AttemptChoiceSerializer(many=True, read_only=True)
+    
+    class Meta:
+        model = Question
+        fields = ['id', 'question_type', 'text', 'image', 'points', 'time_limit', 'choices']
+
+
+class AdaptiveAnswerSerializer(serializers.Serializer):
+    """Answer to the current question of an adaptive attempt"""
+    question = serializers.IntegerField()
+    choices = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    numeric_answer = serializers.FloatField(required=False, allow_null=True, default=None)
+    text_answer = serializers.CharField(required=False, allow_blank=True, default='')
+    matching_pairs = serializers.DictField(required=False, default=dict)
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import TestAttempt
+from . import timing
+
+
+@receiver(post_save, sender=TestAttempt)
+def finish_attempt_timings(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Fold the last dwell events and update question timing statistics once,
+    when an attempt leaves the in-progress state
+    """
+    if raw or created or instance.status == 'in_progress':
+        return
+    previous = getattr(instance, '_loaded_values', None) or {}
+    if previous.get('status') == 'in_progress':
+        timing.finish_attempt_timings(instance)
@@ -1,3 +1,341 @@
-from django.test import TestCase
+import random
+import threading
+import time
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from questions.models import Choice, Question, QuestionAnswer, QuestionStatistics
+from .adaptive import AdaptiveError, AdaptiveSession, ItemPool, get_item_pool
+from .assembly import AssemblyError, Blueprint, TestAssembler, assemble_variants, load_pool
+from .management.commands import import_profile
+from .models import Category, Test, TestAttempt, TestVariant
+from . import timing
+
+
+def make_test(teacher, title='Algebra', category=None, **kwargs):
+    category = category or Category.objects.get_or_create(name='Matematika')[0]
+    defaults = dict(description='Test', time_limit=30, pass_mark=60)
+    defaults.update(kwargs)
+    return Test.objects.create(title=title, category=category, created_by=teacher, **defaults)
+
+
+def bulk_questions(test, count, **fields):
+    start = test.questions.count()
+    return Question.objects.bulk_create([
+        Question(test=test, order=start + number + 1, text=f'{test.title} {start + number}',
+                 question_type='single_choice', created_by=test.created_by, **fields)
+        for number in range(count)
+    ])
+
+
+class TestAssemblyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user('teacher', password='x', role='teacher')
+        self.test = make_test(self.teacher)
+        self.physics = make_test(self.teacher, 'Fizika', Category.objects.create(name='Fizika'))
+
+    def seed_pool(self, per_category=60):
+        rng = random.Random(0)
+        for test in (self.test, self.physics):
+            for number in range(per_category):
+                answered = rng.choice([0, 40])
+                bulk_questions(
+                    test, 1, difficulty=rng.choice(['easy', 'medium', 'hard']), times_answered=answered,
+                    times_correct=rng.randint(0, answered), average_time_spent=rng.choice([0, 45, 90]),
+                )
+
+    def test_variants_follow_the_blueprint(self):
+        self.seed_pool()
+        blueprint = Blueprint(
+            question_count=15, target_difficulty=0.55,
+            category_weights={self.test.category_id: 2, self.physics.category_id: 1},
+        )
+        variants, elapsed = assemble_variants(self.test, blueprint, 8, pool_queryset=Question.objects.all(), seed=1)
+        self.assertEqual([variant.variant_number for variant in variants], list(range(1, 9)))
+        for variant in variants:
+            self.assertEqual(len(set(variant.question_ids)), 15)
+            self.assertEqual(variant.category_counts, {
+                str(self.test.category_id): 10, str(self.physics.category_id): 5,
+            })
+            self.assertAlmostEqual(variant.expected_difficulty, 0.55, delta=0.05)
+            self.assertLessEqual(variant.expected_time, self.test.time_limit * 60)
+        # Exposure control spreads the variants over the pool
+        used = {pk for variant in variants for pk in variant.question_ids}
+        self.assertGreater(len(used), 60)
+
+    def test_budget_reserves_room_for_the_remaining_slots(self):
+        # The cheapest items of the pool (10 s) belong to the other category,
+        # so they cannot pay for the second physics slot
+        bulk_questions(self.test, 3, difficulty='easy', time_limit=10)
+        bulk_questions(self.physics, 1, difficulty='medium', time_limit=100)
+        bulk_questions(self.physics, 3, difficulty='easy', time_limit=50)
+        pool = load_pool(Question.objects.all())
+        blueprint = Blueprint(
+            question_count=3, target_difficulty=0.6, max_seconds=120,
+            category_weights={self.test.category_id: 1, self.physics.category_id: 2},
+        )
+        plan = TestAssembler(pool, blueprint, seed=3).build_variant()
+        self.assertEqual(plan.expected_time, 110)
+
+    def test_impossible_blueprints_are_rejected(self):
+        bulk_questions(self.test, 5, points=3)
+        pool = load_pool(Question.objects.all())
+        with self.assertRaises(AssemblyError):
+            TestAssembler(pool, Blueprint(question_count=6))
+        with self.assertRaises(AssemblyError):
+            TestAssembler(pool, Blueprint(question_count=2, category_weights={self.physics.category_id: 1}))
+        with self.assertRaises(AssemblyError):
+            TestAssembler(pool, Blueprint(question_count=4, max_points=10)).build_variant()
+
+    def test_replacing_keeps_variants_that_attempts_used(self):
+        self.seed_pool(20)
+        blueprint = Blueprint(question_count=5)
+        used, unused = assemble_variants(self.test, blueprint, 2, seed=1)[0]
+        student = User.objects.create_user('student', password='x', role='student')
+        attempt = TestAttempt.objects.create(test=self.test, user=student, variant=used)
+
+        variants, elapsed = assemble_variants(self.test, Blueprint(question_count=5), 2, seed=2)
+        self.assertEqual([variant.variant_number for variant in variants], [2, 3])
+        self.assertFalse(TestVariant.objects.filter(pk=unused.pk).exists())
+        used.refresh_from_db()
+        attempt.refresh_from_db()
+        self.assertFalse(used.is_active)
+        self.assertEqual(attempt.variant, used)
+        self.assertEqual(self.test.variants.filter(is_active=True).count(), 2)
+
+        assemble_variants(self.test, Blueprint(question_count=5), 1, seed=3, replace=False)
+        self.assertEqual(self.test.variants.filter(is_active=True).count(), 3)
+
+
+@override_settings(CAT_MIN_QUESTIONS=3, CAT_MAX_QUESTIONS=5, CAT_RANDOMESQUE_ITEMS=1)
+class AdaptiveTestingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user('teacher', password='x', role='teacher')
+        self.student = User.objects.create_user('student', password='x', role='student')
+        self.test = make_test(self.teacher, test_type='adaptive', status='published', max_attempts=1)
+        for number, difficulty in enumerate(['easy', 'easy', 'medium', 'medium', 'hard', 'hard', 'medium']):
+            question = Question.objects.create(
+                test=self.test, order=number + 1, text=f'Savol {number}', question_type='single_choice',
+                difficulty=difficulty, points=2, created_by=self.teacher,
+            )
+            Choice.objects.create(question=question, text='To\'g\'ri', is_correct=True, order=1)
+            Choice.objects.create(question=question, text='Noto\'g\'ri', order=2)
+        Question.objects.create(test=self.test, order=99, text='Insho', question_type='essay', created_by=self.teacher)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def answer(self, attempt_id, question, correct=True):
+        choice = next(choice for choice in question['choices'] if choice['text'].startswith('To') == correct)
+        return self.client.post(
+            f'/api/tests/attempts/{attempt_id}/adaptive/', {'question': question['id'], 'choices': [choice['id']]},
+            format='json',
+        )
+
+    def test_pool_selects_the_most_informative_item(self):
+        pool = ItemPool([1, 2, 3], [1.0, 1.0, 2.0], [-2.0, 0.0, 2.0])
+        self.assertEqual(pool.select(0.0), 2)
+        self.assertEqual(pool.select(2.0), 3)
+        self.assertEqual(pool.select(0.0, administered=[2]), 1)
+        self.assertIsNone(pool.select(0.0, administered=[1, 2, 3]))
+
+        up, up_se = pool.estimate([1, 2, 3], [1, 1, 1])
+        down, down_se = pool.estimate([1, 2, 3], [0, 0, 0])
+        self.assertGreater(up, 0.5)
+        self.assertLess(down, -0.5)
+        self.assertLess(up_se, 1.0)
+
+    def test_pool_skips_questions_that_cannot_be_auto_graded(self):
+        pool = get_item_pool(self.test)
+        self.assertEqual(len(pool), 7)
+        self.assertIs(get_item_pool(self.test), pool)
+        Question.objects.create(test=self.test, order=100, text='Yangi', question_type='numeric',
+                                numeric_answer=1, created_by=self.teacher)
+        self.assertEqual(len(get_item_pool(self.test)), 8)
+
+    def test_attempt_runs_until_the_stopping_rule(self):
+        response = self.client.post(f'/api/tests/{self.test.pk}/adaptive/start/')
+        self.assertEqual(response.status_code, 201)
+        state = response.json()
+        attempt_id = state['attempt_id']
+        self.assertNotIn('is_correct', state['question']['choices'][0])
+
+        seen = []
+        while not state['finished']:
+            seen.append(state['question']['id'])
+            response = self.answer(attempt_id, state['question'])
+            self.assertEqual(response.status_code, 200)
+            state = response.json()
+
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+        self.assertEqual((state['answered'], state['percentage_score'], state['is_passed']), (5, 100.0, True))
+        self.assertGreater(state['ability'], 0.5)
+        attempt = TestAttempt.objects.get(pk=attempt_id)
+        self.assertEqual((attempt.status, attempt.total_score, attempt.max_possible_score), ('completed', 10.0, 10))
+        self.assertEqual(QuestionAnswer.objects.filter(attempt=attempt, is_correct=True).count(), 5)
+
+        # Finished: no more answers, and no second attempt
+        response = self.client.post(f'/api/tests/attempts/{attempt_id}/adaptive/', {'question': seen[0]}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.client.post(f'/api/tests/{self.test.pk}/adaptive/start/').status_code, 403)
+
+    def test_resuming_and_wrong_answers(self):
+        first = self.client.post(f'/api/tests/{self.test.pk}/adaptive/start/').json()
+        resumed = self.client.post(f'/api/tests/{self.test.pk}/adaptive/start/')
+        self.assertEqual(resumed.status_code, 200)
+        self.assertEqual(resumed.json()['question']['id'], first['question']['id'])
+
+        response = self.answer(first['attempt_id'], first['question'], correct=False)
+        state = response.json()
+        self.assertEqual(state['answered'], 1)
+        self.assertNotEqual(state['question']['id'], first['question']['id'])
+        stale = self.answer(first['attempt_id'], first['question'])
+        self.assertEqual(stale.status_code, 409)
+
+        other = User.objects.create_user('other', password='x', role='student')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(f'/api/tests/attempts/{first["attempt_id"]}/adaptive/').status_code, 404)
+
+    def test_only_adaptive_tests(self):
+        regular = make_test(self.teacher, 'Oddiy', status='published')
+        self.assertEqual(self.client.post(f'/api/tests/{regular.pk}/adaptive/start/').status_code, 404)
+        attempt = TestAttempt.objects.create(test=regular, user=self.student)
+        with self.assertRaises(AdaptiveError):
+            AdaptiveSession(attempt)
+
+
+class TimingBufferTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user('teacher', password='x', role='teacher')
+        self.student = User.objects.create_user('student', password='x', role='student')
+        self.test = make_test(self.teacher)
+        self.first, self.second = bulk_questions(self.test, 2)
+        self.attempt = TestAttempt.objects.create(test=self.test, user=self.student)
+        self.answer = QuestionAnswer.objects.create(attempt=self.attempt, question=self.first)
+
+    def test_events_fold_into_answers(self):
+        self.assertEqual(timing.buffer_events(self.attempt.pk, [[self.first.pk, 1500, 1], [self.second.pk, 2000, 0]]), 2)
+        self.assertEqual(timing.fold_timings(self.attempt), 1)
+        self.answer.refresh_from_db()
+        self.assertEqual((self.answer.time_spent, self.answer.answer_changed_count), (1, 1))
+
+        # The unanswered question and the 500 ms remainder stay buffered
+        second = QuestionAnswer.objects.create(attempt=self.attempt, question=self.second)
+        self.assertEqual(timing.buffer_events(self.attempt.pk, []), 2)
+        self.assertEqual(timing.fold_timings(self.attempt), 2)
+        second.refresh_from_db()
+        self.assertEqual(second.time_spent, 2)
+
+        self.attempt.status = 'completed'
+        self.attempt.save()
+        self.answer.refresh_from_db()
+        self.assertEqual(self.answer.time_spent, 2)
+        stats = QuestionStatistics.objects.get(question=self.first)
+        self.assertEqual((stats.timed_answers, stats.median_time_spent), (1, 2.0))
+        self.assertEqual(timing.buffer_events(self.attempt.pk, []), 0)
+
+    def test_a_fold_in_progress_keeps_the_events(self):
+        timing.buffer_events(self.attempt.pk, [[self.first.pk, 3000, 0]])
+        cache.add(timing._buffer_key(self.attempt.pk, 'lock'), True)
+        self.assertEqual(timing.fold_timings(self.attempt), 0)
+        cache.delete(timing._buffer_key(self.attempt.pk, 'lock'))
+        self.assertEqual(timing.fold_timings(self.attempt), 1)
+        self.answer.refresh_from_db()
+        self.assertEqual(self.answer.time_spent, 3)
+
+    def test_buffer_is_capped(self):
+        with mock.patch.object(timing, 'MAX_BUFFERED_EVENTS', 3):
+            self.assertEqual(timing.buffer_events(self.attempt.pk, [[self.first.pk, 1000, 0]] * 2), 2)
+            self.assertEqual(timing.buffer_events(self.attempt.pk, [[self.first.pk, 1000, 0]] * 2), 2)
+            self.assertEqual(timing.buffer_events(self.attempt.pk, [[self.first.pk, 1000, 0]]), 3)
+
+    def test_lost_batches_are_skipped_after_a_grace_period(self):
+        for dwell_ms in (1000, 2000, 3000):
+            timing.buffer_events(self.attempt.pk, [[self.first.pk, dwell_ms, 0]])
+        cache.delete(timing._buffer_key(self.attempt.pk, 1))
+
+        # Possibly still being written
+        self.assertEqual(timing._drain(self.attempt.pk), [])
+        timing.buffer_events(self.attempt.pk, [[self.first.pk, 4000, 0]])
+        self.assertEqual(timing._drain(self.attempt.pk), [])
+
+        later = time.time() + timing.BATCH_WRITE_GRACE
+        with mock.patch('time.time', return_value=later), self.assertLogs('examinations.timing', 'WARNING'):
+            drained = timing._drain(self.attempt.pk)
+        self.assertEqual([dwell_ms for _, dwell_ms, _ in drained], [2000, 3000, 4000])
+        self.assertEqual(cache.get(timing._buffer_key(self.attempt.pk, 'count')), 0)
+
+        timing.buffer_events(self.attempt.pk, [[self.first.pk, 5000, 0]])
+        self.assertEqual(len(timing._drain(self.attempt.pk)), 1)
+
+    def test_final_fold_does_not_wait_for_lost_batches(self):
+        timing.buffer_events(self.attempt.pk, [[self.first.pk, 1000, 0]])
+        timing.buffer_events(self.attempt.pk, [[self.first.pk, 2000, 0]])
+        cache.delete(timing._buffer_key(self.attempt.pk, 1))
+        with self.assertLogs('examinations.timing', 'WARNING'):
+            self.assertEqual(timing.fold_timings(self.attempt, final=True), 1)
+        self.answer.refresh_from_db()
+        self.assertEqual(self.answer.time_spent, 2)
+
+    def test_concurrent_appends_and_drains_lose_nothing(self):
+        drained = []
+        appending = threading.Event()
+
+        def append():
+            for _ in range(25):
+                timing.buffer_events(self.attempt.pk, [[self.first.pk, 1000, 1]])
+
+        def drain():
+            while appending.is_set():
+                if timing._claim(self.attempt.pk, 0):
+                    drained.extend(timing._drain(self.attempt.pk))
+                    cache.delete(timing._buffer_key(self.attempt.pk, 'lock'))
+
+        appending.set()
+        drainers = [threading.Thread(target=drain) for _ in range(2)]
+        appenders = [threading.Thread(target=append) for _ in range(8)]
+        for thread in drainers + appenders:
+            thread.start()
+        for thread in appenders:
+            thread.join()
+        appending.clear()
+        for thread in drainers:
+            thread.join()
+        drained.extend(timing._drain(self.attempt.pk))
+        self.assertEqual(len(drained), 200)
+
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |       numpy.core
+import time:        80 |        200 |     numpy
+import time:        40 |        240 |   examinations.adaptive
+import time:        30 |        270 | examinations.api_views
+import time:        10 |         10 | json
+"""
+
+
+class ImportProfileTests(SimpleTestCase):
+    def test_importtime_output_and_chains(self):
+        entries = import_profile.parse_importtime(IMPORTTIME)
+        self.assertEqual(entries[1], (2, 'numpy', 80, 200))
+        self.assertEqual(import_profile.importer_chain(entries, 1), ['examinations.adaptive', 'examinations.api_views'])
+        self.assertEqual(import_profile.importer_chain(entries, 4), [])
+
+    def test_startup_keeps_heavy_modules_lazy(self):
+        # The lazy-module check only; timings depend on the machine
+        call_command('import_profile', repeat=1, budget_ms=60_000, stdout=StringIO())
+
+    def test_eager_imports_fail_the_check(self):
+        with mock.patch.dict(import_profile.TARGETS, {'eager': 'import numpy'}):
+            with self.assertRaisesMessage(CommandError, 'eager: numpy imported at startup'):
+                call_command('import_profile', targets=['eager'], repeat=1, stdout=StringIO())
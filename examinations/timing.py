@@ -0,0 +1,270 @@
+"""
+Per-question timing pipeline.
+
+The test page reports dwell events (question id, milliseconds on screen,
+number of answer changes). Events are appended to a per-attempt buffer in
+the cache, which costs no database writes, and folded into
+QuestionAnswer.time_spent / answer_changed_count on autosave. Events for
+questions that have no answer row yet stay buffered until one exists.
+
+Requests for one attempt run concurrently (autosave, heartbeat, timing
+beacons), so the buffer never reads and rewrites a shared list. Each batch
+of events gets its own key, numbered by an atomic ``cache.incr`` counter;
+a fold claims the buffer with ``cache.add`` (one fold at a time), reads the
+batches after the last one it drained and deletes them. The buffer lives
+BUFFER_TIMEOUT from an attempt's first event.
+
+A numbered batch that is missing is normally still being written, so a
+fold stops there. If it is still missing BATCH_WRITE_GRACE seconds later
+(or at the final fold) the cache evicted or expired it: it is counted as
+lost and logged, and folding carries on with the next batch.
+
+When an attempt finishes, the remaining buffer is folded and each answer's
+total time is added to its question's statistics: a streaming mean for
+Question/QuestionStatistics.average_time_spent and a t-digest for
+QuestionStatistics.median_time_spent, so neither needs a rescan of old
+answers.
+"""
+import logging
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from buxoro_test_system.tracing import traced
+from questions.models import Question, QuestionAnswer, QuestionStatistics
+from questions.tdigest import TDigest
+
+BUFFER_PREFIX = 'attempt-timings:'
+BUFFER_TIMEOUT = 60 * 60 * 24
+MAX_EVENTS_PER_REQUEST = 500
+MAX_BUFFERED_EVENTS = 5000
+MAX_DWELL_MS = 60 * 60 * 1000
+BATCH_WRITE_GRACE = 10  # seconds between numbering a batch and writing it
+
+logger = logging.getLogger(__name__)
+
+
+FOLD_LOCK_TIMEOUT = 30
+FINAL_FOLD_WAIT = 2.0
+
+
+def _buffer_key(attempt_id, part):
+    """Cache key of a batch number or of 'next', 'done', 'count', 'gap' or 'lock'"""
+    return f"{BUFFER_PREFIX}{attempt_id}:{part}"
+
+
+def _incr(key, delta):
+    """Atomic counter add that starts missing counters at zero"""
+    cache.add(key, 0, BUFFER_TIMEOUT)
+    return cache.incr(key, delta)
+
+
+def clean_events(raw_events):
+    """
+    Validate client events into [question_id, dwell_ms, changes] triples.
+    Malformed entries are dropped rather than failing the request.
+    """
+    if not isinstance(raw_events, list):
+        return []
+    events = []
+    for event in raw_events[:MAX_EVENTS_PER_REQUEST]:
+        if not isinstance(event, dict):
+            continue
+        try:
+            question_id = int(event.get('question_id'))
+            dwell_ms = int(event.get('dwell_ms') or 0)
+            changes = int(event.get('changes') or 0)
+        except (TypeError, ValueError):
+            continue
+        if question_id <= 0 or dwell_ms < 0 or changes < 0:
+            continue
+        events.append([question_id, min(dwell_ms, MAX_DWELL_MS), min(changes, 1000)])
+    return events
+
+
+@traced('attempt.buffer_timings', attempt='attempt_id')
+def buffer_events(attempt_id, events):
+    """
+    Append cleaned events to the attempt's buffer; returns the buffer size.
+    Events beyond MAX_BUFFERED_EVENTS are dropped.
+    """
+    count_key = _buffer_key(attempt_id, 'count')
+    if not events:
+        return cache.get(count_key, 0)
+    buffered = _incr(count_key, len(events))
+    if buffered > MAX_BUFFERED_EVENTS:
+        cache.decr(count_key, len(events))
+        return buffered - len(events)
+    number = _incr(_buffer_key(attempt_id, 'next'), 1)
+    cache.set(_buffer_key(attempt_id, number), events, BUFFER_TIMEOUT)
+    return buffered
+
+
+def _claim(attempt_id, wait):
+    """Hold the attempt's fold lock, waiting up to ``wait`` seconds for it"""
+    lock_key = _buffer_key(attempt_id, 'lock')
+    deadline = time.monotonic() + wait
+    while not cache.add(lock_key, True, FOLD_LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def _drain(attempt_id, final=False):
+    """
+    Events of the batches written since the last drain; the caller holds
+    the fold lock. Stops at a number whose batch is still being written,
+    and skips batches the cache lost (see the module docstring).
+    """
+    done_key = _buffer_key(attempt_id, 'done')
+    gap_key = _buffer_key(attempt_id, 'gap')
+    done = cache.get(done_key, 0)
+    last = cache.get(_buffer_key(attempt_id, 'next'), 0)
+    numbers = range(done + 1, last + 1)
+    keys = [_buffer_key(attempt_id, number) for number in numbers]
+    batches = cache.get_many(keys)
+    # (last batch number, time) when a missing batch was first seen
+    gap = cache.get(gap_key)
+    events = []
+    drained = []
+    lost = []
+    for number, key in zip(numbers, keys):
+        if key in batches:
+            events.extend(batches[key])
+            drained.append(key)
+        elif final or (gap is not None and number <= gap[0] and time.time() - gap[1] >= BATCH_WRITE_GRACE):
+            lost.append(number)
+        else:
+            if gap is None or number > gap[0]:
+                cache.set(gap_key, (last, time.time()), BUFFER_TIMEOUT)
+            break
+    consumed = len(drained) + len(lost)
+    if consumed:
+        cache.set(done_key, done + consumed, BUFFER_TIMEOUT)
+        cache.delete_many(drained)
+    if lost:
+        logger.warning('Timing batches %s of attempt %s were lost from the cache', lost, attempt_id)
+        cache.delete(gap_key)
+        # The lost events are unknown; recount what is still buffered
+        remaining = sum(len(batches[key]) for key in keys[consumed:] if key in batches)
+        cache.set(_buffer_key(attempt_id, 'count'), remaining, BUFFER_TIMEOUT)
+    elif events:
+        try:
+            cache.decr(_buffer_key(attempt_id, 'count'), len(events))
+        except ValueError:
+            pass
+    return events
+
+
+def _totals(events):
+    """{question_id: [dwell_ms, changes]} summed over events"""
+    totals = {}
+    for question_id, dwell_ms, changes in events:
+        total = totals.setdefault(question_id, [0, 0])
+        total[0] += dwell_ms
+        total[1] += changes
+    return totals
+
+
+@traced('attempt.fold_timings', attempt='attempt')
+def fold_timings(attempt, final=False):
+    """
+    Move buffered dwell time and answer changes into the attempt's answers.
+
+    Time is kept in milliseconds in the buffer and rounded to seconds only
+    when added, with the remainder carried over, so frequent autosaves do
+    not lose sub-second dwell. Returns the number of answers updated.
+    """
+    if not final and not cache.get(_buffer_key(attempt.pk, 'count')):
+        return 0
+    if not _claim(attempt.pk, FINAL_FOLD_WAIT if final else 0):
+        # Another request is folding this attempt's events right now
+        return 0
+    try:
+        return _fold(attempt, _drain(attempt.pk, final), final)
+    finally:
+        if final:
+            cache.delete_many([_buffer_key(attempt.pk, part) for part in ('next', 'done', 'count', 'gap')])
+        cache.delete(_buffer_key(attempt.pk, 'lock'))
+
+
+def _fold(attempt, events, final):
+    """Add drained events to the answers; returns the number of answers updated"""
+    if not events:
+        return 0
+    totals = _totals(events)
+    answers = list(
+        QuestionAnswer.objects.filter(attempt=attempt, question_id__in=list(totals))
+        .only('id', 'question_id', 'time_spent', 'answer_changed_count')
+    )
+    leftover = []
+    for answer in answers:
+        dwell_ms, changes = totals.pop(answer.question_id)
+        seconds, remainder = divmod(dwell_ms, 1000)
+        if final and remainder >= 500:
+            seconds += 1
+        elif not final and remainder:
+            leftover.append([answer.question_id, remainder, 0])
+        answer.time_spent += seconds
+        answer.answer_changed_count += changes
+    QuestionAnswer.objects.bulk_update(answers, ['time_spent', 'answer_changed_count'], batch_size=500)
+
+    if not final:
+        # Questions without an answer row yet, and sub-second remainders
+        leftover.extend([question_id, dwell_ms, changes] for question_id, (dwell_ms, changes) in totals.items())
+        buffer_events(attempt.pk, leftover)
+    return len(answers)
+
+
+@traced('questions.timing_statistics')
+def record_question_times(question_times):
+    """
+    Add answer times to question statistics.
+
+    ``question_times`` maps question id -> list of seconds. Means are
+    updated as running means and medians through each question's stored
+    t-digest; rows are locked so concurrent finishes don't lose updates.
+    """
+    question_ids = sorted(question_times)
+    if not question_ids:
+        return 0
+
+    with transaction.atomic():
+        QuestionStatistics.objects.bulk_create(
+            [QuestionStatistics(question_id=question_id) for question_id in question_ids],
+            ignore_conflicts=True,
+        )
+        statistics = list(
+            QuestionStatistics.objects.select_for_update()
+            .filter(question_id__in=question_ids)
+            .order_by('question_id')
+        )
+        questions = []
+        for stats in statistics:
+            times = question_times[stats.question_id]
+            count = stats.timed_answers + len(times)
+            stats.average_time_spent += (sum(times) - len(times) * stats.average_time_spent) / count
+            stats.timed_answers = count
+            digest = TDigest.from_list(stats.time_digest).update(times)
+            stats.time_digest = digest.to_list()
+            stats.median_time_spent = digest.median()
+            questions.append(Question(pk=stats.question_id, average_time_spent=stats.average_time_spent))
+
+        QuestionStatistics.objects.bulk_update(
+            statistics, ['average_time_spent', 'median_time_spent', 'timed_answers', 'time_digest'], batch_size=500
+        )
+        Question.objects.bulk_update(questions, ['average_time_spent'], batch_size=500)
+    return len(statistics)
+
+
+@traced('attempt.finish_timings', attempt='attempt')
+def finish_attempt_timings(attempt):
+    """Final fold for a finished attempt, then update question statistics"""
+    fold_timings(attempt, final=True)
+    question_times = {}
+    rows = QuestionAnswer.objects.filter(attempt=attempt, time_spent__gt=0).values_list('question_id', 'time_spent')
+    for question_id, seconds in rows:
+        question_times.setdefault(question_id, []).append(seconds)
+    return record_question_times(question_times)
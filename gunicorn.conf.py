@@ -0,0 +1,89 @@
+"""
+Gunicorn settings for production (see the Dockerfile CMD):
+
+    gunicorn -c gunicorn.conf.py
+
+GUNICORN_PROFILE picks the worker model:
+
+    gthread   (default) processes with a thread pool each. Exam traffic is
+              mostly short, I/O-bound requests (autosave, heartbeat,
+              timing events), so threads keep many of them in flight
+              while one waits on the database.
+    sync      one request per process, the previous configuration.
+    uvicorn   the ASGI application under uvicorn workers. Sync Django
+              views still run one at a time per worker, so it is sized
+              like sync.
+
+Worker and thread counts follow the CPU count and can be pinned with
+WEB_CONCURRENCY and GUNICORN_THREADS. The application is preloaded and
+warmed up (URLconf, DRF classes, base templates) in the master, so
+workers share its memory copy-on-write and serve their first requests
+without importing views. Workers are recycled after
+GUNICORN_MAX_REQUESTS requests (with jitter, so they do not all restart
+together) to cap memory growth.
+
+Compare the profiles with ``manage.py loadtest_profiles``.
+"""
+import multiprocessing
+import os
+
+PROFILES = ('gthread', 'sync', 'uvicorn')
+
+profile = os.environ.get('GUNICORN_PROFILE', 'gthread')
+if profile not in PROFILES:
+    raise RuntimeError(f"GUNICORN_PROFILE must be one of {', '.join(PROFILES)}, not '{profile}'")
+
+cpu_count = multiprocessing.cpu_count()
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+backlog = 2048  # queue connection bursts at exam start instead of refusing them
+
+if profile == 'uvicorn':
+    wsgi_app = 'buxoro_test_system.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    workers = int(os.environ.get('WEB_CONCURRENCY', cpu_count * 2 + 1))
+elif profile == 'gthread':
+    wsgi_app = 'buxoro_test_system.wsgi:application'
+    worker_class = 'gthread'
+    workers = int(os.environ.get('WEB_CONCURRENCY', cpu_count + 1))
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+else:
+    wsgi_app = 'buxoro_test_system.wsgi:application'
+    worker_class = 'sync'
+    workers = int(os.environ.get('WEB_CONCURRENCY', cpu_count * 2 + 1))
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5  # nginx keeps upstream connections open
+
+# Worker heartbeats on tmpfs: a busy overlay filesystem can stall them long
+# enough for the master to kill healthy workers
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+forwarded_allow_ips = os.environ.get('FORWARDED_ALLOW_IPS', '127.0.0.1')
+
+
+def post_fork(server, worker):
+    # With preload_app the master imported Django; nothing opened there
+    # (database connections, cache clients) may be shared across workers
+    from django.core.cache import caches
+    from django.db import connections
+
+    connections.close_all()
+    for cache in caches.all(initialized_only=True):
+        cache.close()
+
+
+def when_ready(server):
+    # Runs in the master before the first fork: import what every worker
+    # would otherwise import on its first requests (buxoro_test_system.startup)
+    if server.cfg.preload_app:
+        from buxoro_test_system.startup import warm_up
+
+        warm_up()
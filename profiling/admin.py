@@ -0,0 +1,84 @@
+from django.contrib import admin
+from django.urls import reverse
+from django.utils.html import format_html
+from .models import ProfileRule, ProfileCapture
+
+
+@admin.register(ProfileRule)
+class ProfileRuleAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'mode', 'capture_count', 'max_captures', 'expires_at', 'is_active', 'live_display')
+    list_filter = ('mode', 'is_active')
+    search_fields = ('path_prefix', 'user__username')
+    raw_id_fields = ('user',)
+    readonly_fields = ('capture_count', 'created_by', 'created_at')
+    
+    fieldsets = (
+        ('Nishon', {
+            'fields': ('path_prefix', 'user')
+        }),
+        ('Profiler', {
+            'fields': ('mode', 'sample_interval_ms', 'min_duration_ms')
+        }),
+        ('Cheklovlar', {
+            'fields': ('max_captures', 'capture_count', 'expires_at', 'is_active')
+        }),
+        ('Qoʻshimcha maʼlumotlar', {
+            'fields': ('created_by', 'created_at'),
+            'classes': ('collapse',)
+        }),
+    )
+    
+    actions = ['deactivate_rules']
+    
+    def live_display(self, obj):
+        return obj.is_live
+    live_display.boolean = True
+    live_display.short_description = "Ishlayapti"
+    
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+    
+    def deactivate_rules(self, request, queryset):
+        for rule in queryset:
+            rule.is_active = False
+            rule.save(update_fields=['is_active'])
+        self.message_user(request, f"{queryset.count()} ta qoida oʻchirildi")
+    deactivate_rules.short_description = "Qoidalarni oʻchirish"
+
+
+@admin.register(ProfileCapture)
+class ProfileCaptureAdmin(admin.ModelAdmin):
+    list_display = ('method', 'path', 'mode', 'status_code', 'duration_ms', 'user', 'created_at')
+    list_filter = ('mode', 'method', 'created_at')
+    search_fields = ('path', 'url_name', 'request_id', 'user__username')
+    date_hierarchy = 'created_at'
+    readonly_fields = (
+        'rule', 'mode', 'method', 'path', 'url_name', 'status_code', 'user', 'request_id',
+        'duration_ms', 'sample_count', 'summary_display', 'download_link', 'created_at',
+    )
+    exclude = ('summary', 'profile_file')
+    
+    fieldsets = (
+        ('Soʻrov', {
+            'fields': ('method', 'path', 'url_name', 'status_code', 'user', 'request_id', 'rule')
+        }),
+        ('Profil', {
+            'fields': ('mode', 'duration_ms', 'sample_count', 'download_link', 'summary_display', 'created_at')
+        }),
+    )
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def summary_display(self, obj):
+        return format_html('<pre style="white-space: pre; overflow-x: auto;">{}</pre>', obj.summary)
+    summary_display.short_description = "Xulosa"
+    
+    def download_link(self, obj):
+        if not obj.profile_file:
+            return '-'
+        url = reverse('profile_capture-download', args=[obj.pk])
+        return format_html('<a href="{}">{}</a>', url, obj.profile_file.name.rsplit('/', 1)[-1])
+    download_link.short_description = "Profil fayli"
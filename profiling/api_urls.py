@@ -0,0 +1,11 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .api_views import ProfileRuleViewSet, ProfileCaptureViewSet
+
+router = DefaultRouter()
+router.register(r'rules', ProfileRuleViewSet, basename='profile_rule')
+router.register(r'captures', ProfileCaptureViewSet, basename='profile_capture')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
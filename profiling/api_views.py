@@ -0,0 +1,27 @@
+from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
+from buxoro_test_system.storage import download_redirect
+from .models import ProfileRule, ProfileCapture
+from .serializers import ProfileRuleSerializer, ProfileCaptureSerializer
+
+
+class ProfileRuleViewSet(viewsets.ModelViewSet):
+    """Turn profiling on for a path and/or user; staff only"""
+    serializer_class = ProfileRuleSerializer
+    permission_classes = [permissions.IsAdminUser]
+    queryset = ProfileRule.objects.select_related('user')
+    
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+
+
+class ProfileCaptureViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = ProfileCaptureSerializer
+    permission_classes = [permissions.IsAdminUser]
+    queryset = ProfileCapture.objects.all()
+    filterset_fields = ['rule', 'mode', 'url_name', 'user']
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        capture = self.get_object()
+        return download_redirect(capture.profile_file, capture.profile_file.name.rsplit('/', 1)[-1])
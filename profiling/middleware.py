@@ -0,0 +1,119 @@
+import logging
+import time
+
+from django.core.files.base import ContentFile
+from rest_framework.exceptions import APIException
+
+from .models import ProfileCapture
+from .profilers import PROFILERS
+from .rules import claim_capture, matching_rules
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+HEADER_SAMPLE_INTERVAL = 0.005  # seconds, for X-Profile: sampling
+
+
+def request_user(request):
+    """The session user, or the user of a bearer token (checked without the database)"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user
+    # Imported here: simplejwt is slow to import and most requests never get this far
+    from accounts.authentication import CachedJWTAuthentication
+
+    try:
+        authenticated = CachedJWTAuthentication().authenticate(request)
+    except APIException:
+        return None
+    return authenticated[0] if authenticated else None
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests chosen by a live ProfileRule (path prefix and/or
+    user), or any request from a staff user that sends
+    ``X-Profile: sampling`` or ``X-Profile: cprofile``, and store the
+    result as a ProfileCapture.
+
+    With no live rules and no header a request costs a clock read and a
+    dictionary lookup.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        requested_mode = request.META.get(PROFILE_HEADER)
+        rules = matching_rules(request.path)
+        if not rules and not requested_mode:
+            return self.get_response(request)
+
+        rule, mode, interval = self.choose(request, rules, requested_mode)
+        if mode is None:
+            return self.get_response(request)
+
+        # Before the view: DRF replaces request.user with the result of the
+        # view's own authentication, which is anonymous on public endpoints
+        user = request_user(request)
+        profiler = PROFILERS[mode](interval)
+        try:
+            profiler.start()
+        except ValueError:
+            # Another profiler (e.g. the debug toolbar) already owns this thread
+            return self.get_response(request)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        if rule is not None and (duration_ms < rule.min_duration_ms or not claim_capture(rule)):
+            return response
+        try:
+            capture = self.save_capture(request, response, user, rule, mode, profiler, duration_ms)
+        except Exception:
+            logger.exception('Could not save the profile of %s', request.path)
+        else:
+            response['X-Profile-ID'] = str(capture.pk)
+        return response
+
+    def choose(self, request, rules, requested_mode):
+        """(rule or None, mode, sampling interval) for this request, or a None mode"""
+        user = None
+        if requested_mode:
+            user = request_user(request)
+            if requested_mode in PROFILERS and user is not None and user.is_staff:
+                return None, requested_mode, HEADER_SAMPLE_INTERVAL
+        for rule in rules:
+            if rule.user_id is not None:
+                if user is None:
+                    user = request_user(request)
+                if user is None or user.pk != rule.user_id:
+                    continue
+            return rule, rule.mode, rule.interval
+        return None, None, None
+
+    def save_capture(self, request, response, user, rule, mode, profiler, duration_ms):
+        match = request.resolver_match
+        capture = ProfileCapture(
+            rule_id=rule.pk if rule else None,
+            mode=mode,
+            method=request.method,
+            path=request.path[:500],
+            url_name=(match.url_name or '') if match else '',
+            status_code=response.status_code,
+            user=user,
+            request_id=getattr(request, 'request_id', ''),
+            duration_ms=round(duration_ms, 1),
+            sample_count=profiler.samples,
+            summary=profiler.summary(),
+        )
+        capture.profile_file.save(
+            f"{time.strftime('%Y%m%d-%H%M%S')}-{mode}.{profiler.extension}",
+            ContentFile(profiler.raw()),
+            save=False,
+        )
+        capture.save()
+        return capture
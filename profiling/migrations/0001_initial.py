@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import profiling.models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path_prefix', models.CharField(blank=True, help_text='e.g. /api/tests/attempts/ (blank: any path)', max_length=255)),
+                ('mode', models.CharField(choices=[('sampling', 'Sampling'), ('cprofile', 'cProfile')], default='sampling', max_length=20)),
+                ('sample_interval_ms', models.PositiveSmallIntegerField(default=5, help_text='Sampling mode only')),
+                ('min_duration_ms', models.PositiveIntegerField(default=0, help_text='Keep only requests at least this slow')),
+                ('max_captures', models.PositiveIntegerField(default=10)),
+                ('capture_count', models.PositiveIntegerField(default=0)),
+                ('expires_at', models.DateTimeField(default=profiling.models.default_expiry)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_profile_rules', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='profile_rules', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Profile Rule',
+                'verbose_name_plural': 'Profile Rules',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProfileCapture',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mode', models.CharField(choices=[('sampling', 'Sampling'), ('cprofile', 'cProfile')], max_length=20)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('url_name', models.CharField(blank=True, max_length=200)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('request_id', models.CharField(blank=True, max_length=64)),
+                ('duration_ms', models.FloatField()),
+                ('sample_count', models.PositiveIntegerField(default=0)),
+                ('summary', models.TextField(blank=True)),
+                ('profile_file', models.FileField(blank=True, null=True, upload_to='profiles/')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('rule', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='captures', to='profiling.profilerule')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='profile_captures', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Profile Capture',
+                'verbose_name_plural': 'Profile Captures',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+from django.db import models
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+User = get_user_model()
+
+MODE_CHOICES = (
+    ('sampling', 'Sampling'),
+    ('cprofile', 'cProfile'),
+)
+
+
+def default_expiry():
+    return timezone.now() + timedelta(hours=1)
+
+
+class ProfileRuleQuerySet(models.QuerySet):
+    def live(self):
+        return self.filter(
+            is_active=True,
+            expires_at__gt=timezone.now(),
+            capture_count__lt=models.F('max_captures'),
+        )
+
+
+class ProfileRule(models.Model):
+    """
+    Which requests to profile: a path prefix and/or a user, for a limited
+    number of captures and a limited time
+    """
+    path_prefix = models.CharField(max_length=255, blank=True, help_text="e.g. /api/tests/attempts/ (blank: any path)")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True, related_name='profile_rules')
+    
+    # Profiler
+    mode = models.CharField(max_length=20, choices=MODE_CHOICES, default='sampling')
+    sample_interval_ms = models.PositiveSmallIntegerField(default=5, help_text="Sampling mode only")
+    min_duration_ms = models.PositiveIntegerField(default=0, help_text="Keep only requests at least this slow")
+    
+    # Limits
+    max_captures = models.PositiveIntegerField(default=10)
+    capture_count = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField(default=default_expiry)
+    is_active = models.BooleanField(default=True)
+    
+    # Metadata
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='created_profile_rules')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    objects = ProfileRuleQuerySet.as_manager()
+    
+    @property
+    def is_live(self):
+        return self.is_active and self.expires_at > timezone.now() and self.capture_count < self.max_captures
+    
+    def __str__(self):
+        target = self.path_prefix or '*'
+        if self.user_id:
+            target = f"{target} ({self.user})"
+        return f"{self.get_mode_display()}: {target}"
+    
+    class Meta:
+        verbose_name = 'Profile Rule'
+        verbose_name_plural = 'Profile Rules'
+        ordering = ['-created_at']
+
+
+class ProfileCapture(models.Model):
+    """
+    Profile of one request: a readable summary and the raw profile
+    (pstats dump for cProfile, collapsed stacks for sampling)
+    """
+    rule = models.ForeignKey(ProfileRule, on_delete=models.SET_NULL, blank=True, null=True, related_name='captures')
+    mode = models.CharField(max_length=20, choices=MODE_CHOICES)
+    
+    # Request
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    url_name = models.CharField(max_length=200, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='profile_captures')
+    request_id = models.CharField(max_length=64, blank=True)
+    
+    # Profile
+    duration_ms = models.FloatField()
+    sample_count = models.PositiveIntegerField(default=0)
+    summary = models.TextField(blank=True)
+    profile_file = models.FileField(upload_to='profiles/', blank=True, null=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+    
+    class Meta:
+        verbose_name = 'Profile Capture'
+        verbose_name_plural = 'Profile Captures'
+        ordering = ['-created_at']
@@ -0,0 +1,113 @@
+"""
+Profilers for a single request.
+
+    SamplingProfiler  a background thread reads the request thread's stack
+                      every few milliseconds (sys._current_frames). The
+                      request runs at full speed; the result is collapsed
+                      stacks ("a;b;c 12" lines) for flamegraph.pl or
+                      speedscope.
+    CProfileProfiler  deterministic cProfile of the request thread; exact
+                      call counts but a few times slower. The raw file is
+                      a pstats dump (``python -m pstats file.prof``).
+
+Both only look at the thread serving the request, so they work under
+threaded gunicorn workers, and only run while a request is profiled.
+"""
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+
+SUMMARY_LINES = 40
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    extension = 'txt'
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        self._sampler = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def summary(self):
+        if not self.samples:
+            return 'No samples: the request finished within one sampling interval.'
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        lines = [f"{self.samples} samples every {self.interval * 1000:g} ms", '', 'Own time (leaf frames)']
+        lines += [f"{count / self.samples:>7.1%}  {frame}" for frame, count in own.most_common(SUMMARY_LINES // 2)]
+        lines += ['', 'Total time (on the stack)']
+        lines += [f"{count / self.samples:>7.1%}  {frame}" for frame, count in total.most_common(SUMMARY_LINES // 2)]
+        return '\n'.join(lines)
+
+    def raw(self):
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common()).encode()
+
+
+class CProfileProfiler:
+    extension = 'prof'
+
+    def __init__(self, interval=None):
+        self.profile = cProfile.Profile()
+        self.samples = 0
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def _stats(self, stream=None):
+        return pstats.Stats(self.profile, stream=stream)
+
+    def summary(self):
+        stream = io.StringIO()
+        self._stats(stream).sort_stats('cumulative').print_stats(SUMMARY_LINES)
+        return stream.getvalue().strip()
+
+    def raw(self):
+        # Same format as pstats.Stats.dump_stats
+        stats = self._stats()
+        return marshal.dumps(stats.stats)
+
+
+PROFILERS = {
+    'sampling': SamplingProfiler,
+    'cprofile': CProfileProfiler,
+}
@@ -0,0 +1,71 @@
+"""
+Live profile rules, as seen by the request path.
+
+Every worker keeps the live rules in memory and re-reads them from the
+shared cache at most every PROFILING_RULES_REFRESH seconds, so with no
+rules a request costs one clock read and a comparison. Saving or
+deleting a rule clears the shared copy; a rule also drops out once its
+captures are used up or it expires.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import ProfileRule
+
+RULES_CACHE_KEY = 'profiling:rules'
+RULES_CACHE_TIMEOUT = 60
+
+_rules = ()
+_loaded_at = float('-inf')
+
+
+class Rule:
+    __slots__ = ('pk', 'path_prefix', 'user_id', 'mode', 'interval', 'min_duration_ms', 'expires_at')
+
+    def __init__(self, pk, path_prefix, user_id, mode, interval_ms, min_duration_ms, expires_at):
+        self.pk = pk
+        self.path_prefix = path_prefix
+        self.user_id = user_id
+        self.mode = mode
+        self.interval = interval_ms / 1000
+        self.min_duration_ms = min_duration_ms
+        self.expires_at = expires_at.timestamp()
+
+
+def live_rules():
+    global _rules, _loaded_at
+    now = time.monotonic()
+    if now - _loaded_at < settings.PROFILING_RULES_REFRESH:
+        return _rules
+    rows = cache.get(RULES_CACHE_KEY)
+    if rows is None:
+        rows = list(ProfileRule.objects.live().values_list(
+            'pk', 'path_prefix', 'user_id', 'mode', 'sample_interval_ms', 'min_duration_ms', 'expires_at',
+        ))
+        cache.set(RULES_CACHE_KEY, rows, RULES_CACHE_TIMEOUT)
+    _rules = tuple(Rule(*row) for row in rows)
+    _loaded_at = now
+    return _rules
+
+
+def invalidate_rules():
+    global _loaded_at
+    cache.delete(RULES_CACHE_KEY)
+    _loaded_at = float('-inf')
+
+
+def matching_rules(path):
+    """Live rules whose path prefix matches; the user is checked by the caller"""
+    now = time.time()
+    return [rule for rule in live_rules() if path.startswith(rule.path_prefix) and rule.expires_at > now]
+
+
+def claim_capture(rule):
+    """Count one capture against the rule; False once it has none left"""
+    claimed = ProfileRule.objects.live().filter(pk=rule.pk).update(capture_count=F('capture_count') + 1)
+    if not claimed or not ProfileRule.objects.live().filter(pk=rule.pk).exists():
+        invalidate_rules()
+    return bool(claimed)
@@ -0,0 +1,29 @@
+from rest_framework import serializers
+from .models import ProfileRule, ProfileCapture
+
+
+class ProfileRuleSerializer(serializers.ModelSerializer):
+    is_live = serializers.BooleanField(read_only=True)
+    
+    class Meta:
+        model = ProfileRule
+        fields = [
+            'id', 'path_prefix', 'user', 'mode', 'sample_interval_ms', 'min_duration_ms',
+            'max_captures', 'capture_count', 'expires_at', 'is_active', 'is_live', 'created_by', 'created_at'
+        ]
+        read_only_fields = ['capture_count', 'created_by', 'created_at']
+    
+    def validate_sample_interval_ms(self, value):
+        if value < 1:
+            raise serializers.ValidationError("Sampling interval must be at least 1 ms.")
+        return value
+
+
+class ProfileCaptureSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProfileCapture
+        fields = [
+            'id', 'rule', 'mode', 'method', 'path', 'url_name', 'status_code', 'user', 'request_id',
+            'duration_ms', 'sample_count', 'summary', 'created_at'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import ProfileRule
+from .rules import invalidate_rules
+
+
+@receiver(post_save, sender=ProfileRule)
+@receiver(post_delete, sender=ProfileRule)
+def reload_profile_rules(sender, instance, **kwargs):
+    """
+    Workers pick up new, changed and removed rules within PROFILING_RULES_REFRESH seconds
+    """
+    invalidate_rules()
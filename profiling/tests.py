@@ -0,0 +1,84 @@
+import datetime
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import User
+from .models import ProfileCapture, ProfileRule
+from .rules import invalidate_rules, live_rules, matching_rules
+
+URL = '/api/results/certificates/verify/NOPE-1/'
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_rules()
+        self.addCleanup(invalidate_rules)
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.staff = User.objects.create_user('staff', password='x', role='admin', is_staff=True)
+        self.student = User.objects.create_user('student', password='x', role='student')
+
+    def test_header_profiles_requests_of_staff_only(self):
+        self.client.force_login(self.student)
+        response = self.client.get(URL, HTTP_X_PROFILE='cprofile')
+        self.assertNotIn('X-Profile-ID', response)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(URL, HTTP_X_PROFILE='unknown')
+        self.assertNotIn('X-Profile-ID', response)
+        response = self.client.get(URL, HTTP_X_PROFILE='cprofile')
+        capture = ProfileCapture.objects.get(pk=response['X-Profile-ID'])
+        self.assertEqual((capture.mode, capture.user, capture.status_code, capture.rule), ('cprofile', self.staff, 404, None))
+        self.assertTrue(capture.profile_file.name.endswith('.prof'))
+        self.assertIn('cumulative', capture.summary)
+
+    def test_header_accepts_bearer_tokens(self):
+        self.client.logout()
+        token = RefreshToken.for_user(self.staff).access_token
+        response = self.client.get(URL, HTTP_X_PROFILE='sampling', HTTP_AUTHORIZATION=f'Bearer {token}')
+        capture = ProfileCapture.objects.get(pk=response['X-Profile-ID'])
+        self.assertEqual((capture.mode, capture.user), ('sampling', self.staff))
+
+    def test_rules_match_path_and_user(self):
+        ProfileRule.objects.create(path_prefix='/api/results/', user=self.student, mode='cprofile')
+        self.assertEqual(len(matching_rules(URL)), 1)
+        self.assertEqual(matching_rules('/api/tests/'), [])
+
+        self.client.force_login(self.staff)
+        self.assertNotIn('X-Profile-ID', self.client.get(URL))
+        self.client.force_login(self.student)
+        response = self.client.get(URL)
+        self.assertEqual(ProfileCapture.objects.get(pk=response['X-Profile-ID']).user, self.student)
+        self.assertNotIn('X-Profile-ID', self.client.get('/api/tests/'))
+
+    def test_rules_stop_after_their_captures(self):
+        rule = ProfileRule.objects.create(path_prefix='/api/results/', mode='cprofile', max_captures=2)
+        for _ in range(3):
+            self.client.get(URL)
+        self.assertEqual(ProfileCapture.objects.filter(rule=rule).count(), 2)
+        rule.refresh_from_db()
+        self.assertEqual(rule.capture_count, 2)
+        self.assertFalse(rule.is_live)
+        self.assertEqual(live_rules(), ())
+
+    def test_slow_threshold_and_expiry(self):
+        rule = ProfileRule.objects.create(mode='cprofile', min_duration_ms=60_000)
+        self.client.get(URL)
+        rule.refresh_from_db()
+        self.assertEqual((rule.capture_count, ProfileCapture.objects.count()), (0, 0))
+
+        rule.min_duration_ms = 0
+        rule.expires_at = timezone.now() - datetime.timedelta(minutes=1)
+        rule.save()
+        self.assertEqual(matching_rules(URL), [])
+        self.client.get(URL)
+        self.assertFalse(ProfileCapture.objects.exists())
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Question, Choice, QuestionAnswer
+from .models import Question, Choice, QuestionAnswer, ItemCalibration, DuplicateQuestionPair
+from .search import search_questions
 
 
 class ChoiceInline(admin.TabularInline):
@@ -39,6 +40,13 @@ class QuestionAdmin(admin.ModelAdmin):
         if request.user.role == 'teacher':
             return qs.filter(test__created_by=request.user)
         return qs
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Full-text index instead of icontains scans over Question.text
+        if not search_term:
+            return queryset, False
+        ids = [pk for pk, rank in search_questions(search_term, queryset=queryset)]
+        return queryset.filter(pk__in=ids), False
 
 
 @admin.register(Choice)
@@ -84,3 +92,59 @@ class QuestionAnswerAdmin(admin.ModelAdmin):
         if request.user.role == 'teacher':
             return qs.filter(attempt__test__created_by=request.user)
         return qs
+
+
+@admin.register(ItemCalibration)
+class ItemCalibrationAdmin(admin.ModelAdmin):
+    list_display = ('question', 'discrimination', 'difficulty', 'response_count', 'calibrated_at')
+    list_filter = ('question__test__category', 'calibrated_at')
+    search_fields = ('question__text',)
+    list_select_related = ('question',)
+    raw_id_fields = ('question',)
+    readonly_fields = ('discrimination', 'difficulty', 'response_count', 'calibrated_at')
+    
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if request.user.role == 'teacher':
+            return qs.filter(question__test__created_by=request.user)
+        return qs
+
+
+@admin.register(DuplicateQuestionPair)
+class DuplicateQuestionPairAdmin(admin.ModelAdmin):
+    list_display = ('question_a_preview', 'question_b_preview', 'similarity_display', 'status', 'detected_at')
+    list_filter = ('status', 'detected_at')
+    search_fields = ('question_a__text', 'question_b__text')
+    list_select_related = ('question_a__test', 'question_b__test')
+    raw_id_fields = ('question_a', 'question_b')
+    readonly_fields = ('similarity', 'detected_at', 'updated_at')
+    actions = ['confirm_duplicates', 'dismiss_duplicates']
+    
+    def question_a_preview(self, obj):
+        return f"{obj.question_a.test.title}: {obj.question_a.text[:80]}"
+    question_a_preview.short_description = 'Savol A'
+    
+    def question_b_preview(self, obj):
+        return f"{obj.question_b.test.title}: {obj.question_b.text[:80]}"
+    question_b_preview.short_description = 'Savol B'
+    
+    def similarity_display(self, obj):
+        return f"{obj.similarity:.0%}"
+    similarity_display.short_description = 'O\'xshashlik'
+    similarity_display.admin_order_field = 'similarity'
+    
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if request.user.role == 'teacher':
+            return qs.filter(question_a__test__created_by=request.user)
+        return qs
+    
+    def confirm_duplicates(self, request, queryset):
+        updated = queryset.update(status='confirmed')
+        self.message_user(request, f"{updated} juftlik takror deb belgilandi.")
+    confirm_duplicates.short_description = "Takror savol deb belgilash"
+    
+    def dismiss_duplicates(self, request, queryset):
+        updated = queryset.update(status='dismissed')
+        self.message_user(request, f"{updated} juftlik rad etildi.")
+    dismiss_duplicates.short_description = "Takror emas deb belgilash"
@@ -4,5 +4,10 @@ from . import api_views
 urlpatterns = [
     # Question management endpoints
     path('questions/', api_views.QuestionListAPIView.as_view(), name='question_list'),
+    path('questions/search/', api_views.QuestionSearchAPIView.as_view(), name='question_search'),
     path('questions/<int:pk>/', api_views.QuestionDetailAPIView.as_view(), name='question_detail'),
+    path('uploads/', api_views.QuestionImageUploadAPIView.as_view(), name='question_image_upload'),
+    path('uploads/<str:token>/', api_views.QuestionImageLocalUploadAPIView.as_view(),
+         name='question_image_upload_local'),
+    path('tests/<int:test_id>/import/', api_views.QuestionImportAPIView.as_view(), name='question_import'),
 ]
@@ -0,0 +1,223 @@
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from rest_framework import generics, status, permissions
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from accounts.permissions import IsTeacherOrAdmin
+from buxoro_test_system.images import validate_image_name, validate_image_upload
+from buxoro_test_system.storage import (
+    presigned_upload, read_local_upload, sign_local_upload, sign_upload_key, upload_key,
+)
+from examinations.models import Test
+from .importers import ImportFormatError, import_questions
+from .models import Question
+from .search import search_questions
+from .serializers import DIRECT_UPLOAD_ROOT, QuestionSerializer, QuestionDetailSerializer, QuestionCreateSerializer
+
+
+class TeacherQuestionQuerysetMixin:
+    """Teachers only see questions of their own tests"""
+
+    def get_queryset(self):
+        queryset = Question.objects.select_related('test').prefetch_related('choices')
+        user = self.request.user
+        if user.role == 'teacher' and not user.is_superuser:
+            return queryset.filter(test__created_by=user)
+        return queryset
+
+
+class QuestionListAPIView(TeacherQuestionQuerysetMixin, generics.ListCreateAPIView):
+    """API view for listing and creating questions (teacher/admin only)"""
+    permission_classes = [IsTeacherOrAdmin]
+    filterset_fields = ['test', 'question_type', 'difficulty']
+    ordering_fields = ['order', 'created_at']
+    ordering = ['test', 'order']
+
+    def get_serializer_class(self):
+        if self.request.method == 'POST':
+            return QuestionCreateSerializer
+        return QuestionSerializer
+
+
+class QuestionDetailAPIView(TeacherQuestionQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
+    """API view for a single question (teacher/admin only)"""
+    serializer_class = QuestionDetailSerializer
+    permission_classes = [IsTeacherOrAdmin]
+
+
+class QuestionImageUploadAPIView(APIView):
+    """
+    Start a direct upload of a question image.
+
+    Returns a storage ``key`` and a form (``url`` + ``fields``) the client
+    POSTs the file to, as the last field named ``file``. With S3 storage the
+    form goes straight to the bucket; on local disk it goes to
+    QuestionImageLocalUploadAPIView. The returned ``image_key`` (the key
+    signed to the requesting user) is then sent when creating or updating
+    the question.
+    """
+    permission_classes = [IsTeacherOrAdmin]
+
+    def post(self, request):
+        filename = str(request.data.get('filename', ''))
+        content_type = str(request.data.get('content_type', ''))
+        try:
+            validate_image_name(filename)
+        except ValidationError as exc:
+            return Response({
+                'error': exc.messages[0]
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        key = upload_key(DIRECT_UPLOAD_ROOT, filename)
+        upload = presigned_upload(key, settings.MAX_FILE_UPLOAD_SIZE, content_type)
+        if upload is None:
+            token = sign_local_upload(key, settings.MAX_FILE_UPLOAD_SIZE)
+            upload = {
+                'url': request.build_absolute_uri(reverse('question_image_upload_local', args=[token])),
+                'fields': {},
+                'expires_in': settings.MEDIA_UPLOAD_URL_EXPIRE,
+            }
+        return Response({
+            'key': key, 'image_key': sign_upload_key(key, request.user), 'method': 'POST', **upload
+        }, status=status.HTTP_201_CREATED)
+
+
+class QuestionImageLocalUploadAPIView(APIView):
+    """Receives direct uploads when media is on local disk (no bucket to presign for)"""
+    permission_classes = [IsTeacherOrAdmin]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, token):
+        try:
+            key, max_size = read_local_upload(token)
+        except signing.BadSignature:
+            return Response({
+                'error': 'Upload link is invalid or has expired'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({
+                'error': 'No file uploaded'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if upload.size > max_size:
+            return Response({
+                'error': 'File is too large'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        upload.name = key
+        try:
+            validate_image_upload(upload)
+        except ValidationError as exc:
+            return Response({
+                'error': exc.messages[0]
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if default_storage.exists(key):
+            return Response({
+                'error': 'Upload link was already used'
+            }, status=status.HTTP_409_CONFLICT)
+
+        default_storage.save(key, upload)
+        return Response({'key': key}, status=status.HTTP_201_CREATED)
+
+
+class QuestionImportAPIView(APIView):
+    """API view for importing a CSV/XLSX/JSON question bank into a test"""
+    permission_classes = [IsTeacherOrAdmin]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, test_id):
+        tests = Test.objects.all()
+        if request.user.role == 'teacher' and not request.user.is_superuser:
+            tests = tests.filter(created_by=request.user)
+        try:
+            test = tests.get(pk=test_id)
+        except Test.DoesNotExist:
+            return Response({
+                'error': 'Test not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({
+                'error': 'No file uploaded'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        try:
+            report = import_questions(upload, upload.name, test, request.user, dry_run=dry_run)
+        except ImportFormatError as exc:
+            return Response({
+                'error': str(exc)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if report.errors:
+            return Response(report.as_dict(), status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            report.as_dict(),
+            status=status.HTTP_200_OK if dry_run else status.HTTP_201_CREATED
+        )
+
+
+class QuestionSearchAPIView(generics.GenericAPIView):
+    """
+    Ranked full-text search over the whole question bank (teacher/admin only)
+
+    Filters: category, difficulty, question_type, min_success_rate, max_success_rate
+    """
+    permission_classes = [IsTeacherOrAdmin]
+    filter_backends = []
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({
+                'error': 'Query parameter "q" is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        filters = {
+            'category': request.query_params.get('category'),
+            'difficulty': request.query_params.get('difficulty'),
+            'question_type': request.query_params.get('question_type'),
+        }
+        for name in ('min_success_rate', 'max_success_rate'):
+            value = request.query_params.get(name)
+            if value not in (None, ''):
+                try:
+                    filters[name] = float(value)
+                except ValueError:
+                    return Response({
+                        'error': f'{name} must be a number'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+
+        ranked = search_questions(query, **filters)
+        page = self.paginate_queryset(ranked)
+        ranks = dict(page)
+        questions = Question.objects.filter(pk__in=ranks).select_related('test__category').only(
+            'id', 'text', 'question_type', 'difficulty', 'points', 'times_answered', 'times_correct',
+            'test__id', 'test__title', 'test__category__id', 'test__category__name',
+        )
+        by_id = {question.pk: question for question in questions}
+
+        results = []
+        for pk, rank in page:
+            question = by_id.get(pk)
+            if question is None:
+                continue
+            results.append({
+                'id': question.pk,
+                'text': question.text,
+                'question_type': question.question_type,
+                'difficulty': question.difficulty,
+                'points': question.points,
+                'test': question.test.id,
+                'test_title': question.test.title,
+                'category': question.test.category.name,
+                'success_rate': round(question.success_rate, 1),
+                'rank': round(rank, 4),
+            })
+        return self.get_paginated_response(results)
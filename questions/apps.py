@@ -5,3 +5,6 @@ class QuestionsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "questions"
     verbose_name = "Questions Management"
+    
+    def ready(self):
+        import questions.signals
@@ -0,0 +1,219 @@
+"""
+Near-duplicate question detection with MinHash and LSH banding.
+
+Each question (text plus choice texts) is normalized, split into shingles
+and reduced to a fixed-size MinHash signature. Signatures are stored in
+QuestionSignature and only recomputed when the content hash changes.
+Candidate pairs come from LSH buckets (questions sharing one band of the
+signature), so the whole bank is processed in roughly linear time instead
+of comparing every pair.
+"""
+import hashlib
+import re
+import time
+import unicodedata
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+from django.db import transaction
+
+from .models import Question, Choice, QuestionSignature, DuplicateQuestionPair
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS  # candidate threshold ~ (1/16) ** (1/4) = 0.5
+MERSENNE_PRIME = (1 << 31) - 1
+WORD_SHINGLE_SIZE = 3
+CHAR_SHINGLE_SIZE = 4
+SEED = 20240901
+
+_rng = np.random.default_rng(SEED)
+_A = _rng.integers(1, MERSENNE_PRIME, NUM_PERMUTATIONS, dtype=np.uint64)[:, None]
+_B = _rng.integers(0, MERSENNE_PRIME, NUM_PERMUTATIONS, dtype=np.uint64)[:, None]
+
+_NON_WORD_RE = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def normalize_text(text):
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    return _NON_WORD_RE.sub(' ', text).strip()
+
+
+def question_document(text, choice_texts):
+    """Choice order does not matter for duplicates, so choices are sorted"""
+    choices = sorted(normalize_text(choice) for choice in choice_texts)
+    return ' '.join([normalize_text(text)] + choices).strip()
+
+
+def shingles(document):
+    """Word 3-grams, or character 4-grams for very short questions"""
+    words = document.split()
+    if len(words) >= WORD_SHINGLE_SIZE * 2:
+        return {' '.join(words[i:i + WORD_SHINGLE_SIZE]) for i in range(len(words) - WORD_SHINGLE_SIZE + 1)}
+    if len(document) <= CHAR_SHINGLE_SIZE:
+        return {document}
+    return {document[i:i + CHAR_SHINGLE_SIZE] for i in range(len(document) - CHAR_SHINGLE_SIZE + 1)}
+
+
+def content_hash(document):
+    return hashlib.blake2b(document.encode(), digest_size=16).hexdigest()
+
+
+def minhash(document):
+    """uint32 MinHash signature; products stay below 2**62 so uint64 never overflows"""
+    values = np.fromiter(
+        (zlib.crc32(shingle.encode()) & MERSENNE_PRIME for shingle in shingles(document)),
+        dtype=np.uint64,
+    )
+    return ((_A * values + _B) % MERSENNE_PRIME).min(axis=1).astype(np.uint32)
+
+
+@dataclass
+class DedupReport:
+    questions: int = 0
+    signatures_updated: int = 0
+    candidate_pairs: int = 0
+    duplicate_pairs: int = 0
+    new_pairs: int = 0
+    skipped_buckets: int = 0
+    elapsed: float = 0.0
+
+
+def update_signatures(batch_size=2000):
+    """Compute signatures for new and changed questions. Returns the count."""
+    updated = 0
+    last_pk = 0
+    while True:
+        rows = list(
+            Question.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', 'text')[:batch_size]
+        )
+        if not rows:
+            return updated
+        last_pk = rows[-1][0]
+        ids = [pk for pk, text in rows]
+
+        choices = {}
+        for question_id, text in Choice.objects.filter(question_id__in=ids).values_list('question_id', 'text'):
+            choices.setdefault(question_id, []).append(text)
+        existing = {
+            signature.question_id: signature
+            for signature in QuestionSignature.objects.filter(question_id__in=ids).only('id', 'question_id', 'content_hash')
+        }
+
+        to_create, to_update = [], []
+        for pk, text in rows:
+            document = question_document(text, choices.get(pk, ()))
+            digest = content_hash(document)
+            signature = existing.get(pk)
+            if signature is not None and signature.content_hash == digest:
+                continue
+            packed = minhash(document).tobytes()
+            if signature is None:
+                to_create.append(QuestionSignature(question_id=pk, content_hash=digest, minhash=packed))
+            else:
+                signature.content_hash = digest
+                signature.minhash = packed
+                to_update.append(signature)
+
+        QuestionSignature.objects.bulk_create(to_create)
+        QuestionSignature.objects.bulk_update(to_update, ['content_hash', 'minhash'])
+        updated += len(to_create) + len(to_update)
+
+
+def load_signatures():
+    """All stored signatures as (question_ids, matrix[n, NUM_PERMUTATIONS])"""
+    count = QuestionSignature.objects.count()
+    ids = np.empty(count, dtype=np.int64)
+    matrix = np.empty((count, NUM_PERMUTATIONS), dtype=np.uint32)
+    rows = QuestionSignature.objects.order_by('question_id').values_list('question_id', 'minhash')
+    filled = 0
+    for question_id, packed in rows.iterator(chunk_size=5000):
+        if filled == count:
+            break
+        ids[filled] = question_id
+        matrix[filled] = np.frombuffer(bytes(packed), dtype=np.uint32)
+        filled += 1
+    return ids[:filled], matrix[:filled]
+
+
+def candidate_pairs(matrix, max_bucket_size=500):
+    """
+    Index pairs (i, j), i < j, that share at least one LSH band.
+
+    Buckets larger than ``max_bucket_size`` are skipped: they are usually
+    boilerplate questions and would make the pass quadratic.
+    """
+    pairs = set()
+    skipped = 0
+    for band in range(BANDS):
+        block = np.ascontiguousarray(matrix[:, band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])
+        keys = block.view(np.dtype((np.void, block.dtype.itemsize * ROWS_PER_BAND))).ravel()
+        _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        inverse = inverse.ravel()
+
+        # Only rows whose bucket has a partner matter; singletons are the vast majority
+        shared = np.nonzero(counts[inverse] >= 2)[0]
+        if not len(shared):
+            continue
+        shared = shared[np.argsort(inverse[shared], kind='stable')]
+        bucket_sizes = counts[np.unique(inverse[shared])]
+        for bucket in np.split(shared, np.cumsum(bucket_sizes)[:-1]):
+            size = len(bucket)
+            if size > max_bucket_size:
+                skipped += 1
+                continue
+            for x in range(size - 1):
+                for y in range(x + 1, size):
+                    pairs.add((int(bucket[x]), int(bucket[y])))
+    return pairs, skipped
+
+
+def find_duplicates(threshold=0.8, max_bucket_size=500):
+    """
+    Refresh signatures and the DuplicateQuestionPair table.
+
+    Reviewed pairs keep their status; open pairs that no longer reach the
+    threshold (e.g. after an edit) are removed.
+    """
+    started = time.perf_counter()
+    report = DedupReport()
+    report.signatures_updated = update_signatures()
+
+    ids, matrix = load_signatures()
+    report.questions = len(ids)
+    pairs, report.skipped_buckets = candidate_pairs(matrix, max_bucket_size)
+    report.candidate_pairs = len(pairs)
+
+    found = {}
+    if pairs:
+        left, right = (np.fromiter(side, dtype=np.int64, count=len(pairs)) for side in zip(*pairs))
+        similarity = (matrix[left] == matrix[right]).mean(axis=1)
+        keep = similarity >= threshold
+        for i, j, value in zip(left[keep], right[keep], similarity[keep]):
+            found[(int(ids[i]), int(ids[j]))] = float(value)
+    report.duplicate_pairs = len(found)
+
+    with transaction.atomic():
+        existing = {
+            (a, b): (pk, status)
+            for pk, a, b, status in DuplicateQuestionPair.objects.values_list(
+                'pk', 'question_a_id', 'question_b_id', 'status'
+            )
+        }
+        stale = [pk for key, (pk, status) in existing.items() if status == 'open' and key not in found]
+        DuplicateQuestionPair.objects.filter(pk__in=stale).delete()
+
+        to_create, to_update = [], []
+        for (a, b), value in found.items():
+            if (a, b) in existing:
+                to_update.append(DuplicateQuestionPair(pk=existing[(a, b)][0], similarity=value))
+            else:
+                to_create.append(DuplicateQuestionPair(question_a_id=a, question_b_id=b, similarity=value))
+        DuplicateQuestionPair.objects.bulk_create(to_create, batch_size=1000)
+        DuplicateQuestionPair.objects.bulk_update(to_update, ['similarity'], batch_size=1000)
+        report.new_pairs = len(to_create)
+
+    report.elapsed = time.perf_counter() - started
+    return report
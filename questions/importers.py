@@ -0,0 +1,410 @@
+"""
+Bulk question import from CSV, XLSX and JSON question banks.
+
+Files are read as a stream of rows, validated in batches and inserted with
+bulk_create inside a single transaction. Any invalid row rolls the whole
+import back, so a dry run reports exactly what a real run would reject.
+
+Row format (CSV/XLSX header names, JSON object keys):
+    text                required
+    question_type       single_choice (default), multiple_choice, true_false,
+                        numeric, text, matching, essay
+    points, difficulty, explanation, time_limit
+    numeric_answer, numeric_tolerance
+    choice_1 ... choice_N and correct ("2" or "1,3", 1-based) in tabular files;
+    JSON rows may instead give choices as [{"text": ..., "is_correct": ...}].
+    Only single_choice, multiple_choice and true_false rows take choices.
+"""
+import csv
+import io
+import json
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Max
+
+from .irt import bump_calibration_version
+from .models import Question, Choice
+from . import search
+
+CHOICE_TYPES = ('single_choice', 'multiple_choice', 'true_false')
+QUESTION_TYPES = {value for value, label in Question.QUESTION_TYPES}
+DIFFICULTY_LEVELS = {value for value, label in Question.DIFFICULTY_LEVELS}
+SUPPORTED_EXTENSIONS = ('.csv', '.xlsx', '.json', '.jsonl')
+MAX_INTEGER = 2147483647  # largest value every database accepts in an integer column
+
+
+class ImportFormatError(ValueError):
+    """The file cannot be read as a question bank at all"""
+
+
+@dataclass
+class RowError:
+    line: int
+    messages: list
+
+    def as_dict(self):
+        return {'line': self.line, 'errors': self.messages}
+
+
+@dataclass
+class ImportReport:
+    dry_run: bool = False
+    total_rows: int = 0
+    valid_rows: int = 0
+    imported_questions: int = 0
+    imported_choices: int = 0
+    errors: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        if not self.elapsed:
+            return 0.0
+        return self.total_rows / self.elapsed
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def as_dict(self):
+        return {
+            'dry_run': self.dry_run,
+            'total_rows': self.total_rows,
+            'valid_rows': self.valid_rows,
+            'imported_questions': self.imported_questions,
+            'imported_choices': self.imported_choices,
+            'errors': [error.as_dict() for error in self.errors],
+            'elapsed_seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+# Readers ---------------------------------------------------------------
+
+def _normalize_header(value):
+    return str(value or '').strip().lower().replace(' ', '_')
+
+
+def iter_csv_rows(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    header = [_normalize_header(name) for name in next(reader, [])]
+    for line, values in enumerate(reader, start=2):
+        if not any(value.strip() for value in values):
+            continue
+        yield line, dict(zip(header, values))
+
+
+def iter_xlsx_rows(fileobj):
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [_normalize_header(name) for name in next(rows, ())]
+        for line, values in enumerate(rows, start=2):
+            if all(value in (None, '') for value in values):
+                continue
+            yield line, dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def iter_jsonl_rows(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig')
+    for line, raw in enumerate(text, start=1):
+        if not raw.strip():
+            continue
+        try:
+            yield line, json.loads(raw)
+        except json.JSONDecodeError as exc:
+            raise ImportFormatError(f"Line {line}: invalid JSON ({exc.msg})")
+
+
+def iter_json_rows(fileobj, chunk_size=65536):
+    """
+    Stream objects out of a top-level JSON array without loading it whole
+    """
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig')
+    decoder = json.JSONDecoder()
+    buffer = text.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise ImportFormatError("JSON question banks must be an array of objects")
+    buffer = buffer[1:]
+    index = 0
+    exhausted = False
+
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            obj, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError as exc:
+            if exhausted:
+                raise ImportFormatError(f"Item {index + 1}: invalid JSON ({exc.msg})")
+            chunk = text.read(chunk_size)
+            exhausted = not chunk
+            buffer += chunk
+            continue
+        index += 1
+        buffer = buffer[end:]
+        yield index, obj
+
+
+def read_question_rows(fileobj, filename):
+    """Yield (line, row) pairs from an uploaded or opened binary file"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        return iter_csv_rows(fileobj)
+    if extension == '.xlsx':
+        return iter_xlsx_rows(fileobj)
+    if extension == '.jsonl':
+        return iter_jsonl_rows(fileobj)
+    if extension == '.json':
+        return iter_json_rows(fileobj)
+    raise ImportFormatError(
+        f"Unsupported file type '{extension}'. Use one of: {', '.join(SUPPORTED_EXTENSIONS)}"
+    )
+
+
+# Validation ------------------------------------------------------------
+
+def _clean(value):
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def _parse_int(row, name, errors, default=None, minimum=0, maximum=MAX_INTEGER):
+    value = _clean(row.get(name))
+    if not value:
+        return default
+    try:
+        number = int(float(value))
+    except (ValueError, OverflowError):
+        errors.append(f"{name}: '{value}' is not a whole number")
+        return default
+    if number < minimum:
+        errors.append(f"{name}: must be at least {minimum}")
+    elif number > maximum:
+        errors.append(f"{name}: must be at most {maximum}")
+    return number
+
+
+def _parse_float(row, name, errors, default=None):
+    value = _clean(row.get(name))
+    if not value:
+        return default
+    try:
+        number = float(value.replace(',', '.'))
+    except ValueError:
+        errors.append(f"{name}: '{value}' is not a number")
+        return default
+    if not math.isfinite(number):
+        errors.append(f"{name}: '{value}' is not a finite number")
+        return default
+    return number
+
+
+def _parse_choices(row, errors):
+    """Return [(text, is_correct, explanation)] from either row layout"""
+    if isinstance(row.get('choices'), list):
+        choices = []
+        for item in row['choices']:
+            if isinstance(item, dict):
+                choices.append((
+                    _clean(item.get('text')),
+                    bool(item.get('is_correct')),
+                    _clean(item.get('explanation')),
+                ))
+            else:
+                choices.append((_clean(item), False, ''))
+    else:
+        numbered = sorted(
+            (int(key.split('_', 1)[1]), value)
+            for key, value in row.items()
+            if key and key.startswith('choice_') and key.split('_', 1)[1].isdigit()
+        )
+        choices = [(_clean(value), False, '') for number, value in numbered if _clean(value)]
+
+    correct = row.get('correct')
+    if isinstance(correct, (int, float)):
+        correct = str(int(correct)) if math.isfinite(correct) else str(correct)
+    if isinstance(correct, list):
+        correct = ','.join(str(item) for item in correct)
+    correct = _clean(correct)
+    if correct:
+        marked = set()
+        for part in correct.replace(';', ',').split(','):
+            part = part.strip()
+            if not part.isdigit() or not 1 <= int(part) <= len(choices):
+                errors.append(f"correct: '{part}' does not refer to a choice")
+                continue
+            marked.add(int(part) - 1)
+        choices = [
+            (text, is_correct or position in marked, explanation)
+            for position, (text, is_correct, explanation) in enumerate(choices)
+        ]
+    return choices
+
+
+def validate_row(row):
+    """
+    Turn a raw row into question data. Returns (data, errors).
+    """
+    errors = []
+    if not isinstance(row, dict):
+        return None, ['row must be an object']
+
+    text = _clean(row.get('text'))
+    if not text:
+        errors.append('text: required')
+
+    question_type = _clean(row.get('question_type')).lower() or 'single_choice'
+    if question_type not in QUESTION_TYPES:
+        errors.append(f"question_type: unknown type '{question_type}'")
+
+    difficulty = _clean(row.get('difficulty')).lower() or 'medium'
+    if difficulty not in DIFFICULTY_LEVELS:
+        errors.append(f"difficulty: unknown level '{difficulty}'")
+
+    data = {
+        'text': text,
+        'question_type': question_type,
+        'difficulty': difficulty,
+        'explanation': _clean(row.get('explanation')),
+        'points': _parse_int(row, 'points', errors, default=1, minimum=1),
+        'time_limit': _parse_int(row, 'time_limit', errors),
+        'numeric_answer': _parse_float(row, 'numeric_answer', errors),
+        'numeric_tolerance': _parse_float(row, 'numeric_tolerance', errors, default=0.0),
+    }
+
+    choices = _parse_choices(row, errors)
+    if question_type in CHOICE_TYPES:
+        correct_count = sum(1 for text, is_correct, explanation in choices if is_correct)
+        if len(choices) < 2:
+            errors.append('choices: at least two choices are required')
+        elif any(not choice_text for choice_text, is_correct, explanation in choices):
+            errors.append('choices: choice text cannot be empty')
+        if question_type == 'true_false' and len(choices) != 2:
+            errors.append('choices: true/false questions need exactly two choices')
+        if question_type == 'multiple_choice':
+            if correct_count < 1:
+                errors.append('correct: mark at least one correct choice')
+        elif correct_count != 1:
+            errors.append('correct: mark exactly one correct choice')
+    else:
+        if choices:
+            errors.append(f"choices: {question_type} questions do not take choices")
+        if question_type == 'numeric' and data['numeric_answer'] is None:
+            errors.append('numeric_answer: required for numeric questions')
+
+    data['choices'] = choices
+    return data, errors
+
+
+# Import ----------------------------------------------------------------
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class QuestionImporter:
+    """
+    Import a stream of rows into a test.
+
+    Imported questions are appended after the test's last question in file
+    order, so the ['test', 'order'] uniqueness holds without renumbering
+    existing rows.
+    """
+
+    def __init__(self, test, created_by, batch_size=500, dry_run=False):
+        self.test = test
+        self.created_by = created_by
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+
+    def run(self, rows):
+        report = ImportReport(dry_run=self.dry_run)
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            last_order = self.test.questions.aggregate(last=Max('order'))['last'] or 0
+
+            for batch in _batched(rows, self.batch_size):
+                valid = []
+                for line, raw in batch:
+                    report.total_rows += 1
+                    data, errors = validate_row(raw)
+                    if errors:
+                        report.errors.append(RowError(line, errors))
+                    else:
+                        valid.append(data)
+                report.valid_rows += len(valid)
+
+                # Keep validating after the first error so every bad row is reported
+                if self.dry_run or report.errors:
+                    continue
+
+                last_order = self._insert(valid, last_order, report)
+
+            if self.dry_run or report.errors:
+                transaction.set_rollback(True)
+                report.imported_questions = 0
+                report.imported_choices = 0
+            elif report.imported_questions:
+                # bulk_create skips the post_save that refreshes adaptive item pools
+                transaction.on_commit(bump_calibration_version)
+
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def _insert(self, rows, last_order, report):
+        questions = []
+        for data in rows:
+            last_order += 1
+            questions.append(Question(
+                test=self.test,
+                created_by=self.created_by,
+                order=last_order,
+                **{key: value for key, value in data.items() if key != 'choices'}
+            ))
+        Question.objects.bulk_create(questions)
+
+        choices = [
+            Choice(
+                question=question,
+                text=text,
+                is_correct=is_correct,
+                explanation=explanation,
+                order=position,
+            )
+            for question, data in zip(questions, rows)
+            for position, (text, is_correct, explanation) in enumerate(data['choices'], start=1)
+        ]
+        Choice.objects.bulk_create(choices, batch_size=self.batch_size * 4)
+
+        # bulk_create skips post_save, so index the batch explicitly
+        search.index_questions([question.pk for question in questions])
+
+        report.imported_questions += len(questions)
+        report.imported_choices += len(choices)
+        return last_order
+
+
+def import_questions(fileobj, filename, test, created_by, batch_size=500, dry_run=False):
+    """Read a question bank file and import it into ``test``"""
+    rows = read_question_rows(fileobj, filename)
+    importer = QuestionImporter(test, created_by, batch_size=batch_size, dry_run=dry_run)
+    return importer.run(rows)
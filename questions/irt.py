@@ -0,0 +1,262 @@
+"""
+Two-parameter logistic (2PL) item response theory.
+
+    P(correct | theta) = 1 / (1 + exp(-a * (theta - b)))
+
+Item parameters (discrimination ``a``, difficulty ``b``) are calibrated
+offline from graded QuestionAnswer rows. Responses are kept as flat
+(person, item, correct) arrays rather than a persons x items matrix, and
+each Newton step is a handful of vectorized gathers and bincount sums, so
+memory and time grow with the number of answers only.
+
+Abilities and items are estimated jointly with weak normal priors (a
+regularized joint MAP fit), which keeps perfect and zero scores finite and
+anchors the scale at theta ~ N(0, 1).
+
+NumPy is imported by the functions that need it, since the question
+signals import this module in every process.
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from itertools import islice
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import QuestionAnswer, ItemCalibration
+
+CALIBRATION_VERSION_KEY = 'item-calibration:version'
+
+THETA_LIMIT = 4.0
+DISCRIMINATION_RANGE = (0.2, 4.0)
+DIFFICULTY_LIMIT = 4.0
+
+# Prior variances for the MAP fit
+THETA_PRIOR_VAR = 1.0
+DISCRIMINATION_PRIOR_VAR = 1.0  # around a = 1
+DIFFICULTY_PRIOR_VAR = 4.0  # around b = 0
+
+# Starting values for items that have no calibration yet
+DIFFICULTY_PRIORS = {'easy': -1.0, 'medium': 0.0, 'hard': 1.0}
+
+AUTO_GRADED_TYPES = ('single_choice', 'multiple_choice', 'true_false', 'numeric', 'matching')
+
+
+def probability(theta, a, b):
+    """P(correct) for broadcastable ability and item parameter arrays"""
+    import numpy as np
+
+    z = np.clip(a * (theta - b), -30.0, 30.0)
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def information(theta, a, b):
+    """Fisher information a^2 * P * (1 - P) of each item at ``theta``"""
+    p = probability(theta, a, b)
+    return a * a * p * (1.0 - p)
+
+
+def calibration_version():
+    version = cache.get(CALIBRATION_VERSION_KEY)
+    if version is None:
+        cache.add(CALIBRATION_VERSION_KEY, 1, timeout=None)
+        version = cache.get(CALIBRATION_VERSION_KEY, 1)
+    return version
+
+
+def bump_calibration_version():
+    """Tell every process that preloaded item pools are stale"""
+    try:
+        return cache.incr(CALIBRATION_VERSION_KEY)
+    except ValueError:
+        cache.add(CALIBRATION_VERSION_KEY, 1, timeout=None)
+        return cache.get(CALIBRATION_VERSION_KEY, 1)
+
+
+@dataclass
+class FitResult:
+    discrimination: np.ndarray
+    difficulty: np.ndarray
+    theta: np.ndarray
+    iterations: int
+    converged: bool
+
+
+def fit_2pl(persons, items, correct, n_persons, n_items, max_iter=100, tol=1e-4):
+    """
+    Fit the 2PL model to flat response arrays.
+
+    ``persons`` and ``items`` are 0-based indices, ``correct`` is 0/1.
+    Ability and item parameters are updated alternately with one damped
+    Newton step each per iteration.
+    """
+    import numpy as np
+
+    persons = np.asarray(persons, dtype=np.intp)
+    items = np.asarray(items, dtype=np.intp)
+    y = np.asarray(correct, dtype=np.float64)
+
+    # Start from observed proportions correct
+    answered = np.bincount(items, minlength=n_items).astype(np.float64)
+    p_item = (np.bincount(items, weights=y, minlength=n_items) + 0.5) / (answered + 1.0)
+    b = np.clip(-np.log(p_item / (1.0 - p_item)), -DIFFICULTY_LIMIT, DIFFICULTY_LIMIT)
+    a = np.ones(n_items)
+    taken = np.bincount(persons, minlength=n_persons).astype(np.float64)
+    p_person = (np.bincount(persons, weights=y, minlength=n_persons) + 0.5) / (taken + 1.0)
+    theta = np.clip(np.log(p_person / (1.0 - p_person)), -THETA_LIMIT, THETA_LIMIT)
+
+    converged = False
+    iteration = 0
+    for iteration in range(1, max_iter + 1):
+        # Ability step
+        a_r = a[items]
+        p = probability(theta[persons], a_r, b[items])
+        residual = y - p
+        weight = p * (1.0 - p)
+        gradient = np.bincount(persons, weights=a_r * residual, minlength=n_persons) - theta / THETA_PRIOR_VAR
+        hessian = np.bincount(persons, weights=a_r * a_r * weight, minlength=n_persons) + 1.0 / THETA_PRIOR_VAR
+        step_theta = np.clip(gradient / hessian, -1.0, 1.0)
+        theta = np.clip(theta + step_theta, -THETA_LIMIT, THETA_LIMIT)
+
+        # Item step at the new abilities
+        distance = theta[persons] - b[items]
+        p = probability(theta[persons], a_r, b[items])
+        residual = y - p
+        weight = p * (1.0 - p)
+
+        gradient_b = -np.bincount(items, weights=a_r * residual, minlength=n_items) - b / DIFFICULTY_PRIOR_VAR
+        hessian_b = np.bincount(items, weights=a_r * a_r * weight, minlength=n_items) + 1.0 / DIFFICULTY_PRIOR_VAR
+        gradient_a = (np.bincount(items, weights=distance * residual, minlength=n_items)
+                      - (a - 1.0) / DISCRIMINATION_PRIOR_VAR)
+        hessian_a = (np.bincount(items, weights=distance * distance * weight, minlength=n_items)
+                     + 1.0 / DISCRIMINATION_PRIOR_VAR)
+
+        step_b = np.clip(gradient_b / hessian_b, -1.0, 1.0)
+        step_a = np.clip(gradient_a / hessian_a, -0.5, 0.5)
+        b = np.clip(b + step_b, -DIFFICULTY_LIMIT, DIFFICULTY_LIMIT)
+        a = np.clip(a + step_a, *DISCRIMINATION_RANGE)
+
+        change = max(np.abs(step_theta).max(initial=0.0), np.abs(step_a).max(initial=0.0),
+                     np.abs(step_b).max(initial=0.0))
+        if change < tol:
+            converged = True
+            break
+
+    return FitResult(a, b, theta, iteration, converged)
+
+
+@dataclass
+class CalibrationReport:
+    responses: int = 0
+    persons: int = 0
+    items: int = 0
+    skipped_items: int = 0
+    iterations: int = 0
+    converged: bool = False
+    elapsed: float = 0.0
+
+
+def load_responses(question_queryset=None, chunk_size=20000):
+    """
+    Graded answers to auto-gradable questions as (attempt_ids, question_ids, correct) arrays
+    """
+    import numpy as np
+
+    answers = QuestionAnswer.objects.filter(question__question_type__in=AUTO_GRADED_TYPES)
+    if question_queryset is not None:
+        answers = answers.filter(question__in=question_queryset)
+    rows = answers.values_list('attempt_id', 'question_id', 'is_correct').iterator(chunk_size=chunk_size)
+
+    attempts, questions, correct = [], [], []
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        attempt_ids, question_ids, flags = zip(*chunk)
+        # Attempt ids are UUIDs; only their identity matters here
+        attempts.append(np.array([attempt_id.int & 0x7FFFFFFFFFFFFFFF for attempt_id in attempt_ids], dtype=np.int64))
+        questions.append(np.array(question_ids, dtype=np.int64))
+        correct.append(np.array(flags, dtype=np.int8))
+
+    if not attempts:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.int8)
+    return np.concatenate(attempts), np.concatenate(questions), np.concatenate(correct)
+
+
+def calibrate_items(question_queryset=None, min_responses=30, max_iter=100):
+    """
+    Estimate 2PL parameters and store them in ItemCalibration.
+
+    Questions with fewer than ``min_responses`` graded answers keep their
+    previous calibration (or none).
+    """
+    import numpy as np
+
+    started = time.perf_counter()
+    report = CalibrationReport()
+
+    attempt_ids, question_ids, correct = load_responses(question_queryset)
+    item_keys, items, counts = np.unique(question_ids, return_inverse=True, return_counts=True)
+    keep_items = counts >= min_responses
+    report.skipped_items = int((~keep_items).sum())
+
+    keep = keep_items[items]
+    attempt_ids, items, correct = attempt_ids[keep], items[keep], correct[keep]
+    item_keys, items = np.unique(item_keys[items], return_inverse=True)
+    person_keys, persons = np.unique(attempt_ids, return_inverse=True)
+
+    report.responses = len(correct)
+    report.items = len(item_keys)
+    report.persons = len(person_keys)
+    if not report.items:
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    fit = fit_2pl(persons, items, correct, len(person_keys), len(item_keys), max_iter=max_iter)
+    report.iterations = fit.iterations
+    report.converged = fit.converged
+    response_counts = np.bincount(items, minlength=len(item_keys))
+
+    with transaction.atomic():
+        ItemCalibration.objects.bulk_create(
+            [
+                ItemCalibration(
+                    question_id=int(question_id),
+                    discrimination=float(a),
+                    difficulty=float(b),
+                    response_count=int(count),
+                )
+                for question_id, a, b, count in zip(item_keys, fit.discrimination, fit.difficulty, response_counts)
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['question'],
+            update_fields=['discrimination', 'difficulty', 'response_count', 'calibrated_at'],
+        )
+        transaction.on_commit(bump_calibration_version)
+
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def item_parameters(question_queryset):
+    """
+    (question_ids, a, b) arrays for a pool in one query.
+
+    Uncalibrated questions get a = 1 and a difficulty from their label.
+    """
+    import numpy as np
+
+    rows = list(question_queryset.order_by('pk').values_list(
+        'pk', 'difficulty', 'calibration__discrimination', 'calibration__difficulty'
+    ))
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    a = np.fromiter((row[2] if row[2] is not None else 1.0 for row in rows), dtype=np.float64, count=len(rows))
+    b = np.fromiter(
+        (row[3] if row[3] is not None else DIFFICULTY_PRIORS.get(row[1], 0.0) for row in rows),
+        dtype=np.float64, count=len(rows),
+    )
+    return ids, a, b
@@ -0,0 +1,79 @@
+import io
+import csv
+import time
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from examinations.models import Category, Test
+from questions.models import Question, Choice
+from questions.importers import import_questions
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare bulk question import throughput with per-row creation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500)
+        parser.add_argument('--choices', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def build_csv(self, rows, choices):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['text', 'question_type', 'points', 'difficulty']
+                        + [f'choice_{n}' for n in range(1, choices + 1)] + ['correct'])
+        for i in range(rows):
+            writer.writerow([f'Benchmark question {i}', 'single_choice', 1, 'medium']
+                            + [f'Option {n}' for n in range(1, choices + 1)] + [1 + i % choices])
+        return buffer.getvalue().encode()
+
+    def run_in_rollback(self, fn):
+        """Time ``fn`` against a throwaway test, leaving the database untouched"""
+        try:
+            with transaction.atomic():
+                teacher = User.objects.create(username='__benchmark_teacher__', role='teacher')
+                category = Category.objects.create(name='__benchmark_category__')
+                test = Test.objects.create(
+                    title='__benchmark_test__', description='', category=category,
+                    time_limit=60, pass_mark=50, created_by=teacher,
+                )
+                started = time.perf_counter()
+                fn(test, teacher)
+                elapsed = time.perf_counter() - started
+                raise Rollback(elapsed)
+        except Rollback as result:
+            return result.args[0]
+
+    def handle(self, *args, **options):
+        rows, choices = options['rows'], options['choices']
+        payload = self.build_csv(rows, choices)
+
+        def per_row(test, teacher):
+            for i in range(rows):
+                question = Question.objects.create(
+                    test=test, created_by=teacher, question_type='single_choice',
+                    text=f'Benchmark question {i}', order=i + 1,
+                )
+                for n in range(1, choices + 1):
+                    Choice.objects.create(question=question, text=f'Option {n}', is_correct=n == 1)
+
+        def bulk(test, teacher):
+            report = import_questions(
+                io.BytesIO(payload), 'bench.csv', test, teacher,
+                batch_size=options['batch_size'],
+            )
+            assert report.ok, report.errors
+
+        per_row_time = self.run_in_rollback(per_row)
+        bulk_time = self.run_in_rollback(bulk)
+
+        self.stdout.write(f"{rows} questions x {choices} choices")
+        self.stdout.write(f"  per-row create : {per_row_time:.3f}s ({rows / per_row_time:.0f} rows/s)")
+        self.stdout.write(f"  bulk import    : {bulk_time:.3f}s ({rows / bulk_time:.0f} rows/s)")
+        self.stdout.write(self.style.SUCCESS(f"  speedup        : {per_row_time / bulk_time:.1f}x"))
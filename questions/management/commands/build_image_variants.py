@@ -0,0 +1,50 @@
+import time
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from buxoro_test_system.images import get_executor, process_image
+from questions.models import Question
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Generate resized WebP/JPEG variants for question images and profile photos that lack them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Rebuild images that already have variants')
+
+    def handle(self, *args, **options):
+        targets = [
+            (Question, 'image', 'image_hash', 'image_widths', settings.QUESTION_IMAGE_WIDTHS),
+            (User, 'profile_image', 'profile_image_hash', 'profile_image_widths', settings.PROFILE_IMAGE_WIDTHS),
+        ]
+        started = time.perf_counter()
+        futures = []
+        for model, field_name, hash_field, widths_field, widths in targets:
+            queryset = model._default_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            if not options['all']:
+                queryset = queryset.filter(**{widths_field: []})
+            for pk in queryset.values_list('pk', flat=True).iterator():
+                futures.append(get_executor().submit(
+                    process_image, model, pk, field_name, hash_field, widths_field, tuple(widths)
+                ))
+
+        failed = 0
+        hashes = set()
+        for future in futures:
+            try:
+                image_hash = future.result()
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"  {exc}")
+                continue
+            if image_hash:
+                hashes.add(image_hash)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {len(futures) - failed} images ({len(hashes)} distinct) in {elapsed:.2f}s"
+        ))
+        if failed:
+            self.stdout.write(self.style.WARNING(f"{failed} images failed"))
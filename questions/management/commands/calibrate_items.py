@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from questions.irt import calibrate_items
+from questions.models import Question
+
+
+class Command(BaseCommand):
+    help = 'Calibrate 2PL IRT item parameters from graded answers (used by adaptive tests)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--test', type=int, help='Only calibrate questions of this test id')
+        parser.add_argument('--category', type=int, help='Only calibrate questions in this category id')
+        parser.add_argument('--min-responses', type=int, default=30,
+                            help='Skip questions with fewer graded answers')
+        parser.add_argument('--max-iter', type=int, default=100)
+
+    def handle(self, *args, **options):
+        if options['min_responses'] < 1:
+            raise CommandError('--min-responses must be positive')
+
+        queryset = None
+        if options['test'] or options['category']:
+            queryset = Question.objects.all()
+            if options['test']:
+                queryset = queryset.filter(test_id=options['test'])
+            if options['category']:
+                queryset = queryset.filter(test__category_id=options['category'])
+
+        report = calibrate_items(
+            queryset,
+            min_responses=options['min_responses'],
+            max_iter=options['max_iter'],
+        )
+        self.stdout.write(
+            f"{report.responses} responses from {report.persons} attempts, "
+            f"{report.skipped_items} questions below {options['min_responses']} responses"
+        )
+        if report.items and not report.converged:
+            self.stdout.write(self.style.WARNING(f"Stopped after {report.iterations} iterations without converging"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Calibrated {report.items} questions in {report.iterations} iterations, {report.elapsed:.2f}s"
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from questions.dedup import find_duplicates
+
+
+class Command(BaseCommand):
+    help = 'Detect near-duplicate questions with MinHash/LSH and record them for review in the admin'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=0.8,
+                            help='Minimum estimated Jaccard similarity (0-1)')
+        parser.add_argument('--max-bucket-size', type=int, default=500,
+                            help='Skip LSH buckets larger than this')
+
+    def handle(self, *args, **options):
+        if not 0 < options['threshold'] <= 1:
+            raise CommandError('--threshold must be between 0 and 1')
+
+        report = find_duplicates(
+            threshold=options['threshold'],
+            max_bucket_size=options['max_bucket_size'],
+        )
+        self.stdout.write(
+            f"{report.questions} questions, {report.signatures_updated} signatures updated, "
+            f"{report.candidate_pairs} candidate pairs"
+        )
+        if report.skipped_buckets:
+            self.stdout.write(self.style.WARNING(f"{report.skipped_buckets} oversized LSH buckets skipped"))
+        self.stdout.write(self.style.SUCCESS(
+            f"{report.duplicate_pairs} duplicate pairs ({report.new_pairs} new) in {report.elapsed:.2f}s"
+        ))
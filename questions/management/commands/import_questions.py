@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from examinations.models import Test
+from questions.importers import ImportFormatError, import_questions
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Import a CSV, XLSX or JSON question bank into a test'
+
+    def add_arguments(self, parser):
+        parser.add_argument('test_id', type=int, help='Test to append the questions to')
+        parser.add_argument('path', help='Path to a .csv, .xlsx, .json or .jsonl file')
+        parser.add_argument('--created-by', help='Username recorded as question author (default: test owner)')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, do not write anything')
+
+    def handle(self, *args, **options):
+        try:
+            test = Test.objects.get(pk=options['test_id'])
+        except Test.DoesNotExist:
+            raise CommandError(f"Test {options['test_id']} not found")
+
+        created_by = test.created_by
+        if options['created_by']:
+            try:
+                created_by = User.objects.get(username=options['created_by'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['created_by']}' not found")
+
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                report = import_questions(
+                    fileobj, options['path'], test, created_by,
+                    batch_size=options['batch_size'],
+                    dry_run=options['dry_run'],
+                )
+        except (OSError, ImportFormatError) as exc:
+            raise CommandError(str(exc))
+
+        for error in report.errors:
+            self.stdout.write(self.style.ERROR(f"Line {error.line}: {'; '.join(error.messages)}"))
+
+        summary = (
+            f"{report.total_rows} rows, {report.valid_rows} valid, "
+            f"{report.imported_questions} questions / {report.imported_choices} choices imported "
+            f"in {report.elapsed:.2f}s ({report.rows_per_second:.0f} rows/s)"
+        )
+        if report.errors:
+            raise CommandError(f"Import aborted, nothing was written. {summary}")
+        if report.dry_run:
+            self.stdout.write(self.style.SUCCESS(f"Dry run OK: {summary}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,15 @@
+import time
+from django.core.management.base import BaseCommand
+from questions.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text question search index from scratch'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        started = time.perf_counter()
+        count = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {count} questions with {backend.__class__.__name__} in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:29
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS questions_question_search_gin "
+            "ON questions_question USING GIN (search_vector)"
+        )
+        # Same document as questions.search.PostgresSearchBackend, as of this migration
+        schema_editor.execute(
+            """
+            UPDATE questions_question q SET search_vector =
+                setweight(to_tsvector(%s::regconfig, coalesce(q.text, '')), 'A') ||
+                setweight(to_tsvector(%s::regconfig, coalesce((
+                    SELECT string_agg(c.text, ' ') FROM questions_choice c
+                    WHERE c.question_id = q.id
+                ), '')), 'B') ||
+                setweight(to_tsvector(%s::regconfig, coalesce(q.explanation, '')), 'C')
+            """,
+            [settings.QUESTION_SEARCH_CONFIG] * 3
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS questions_question_fts "
+            "USING fts5(text, choices, explanation, tokenize='unicode61 remove_diacritics 2')"
+        )
+        # Same document as questions.search.SQLiteSearchBackend, as of this migration
+        schema_editor.execute(
+            """
+            INSERT INTO questions_question_fts (rowid, text, choices, explanation)
+            SELECT q.id, q.text, coalesce((
+                SELECT group_concat(c.text, ' ') FROM questions_choice c WHERE c.question_id = q.id
+            ), ''), q.explanation
+            FROM questions_question q
+            """
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS questions_question_search_gin")
+    elif vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS questions_question_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0002_question_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionSignature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=32)),
+                ('minhash', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='signature', to='questions.question')),
+            ],
+            options={
+                'verbose_name': 'Question Signature',
+                'verbose_name_plural': 'Question Signatures',
+                'db_table': 'questions_questionsignature',
+            },
+        ),
+        migrations.CreateModel(
+            name='DuplicateQuestionPair',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('similarity', models.FloatField(help_text='Estimated Jaccard similarity')),
+                ('status', models.CharField(choices=[('open', 'Open'), ('confirmed', 'Confirmed duplicate'), ('dismissed', 'Not a duplicate')], default='open', max_length=20)),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('question_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='questions.question')),
+                ('question_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='questions.question')),
+            ],
+            options={
+                'verbose_name': 'Duplicate Question Pair',
+                'verbose_name_plural': 'Duplicate Question Pairs',
+                'db_table': 'questions_duplicatequestionpair',
+                'ordering': ['-similarity'],
+                'unique_together': {('question_a', 'question_b')},
+            },
+        ),
+    ]
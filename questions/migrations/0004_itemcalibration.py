@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0003_question_duplicates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemCalibration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('discrimination', models.FloatField(default=1.0)),
+                ('difficulty', models.FloatField(default=0.0)),
+                ('response_count', models.PositiveIntegerField(default=0)),
+                ('calibrated_at', models.DateTimeField(auto_now=True)),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='calibration', to='questions.question')),
+            ],
+            options={
+                'verbose_name': 'Item Calibration',
+                'verbose_name_plural': 'Item Calibrations',
+                'db_table': 'questions_itemcalibration',
+            },
+        ),
+    ]
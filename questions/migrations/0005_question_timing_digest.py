@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0004_itemcalibration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionstatistics',
+            name='time_digest',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='questionstatistics',
+            name='timed_answers',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:05
+
+from django.db import migrations, models
+import buxoro_test_system.images
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0005_question_timing_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='image_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='image_widths',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='image',
+            field=models.ImageField(blank=True, null=True, upload_to='questions/', validators=[buxoro_test_system.images.validate_image_upload]),
+        ),
+    ]
@@ -1,8 +1,11 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 import uuid
 
+from buxoro_test_system.images import validate_image_upload
+
 User = get_user_model()
 
 
@@ -33,7 +36,10 @@ class Question(models.Model):
     # Content
     text = models.TextField(help_text="The question text")
     explanation = models.TextField(blank=True, help_text="Explanation shown after answering")
-    image = models.ImageField(upload_to='questions/', blank=True, null=True)
+    image = models.ImageField(upload_to='questions/', blank=True, null=True, validators=[validate_image_upload])
+    # Set by the image pipeline (buxoro_test_system.images) once variants exist
+    image_hash = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
+    image_widths = models.JSONField(default=list, blank=True, editable=False)
     
     # Scoring and difficulty
     points = models.PositiveIntegerField(default=1, validators=[MinValueValidator(1)])
@@ -61,6 +67,9 @@ class Question(models.Model):
     times_correct = models.PositiveIntegerField(default=0)
     average_time_spent = models.FloatField(default=0.0)  # in seconds
     
+    # Full-text search document (PostgreSQL only, see questions.search)
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     @property
     def success_rate(self):
         if self.times_answered == 0:
@@ -140,8 +149,10 @@ class QuestionAnswer(models.Model):
     last_modified_at = models.DateTimeField(auto_now=True)
     
     def save(self, *args, **kwargs):
-        # Auto-grade if possible
-        if not self.manually_graded and self.question.is_auto_gradable:
+        # Auto-grade if possible; choice selections can only be read once the answer exists
+        if not self.manually_graded and self.question.is_auto_gradable and (
+            self.pk is not None or self.question.question_type not in ('single_choice', 'multiple_choice', 'true_false')
+        ):
             self.auto_grade()
         super().save(*args, **kwargs)
     
@@ -245,6 +256,8 @@ class QuestionStatistics(models.Model):
     # Time metrics
     average_time_spent = models.FloatField(default=0.0)  # seconds
     median_time_spent = models.FloatField(default=0.0)
+    timed_answers = models.PositiveIntegerField(default=0)
+    time_digest = models.JSONField(default=list, blank=True)  # t-digest centroids, see questions.tdigest
     
     # Difficulty analysis
     discrimination_index = models.FloatField(default=0.0)  # How well question separates high/low performers
@@ -269,3 +282,70 @@ class QuestionStatistics(models.Model):
         db_table = 'questions_questionstatistics'
         verbose_name = 'Question Statistics'
         verbose_name_plural = 'Question Statistics'
+
+
+class ItemCalibration(models.Model):
+    """
+    2PL IRT parameters calibrated from historical answers (see questions.irt)
+    """
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='calibration')
+    discrimination = models.FloatField(default=1.0)  # a
+    difficulty = models.FloatField(default=0.0)  # b, on the ability scale
+    response_count = models.PositiveIntegerField(default=0)
+    calibrated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Q{self.question_id}: a={self.discrimination:.2f}, b={self.difficulty:.2f}"
+    
+    class Meta:
+        db_table = 'questions_itemcalibration'
+        verbose_name = 'Item Calibration'
+        verbose_name_plural = 'Item Calibrations'
+
+
+class QuestionSignature(models.Model):
+    """
+    MinHash signature of a question's normalized text and choices,
+    stored so duplicate detection only re-hashes changed questions
+    """
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='signature')
+    content_hash = models.CharField(max_length=32)
+    minhash = models.BinaryField()  # uint32 array, see questions.dedup
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Signature of Q{self.question_id}"
+    
+    class Meta:
+        db_table = 'questions_questionsignature'
+        verbose_name = 'Question Signature'
+        verbose_name_plural = 'Question Signatures'
+
+
+class DuplicateQuestionPair(models.Model):
+    """
+    Near-duplicate candidate found by MinHash/LSH (question_a_id < question_b_id)
+    """
+    STATUS_CHOICES = (
+        ('open', 'Open'),
+        ('confirmed', 'Confirmed duplicate'),
+        ('dismissed', 'Not a duplicate'),
+    )
+    
+    question_a = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='+')
+    question_b = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='+')
+    similarity = models.FloatField(help_text="Estimated Jaccard similarity")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
+    
+    detected_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Q{self.question_a_id} ~ Q{self.question_b_id} ({self.similarity:.0%})"
+    
+    class Meta:
+        db_table = 'questions_duplicatequestionpair'
+        verbose_name = 'Duplicate Question Pair'
+        verbose_name_plural = 'Duplicate Question Pairs'
+        ordering = ['-similarity']
+        unique_together = ['question_a', 'question_b']
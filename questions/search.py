@@ -0,0 +1,207 @@
+"""
+Full-text search over the question bank.
+
+PostgreSQL uses the ``search_vector`` column with a GIN index, SQLite uses
+an FTS5 virtual table keyed by question id. Both are maintained by the
+question/choice signals and by the bulk importer, so search never scans
+``Question.text``.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, When, Value, F, FloatField, ExpressionWrapper
+
+FTS_TABLE = 'questions_question_fts'
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def annotate_success_rate(queryset):
+    """Same value as Question.success_rate, computed in the database"""
+    return queryset.annotate(
+        success_rate_value=Case(
+            When(times_answered=0, then=Value(0.0)),
+            default=ExpressionWrapper(
+                F('times_correct') * 100.0 / F('times_answered'),
+                output_field=FloatField()
+            ),
+            output_field=FloatField(),
+        )
+    )
+
+
+def filter_questions(queryset, category=None, difficulty=None, question_type=None,
+                     min_success_rate=None, max_success_rate=None):
+    if category:
+        queryset = queryset.filter(test__category_id=category)
+    if difficulty:
+        queryset = queryset.filter(difficulty=difficulty)
+    if question_type:
+        queryset = queryset.filter(question_type=question_type)
+    if min_success_rate is not None or max_success_rate is not None:
+        queryset = annotate_success_rate(queryset)
+        if min_success_rate is not None:
+            queryset = queryset.filter(success_rate_value__gte=min_success_rate)
+        if max_success_rate is not None:
+            queryset = queryset.filter(success_rate_value__lte=max_success_rate)
+    return queryset
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class BaseSearchBackend:
+    batch_size = 500
+
+    def index_questions(self, question_ids):
+        """(Re)index the given questions"""
+
+    def remove_questions(self, question_ids):
+        """Drop deleted questions from the index"""
+
+    def rebuild(self):
+        from .models import Question
+
+        self.clear()
+        ids = list(Question.objects.values_list('pk', flat=True))
+        for chunk in _chunks(ids, self.batch_size):
+            self.index_questions(chunk)
+        return len(ids)
+
+    def clear(self):
+        pass
+
+    def search(self, query, queryset, limit):
+        """Return [(question_id, rank)] best first, restricted to ``queryset``"""
+        raise NotImplementedError
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """tsvector column weighted text (A) > choices (B) > explanation (C)"""
+
+    def index_questions(self, question_ids):
+        config = settings.QUESTION_SEARCH_CONFIG
+        with connection.cursor() as cursor:
+            for chunk in _chunks(list(question_ids), self.batch_size):
+                cursor.execute(
+                    """
+                    UPDATE questions_question q SET search_vector =
+                        setweight(to_tsvector(%s::regconfig, coalesce(q.text, '')), 'A') ||
+                        setweight(to_tsvector(%s::regconfig, coalesce((
+                            SELECT string_agg(c.text, ' ') FROM questions_choice c
+                            WHERE c.question_id = q.id
+                        ), '')), 'B') ||
+                        setweight(to_tsvector(%s::regconfig, coalesce(q.explanation, '')), 'C')
+                    WHERE q.id = ANY(%s)
+                    """,
+                    [config, config, config, list(chunk)]
+                )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE questions_question SET search_vector = NULL")
+
+    def search(self, query, queryset, limit):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        search_query = SearchQuery(query, config=settings.QUESTION_SEARCH_CONFIG, search_type='websearch')
+        return list(
+            queryset.filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F('search_vector'), search_query))
+            .order_by('-rank', 'pk')
+            .values_list('pk', 'rank')[:limit]
+        )
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """FTS5 table whose rowid is the question id, ranked with bm25()"""
+
+    def _documents(self, question_ids):
+        from .models import Question, Choice
+
+        choices = {}
+        for question_id, text in Choice.objects.filter(question_id__in=question_ids).values_list('question_id', 'text'):
+            choices.setdefault(question_id, []).append(text)
+        for pk, text, explanation in Question.objects.filter(pk__in=question_ids).values_list('pk', 'text', 'explanation'):
+            yield pk, text, ' '.join(choices.get(pk, ())), explanation
+
+    def index_questions(self, question_ids):
+        with connection.cursor() as cursor:
+            for chunk in _chunks(list(question_ids), self.batch_size):
+                cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in chunk])
+                cursor.executemany(
+                    f"INSERT INTO {FTS_TABLE} (rowid, text, choices, explanation) VALUES (%s, %s, %s, %s)",
+                    list(self._documents(chunk))
+                )
+
+    def remove_questions(self, question_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in question_ids])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+    @staticmethod
+    def match_expression(query):
+        """Quote every token (AND semantics) and prefix-match the last one"""
+        tokens = TOKEN_RE.findall(query)
+        if not tokens:
+            return None
+        terms = [f'"{token}"' for token in tokens]
+        terms[-1] += '*'
+        return ' '.join(terms)
+
+    def search(self, query, queryset, limit):
+        expression = self.match_expression(query)
+        if expression is None:
+            return []
+
+        # The ORM filters run inside the FTS query as a rowid subquery, so
+        # bm25() ranks only the questions the caller may see
+        allowed_sql, allowed_params = queryset.order_by().values('pk').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, bm25({FTS_TABLE}, 10.0, 4.0, 1.0) AS score FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND rowid IN ({allowed_sql}) ORDER BY score, rowid LIMIT %s",
+                [expression, *allowed_params, limit]
+            )
+            # bm25() is lower-is-better; expose higher-is-better like ts_rank
+            return [(pk, -score) for pk, score in cursor.fetchall()]
+
+
+class FallbackSearchBackend(BaseSearchBackend):
+    """Unindexed substring search for other database vendors"""
+
+    def search(self, query, queryset, limit):
+        return [(pk, 1.0) for pk in queryset.filter(text__icontains=query).values_list('pk', flat=True)[:limit]]
+
+
+def get_search_backend():
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    if connection.vendor == 'sqlite':
+        return SQLiteSearchBackend()
+    return FallbackSearchBackend()
+
+
+def index_questions(question_ids):
+    question_ids = [pk for pk in question_ids if pk is not None]
+    if question_ids:
+        get_search_backend().index_questions(question_ids)
+
+
+def remove_questions(question_ids):
+    get_search_backend().remove_questions(list(question_ids))
+
+
+def search_questions(query, queryset=None, limit=None, **filters):
+    """Ranked [(question_id, rank)] for ``query`` with the bank filters applied"""
+    from .models import Question
+
+    if queryset is None:
+        queryset = Question.objects.all()
+    queryset = filter_questions(queryset, **filters)
+    return get_search_backend().search(query, queryset, limit or settings.QUESTION_SEARCH_MAX_RESULTS)
@@ -1,5 +1,14 @@
+from django.core import signing
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.storage import default_storage
 from rest_framework import serializers
+from buxoro_test_system.images import image_sources, validate_image_upload
+from buxoro_test_system.storage import read_upload_key
 from .models import Question, Choice, QuestionAnswer
+from . import search
+
+# Storage prefix for images uploaded directly by clients
+DIRECT_UPLOAD_ROOT = 'uploads/questions'
 
 
 class ChoiceSerializer(serializers.ModelSerializer):
@@ -14,37 +23,85 @@ class QuestionSerializer(serializers.ModelSerializer):
     """Serializer for Question model"""
     choices = ChoiceSerializer(many=True, read_only=True)
     test_title = serializers.CharField(source='test.title', read_only=True)
+    image_sources = serializers.SerializerMethodField()
     
     class Meta:
         model = Question
-        fields = ['id', 'test', 'test_title', 'question_type', 'text', 'image',
-                 'points', 'order', 'explanation', 'correct_answer', 'choices',
+        fields = ['id', 'test', 'test_title', 'question_type', 'text', 'image', 'image_sources',
+                 'points', 'difficulty', 'order', 'choices',
                  'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
+    
+    def get_image_sources(self, obj):
+        return image_sources(obj.image, obj.image_hash, obj.image_widths, self.context.get('request'))
+
+
+class ImageKeyMixin(serializers.Serializer):
+    """
+    ``image_key``: signed storage key of an image the client uploaded
+    directly (QuestionImageUploadAPIView), attached instead of a multipart
+    ``image``. Only the user the key was issued to can attach it.
+    """
+    image_key = serializers.CharField(write_only=True, required=False, max_length=512)
+
+    def validate_image_key(self, value):
+        try:
+            key = read_upload_key(value, self.context['request'].user)
+        except signing.BadSignature:
+            raise serializers.ValidationError('Invalid upload key.')
+        if not default_storage.exists(key):
+            raise serializers.ValidationError('Upload not found.')
+        # The client wrote the bytes itself; check them like a multipart upload
+        try:
+            with default_storage.open(key, 'rb') as upload:
+                validate_image_upload(upload)
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError(exc.messages)
+        return key
+
+    def attach_image_key(self, instance, image_key):
+        if image_key:
+            instance.image = image_key
+            # Processed like a fresh upload (buxoro_test_system.images.reset_if_replaced)
+            instance._direct_upload = True
+
+    def update(self, instance, validated_data):
+        self.attach_image_key(instance, validated_data.pop('image_key', None))
+        return super().update(instance, validated_data)
 
 
-class QuestionDetailSerializer(QuestionSerializer):
+class QuestionDetailSerializer(ImageKeyMixin, QuestionSerializer):
     """Detailed serializer for Question model"""
     
     class Meta(QuestionSerializer.Meta):
-        fields = QuestionSerializer.Meta.fields + ['explanation']
+        fields = QuestionSerializer.Meta.fields + ['explanation', 'image_key']
 
 
-class QuestionCreateSerializer(serializers.ModelSerializer):
+class QuestionCreateSerializer(ImageKeyMixin, serializers.ModelSerializer):
     """Serializer for creating questions"""
     choices = ChoiceSerializer(many=True, required=False)
     
     class Meta:
         model = Question
-        fields = ['test', 'question_type', 'text', 'image', 'points', 
-                 'order', 'explanation', 'correct_answer', 'choices']
+        fields = ['test', 'question_type', 'text', 'image', 'image_key', 'points', 'difficulty',
+                 'order', 'explanation', 'choices']
     
     def create(self, validated_data):
         choices_data = validated_data.pop('choices', [])
-        question = Question.objects.create(**validated_data)
+        validated_data.setdefault('created_by', self.context['request'].user)
+        image_key = validated_data.pop('image_key', None)
+        question = Question(**validated_data)
+        self.attach_image_key(question, image_key)
+        question.save(force_insert=True)
         
-        for choice_data in choices_data:
-            Choice.objects.create(question=question, **choice_data)
+        # One INSERT for all choices instead of one per choice
+        Choice.objects.bulk_create([
+            Choice(question=question, **choice_data)
+            for choice_data in choices_data
+        ])
+        if choices_data:
+            # bulk_create skips post_save: index the choice texts too
+            search.index_questions([question.pk])
         
         return question
 
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from buxoro_test_system import images
+from .models import Question, Choice
+from . import search
+from .irt import bump_calibration_version
+
+
+@receiver(post_save, sender=Question)
+def index_question(sender, instance, created=False, update_fields=None, **kwargs):
+    """
+    Keep the full-text index current; statistics-only saves don't touch it
+    """
+    if created:
+        # New questions join the preloaded adaptive item pools
+        bump_calibration_version()
+    if update_fields and not {'text', 'explanation'} & set(update_fields):
+        return
+    search.index_questions([instance.pk])
+
+
+@receiver(pre_save, sender=Question)
+def detect_new_question_image(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._process_image = images.reset_if_replaced(instance, 'image', 'image_hash', 'image_widths')
+
+
+@receiver(post_save, sender=Question)
+def process_question_image(sender, instance, raw=False, **kwargs):
+    """
+    Resize new uploads in the background after commit
+    """
+    if not raw and getattr(instance, '_process_image', False):
+        instance._process_image = False
+        images.schedule_processing(
+            instance, 'image', 'image_hash', 'image_widths', settings.QUESTION_IMAGE_WIDTHS
+        )
+
+
+@receiver(post_delete, sender=Question)
+def unindex_question(sender, instance, **kwargs):
+    search.remove_questions([instance.pk])
+    bump_calibration_version()
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def reindex_choice_question(sender, instance, **kwargs):
+    """
+    Choice texts are part of the question's search document
+    """
+    search.index_questions([instance.question_id])
@@ -0,0 +1,99 @@
+"""
+Merging t-digest for streaming quantiles (Dunning & Ertl).
+
+A digest is a short list of (mean, weight) centroids. Centroids near the
+median may hold many points while those near the tails stay small, so
+median and tail quantiles stay accurate with a bounded amount of state.
+Digests are mergeable: adding a batch of values or another digest
+produces the same kind of summary, which is what lets question timing
+statistics be updated per attempt without rescanning old answers.
+
+Stored as JSON: ``[[mean, weight], ...]`` sorted by mean.
+"""
+import math
+
+DEFAULT_COMPRESSION = 100
+
+
+def _k(q, compression):
+    """k1 scale function: centroids get smaller towards q = 0 and q = 1"""
+    return compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+
+class TDigest:
+    def __init__(self, centroids=None, compression=DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.centroids = [(float(mean), float(weight)) for mean, weight in (centroids or ())]
+
+    @classmethod
+    def from_list(cls, data, compression=DEFAULT_COMPRESSION):
+        return cls(data or (), compression=compression)
+
+    def to_list(self, precision=3):
+        return [[round(mean, precision), round(weight, precision)] for mean, weight in self.centroids]
+
+    @property
+    def count(self):
+        return sum(weight for mean, weight in self.centroids)
+
+    def __len__(self):
+        return len(self.centroids)
+
+    def update(self, values):
+        """Add a batch of raw values"""
+        self._compress(self.centroids + [(float(value), 1.0) for value in values])
+        return self
+
+    def merge(self, other):
+        self._compress(self.centroids + other.centroids)
+        return self
+
+    def _compress(self, points):
+        points.sort()
+        total = sum(weight for mean, weight in points)
+        if not total:
+            self.centroids = []
+            return
+
+        merged = []
+        mean, weight = points[0]
+        done = 0.0
+        limit = _k(0.0, self.compression) + 1
+        for next_mean, next_weight in points[1:]:
+            q = (done + weight + next_weight) / total
+            if _k(min(q, 1.0), self.compression) <= limit:
+                # Still within the size bound of the current centroid
+                weight += next_weight
+                mean += (next_mean - mean) * next_weight / weight
+            else:
+                merged.append((mean, weight))
+                done += weight
+                limit = _k(done / total, self.compression) + 1
+                mean, weight = next_mean, next_weight
+        merged.append((mean, weight))
+        self.centroids = merged
+
+    def quantile(self, q):
+        """Estimated q-quantile (0 <= q <= 1), or None for an empty digest"""
+        if not self.centroids:
+            return None
+        if len(self.centroids) == 1:
+            return self.centroids[0][0]
+
+        total = self.count
+        target = q * total
+        cumulative = 0.0
+        previous_mean, previous_mid = None, None
+        for mean, weight in self.centroids:
+            mid = cumulative + weight / 2
+            if target <= mid:
+                if previous_mean is None:
+                    return mean
+                fraction = (target - previous_mid) / (mid - previous_mid)
+                return previous_mean + fraction * (mean - previous_mean)
+            previous_mean, previous_mid = mean, mid
+            cumulative += weight
+        return self.centroids[-1][0]
+
+    def median(self):
+        return self.quantile(0.5)
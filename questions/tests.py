@@ -1,3 +1,425 @@
-from django.test import TestCase
+import io
+import json
+import shutil
+import tempfile
 
-# Create your tests here.
+import numpy as np
+from PIL import Image
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from examinations.models import Category, Test, TestAttempt
+from . import dedup, irt
+from .importers import ImportFormatError, import_questions, iter_json_rows, validate_row
+from .models import Choice, DuplicateQuestionPair, ItemCalibration, Question, QuestionAnswer, QuestionSignature
+from .search import search_questions
+from .tdigest import TDigest
+
+
+def make_test(teacher, title='Algebra', category=None):
+    category = category or Category.objects.get_or_create(name='Matematika')[0]
+    return Test.objects.create(
+        title=title, description='Test', category=category, time_limit=30, pass_mark=60, created_by=teacher
+    )
+
+
+def add_question(test, text, choices=('Javob',), question_type='single_choice', **kwargs):
+    """Question with the first choice correct"""
+    question = Question.objects.create(
+        test=test, question_type=question_type, text=text, order=test.questions.count() + 1,
+        created_by=test.created_by, **kwargs
+    )
+    for position, choice in enumerate(choices, start=1):
+        Choice.objects.create(question=question, text=choice, is_correct=position == 1, order=position)
+    return question
+
+
+def upload(content, name):
+    fileobj = io.BytesIO(content.encode() if isinstance(content, str) else content)
+    fileobj.name = name
+    return fileobj
+
+
+CSV_BANK = (
+    "text,question_type,points,choice_1,choice_2,choice_3,correct\n"
+    "2+2?,single_choice,1,3,4,5,2\n"
+    "Tub sonlar,multiple_choice,2,2,3,4,\"1,2\"\n"
+)
+
+
+class QuestionImportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user('teacher', password='x', role='teacher')
+        self.test = make_test(self.teacher)
+
+    def test_csv_import_appends_questions_with_choices(self):
+        Question.objects.create(
+            test=self.test, question_type='essay', text='Mavjud', order=7, created_by=self.teacher
+        )
+        report = import_questions(upload(CSV_BANK, 'bank.csv'), 'bank.csv', self.test, self.teacher)
+        self.assertTrue(report.ok)
+        self.assertEqual((report.imported_questions, report.imported_choices), (2, 6))
+        questions = list(self.test.questions.order_by('order'))
+        self.assertEqual([question.order for question in questions], [7, 8, 9])
+        self.assertEqual(
+            list(questions[2].choices.filter(is_correct=True).values_list('text', flat=True)), ['2', '3']
+        )
+
+    def test_dry_run_reports_row_errors_and_writes_nothing(self):
+        bank = CSV_BANK + ",single_choice,1,a,b,,1\nBo'sh,single_choice,1,a,b,,3\n"
+        report = import_questions(upload(bank, 'bank.csv'), 'bank.csv', self.test, self.teacher, dry_run=True)
+        self.assertEqual(report.total_rows, 4)
+        self.assertEqual(report.valid_rows, 2)
+        self.assertEqual([error.line for error in report.errors], [4, 5])
+        self.assertIn('text: required', report.errors[0].messages)
+        self.assertFalse(Question.objects.exists())
+
+    def test_any_invalid_row_rolls_the_import_back(self):
+        bank = CSV_BANK + "Yomon,numeric,1,,,,\n"
+        report = import_questions(upload(bank, 'bank.csv'), 'bank.csv', self.test, self.teacher)
+        self.assertFalse(report.ok)
+        self.assertEqual(report.imported_questions, 0)
+        self.assertFalse(Question.objects.exists())
+        self.assertFalse(Choice.objects.exists())
+
+    def test_json_array_is_streamed_in_small_chunks(self):
+        items = [
+            {'text': f'Savol {number}', 'question_type': 'true_false',
+             'choices': [{'text': 'Ha', 'is_correct': True}, {'text': "Yo'q"}]}
+            for number in range(50)
+        ]
+        items.append({'text': 'Son', 'question_type': 'numeric', 'numeric_answer': '3,5'})
+        rows = list(iter_json_rows(io.BytesIO(json.dumps(items, indent=2).encode()), chunk_size=64))
+        self.assertEqual(len(rows), 51)
+        self.assertEqual(rows[-1], (51, items[-1]))
+
+        report = import_questions(upload(json.dumps(items), 'bank.json'), 'bank.json', self.test, self.teacher,
+                                  batch_size=20)
+        self.assertEqual(report.imported_questions, 51)
+        self.assertEqual(Question.objects.get(text='Son').numeric_answer, 3.5)
+
+    def test_unreadable_files_raise_format_errors(self):
+        with self.assertRaises(ImportFormatError):
+            import_questions(upload('{}', 'bank.json'), 'bank.json', self.test, self.teacher)
+        with self.assertRaises(ImportFormatError):
+            import_questions(upload('x', 'bank.txt'), 'bank.txt', self.test, self.teacher)
+
+    def test_out_of_range_numbers_are_row_errors(self):
+        for value in ('inf', '-inf', 'nan', '1e30', '2147483648'):
+            data, errors = validate_row({'text': 'Q', 'question_type': 'essay', 'points': value})
+            self.assertTrue(any(error.startswith('points:') for error in errors), value)
+        data, errors = validate_row({'text': 'Q', 'question_type': 'numeric', 'numeric_answer': 'inf'})
+        self.assertTrue(any(error.startswith('numeric_answer:') for error in errors))
+        data, errors = validate_row({'text': 'Q', 'question_type': 'essay', 'time_limit': '90.0'})
+        self.assertEqual((data['time_limit'], errors), (90, []))
+
+    def test_choices_are_rejected_for_other_question_types(self):
+        data, errors = validate_row({'text': 'Insho', 'question_type': 'essay', 'choice_1': 'a', 'choice_2': 'b'})
+        self.assertIn('choices: essay questions do not take choices', errors)
+        data, errors = validate_row({
+            'text': 'Son', 'question_type': 'numeric', 'numeric_answer': 4, 'choices': [{'text': '4'}],
+        })
+        self.assertIn('choices: numeric questions do not take choices', errors)
+
+    def test_import_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+        url = f'/api/questions/tests/{self.test.pk}/import/'
+        response = client.post(url, {'file': upload(CSV_BANK, 'bank.csv'), 'dry_run': 'true'}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['valid_rows'], 2)
+
+        bad = CSV_BANK + "X,single_choice,inf,a,b,,1\n"
+        response = client.post(url, {'file': upload(bad, 'bank.csv')}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'][0]['line'], 4)
+
+        response = client.post(url, {'file': upload(CSV_BANK, 'bank.csv')}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.test.questions.count(), 2)
+
+        other = User.objects.create_user('other', password='x', role='teacher')
+        client.force_authenticate(other)
+        response = client.post(url, {'file': upload(CSV_BANK, 'bank.csv')}, format='multipart')
+        self.assertEqual(response.status_code, 404)
+
+
+class QuestionSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user('teacher', password='x', role='teacher')
+        self.other = User.objects.create_user('other', password='x', role='teacher')
+        self.test = make_test(self.teacher)
+        self.physics = make_test(self.other, 'Fizika', Category.objects.create(name='Fizika'))
+
+    def add(self, test, text, choice='Javob', **kwargs):
+        return add_question(test, text, choices=[choice], **kwargs)
+
+    def test_ranks_text_matches_above_choice_matches(self):
+        in_text = self.add(self.test, 'Kvadrat tenglamani yeching')
+        in_choice = self.add(self.test, 'Qaysi biri tenglama?', choice='Kvadrat tenglama')
+        self.add(self.test, 'Uchburchak yuzi')
+        ranked = search_questions('kvadrat')
+        self.assertEqual([pk for pk, rank in ranked], [in_text.pk, in_choice.pk])
+        self.assertGreater(ranked[0][1], ranked[1][1])
+        self.assertEqual({pk for pk, rank in search_questions('tengl')}, {in_text.pk, in_choice.pk})
+
+    def test_edits_and_deletes_keep_the_index_current(self):
+        question = self.add(self.test, 'Uchburchak yuzi')
+        question.text = 'Doira yuzi'
+        question.save()
+        self.assertEqual(search_questions('uchburchak'), [])
+        self.assertEqual([pk for pk, rank in search_questions('doira')], [question.pk])
+        question.delete()
+        self.assertEqual(search_questions('doira'), [])
+
+    def test_filters(self):
+        easy = self.add(self.test, 'Kvadrat ildiz', difficulty='easy', times_answered=10, times_correct=9)
+        hard = self.add(self.test, 'Kvadrat ildiz', difficulty='hard', times_answered=10, times_correct=2)
+        physics = self.add(self.physics, 'Kvadrat ildiz')
+        ids = lambda **filters: {pk for pk, rank in search_questions('ildiz', **filters)}
+        self.assertEqual(ids(), {easy.pk, hard.pk, physics.pk})
+        self.assertEqual(ids(difficulty='hard'), {hard.pk})
+        self.assertEqual(ids(category=self.physics.category_id), {physics.pk})
+        self.assertEqual(ids(min_success_rate=50), {easy.pk})
+        self.assertEqual(ids(max_success_rate=50), {hard.pk, physics.pk})
+
+    def test_restricted_queryset_is_not_crowded_out_by_better_matches(self):
+        for number in range(30):
+            self.add(self.physics, f'Kvadrat kvadrat kvadrat {number}')
+        own = self.add(self.test, 'Bu savolda kvadrat so\'zi bor, lekin matn ancha uzunroq yozilgan')
+        ranked = search_questions('kvadrat', queryset=Question.objects.filter(created_by=self.teacher), limit=5)
+        self.assertEqual([pk for pk, rank in ranked], [own.pk])
+        self.assertEqual(len(search_questions('kvadrat', limit=5)), 5)
+
+    def test_search_endpoint(self):
+        question = self.add(self.test, 'Kvadrat tenglamani yeching')
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+        response = client.get('/api/questions/questions/search/', {'q': 'kvadrat', 'difficulty': 'medium'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.json()['results']], [question.pk])
+        self.assertEqual(client.get('/api/questions/questions/search/').status_code, 400)
+        response = client.get('/api/questions/questions/search/', {'q': 'kvadrat', 'min_success_rate': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_choices_created_through_the_api_are_searchable(self):
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+        response = client.post('/api/questions/questions/', {
+            'test': self.test.pk, 'question_type': 'single_choice', 'text': 'Poytaxt qaysi?', 'order': 1,
+            'choices': [{'text': 'Toshkentbek', 'is_correct': True, 'order': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([pk for pk, rank in search_questions('Toshkentbek')], [Question.objects.get().pk])
+
+
+class DuplicateDetectionTests(TestCase):
+    TEXT = 'Quyidagi tenglamaning ildizlarini toping va ularning yig\'indisini hisoblang: x2 - 5x + 6 = 0'
+
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='x', role='teacher')
+        self.test = make_test(self.teacher)
+
+    def test_documents_ignore_case_punctuation_and_choice_order(self):
+        first = dedup.question_document('Poytaxt qaysi?', ['Buxoro', 'Toshkent'])
+        second = dedup.question_document('POYTAXT  qaysi', ['toshkent.', 'Buxoro'])
+        self.assertEqual(first, second)
+        self.assertEqual(dedup.content_hash(first), dedup.content_hash(second))
+
+    def test_signature_similarity_tracks_jaccard(self):
+        words = [f'soz{number}' for number in range(60)]
+        first = ' '.join(words)
+        second = ' '.join(words[:54] + [f'boshqa{number}' for number in range(6)])
+        a, b = dedup.shingles(first), dedup.shingles(second)
+        jaccard = len(a & b) / len(a | b)
+        estimate = (dedup.minhash(first) == dedup.minhash(second)).mean()
+        self.assertAlmostEqual(estimate, jaccard, delta=0.15)
+        unrelated = ' '.join(f'yangi{number}' for number in range(60))
+        self.assertLess((dedup.minhash(first) == dedup.minhash(unrelated)).mean(), 0.1)
+
+    def test_finds_near_duplicates_and_keeps_reviews(self):
+        original = add_question(self.test, self.TEXT, choices=['5', '6', '7'])
+        copy = add_question(self.test, self.TEXT + '.', choices=['7', '5', '6'])
+        add_question(self.test, 'Uchburchakning ichki burchaklari yig\'indisi nechaga teng?', choices=['180', '90'])
+
+        report = dedup.find_duplicates()
+        self.assertEqual((report.questions, report.signatures_updated, report.new_pairs), (3, 3, 1))
+        pair = DuplicateQuestionPair.objects.get()
+        self.assertEqual((pair.question_a_id, pair.question_b_id), (original.pk, copy.pk))
+        self.assertEqual(pair.similarity, 1.0)
+
+        pair.status = 'dismissed'
+        pair.save()
+        report = dedup.find_duplicates()
+        self.assertEqual((report.signatures_updated, report.new_pairs), (0, 0))
+        self.assertEqual(DuplicateQuestionPair.objects.get().status, 'dismissed')
+
+    def test_edited_questions_drop_open_pairs(self):
+        add_question(self.test, self.TEXT, choices=['5', '6'])
+        copy = add_question(self.test, self.TEXT, choices=['5', '6'])
+        dedup.find_duplicates()
+        self.assertEqual(DuplicateQuestionPair.objects.count(), 1)
+
+        copy.text = 'Butunlay boshqa savol: Amir Temur qaysi yili tug\'ilgan va qayerda dafn etilgan?'
+        copy.save()
+        report = dedup.find_duplicates()
+        self.assertEqual(report.signatures_updated, 1)
+        self.assertFalse(DuplicateQuestionPair.objects.exists())
+        self.assertEqual(QuestionSignature.objects.count(), 2)
+
+
+class ItemCalibrationTests(TestCase):
+    def simulate(self, persons=500, items=40, per_person=30, seed=1):
+        rng = np.random.default_rng(seed)
+        a = rng.uniform(0.7, 2.0, items)
+        b = rng.normal(0.0, 1.0, items)
+        theta = rng.normal(0.0, 1.0, persons)
+        person_index = np.repeat(np.arange(persons), per_person)
+        item_index = np.concatenate([rng.choice(items, per_person, replace=False) for _ in range(persons)])
+        p = irt.probability(theta[person_index], a[item_index], b[item_index])
+        correct = (rng.random(len(p)) < p).astype(np.int8)
+        return a, b, theta, person_index, item_index, correct
+
+    def test_fit_recovers_known_parameters(self):
+        a, b, theta, persons, items, correct = self.simulate()
+        fit = irt.fit_2pl(persons, items, correct, len(theta), len(a))
+        self.assertTrue(fit.converged)
+        self.assertGreater(np.corrcoef(fit.difficulty, b)[0, 1], 0.95)
+        self.assertGreater(np.corrcoef(fit.discrimination, a)[0, 1], 0.6)
+        self.assertGreater(np.corrcoef(fit.theta, theta)[0, 1], 0.85)
+        self.assertLess(np.abs(fit.difficulty - b).mean(), 0.35)
+
+    def test_perfect_scores_stay_finite(self):
+        fit = irt.fit_2pl([0, 0, 1, 1], [0, 1, 0, 1], [1, 1, 0, 0], 2, 2)
+        self.assertTrue(np.isfinite(fit.theta).all())
+        self.assertLessEqual(np.abs(fit.theta).max(), irt.THETA_LIMIT)
+
+    def test_calibration_is_stored_and_invalidates_pools(self):
+        cache.clear()
+        teacher = User.objects.create_user('teacher', password='x', role='teacher')
+        test = make_test(teacher)
+        a, b, theta, persons, items, correct = self.simulate(persons=120, items=6, per_person=6, seed=2)
+        questions = [add_question(test, f'Savol {number}', choices=['a', 'b']) for number in range(6)]
+        essay = add_question(test, 'Insho', choices=[], question_type='essay')
+        students = User.objects.bulk_create([User(username=f'student{n}', role='student') for n in range(len(theta))])
+        attempts = TestAttempt.objects.bulk_create([TestAttempt(test=test, user=student) for student in students])
+        QuestionAnswer.objects.bulk_create(
+            [QuestionAnswer(attempt=attempts[person], question=questions[item], is_correct=bool(flag))
+             for person, item, flag in zip(persons, items, correct)]
+            + [QuestionAnswer(attempt=attempt, question=essay) for attempt in attempts]
+        )
+
+        version = irt.calibration_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            report = irt.calibrate_items(min_responses=30)
+        self.assertEqual((report.items, report.persons, report.responses), (6, 120, 720))
+        self.assertEqual(ItemCalibration.objects.count(), 6)
+        self.assertFalse(ItemCalibration.objects.filter(question=essay).exists())
+        self.assertGreater(irt.calibration_version(), version)
+
+        ids, discrimination, difficulty = irt.item_parameters(test.questions.all())
+        self.assertEqual(list(ids), [question.pk for question in questions] + [essay.pk])
+        self.assertEqual((discrimination[-1], difficulty[-1]), (1.0, 0.0))
+
+    def test_imports_invalidate_pools(self):
+        cache.clear()
+        teacher = User.objects.create_user('teacher', password='x', role='teacher')
+        test = make_test(teacher)
+        version = irt.calibration_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            import_questions(upload(CSV_BANK, 'bank.csv'), 'bank.csv', test, teacher, dry_run=True)
+        self.assertEqual(irt.calibration_version(), version)
+        with self.captureOnCommitCallbacks(execute=True):
+            import_questions(upload(CSV_BANK, 'bank.csv'), 'bank.csv', test, teacher)
+        self.assertGreater(irt.calibration_version(), version)
+
+
+class TDigestTests(SimpleTestCase):
+    def setUp(self):
+        self.values = np.random.default_rng(7).lognormal(3.5, 0.6, 20000)
+        self.ordered = np.sort(self.values)
+
+    def rank(self, value):
+        return np.searchsorted(self.ordered, value) / len(self.ordered)
+
+    def test_streamed_quantiles_are_accurate(self):
+        digest = TDigest()
+        for batch in np.array_split(self.values, 400):
+            # Stored and reloaded between batches, as per finished attempt
+            digest = TDigest.from_list(digest.to_list()).update(batch.tolist())
+        self.assertEqual(digest.count, len(self.values))
+        self.assertLess(len(digest), 100)
+        for q, tolerance in ((0.01, 0.002), (0.1, 0.005), (0.5, 0.005), (0.9, 0.005), (0.99, 0.002)):
+            self.assertAlmostEqual(self.rank(digest.quantile(q)), q, delta=tolerance)
+
+    def test_merged_digests_agree(self):
+        halves = [TDigest().update(half.tolist()) for half in np.array_split(self.values, 2)]
+        merged = halves[0].merge(halves[1])
+        self.assertEqual(merged.count, len(self.values))
+        self.assertAlmostEqual(self.rank(merged.median()), 0.5, delta=0.005)
+
+    def test_small_and_empty_digests(self):
+        self.assertIsNone(TDigest().median())
+        self.assertEqual(TDigest().update([42]).median(), 42.0)
+        self.assertEqual(TDigest().update([10, 20, 30]).median(), 20.0)
+        self.assertEqual(TDigest.from_list(None).count, 0)
+
+
+class DirectImageUploadTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.teacher = User.objects.create_user('teacher', password='x', role='teacher')
+        self.question = add_question(make_test(self.teacher), '2+2?')
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def start_upload(self, client=None):
+        response = (client or self.client).post('/api/questions/uploads/', {'filename': 'rasm.png'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def attach(self, image_key, client=None):
+        return (client or self.client).patch(
+            f'/api/questions/questions/{self.question.pk}/', {'image_key': image_key}, format='json'
+        )
+
+    def test_signed_key_is_attached(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (20, 10)).save(buffer, 'PNG')
+        started = self.start_upload()
+        response = self.client.post(started['url'], {'file': upload(buffer.getvalue(), 'rasm.png')})
+        self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(self.attach(started['key']).status_code, 400)
+        self.assertEqual(self.attach(started['image_key']).status_code, 200)
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.image.name, started['key'])
+
+    def test_keys_of_other_users_are_rejected(self):
+        started = self.start_upload()
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user('admin', password='x', role='admin'))
+        response = self.attach(started['image_key'], client=other)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image_key', response.json())
+
+    def test_uploaded_bytes_are_checked_before_attaching(self):
+        # A bucket upload never passes through the API's own checks
+        started = self.start_upload()
+        default_storage.save(started['key'], ContentFile(b'not an image'))
+        response = self.attach(started['image_key'])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image_key', response.json())
+        self.question.refresh_from_db()
+        self.assertFalse(self.question.image)
@@ -2,14 +2,15 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.http import HttpResponse
 import csv
-from .models import TestResult, Certificate, UserProgress
+from .models import TestResult, Certificate, UserProgress, AnalyticsReport, TeacherStudent
+from .verification import certificate_index
 
 
 @admin.register(TestResult)
 class TestResultAdmin(admin.ModelAdmin):
     list_display = ('attempt', 'points_earned', 'percentage_score', 'grade_letter', 'is_passed', 'created_at')
     list_filter = ('is_passed', 'grade_letter', 'created_at')
-    search_fields = ('attempt__user__username', 'attempt__test__title')
+    search_fields = ('user__username', 'test__title')
     readonly_fields = ('created_at', 'updated_at')
     
     fieldsets = (
@@ -79,8 +80,11 @@ class CertificateAdmin(admin.ModelAdmin):
     actions = ['revoke_certificates', 'export_certificates']
     
     def revoke_certificates(self, request, queryset):
-        queryset.update(is_valid=False)
-        self.message_user(request, f"{queryset.count()} sertifikat bekor qilindi.")
+        # update() bypasses post_save, so drop the codes from the verification index here
+        codes = [code for pair in queryset.values_list('certificate_number', 'verification_code') for code in pair]
+        revoked = queryset.update(is_verified=False)
+        certificate_index.discard(*codes)
+        self.message_user(request, f"{revoked} sertifikat bekor qilindi.")
     revoke_certificates.short_description = "Sertifikatlarni bekor qilish"
     
     def export_certificates(self, request, queryset):
@@ -131,3 +135,40 @@ class UserProgressAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(TeacherStudent)
+class TeacherStudentAdmin(admin.ModelAdmin):
+    list_display = ('teacher', 'student', 'first_completed_at', 'last_completed_at')
+    list_filter = ('student__school_class',)
+    search_fields = ('teacher__username', 'student__username', 'student__student_id')
+    raw_id_fields = ('teacher', 'student')
+
+
+@admin.register(AnalyticsReport)
+class AnalyticsReportAdmin(admin.ModelAdmin):
+    list_display = ('title', 'report_type', 'start_date', 'end_date', 'total_completions', 'average_score', 'pass_rate', 'is_automated', 'generated_at')
+    list_filter = ('report_type', 'is_automated', 'category', 'generated_at')
+    search_fields = ('title', 'user_group')
+    readonly_fields = ('generated_at',)
+    date_hierarchy = 'start_date'
+    
+    fieldsets = (
+        ('Hisobot', {
+            'fields': ('report_type', 'title', 'description', 'start_date', 'end_date')
+        }),
+        ('Qamrov', {
+            'fields': ('test', 'category', 'user_group')
+        }),
+        ('Ko\'rsatkichlar', {
+            'fields': ('total_attempts', 'total_completions', 'average_score', 'median_score', 'pass_rate')
+        }),
+        ('Batafsil tahlil', {
+            'fields': ('score_distribution', 'time_analytics', 'question_analytics', 'user_performance',
+                       'performance_trends', 'improvement_recommendations'),
+            'classes': ('collapse',)
+        }),
+        ('Fayllar', {
+            'fields': ('report_pdf', 'report_excel', 'generated_by', 'is_automated', 'generated_at')
+        }),
+    )
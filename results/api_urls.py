@@ -1,6 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .api_views import TestResultViewSet, CertificateViewSet, UserProgressViewSet
+from .api_views import (
+    TestResultViewSet, CertificateViewSet, UserProgressViewSet, CertificateVerifyAPIView, AnalyticsTrendsAPIView,
+    AnalyticsReportDownloadAPIView,
+)
 
 router = DefaultRouter()
 router.register(r'results', TestResultViewSet, basename='testresult')
@@ -8,5 +11,9 @@ router.register(r'certificates', CertificateViewSet, basename='certificate')
 router.register(r'progress', UserProgressViewSet, basename='userprogress')
 
 urlpatterns = [
+    # Public verification for employers and universities
+    path('certificates/verify/<str:code>/', CertificateVerifyAPIView.as_view(), name='certificate_verify'),
+    path('reports/<int:pk>/<str:kind>/', AnalyticsReportDownloadAPIView.as_view(), name='report_download'),
+    path('analytics/trends/', AnalyticsTrendsAPIView.as_view(), name='analytics_trends'),
     path('', include(router.urls)),
 ]
@@ -1,11 +1,23 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.http import HttpResponse
+from rest_framework.views import APIView
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
 from django.db.models import Q
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
 import csv
-from .models import TestResult, Certificate, UserProgress
+import datetime
+from accounts.permissions import IsTeacherOrAdmin
+from accounts.ratelimit import limit_request
+from buxoro_test_system.storage import download_redirect
+from .models import AnalyticsReport, AttemptRollup
+from .rollups import rollup_series, day_range
+from .scope import certificates_for, progress_for, results_for
 from .serializers import TestResultSerializer, CertificateSerializer, UserProgressSerializer
+from .verification import build_verification_payload, verify_certificate
 
 
 class TestResultViewSet(viewsets.ReadOnlyModelViewSet):
@@ -13,13 +25,7 @@ class TestResultViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        user = self.request.user
-        if user.role == 'admin':
-            return TestResult.objects.all()
-        elif user.role == 'teacher':
-            return TestResult.objects.filter(attempt__test__created_by=user)
-        else:  # student
-            return TestResult.objects.filter(attempt__student=user)
+        return results_for(self.request.user).select_related('user', 'test')
     
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
@@ -32,13 +38,13 @@ class TestResultViewSet(viewsets.ReadOnlyModelViewSet):
         
         for result in queryset:
             writer.writerow([
-                result.attempt.test.title,
-                result.attempt.student.get_full_name(),
-                result.total_score,
-                f"{result.percentage:.1f}%",
-                result.grade,
+                result.test.title,
+                result.user.get_full_name(),
+                result.points_earned,
+                f"{result.percentage_score:.1f}%",
+                result.grade_letter,
                 'O\'tdi' if result.is_passed else 'O\'tmadi',
-                result.completed_at.strftime('%Y-%m-%d %H:%M')
+                timezone.localtime(result.created_at).strftime('%Y-%m-%d %H:%M')
             ])
         
         return response
@@ -49,42 +55,118 @@ class CertificateViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        user = self.request.user
-        if user.role == 'admin':
-            return Certificate.objects.all()
-        elif user.role == 'teacher':
-            return Certificate.objects.filter(test__created_by=user)
-        else:  # student
-            return Certificate.objects.filter(student=user)
+        return certificates_for(self.request.user)
     
     @action(detail=True, methods=['get'])
     def verify(self, request, pk=None):
         certificate = self.get_object()
-        if certificate.is_valid:
-            return Response({
-                'valid': True,
-                'certificate_id': certificate.certificate_id,
-                'student': certificate.student.get_full_name(),
-                'test': certificate.test.title,
-                'score': certificate.score,
-                'issued_at': certificate.issued_at
-            })
+        if certificate.is_verified:
+            return Response(build_verification_payload(certificate))
         else:
             return Response({'valid': False}, status=status.HTTP_404_NOT_FOUND)
 
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Redirect to a signed URL of the certificate PDF"""
+        certificate = self.get_object()
+        return download_redirect(certificate.certificate_pdf, f"{certificate.certificate_number}.pdf")
+
+
+class CertificateVerifyAPIView(APIView):
+    """Public certificate lookup by verification code or certificate number"""
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def get(self, request, code):
+        limit_request('certificate_ip', request)
+
+        payload = verify_certificate(code)
+        if payload is None:
+            response = Response({'valid': False}, status=status.HTTP_404_NOT_FOUND)
+            # Short lifetime so a freshly issued certificate verifies soon
+            max_age = min(60, settings.CERTIFICATE_VERIFY_CACHE_TIMEOUT)
+        else:
+            response = Response(payload)
+            max_age = settings.CERTIFICATE_VERIFY_CACHE_TIMEOUT
+
+        patch_cache_control(response, public=True, max_age=max_age)
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+
+class AnalyticsReportDownloadAPIView(APIView):
+    """Redirect to a signed URL of a report's XLSX or PDF file"""
+    permission_classes = [IsTeacherOrAdmin]
+    files = {'excel': ('report_excel', 'xlsx'), 'pdf': ('report_pdf', 'pdf')}
+
+    def get(self, request, pk, kind):
+        if kind not in self.files:
+            raise Http404('Unknown report file')
+        field_name, extension = self.files[kind]
+        reports = AnalyticsReport.objects.only('id', 'report_type', 'start_date', field_name)
+        user = request.user
+        if user.role == 'teacher' and not user.is_superuser:
+            reports = reports.filter(Q(generated_by=user) | Q(test__created_by=user))
+        report = get_object_or_404(reports, pk=pk)
+        filename = f"report-{report.pk}-{report.report_type}-{report.start_date}.{extension}"
+        return download_redirect(getattr(report, field_name), filename)
+
+
+class AnalyticsTrendsAPIView(APIView):
+    """Completed-attempt time series read from the rollup tables"""
+    permission_classes = [IsTeacherOrAdmin]
+    
+    DEFAULT_DAYS = 30
+    MAX_HOURLY_DAYS = 31
+    
+    def get(self, request):
+        params = request.query_params
+        granularity = params.get('granularity', 'day')
+        group_by = params.get('group_by') or None
+        if granularity not in ('day', 'hour'):
+            return Response({'error': "granularity must be 'day' or 'hour'"}, status=status.HTTP_400_BAD_REQUEST)
+        if group_by not in (None, 'test', 'category', 'school_class'):
+            return Response({'error': "group_by must be 'test', 'category' or 'school_class'"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            end_date = datetime.date.fromisoformat(params['end']) if params.get('end') else timezone.localdate()
+            start_date = (datetime.date.fromisoformat(params['start']) if params.get('start')
+                          else end_date - datetime.timedelta(days=self.DEFAULT_DAYS - 1))
+            test_id = int(params['test']) if params.get('test') else None
+            category_id = int(params['category']) if params.get('category') else None
+        except ValueError:
+            return Response({'error': 'Invalid date or id'}, status=status.HTTP_400_BAD_REQUEST)
+        if end_date < start_date:
+            return Response({'error': 'end is before start'}, status=status.HTTP_400_BAD_REQUEST)
+        if granularity == 'hour' and (end_date - start_date).days >= self.MAX_HOURLY_DAYS:
+            return Response({'error': f'Hourly series are limited to {self.MAX_HOURLY_DAYS} days'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        rollups = AttemptRollup.objects.all()
+        user = request.user
+        if user.role == 'teacher' and not user.is_superuser:
+            rollups = rollups.filter(test__created_by=user)
+        
+        series = rollup_series(
+            granularity,
+            *day_range(start_date, end_date),
+            test=test_id,
+            category=category_id,
+            school_class=params.get('school_class') or None,
+            group_by=group_by,
+            queryset=rollups,
+        )
+        return Response({
+            'granularity': granularity,
+            'start': start_date.isoformat(),
+            'end': end_date.isoformat(),
+            'series': series,
+        })
+
 
 class UserProgressViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = UserProgressSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        user = self.request.user
-        if user.role == 'admin':
-            return UserProgress.objects.all()
-        elif user.role == 'teacher':
-            # O'qituvchilar faqat o'z testlarini topshirgan o'quvchilarni ko'radi
-            return UserProgress.objects.filter(
-                user__testresult__attempt__test__created_by=user
-            ).distinct()
-        else:  # student
-            return UserProgress.objects.filter(user=user)
+        # O'qituvchilar faqat o'z testlarini topshirgan o'quvchilarni ko'radi
+        return progress_for(self.request.user).select_related('user')
@@ -5,3 +5,6 @@ class ResultsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "results"
     verbose_name = "Test Results & Analytics"
+    
+    def ready(self):
+        import results.signals
@@ -0,0 +1,26 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from results.rollups import backfill_rollups, day_range
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the hourly/daily attempt rollups from TestAttempt history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=datetime.date.fromisoformat,
+                            help='First day to rebuild (default: all history)')
+        parser.add_argument('--end', type=datetime.date.fromisoformat,
+                            help='Last day to rebuild (inclusive)')
+
+    def handle(self, *args, **options):
+        start = end = None
+        if options['start'] or options['end']:
+            if not (options['start'] and options['end']):
+                raise CommandError('--start and --end must be given together')
+            if options['end'] < options['start']:
+                raise CommandError('--end is before --start')
+            start, end = day_range(options['start'], options['end'])
+
+        rows, elapsed = backfill_rollups(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} rollup rows in {elapsed:.2f}s"))
@@ -0,0 +1,59 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from examinations.models import Category, Test
+from results.models import AnalyticsReport
+from results.reports import generate_report
+
+REPORT_TYPES = [value for value, label in AnalyticsReport.REPORT_TYPES]
+
+
+class Command(BaseCommand):
+    help = 'Generate an AnalyticsReport (with XLSX/PDF files) for a period and scope'
+
+    def add_arguments(self, parser):
+        parser.add_argument('report_type', choices=REPORT_TYPES)
+        parser.add_argument('--date', type=datetime.date.fromisoformat,
+                            help='Any day inside the daily/weekly/monthly period (default: today)')
+        parser.add_argument('--start', type=datetime.date.fromisoformat, help='Start date for custom reports')
+        parser.add_argument('--end', type=datetime.date.fromisoformat, help='End date for custom reports')
+        parser.add_argument('--test', type=int, help='Test id')
+        parser.add_argument('--category', type=int, help='Category id')
+        parser.add_argument('--group', default='', help='User group (school class), e.g. 9-A')
+        parser.add_argument('--no-files', action='store_true', help='Skip the XLSX/PDF artifacts')
+
+    def handle(self, *args, **options):
+        report_type = options['report_type']
+        if report_type == 'custom':
+            if not (options['start'] and options['end']):
+                raise CommandError('Custom reports need --start and --end')
+            start_date, end_date = options['start'], options['end']
+        else:
+            start_date, end_date = options['date'], None
+
+        try:
+            test = Test.objects.get(pk=options['test']) if options['test'] else None
+            category = Category.objects.get(pk=options['category']) if options['category'] else None
+        except (Test.DoesNotExist, Category.DoesNotExist) as exc:
+            raise CommandError(str(exc))
+
+        try:
+            report, elapsed = generate_report(
+                report_type,
+                start_date=start_date,
+                end_date=end_date,
+                test=test,
+                category=category,
+                user_group=options['group'],
+                write_files=not options['no_files'],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(
+            f"{report.title}: {report.total_attempts} attempts, {report.total_completions} completed, "
+            f"average {report.average_score}, median {report.median_score}, pass rate {report.pass_rate}%"
+        )
+        if report.report_excel:
+            self.stdout.write(f"Files: {report.report_excel.name}, {report.report_pdf.name}")
+        self.stdout.write(self.style.SUCCESS(f"Report #{report.pk} generated in {elapsed:.2f}s"))
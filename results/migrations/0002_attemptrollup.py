@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('examinations', '0003_alter_test_test_type'),
+        ('results', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttemptRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hourly'), ('day', 'Daily')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('school_class', models.CharField(blank=True, max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('pass_count', models.IntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0.0)),
+                ('score_sq_sum', models.FloatField(default=0.0)),
+                ('time_sum', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='examinations.category')),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='examinations.test')),
+            ],
+            options={
+                'verbose_name': 'Attempt Rollup',
+                'verbose_name_plural': 'Attempt Rollups',
+                'db_table': 'results_attemptrollup',
+                'indexes': [models.Index(fields=['granularity', 'category', 'bucket_start'], name='results_att_granula_00980d_idx'), models.Index(fields=['granularity', 'test', 'bucket_start'], name='results_att_granula_bba295_idx'), models.Index(fields=['granularity', 'bucket_start'], name='results_att_granula_c1efb4_idx')],
+                'unique_together': {('granularity', 'bucket_start', 'test', 'school_class')},
+            },
+        ),
+    ]
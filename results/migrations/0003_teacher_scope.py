@@ -0,0 +1,101 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models.functions import Coalesce
+
+
+def backfill_teacher_scope(apps, schema_editor):
+    TestResult = apps.get_model('results', 'TestResult')
+    TestAttempt = apps.get_model('examinations', 'TestAttempt')
+    TeacherStudent = apps.get_model('results', 'TeacherStudent')
+
+    attempt = TestAttempt.objects.filter(pk=models.OuterRef('attempt_id'))
+    TestResult.objects.update(
+        user_id=models.Subquery(attempt.values('user_id')[:1]),
+        test_id=models.Subquery(attempt.values('test_id')[:1]),
+        owner_id=models.Subquery(attempt.values('test__created_by_id')[:1]),
+    )
+
+    links = (
+        TestAttempt.objects.filter(status='completed')
+        .annotate(completed_at=Coalesce('finished_at', 'started_at'))
+        .order_by()
+        .values('test__created_by_id', 'user_id')
+        .annotate(first=models.Min('completed_at'), last=models.Max('completed_at'))
+    )
+    TeacherStudent.objects.bulk_create(
+        (
+            TeacherStudent(
+                teacher_id=row['test__created_by_id'], student_id=row['user_id'],
+                first_completed_at=row['first'], last_completed_at=row['last'],
+            )
+            for row in links.iterator(chunk_size=5000)
+        ),
+        batch_size=2000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('examinations', '0003_alter_test_test_type'),
+        ('results', '0002_attemptrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeacherStudent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_completed_at', models.DateTimeField()),
+                ('last_completed_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Teacher Student',
+                'verbose_name_plural': 'Teacher Students',
+                'db_table': 'results_teacherstudent',
+            },
+        ),
+        migrations.AddField(
+            model_name='testresult',
+            name='owner',
+            field=models.ForeignKey(editable=False, help_text='Creator of the test at the time of the attempt', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='owned_results', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='testresult',
+            name='test',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='results', to='examinations.test'),
+        ),
+        migrations.AddField(
+            model_name='testresult',
+            name='user',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='test_results', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='testresult',
+            index=models.Index(fields=['owner', '-created_at'], name='results_tes_owner_i_ec2378_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testresult',
+            index=models.Index(fields=['user', '-created_at'], name='results_tes_user_id_459fc1_idx'),
+        ),
+        migrations.AddField(
+            model_name='teacherstudent',
+            name='student',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='teacher_links', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='teacherstudent',
+            name='teacher',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_links', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='teacherstudent',
+            unique_together={('teacher', 'student')},
+        ),
+        migrations.RunPython(backfill_teacher_scope, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,8 @@ from django.contrib.auth import get_user_model
 from django.utils import timezone
 import uuid
 
+from buxoro_test_system.tracing import traced
+
 User = get_user_model()
 
 
@@ -14,6 +16,13 @@ class TestResult(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     attempt = models.OneToOneField('examinations.TestAttempt', on_delete=models.CASCADE, related_name='result')
     
+    # Copied from the attempt so role-scoped listings filter on one indexed column
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='test_results', null=True, editable=False)
+    test = models.ForeignKey('examinations.Test', on_delete=models.CASCADE, related_name='results', null=True,
+                             editable=False)
+    owner = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='owned_results', null=True,
+                              editable=False, help_text="Creator of the test at the time of the attempt")
+    
     # Detailed scoring
     total_questions = models.PositiveIntegerField()
     correct_answers = models.PositiveIntegerField(default=0)
@@ -60,11 +69,20 @@ class TestResult(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    @traced('result.save', attempt='self')
     def save(self, *args, **kwargs):
+        if self.user_id is None or self.test_id is None:
+            self.fill_scope_fields()
         if not self.certificate_number and self.is_passed and not self.certificate_issued:
             self.generate_certificate_number()
         super().save(*args, **kwargs)
     
+    def fill_scope_fields(self):
+        attempt = self.attempt
+        self.user_id = attempt.user_id
+        self.test_id = attempt.test_id
+        self.owner_id = attempt.test.created_by_id
+    
     def generate_certificate_number(self):
         """Generate unique certificate number"""
         year = timezone.now().year
@@ -106,6 +124,10 @@ class TestResult(models.Model):
         verbose_name = 'Test Result'
         verbose_name_plural = 'Test Results'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['owner', '-created_at']),
+            models.Index(fields=['user', '-created_at']),
+        ]
 
 
 class Certificate(models.Model):
@@ -142,10 +164,24 @@ class Certificate(models.Model):
         data = f"{self.certificate_number}{self.recipient_name}{self.completion_date}"
         return hashlib.sha256(data.encode()).hexdigest()[:20].upper()
     
+    # Columns the verification index depends on; post_save compares them
+    # against ``_loaded_values`` so unrelated saves leave the index alone
+    TRACKED_FIELDS = ('certificate_number', 'verification_code', 'is_verified')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values) if name in cls.TRACKED_FIELDS
+        }
+        return instance
+    
+    @traced('certificate.save')
     def save(self, *args, **kwargs):
         if not self.verification_code:
             self.verification_code = self.generate_verification_code()
         super().save(*args, **kwargs)
+        self._loaded_values = {name: getattr(self, name) for name in self.TRACKED_FIELDS}
     
     def __str__(self):
         return f"Certificate: {self.certificate_number} - {self.recipient_name}"
@@ -218,6 +254,54 @@ class AnalyticsReport(models.Model):
         ordering = ['-generated_at']
 
 
+class AttemptRollup(models.Model):
+    """
+    Completed-attempt aggregates per time bucket, test and school class.
+    Maintained incrementally by results.rollups; rebuild with backfill_rollups.
+    """
+    GRANULARITIES = (
+        ('hour', 'Hourly'),
+        ('day', 'Daily'),
+    )
+    
+    granularity = models.CharField(max_length=4, choices=GRANULARITIES)
+    bucket_start = models.DateTimeField()
+    test = models.ForeignKey('examinations.Test', on_delete=models.CASCADE, related_name='rollups')
+    category = models.ForeignKey('examinations.Category', on_delete=models.CASCADE, related_name='rollups')
+    school_class = models.CharField(max_length=10, blank=True)
+    
+    # Additive aggregates, so buckets can be summed into any coarser view
+    attempts = models.IntegerField(default=0)
+    pass_count = models.IntegerField(default=0)
+    score_sum = models.FloatField(default=0.0)
+    score_sq_sum = models.FloatField(default=0.0)
+    time_sum = models.BigIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    @property
+    def average_score(self):
+        return self.score_sum / self.attempts if self.attempts else 0.0
+    
+    @property
+    def pass_rate(self):
+        return self.pass_count * 100.0 / self.attempts if self.attempts else 0.0
+    
+    def __str__(self):
+        return f"{self.granularity} {self.bucket_start:%Y-%m-%d %H:%M} - {self.test_id} {self.school_class}"
+    
+    class Meta:
+        db_table = 'results_attemptrollup'
+        verbose_name = 'Attempt Rollup'
+        verbose_name_plural = 'Attempt Rollups'
+        unique_together = ['granularity', 'bucket_start', 'test', 'school_class']
+        indexes = [
+            models.Index(fields=['granularity', 'category', 'bucket_start']),
+            models.Index(fields=['granularity', 'test', 'bucket_start']),
+            models.Index(fields=['granularity', 'bucket_start']),
+        ]
+
+
 class UserProgress(models.Model):
     """
     Track individual user progress across multiple tests
@@ -306,3 +390,23 @@ class UserProgress(models.Model):
         verbose_name_plural = 'User Progress Records'
         unique_together = ['user', 'category']
         ordering = ['-updated_at']
+
+
+class TeacherStudent(models.Model):
+    """
+    Which students have completed a test of which teacher.
+    Maintained on attempt completion (results.scope).
+    """
+    teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name='student_links')
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='teacher_links')
+    first_completed_at = models.DateTimeField()
+    last_completed_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.teacher.username} -> {self.student.username}"
+    
+    class Meta:
+        db_table = 'results_teacherstudent'
+        verbose_name = 'Teacher Student'
+        verbose_name_plural = 'Teacher Students'
+        unique_together = ['teacher', 'student']
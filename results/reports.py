@@ -0,0 +1,387 @@
+"""
+AnalyticsReport generation.
+
+A report covers a date range (daily, weekly, monthly or custom) and is
+optionally scoped to a test, a category and a user group (school class).
+All metrics come from two queries: a narrow projection of the attempts in
+scope and one GROUP BY question over their answers. Distributions,
+medians and per-class breakdowns are then computed with NumPy on the
+projected columns, so the cost is dominated by the database scan. Daily
+trends are read from the AttemptRollup buckets (see results.rollups).
+
+Attempts fall in the period of their completion time, like the rollups:
+``finished_at``, or ``started_at`` for attempts that have not finished.
+
+XLSX and PDF artifacts are written to the report's FileFields.
+
+NumPy, openpyxl and reportlab are imported by the functions that use
+them: Celery workers import this module (via results.tasks) at boot.
+"""
+import datetime
+import io
+import time
+from xml.sax.saxutils import escape
+
+from django.core.files.base import ContentFile
+from django.db.models import Count, Q, Avg
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from buxoro_test_system.storage import save_files
+from buxoro_test_system.tracing import traced
+from examinations.models import TestAttempt
+from questions.models import Question, QuestionAnswer
+from .models import AnalyticsReport
+from .rollups import rollup_series, day_range
+
+SCORE_BINS = list(range(0, 101, 10))
+TOP_QUESTIONS = 10
+HARD_QUESTION_RATE = 40.0
+
+
+def report_period(report_type, day=None):
+    """(start_date, end_date) of the daily/weekly/monthly period containing ``day``"""
+    day = day or timezone.localdate()
+    if report_type == 'daily':
+        return day, day
+    if report_type == 'weekly':
+        start = day - datetime.timedelta(days=day.weekday())
+        return start, start + datetime.timedelta(days=6)
+    if report_type == 'monthly':
+        start = day.replace(day=1)
+        next_month = (start + datetime.timedelta(days=32)).replace(day=1)
+        return start, next_month - datetime.timedelta(days=1)
+    raise ValueError(f"Unknown report type '{report_type}'")
+
+
+def previous_period(report_type, today=None):
+    """The last complete period before ``today``"""
+    today = today or timezone.localdate()
+    if report_type == 'daily':
+        return report_period('daily', today - datetime.timedelta(days=1))
+    if report_type == 'weekly':
+        return report_period('weekly', today - datetime.timedelta(days=7))
+    return report_period('monthly', today.replace(day=1) - datetime.timedelta(days=1))
+
+
+def scoped_attempts(start_date, end_date, test=None, category=None, user_group=''):
+    start, end = day_range(start_date, end_date)
+    attempts = TestAttempt.objects.annotate(
+        completed_at=Coalesce('finished_at', 'started_at')
+    ).filter(completed_at__gte=start, completed_at__lt=end)
+    if test is not None:
+        attempts = attempts.filter(test=test)
+    if category is not None:
+        attempts = attempts.filter(test__category=category)
+    if user_group:
+        attempts = attempts.filter(school_class=user_group)
+    return attempts
+
+
+def _percent(part, whole):
+    return round(100.0 * float(part) / float(whole), 2) if whole else 0.0
+
+
+def _load_attempts(attempts):
+    """Projected attempt columns as NumPy arrays"""
+    import numpy as np
+
+    rows = list(attempts.order_by().values_list(
+        'status', 'percentage_score', 'time_spent', 'is_passed', 'test__time_limit', 'school_class',
+    ))
+    if not rows:
+        return None
+    status, score, spent, passed, limit, group = zip(*rows)
+    return {
+        'completed': np.array(status) == 'completed',
+        'score': np.array(score, dtype=np.float64),
+        'time_spent': np.array(spent, dtype=np.float64),
+        'passed': np.array(passed, dtype=bool),
+        'time_limit': np.array(limit, dtype=np.float64) * 60,
+        'group': np.array([value or '' for value in group]),
+    }
+
+
+def _grouped(keys, columns):
+    """Per-key count, score sum and pass count via a single sort"""
+    import numpy as np
+
+    labels, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    inverse = inverse.ravel()
+    score_sum = np.bincount(inverse, weights=columns['score'], minlength=len(labels))
+    passed = np.bincount(inverse, weights=columns['passed'].astype(np.float64), minlength=len(labels))
+    return labels, counts, score_sum, passed
+
+
+def compute_attempt_metrics(data):
+    """Summary, distribution, timing and per-group metrics"""
+    import numpy as np
+
+    if data is None:
+        return {
+            'total_attempts': 0, 'total_completions': 0, 'average_score': 0.0, 'median_score': 0.0,
+            'pass_rate': 0.0, 'score_distribution': {}, 'time_analytics': {}, 'user_performance': {},
+        }
+
+    completed = data['completed']
+    done = {name: column[completed] for name, column in data.items()}
+    scores = done['score']
+    total = int(completed.sum())
+
+    histogram, _ = np.histogram(scores, bins=SCORE_BINS)
+    score_distribution = {
+        f"{low}-{high}": int(count)
+        for low, high, count in zip(SCORE_BINS[:-1], SCORE_BINS[1:], histogram)
+    }
+
+    time_analytics = {}
+    if total:
+        spent = done['time_spent']
+        limits = done['time_limit']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            efficiency = np.where(limits > 0, spent / limits * 100, np.nan)
+        time_analytics = {
+            'average_seconds': round(float(spent.mean()), 1),
+            'median_seconds': round(float(np.median(spent)), 1),
+            'p90_seconds': round(float(np.percentile(spent, 90)), 1),
+            'min_seconds': int(spent.min()),
+            'max_seconds': int(spent.max()),
+            'average_time_used_percent': round(float(np.nanmean(efficiency)), 1) if np.isfinite(efficiency).any() else None,
+            'finished_in_last_10_percent': int((efficiency >= 90).sum()),
+        }
+
+    user_performance = {}
+    if total:
+        labels, counts, score_sum, passed = _grouped(done['group'], done)
+        user_performance = {
+            (str(label) or 'unassigned'): {
+                'completions': int(count),
+                'average_score': round(float(total_score / count), 2),
+                'pass_rate': _percent(float(passed_count), count),
+            }
+            for label, count, total_score, passed_count in zip(labels, counts, score_sum, passed)
+        }
+
+    return {
+        'total_attempts': len(completed),
+        'total_completions': total,
+        'average_score': round(float(scores.mean()), 2) if total else 0.0,
+        'median_score': round(float(np.median(scores)), 2) if total else 0.0,
+        'pass_rate': _percent(int(done['passed'].sum()), total),
+        'score_distribution': score_distribution,
+        'time_analytics': time_analytics,
+        'user_performance': user_performance,
+    }
+
+
+def compute_question_metrics(attempts):
+    """Per-question success rates from one GROUP BY over the answers in scope"""
+    import numpy as np
+
+    rows = list(
+        QuestionAnswer.objects.filter(attempt__in=attempts.values('pk'))
+        .values('question_id')
+        .annotate(answered=Count('id'), correct=Count('id', filter=Q(is_correct=True)), avg_time=Avg('time_spent'))
+        .order_by()
+        .values_list('question_id', 'answered', 'correct', 'avg_time')
+    )
+    if not rows:
+        return {'questions': 0, 'answers': 0}, []
+
+    ids, answered, correct, avg_time = (np.array(column, dtype=np.float64) for column in zip(*rows))
+    ids = ids.astype(np.int64)
+    rate = correct / answered * 100
+
+    order = np.lexsort((-answered, rate))
+    hardest = order[:TOP_QUESTIONS]
+    easiest = order[::-1][:TOP_QUESTIONS]
+    texts = dict(Question.objects.filter(pk__in=ids[np.concatenate([hardest, easiest])].tolist()).values_list('pk', 'text'))
+
+    def describe(index):
+        pk = int(ids[index])
+        return {
+            'question_id': pk,
+            'text': (texts.get(pk) or '')[:200],
+            'answered': int(answered[index]),
+            'success_rate': round(float(rate[index]), 1),
+            'average_time': round(float(avg_time[index] or 0), 1),
+        }
+
+    histogram, _ = np.histogram(rate, bins=SCORE_BINS)
+    analytics = {
+        'questions': len(ids),
+        'answers': int(answered.sum()),
+        'average_success_rate': round(float(rate.mean()), 1),
+        'success_rate_distribution': {
+            f"{low}-{high}": int(count) for low, high, count in zip(SCORE_BINS[:-1], SCORE_BINS[1:], histogram)
+        },
+        'hardest': [describe(index) for index in hardest],
+        'easiest': [describe(index) for index in easiest],
+    }
+
+    recommendations = [
+        f"Review question #{item['question_id']}: only {item['success_rate']}% answered correctly"
+        for item in analytics['hardest'] if item['success_rate'] < HARD_QUESTION_RATE
+    ]
+    return analytics, recommendations
+
+
+def report_title(report_type, start_date, end_date, test=None, category=None, user_group=''):
+    scope = test.title if test else (category.name if category else 'Barcha testlar')
+    if user_group:
+        scope = f"{scope}, {user_group}"
+    if start_date == end_date:
+        return f"{scope}: {start_date}"
+    return f"{scope}: {start_date} - {end_date}"
+
+
+@traced('results.report')
+def generate_report(report_type, start_date=None, end_date=None, test=None, category=None, user_group='',
+                    generated_by=None, is_automated=False, write_files=True):
+    """Compute and store an AnalyticsReport; returns (report, elapsed_seconds)"""
+    started = time.perf_counter()
+    if report_type == 'custom':
+        if start_date is None or end_date is None:
+            raise ValueError("Custom reports need a start and end date")
+    elif start_date is None:
+        start_date, end_date = report_period(report_type)
+    elif end_date is None:
+        start_date, end_date = report_period(report_type, start_date)
+    if end_date < start_date:
+        raise ValueError("End date is before start date")
+
+    attempts = scoped_attempts(start_date, end_date, test=test, category=category, user_group=user_group)
+    metrics = compute_attempt_metrics(_load_attempts(attempts))
+    question_analytics, recommendations = compute_question_metrics(attempts)
+    metrics['performance_trends'] = {
+        'daily': rollup_series('day', *day_range(start_date, end_date), test=test, category=category,
+                               school_class=user_group or None),
+    }
+
+    report = AnalyticsReport(
+        report_type=report_type,
+        title=report_title(report_type, start_date, end_date, test, category, user_group),
+        start_date=start_date,
+        end_date=end_date,
+        test=test,
+        category=category,
+        user_group=user_group or '',
+        question_analytics=question_analytics,
+        improvement_recommendations=recommendations,
+        generated_by=generated_by,
+        is_automated=is_automated,
+        **metrics
+    )
+    report.save()
+
+    if write_files:
+        write_artifacts(report)
+    return report, time.perf_counter() - started
+
+
+# Artifacts -------------------------------------------------------------
+
+def _summary_rows(report):
+    return [
+        ('Hisobot', report.title),
+        ('Davr', f"{report.start_date} - {report.end_date}"),
+        ('Urinishlar', report.total_attempts),
+        ('Yakunlangan', report.total_completions),
+        ("O'rtacha ball", report.average_score),
+        ('Mediana', report.median_score),
+        ("O'tish darajasi (%)", report.pass_rate),
+    ]
+
+
+def render_excel(report):
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+
+    sheet = workbook.create_sheet('Umumiy')
+    for row in _summary_rows(report):
+        sheet.append(row)
+    for key, value in report.time_analytics.items():
+        sheet.append((key, value))
+
+    sheet = workbook.create_sheet('Ballar taqsimoti')
+    sheet.append(('Oraliq', 'Soni'))
+    for bucket, count in report.score_distribution.items():
+        sheet.append((bucket, count))
+
+    sheet = workbook.create_sheet('Savollar')
+    sheet.append(('ID', 'Savol', 'Javoblar', "To'g'ri (%)", "O'rtacha vaqt (s)", ''))
+    for label in ('hardest', 'easiest'):
+        for item in report.question_analytics.get(label, []):
+            sheet.append((item['question_id'], item['text'], item['answered'], item['success_rate'],
+                          item['average_time'], label))
+
+    sheet = workbook.create_sheet('Sinflar')
+    sheet.append(('Sinf', 'Yakunlangan', "O'rtacha ball", "O'tish (%)"))
+    for group, values in report.user_performance.items():
+        sheet.append((group, values['completions'], values['average_score'], values['pass_rate']))
+
+    sheet = workbook.create_sheet('Dinamika')
+    sheet.append(('Sana', 'Yakunlangan', "O'rtacha ball", "O'tish (%)"))
+    for point in report.performance_trends.get('daily', []):
+        sheet.append((point['date'], point['completions'], point['average_score'], point['pass_rate']))
+
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def render_pdf(report):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    table_style = TableStyle([
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#e9ecef')),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ])
+
+    # Paragraph parses ReportLab markup; test titles and other stored text are escaped
+    story = [Paragraph(escape(report.title), styles['Title']), Spacer(1, 12)]
+    story.append(Table([(label, str(value)) for label, value in _summary_rows(report)], hAlign='LEFT'))
+    story.append(Spacer(1, 12))
+
+    if report.score_distribution:
+        story.append(Paragraph('Ballar taqsimoti', styles['Heading2']))
+        rows = [('Oraliq', 'Soni')] + list(report.score_distribution.items())
+        story.append(Table(rows, hAlign='LEFT', style=table_style))
+
+    hardest = report.question_analytics.get('hardest', [])
+    if hardest:
+        story.append(Paragraph('Eng qiyin savollar', styles['Heading2']))
+        rows = [('ID', 'Savol', "To'g'ri (%)")] + [
+            (item['question_id'], item['text'][:80], item['success_rate']) for item in hardest
+        ]
+        story.append(Table(rows, hAlign='LEFT', style=table_style))
+
+    if report.user_performance:
+        story.append(Paragraph('Sinflar kesimida', styles['Heading2']))
+        rows = [('Sinf', 'Yakunlangan', "O'rtacha ball", "O'tish (%)")] + [
+            (group, values['completions'], values['average_score'], values['pass_rate'])
+            for group, values in report.user_performance.items()
+        ]
+        story.append(Table(rows, hAlign='LEFT', style=table_style))
+
+    for recommendation in report.improvement_recommendations:
+        story.append(Paragraph(escape(recommendation), styles['Normal']))
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=A4, title=report.title).build(story)
+    return buffer.getvalue()
+
+
+def write_artifacts(report):
+    name = f"report-{report.pk}-{report.report_type}-{report.start_date}"
+    save_files([
+        (report.report_excel, f"{name}.xlsx", ContentFile(render_excel(report))),
+        (report.report_pdf, f"{name}.pdf", ContentFile(render_pdf(report))),
+    ])
+    report.save(update_fields=['report_excel', 'report_pdf'])
@@ -0,0 +1,228 @@
+"""
+Incremental time-series rollups of completed attempts.
+
+Every completed attempt contributes to one hourly and one daily
+AttemptRollup row keyed by (bucket, test, school class). The rows only
+hold additive values (count, pass count, score sum, sum of squares, time
+sum), so any chart is a GROUP BY over a few hundred buckets instead of a
+scan over every attempt, and mean/standard deviation/pass rate are derived
+from the sums.
+
+Buckets are in the project's local time and use the completion time
+(``finished_at``, or ``started_at`` when it is missing). The school class
+is the one stored on the attempt at completion (``TestAttempt.school_class``),
+so moving a student to another class leaves their past buckets alone.
+"""
+import datetime
+import time
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, Trunc
+from django.utils import timezone
+
+from buxoro_test_system.tracing import traced
+from .models import AttemptRollup
+
+GRANULARITIES = ('hour', 'day')
+
+
+def bucket_start(moment, granularity):
+    local = timezone.localtime(moment)
+    if granularity == 'hour':
+        return local.replace(minute=0, second=0, microsecond=0)
+    return local.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _contribution(values):
+    """Rollup deltas of one attempt given its status/score/time values, or None"""
+    if values.get('status') != 'completed':
+        return None
+    score = values.get('percentage_score') or 0.0
+    return {
+        'attempts': 1,
+        'pass_count': 1 if values.get('is_passed') else 0,
+        'score_sum': score,
+        'score_sq_sum': score * score,
+        'time_sum': values.get('time_spent') or 0,
+    }
+
+
+def _apply(key, deltas, sign):
+    """Add (sign=1) or remove (sign=-1) one contribution in both granularities"""
+    updates = {name: F(name) + sign * value for name, value in deltas.items()}
+    for granularity in GRANULARITIES:
+        lookup = {
+            'granularity': granularity,
+            'bucket_start': bucket_start(key['moment'], granularity),
+            'test_id': key['test_id'],
+            'school_class': key['school_class'],
+        }
+        if AttemptRollup.objects.filter(**lookup).update(**updates) or sign < 0:
+            continue
+        try:
+            with transaction.atomic():
+                AttemptRollup.objects.create(category_id=key['category_id'], **lookup, **deltas)
+        except IntegrityError:
+            # Another worker created the bucket first
+            AttemptRollup.objects.filter(**lookup).update(**updates)
+
+
+def _attempt_key(attempt, values):
+    return {
+        'moment': values.get('finished_at') or attempt.started_at,
+        'test_id': attempt.test_id,
+        'category_id': attempt.test.category_id,
+        'school_class': values.get('school_class') or '',
+    }
+
+
+def current_values(attempt):
+    return {name: getattr(attempt, name) for name in attempt.TRACKED_FIELDS}
+
+
+@traced('results.rollup', attempt='attempt')
+def record_attempt_change(attempt, previous=None):
+    """
+    Move the attempt's contribution from its loaded state to its current one.
+
+    ``previous`` is the snapshot taken when the attempt was loaded (None for
+    new attempts). Nothing is written unless a completed attempt appears,
+    disappears or changes its score, pass flag, time or completion time.
+    """
+    current = current_values(attempt)
+    before = _contribution(previous or {})
+    after = _contribution(current)
+    if before == after and (before is None or all(
+        previous.get(name) == current[name] for name in ('finished_at', 'school_class')
+    )):
+        return False
+    if before is not None:
+        _apply(_attempt_key(attempt, previous), before, -1)
+    if after is not None:
+        _apply(_attempt_key(attempt, current), after, 1)
+    return True
+
+
+def remove_attempt(attempt, values):
+    """Take back the contribution of an attempt about to be deleted, given its stored values"""
+    deltas = _contribution(values)
+    if deltas is not None:
+        _apply(_attempt_key(attempt, values), deltas, -1)
+
+
+def backfill_rollups(start=None, end=None):
+    """
+    Rebuild rollups from TestAttempt history with one grouped query per
+    granularity. ``start``/``end`` are aware datetimes aligned to days;
+    without them every bucket is rebuilt. Returns (rows, elapsed_seconds).
+    """
+    from examinations.models import TestAttempt
+
+    started = time.perf_counter()
+    attempts = TestAttempt.objects.filter(status='completed').annotate(
+        completed_at=Coalesce('finished_at', 'started_at')
+    )
+    existing = AttemptRollup.objects.all()
+    if start is not None:
+        attempts = attempts.filter(completed_at__gte=start)
+        existing = existing.filter(bucket_start__gte=start)
+    if end is not None:
+        attempts = attempts.filter(completed_at__lt=end)
+        existing = existing.filter(bucket_start__lt=end)
+
+    rows = []
+    for granularity in GRANULARITIES:
+        grouped = (
+            attempts.annotate(
+                bucket=Trunc('completed_at', granularity),
+                group=F('school_class'),
+            )
+            .order_by()
+            .values('bucket', 'test_id', 'test__category_id', 'group')
+            .annotate(
+                attempts_count=Count('pk'),
+                passed=Count('pk', filter=Q(is_passed=True)),
+                scores=Sum('percentage_score'),
+                scores_sq=Sum(F('percentage_score') * F('percentage_score')),
+                seconds=Sum('time_spent'),
+            )
+        )
+        rows.extend(
+            AttemptRollup(
+                granularity=granularity,
+                bucket_start=row['bucket'],
+                test_id=row['test_id'],
+                category_id=row['test__category_id'],
+                school_class=row['group'],
+                attempts=row['attempts_count'],
+                pass_count=row['passed'],
+                score_sum=row['scores'] or 0.0,
+                score_sq_sum=row['scores_sq'] or 0.0,
+                time_sum=row['seconds'] or 0,
+            )
+            for row in grouped.iterator(chunk_size=5000)
+        )
+
+    with transaction.atomic():
+        existing.delete()
+        AttemptRollup.objects.bulk_create(rows, batch_size=2000)
+    return len(rows), time.perf_counter() - started
+
+
+def rollup_series(granularity, start, end, test=None, category=None, school_class=None, group_by=None,
+                  queryset=None):
+    """
+    Time series of completed attempts between ``start`` and ``end`` (aware
+    datetimes, end exclusive), optionally split by 'test', 'category' or
+    'school_class'. Runs in O(buckets).
+    """
+    rollups = queryset if queryset is not None else AttemptRollup.objects.all()
+    rollups = rollups.filter(granularity=granularity, bucket_start__gte=start, bucket_start__lt=end)
+    if test is not None:
+        rollups = rollups.filter(test=test)
+    if category is not None:
+        rollups = rollups.filter(category=category)
+    if school_class:
+        rollups = rollups.filter(school_class=school_class)
+
+    group_field = {'test': 'test_id', 'category': 'category_id', 'school_class': 'school_class'}.get(group_by)
+    columns = ['bucket_start'] + ([group_field] if group_field else [])
+    grouped = (
+        rollups.order_by()
+        .values(*columns)
+        .annotate(
+            n=Sum('attempts'), passed=Sum('pass_count'), scores=Sum('score_sum'),
+            scores_sq=Sum('score_sq_sum'), seconds=Sum('time_sum'),
+        )
+        .order_by(*columns)
+    )
+
+    series = []
+    for row in grouped:
+        n = row['n']
+        if not n:
+            continue
+        mean = row['scores'] / n
+        variance = max(row['scores_sq'] / n - mean * mean, 0.0)
+        point = {
+            'bucket': timezone.localtime(row['bucket_start']).isoformat(),
+            'date': str(timezone.localtime(row['bucket_start']).date()),
+            'completions': n,
+            'average_score': round(mean, 2),
+            'score_stddev': round(variance ** 0.5, 2),
+            'pass_rate': round(row['passed'] * 100.0 / n, 2),
+            'average_time': round(row['seconds'] / n, 1),
+        }
+        if group_field:
+            point[group_by] = row[group_field]
+        series.append(point)
+    return series
+
+
+def day_range(start_date, end_date):
+    """Aware [start, end) datetimes covering whole local days"""
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.datetime.combine(start_date, datetime.time.min), tz)
+    end = timezone.make_aware(datetime.datetime.combine(end_date + datetime.timedelta(days=1), datetime.time.min), tz)
+    return start, end
@@ -0,0 +1,56 @@
+"""
+Role-scoped access to results.
+
+Teachers see results, progress and certificates of students who completed
+their tests. Instead of joining through attempts and tests on every
+request, TestResult carries ``owner``/``user``/``test`` copied from its
+attempt, and TeacherStudent keeps one row per (teacher, student) pair,
+refreshed when an attempt completes. Each scoped listing is then a filter
+on one indexed column or a single join against a unique index.
+"""
+from django.utils import timezone
+
+from .models import Certificate, TeacherStudent, TestResult, UserProgress
+
+
+def _is_admin(user):
+    return user.role == 'admin' or user.is_superuser
+
+
+def results_for(user):
+    if _is_admin(user):
+        return TestResult.objects.all()
+    if user.role == 'teacher':
+        return TestResult.objects.filter(owner=user)
+    return TestResult.objects.filter(user=user)
+
+
+def certificates_for(user):
+    if _is_admin(user):
+        return Certificate.objects.all()
+    if user.role == 'teacher':
+        return Certificate.objects.filter(result__owner=user)
+    return Certificate.objects.filter(result__user=user)
+
+
+def progress_for(user):
+    if _is_admin(user):
+        return UserProgress.objects.all()
+    if user.role == 'teacher':
+        # (teacher, student) is unique, so the join needs no DISTINCT
+        return UserProgress.objects.filter(user__teacher_links__teacher=user)
+    return UserProgress.objects.filter(user=user)
+
+
+def record_completion(attempt):
+    """Link the attempt's student to the test's creator"""
+    teacher_id = attempt.test.created_by_id
+    moment = attempt.finished_at or timezone.now()
+    TeacherStudent.objects.bulk_create(
+        [TeacherStudent(teacher_id=teacher_id, student_id=attempt.user_id,
+                        first_completed_at=moment, last_completed_at=moment)],
+        ignore_conflicts=True,
+    )
+    TeacherStudent.objects.filter(
+        teacher_id=teacher_id, student_id=attempt.user_id, last_completed_at__lt=moment
+    ).update(last_completed_at=moment)
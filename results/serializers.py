@@ -3,31 +3,31 @@ from .models import TestResult, Certificate, UserProgress
 
 
 class TestResultSerializer(serializers.ModelSerializer):
-    student_name = serializers.CharField(source='attempt.student.get_full_name', read_only=True)
-    test_title = serializers.CharField(source='attempt.test.title', read_only=True)
+    student_name = serializers.CharField(source='user.get_full_name', read_only=True)
+    test_title = serializers.CharField(source='test.title', read_only=True)
     
     class Meta:
         model = TestResult
         fields = [
-            'id', 'attempt', 'student_name', 'test_title',
-            'total_score', 'percentage', 'grade', 'is_passed',
-            'detailed_results', 'feedback', 'completed_at'
+            'id', 'attempt', 'user', 'student_name', 'test', 'test_title',
+            'points_earned', 'points_possible', 'percentage_score', 'grade_letter', 'is_passed',
+            'category_scores', 'difficulty_breakdown', 'instructor_feedback', 'automated_feedback',
+            'created_at'
         ]
-        read_only_fields = ['completed_at']
+        read_only_fields = ['created_at']
 
 
 class CertificateSerializer(serializers.ModelSerializer):
-    student_name = serializers.CharField(source='student.get_full_name', read_only=True)
-    test_title = serializers.CharField(source='test.title', read_only=True)
+    student_name = serializers.CharField(source='recipient_name', read_only=True)
     
     class Meta:
         model = Certificate
         fields = [
-            'id', 'student', 'student_name', 'test', 'test_title',
-            'certificate_id', 'score', 'percentage', 'grade',
-            'issued_at', 'is_valid', 'verification_url'
+            'id', 'result', 'student_name', 'test_title',
+            'certificate_number', 'score_achieved', 'completion_date',
+            'issued_at', 'is_verified', 'verification_code'
         ]
-        read_only_fields = ['certificate_id', 'issued_at']
+        read_only_fields = ['certificate_number', 'issued_at']
 
 
 class UserProgressSerializer(serializers.ModelSerializer):
@@ -37,8 +37,8 @@ class UserProgressSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserProgress
         fields = [
-            'id', 'user', 'username', 'full_name',
-            'total_tests_taken', 'total_tests_passed', 'average_score',
-            'total_time_spent', 'achievements', 'last_activity'
+            'id', 'user', 'username', 'full_name', 'category',
+            'tests_taken', 'tests_passed', 'average_score',
+            'total_study_time', 'achievements', 'last_activity_date'
         ]
-        read_only_fields = ['last_activity', 'updated_at']
+        read_only_fields = ['last_activity_date']
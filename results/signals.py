@@ -0,0 +1,67 @@
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from buxoro_test_system.tracing import traced
+from examinations.models import TestAttempt
+from .models import Certificate
+from .verification import certificate_index
+from . import rollups, scope
+
+
+@receiver(post_save, sender=Certificate)
+@traced('certificate.index')
+def index_certificate(sender, instance, created=False, **kwargs):
+    """
+    Keep the public verification index current on issuance and revocation.
+    Saves that change neither the codes nor ``is_verified`` leave it alone.
+    """
+    codes = (instance.certificate_number, instance.verification_code)
+    previous = None if created else getattr(instance, '_loaded_values', None)
+    if previous is not None and all(name in previous for name in Certificate.TRACKED_FIELDS):
+        old_codes = (previous['certificate_number'], previous['verification_code'])
+        if old_codes == codes and previous['is_verified'] == instance.is_verified:
+            return
+        if previous['is_verified'] and old_codes != codes:
+            certificate_index.discard(*old_codes)
+    if instance.is_verified:
+        certificate_index.add(*codes)
+    else:
+        certificate_index.discard(*codes)
+
+
+@receiver(post_delete, sender=Certificate)
+def unindex_certificate(sender, instance, **kwargs):
+    """
+    Deleted certificates must stop verifying immediately
+    """
+    certificate_index.discard(instance.certificate_number, instance.verification_code)
+
+
+@receiver(post_save, sender=TestAttempt)
+def roll_up_attempt(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Fold completed attempts into the time-series rollups as they finish
+    """
+    if raw:
+        return
+    # TestAttempt.save() fills the snapshot with the stored values before writing
+    rollups.record_attempt_change(instance, None if created else instance._loaded_values)
+
+
+@receiver(pre_delete, sender=TestAttempt)
+def remove_attempt_rollup(sender, instance, **kwargs):
+    """
+    Before the row goes, so columns deferred on the instance can still be read
+    """
+    rollups.remove_attempt(instance, instance._stored_values())
+
+
+@receiver(post_save, sender=TestAttempt)
+def link_teacher_student(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Keep the teacher -> student membership used by teacher-scoped listings
+    """
+    if raw or instance.status != 'completed':
+        return
+    previous = {} if created else getattr(instance, '_loaded_values', {})
+    if previous.get('status') != 'completed':
+        scope.record_completion(instance)
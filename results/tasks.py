@@ -0,0 +1,38 @@
+import datetime
+
+from celery import shared_task
+from django.contrib.auth import get_user_model
+
+from examinations.models import Category, Test
+from .reports import generate_report, previous_period
+
+User = get_user_model()
+
+
+@shared_task
+def generate_periodic_reports(report_type):
+    """School-wide and per-category reports for the last complete period"""
+    start_date, end_date = previous_period(report_type)
+    report_ids = []
+    report, elapsed = generate_report(report_type, start_date, end_date, is_automated=True)
+    report_ids.append(report.pk)
+    for category in Category.objects.filter(is_active=True):
+        report, elapsed = generate_report(report_type, start_date, end_date, category=category, is_automated=True)
+        report_ids.append(report.pk)
+    return report_ids
+
+
+@shared_task
+def generate_analytics_report(report_type, start_date=None, end_date=None, test_id=None, category_id=None,
+                              user_group='', user_id=None):
+    """On-demand report; dates are ISO strings so the task stays JSON-serializable"""
+    report, elapsed = generate_report(
+        report_type,
+        start_date=datetime.date.fromisoformat(start_date) if start_date else None,
+        end_date=datetime.date.fromisoformat(end_date) if end_date else None,
+        test=Test.objects.get(pk=test_id) if test_id else None,
+        category=Category.objects.get(pk=category_id) if category_id else None,
+        user_group=user_group,
+        generated_by=User.objects.filter(pk=user_id).first() if user_id else None,
+    )
+    return report.pk
@@ -1,3 +1,281 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from examinations.models import Category, Test, TestAttempt
+from .models import AttemptRollup, Certificate, TeacherStudent, TestResult, UserProgress
+from . import scope
+from .reports import generate_report, render_pdf
+from .rollups import backfill_rollups
+from .verification import INDEX_VERSION_KEY, certificate_index, verify_certificate
+
+
+def make_test(teacher, **kwargs):
+    category, _ = Category.objects.get_or_create(name='Matematika')
+    defaults = dict(description='Test', category=category, time_limit=30, pass_mark=60, created_by=teacher)
+    defaults.update(kwargs)
+    return Test.objects.create(title=defaults.pop('title', 'Algebra'), **defaults)
+
+
+def make_result(test, student, percentage=80.0, **attempt_kwargs):
+    attempt = TestAttempt.objects.create(
+        test=test, user=student, status='completed', percentage_score=percentage,
+        is_passed=percentage >= test.pass_mark, **attempt_kwargs
+    )
+    result = TestResult.objects.create(
+        attempt=attempt, total_questions=10, points_possible=10, percentage_score=percentage,
+        is_passed=attempt.is_passed, pass_threshold=test.pass_mark, time_allocated=1800, time_used=100,
+    )
+    return attempt, result
+
+
+@override_settings(CACHE_IS_SHARED=True)
+class CertificateVerificationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user('teacher', password='x', role='teacher')
+        self.student = User.objects.create_user('student', password='x', role='student', first_name='Ali')
+        attempt, self.result = make_result(make_test(self.teacher), self.student)
+        self.certificate = Certificate.objects.create(
+            result=self.result, certificate_number=self.result.certificate_number, recipient_name='Ali Valiyev',
+            test_title='Algebra', completion_date=datetime.date.today(), score_achieved=80,
+        )
+
+    def test_verifies_by_code_and_number(self):
+        payload = verify_certificate(self.certificate.verification_code.lower())
+        self.assertEqual(payload['certificate_number'], self.certificate.certificate_number)
+        response = self.client.get(f'/api/results/certificates/verify/{self.certificate.certificate_number}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['valid'])
+
+    def test_unknown_code_needs_no_query(self):
+        certificate_index.ensure_current()
+        with self.assertNumQueries(0):
+            self.assertIsNone(verify_certificate('NOPE-123'))
+        response = self.client.get('/api/results/certificates/verify/NOPE-123/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_revoked_and_deleted_certificates_stop_verifying(self):
+        code = self.certificate.verification_code
+        self.assertIsNotNone(verify_certificate(code))
+        self.certificate.is_verified = False
+        self.certificate.save()
+        self.assertIsNone(verify_certificate(code))
+
+        self.certificate.is_verified = True
+        self.certificate.save()
+        self.assertIsNotNone(verify_certificate(code))
+        self.certificate.delete()
+        self.assertIsNone(verify_certificate(code))
+
+    def test_changed_number_replaces_the_old_one(self):
+        old_number = self.certificate.certificate_number
+        self.certificate.certificate_number = 'CERT-NEW-1'
+        self.certificate.save()
+        self.assertIsNone(verify_certificate(old_number))
+        self.assertIsNotNone(verify_certificate('CERT-NEW-1'))
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_without_a_shared_cache_lookups_use_the_database(self):
+        certificate_index.ensure_current()
+        # Issued and revoked by other processes, which cannot reach this one's cache
+        other = Certificate.objects.bulk_create([Certificate(
+            result=make_result(make_test(self.teacher, title='Fizika'), self.student)[1],
+            certificate_number='CERT-OTHER-1', recipient_name='Ali Valiyev', test_title='Fizika',
+            completion_date=datetime.date.today(), score_achieved=90,
+        )])[0]
+        self.assertEqual(verify_certificate('CERT-OTHER-1')['test_title'], 'Fizika')
+        self.assertIsNotNone(verify_certificate(self.certificate.verification_code))
+        Certificate.objects.filter(pk=self.certificate.pk).update(is_verified=False)
+        self.assertIsNone(verify_certificate(self.certificate.verification_code))
+        self.assertIsNone(verify_certificate('NOPE-123'))
+
+    def test_unrelated_save_keeps_the_index_version(self):
+        certificate = Certificate.objects.get(pk=self.certificate.pk)
+        version = cache.get(INDEX_VERSION_KEY)
+        certificate.recipient_name = 'Ali Valiyev (yangilangan)'
+        certificate.save()
+        certificate.template_used = 'gold'
+        certificate.save(update_fields=['template_used'])
+        self.assertEqual(cache.get(INDEX_VERSION_KEY), version)
+
+        certificate.is_verified = False
+        certificate.save()
+        self.assertEqual(cache.get(INDEX_VERSION_KEY), version + 1)
+
+
+class AnalyticsReportTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='x', role='teacher')
+        self.student = User.objects.create_user('student', password='x', role='student', school_class='9-A')
+        self.test = make_test(self.teacher)
+        self.day = timezone.localdate() - datetime.timedelta(days=2)
+
+    def at(self, day, hour, minute=0):
+        return timezone.make_aware(datetime.datetime.combine(day, datetime.time(hour, minute)))
+
+    def attempt(self, started_at, finished_at=None, percentage=90.0):
+        attempt = TestAttempt.objects.create(test=self.test, user=self.student)
+        TestAttempt.objects.filter(pk=attempt.pk).update(started_at=started_at)
+        attempt = TestAttempt.objects.get(pk=attempt.pk)
+        if finished_at is not None:
+            attempt.status = 'completed'
+            attempt.finished_at = finished_at
+            attempt.percentage_score = percentage
+            attempt.is_passed = percentage >= self.test.pass_mark
+            attempt.save()
+        return attempt
+
+    def test_attempts_count_on_their_completion_day(self):
+        before = self.day - datetime.timedelta(days=1)
+        after = self.day + datetime.timedelta(days=1)
+        self.attempt(self.at(before, 23, 50), self.at(self.day, 0, 10), percentage=90.0)
+        self.attempt(self.at(self.day, 23, 50), self.at(after, 0, 10), percentage=20.0)
+        self.attempt(self.at(self.day, 12))
+
+        report, elapsed = generate_report('daily', self.day, write_files=False)
+        self.assertEqual((report.total_attempts, report.total_completions), (2, 1))
+        self.assertEqual(report.average_score, 90.0)
+        self.assertEqual(report.user_performance, {'9-A': {'completions': 1, 'average_score': 90.0, 'pass_rate': 100.0}})
+        # The daily trend comes from the rollups and agrees with the summary
+        [point] = report.performance_trends['daily']
+        self.assertEqual(point['completions'], report.total_completions)
+        self.assertEqual(point['average_score'], report.average_score)
+
+        report, elapsed = generate_report('daily', after, write_files=False)
+        self.assertEqual((report.total_completions, report.average_score), (1, 20.0))
+
+    def test_scoped_to_test_and_group(self):
+        other = make_test(self.teacher, title='Geometriya')
+        self.attempt(self.at(self.day, 10), self.at(self.day, 10, 30))
+        report, elapsed = generate_report('daily', self.day, test=other, write_files=False)
+        self.assertEqual(report.total_attempts, 0)
+        report, elapsed = generate_report('daily', self.day, test=self.test, user_group='9-B', write_files=False)
+        self.assertEqual(report.total_attempts, 0)
+        report, elapsed = generate_report('weekly', self.day, test=self.test, user_group='9-A', write_files=False)
+        self.assertEqual(report.total_completions, 1)
+
+    def test_pdf_keeps_markup_characters_as_text(self):
+        test = make_test(self.teacher, title='Algebra & <b>Geometriya')
+        report, elapsed = generate_report('daily', self.day, test=test, write_files=False)
+        report.improvement_recommendations = ['Savol #1: x < 2 & y > 3']
+        self.assertTrue(render_pdf(report).startswith(b'%PDF'))
+
+
+class AttemptRollupTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='x', role='teacher')
+        self.student = User.objects.create_user('student', password='x', role='student', school_class='9-A')
+        self.test = make_test(self.teacher)
+
+    def complete(self, percentage=80.0):
+        attempt = TestAttempt.objects.create(test=self.test, user=self.student)
+        attempt.status = 'completed'
+        attempt.finished_at = timezone.now()
+        attempt.percentage_score = percentage
+        attempt.is_passed = percentage >= self.test.pass_mark
+        attempt.save()
+        return attempt
+
+    def buckets(self):
+        return {
+            row.school_class: (row.attempts, row.pass_count, row.score_sum)
+            for row in AttemptRollup.objects.filter(granularity='day')
+        }
+
+    def test_completion_regrade_and_delete(self):
+        attempt = self.complete(80.0)
+        self.complete(40.0)
+        self.assertEqual(self.buckets(), {'9-A': (2, 1, 120.0)})
+        self.assertEqual(AttemptRollup.objects.filter(granularity='hour').count(), 1)
+
+        attempt = TestAttempt.objects.get(pk=attempt.pk)
+        attempt.percentage_score, attempt.is_passed = 50.0, False
+        attempt.save()
+        self.assertEqual(self.buckets(), {'9-A': (2, 0, 90.0)})
+
+        attempt.delete()
+        self.assertEqual(self.buckets(), {'9-A': (1, 0, 40.0)})
+
+    def test_regrade_after_a_class_change_keeps_the_bucket(self):
+        attempt = self.complete(80.0)
+        self.student.school_class = '10-A'
+        self.student.save()
+
+        attempt = TestAttempt.objects.get(pk=attempt.pk)
+        attempt.percentage_score = 90.0
+        attempt.save()
+        self.assertEqual(attempt.school_class, '9-A')
+        self.assertEqual(self.buckets(), {'9-A': (1, 1, 90.0)})
+        rows, elapsed = backfill_rollups()
+        self.assertEqual(self.buckets(), {'9-A': (1, 1, 90.0)})
+
+    def test_deferred_fields_are_read_before_saving(self):
+        attempt = self.complete(80.0)
+        partial = TestAttempt.objects.only('id', 'test', 'user', 'percentage_score').get(pk=attempt.pk)
+        partial.percentage_score = 70.0
+        partial.save()
+        self.assertEqual(self.buckets(), {'9-A': (1, 1, 70.0)})
+
+        TestAttempt.objects.only('id').get(pk=attempt.pk).delete()
+        self.assertEqual(self.buckets(), {'9-A': (0, 0, 0.0)})
+
+    def test_unrelated_saves_write_nothing(self):
+        attempt = self.complete(80.0)
+        attempt = TestAttempt.objects.get(pk=attempt.pk)
+        attempt.current_question_index = 3
+        with self.assertNumQueries(1):
+            attempt.save(update_fields=['current_question_index'])
+        attempt.instructor_feedback = 'Yaxshi'
+        attempt.save()
+        self.assertEqual(self.buckets(), {'9-A': (1, 1, 80.0)})
+
+
+class TeacherScopeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user('teacher', password='x', role='teacher')
+        self.other_teacher = User.objects.create_user('teacher2', password='x', role='teacher')
+        self.admin = User.objects.create_user('admin', password='x', role='admin')
+        self.student = User.objects.create_user('student', password='x', role='student')
+        self.classmate = User.objects.create_user('classmate', password='x', role='student')
+        self.algebra = make_test(self.teacher)
+        self.geometry = make_test(self.teacher, title='Geometriya')
+        self.physics = make_test(self.other_teacher, title='Fizika')
+
+    def test_results_carry_their_owner(self):
+        attempt, result = make_result(self.algebra, self.student)
+        self.assertEqual((result.owner, result.user, result.test), (self.teacher, self.student, self.algebra))
+        make_result(self.physics, self.classmate)
+
+        self.assertEqual(list(scope.results_for(self.teacher)), [result])
+        self.assertEqual(scope.results_for(self.student).get(), result)
+        self.assertEqual(scope.results_for(self.admin).count(), 2)
+
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+        data = client.get('/api/results/results/').json()
+        rows = data['results'] if isinstance(data, dict) else data
+        self.assertEqual([row['id'] for row in rows], [str(result.pk)])
+
+    def test_completions_link_students_to_teachers_once(self):
+        first = timezone.now() - datetime.timedelta(days=3)
+        make_result(self.algebra, self.student, finished_at=first, time_spent=600)
+        make_result(self.geometry, self.student)
+        make_result(self.physics, self.classmate)
+        TestAttempt.objects.create(test=self.algebra, user=self.classmate)
+
+        link = TeacherStudent.objects.get(teacher=self.teacher)
+        self.assertEqual(link.student, self.student)
+        self.assertEqual(link.first_completed_at, first)
+        self.assertGreater(link.last_completed_at, first)
+
+        for student in (self.student, self.classmate):
+            UserProgress.objects.create(user=student, category=self.algebra.category)
+        self.assertEqual([progress.user for progress in scope.progress_for(self.teacher)], [self.student])
+        self.assertEqual([progress.user for progress in scope.progress_for(self.other_teacher)], [self.classmate])
+        self.assertEqual(scope.progress_for(self.admin).count(), 2)
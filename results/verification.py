@@ -0,0 +1,167 @@
+"""
+Public certificate verification.
+
+Verification codes and certificate numbers of valid certificates are kept in
+a process-local set of short digests, so unknown codes are rejected without
+touching the database. A version counter in the shared cache tells other
+worker processes when their copy of the index is stale.
+
+Without a shared cache (CACHE_IS_SHARED) other processes cannot announce
+new or revoked certificates, so the index and the cached payloads are not
+used and every lookup goes to the database.
+"""
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+INDEX_VERSION_KEY = 'certificate-index:version'
+PAYLOAD_CACHE_PREFIX = 'certificate-verify:'
+
+
+def normalize_code(code):
+    """Verification codes and certificate numbers are stored upper-case"""
+    return (code or '').strip().upper()
+
+
+def code_digest(code):
+    """8-byte digest used as the index key for a normalized code"""
+    return hashlib.blake2b(code.encode(), digest_size=8).digest()
+
+
+class CertificateIndex:
+    """
+    In-memory index of valid certificate codes.
+
+    A digest collision only costs one database query, the same as a Bloom
+    filter false positive, while keeping the index around 100 bytes per code.
+    """
+
+    def __init__(self):
+        self._digests = set()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _shared_version(self):
+        version = cache.get(INDEX_VERSION_KEY)
+        if version is None:
+            # First process to look: publish a version so the others agree on it
+            cache.add(INDEX_VERSION_KEY, 1, timeout=None)
+            version = cache.get(INDEX_VERSION_KEY, 1)
+        return version
+
+    def _bump_version(self):
+        try:
+            return cache.incr(INDEX_VERSION_KEY)
+        except ValueError:
+            cache.add(INDEX_VERSION_KEY, 1, timeout=None)
+            return cache.get(INDEX_VERSION_KEY, 1)
+
+    def rebuild(self):
+        """Load every valid certificate code from the database"""
+        from .models import Certificate
+
+        version = self._shared_version()
+        digests = set()
+        rows = Certificate.objects.filter(is_verified=True).values_list(
+            'certificate_number', 'verification_code'
+        )
+        for certificate_number, verification_code in rows.iterator(chunk_size=5000):
+            digests.add(code_digest(normalize_code(certificate_number)))
+            digests.add(code_digest(normalize_code(verification_code)))
+
+        with self._lock:
+            self._digests = digests
+            self._version = version
+
+    def ensure_current(self):
+        if self._version != self._shared_version():
+            self.rebuild()
+
+    def __contains__(self, code):
+        self.ensure_current()
+        return code_digest(normalize_code(code)) in self._digests
+
+    def __len__(self):
+        return len(self._digests)
+
+    def _apply(self, codes, add):
+        """
+        Update the local index and notify other processes.
+
+        If the local copy was current before the change it stays current,
+        otherwise it is rebuilt on the next lookup.
+        """
+        digests = {code_digest(normalize_code(code)) for code in codes if code}
+        previous = self._version
+        version = self._bump_version()
+
+        with self._lock:
+            if add:
+                self._digests |= digests
+            else:
+                self._digests -= digests
+            if previous is not None and previous == version - 1:
+                self._version = version
+            else:
+                self._version = None
+
+        cache.delete_many([PAYLOAD_CACHE_PREFIX + digest.hex() for digest in digests])
+
+    def add(self, *codes):
+        self._apply(codes, add=True)
+
+    def discard(self, *codes):
+        self._apply(codes, add=False)
+
+
+certificate_index = CertificateIndex()
+
+
+def build_verification_payload(certificate):
+    return {
+        'valid': True,
+        'certificate_number': certificate.certificate_number,
+        'verification_code': certificate.verification_code,
+        'recipient_name': certificate.recipient_name,
+        'test_title': certificate.test_title,
+        'completion_date': certificate.completion_date.isoformat(),
+        'score_achieved': certificate.score_achieved,
+        'issued_at': certificate.issued_at.isoformat(),
+    }
+
+
+def verify_certificate(code):
+    """
+    Return the public verification payload for a code, or None.
+
+    Unknown codes are answered from the in-memory index; known codes are
+    served from the shared cache and fall back to a single indexed query.
+    """
+    from .models import Certificate
+
+    code = normalize_code(code)
+    if not code:
+        return None
+    shared = settings.CACHE_IS_SHARED
+    if shared and code not in certificate_index:
+        return None
+
+    cache_key = PAYLOAD_CACHE_PREFIX + code_digest(code).hex()
+    payload = cache.get(cache_key) if shared else None
+    if payload is not None:
+        return payload
+
+    certificate = Certificate.objects.filter(
+        Q(verification_code=code) | Q(certificate_number=code),
+        is_verified=True,
+    ).first()
+    if certificate is None:
+        return None
+
+    payload = build_verification_payload(certificate)
+    if shared:
+        cache.set(cache_key, payload, settings.CERTIFICATE_VERIFY_CACHE_TIMEOUT)
+    return payload
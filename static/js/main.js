@@ -71,6 +71,12 @@ class TestInterface {
         this.focusLostCount = 0;
         this.suspiciousActivity = [];
         
+        // Per-question dwell tracking, sent with auto-save
+        this.timingEvents = [];
+        this.answerChanges = {};
+        this.activeQuestionId = null;
+        this.activeSince = null;
+        
         this.init();
     }
 
@@ -80,6 +86,7 @@ class TestInterface {
         this.setupHeartbeat();
         this.setupAntiCheat();
         this.setupNavigation();
+        this.setupTiming();
         this.loadSavedAnswers();
     }
 
@@ -131,7 +138,12 @@ class TestInterface {
 
         // Save on answer change
         document.addEventListener('change', (e) => {
-            if (e.target.closest('.question-container')) {
+            const container = e.target.closest('.question-container');
+            if (container) {
+                const questionId = container.dataset.questionId;
+                if (this.answers[questionId]) {
+                    this.answerChanges[questionId] = (this.answerChanges[questionId] || 0) + 1;
+                }
                 this.saveCurrentAnswer();
                 this.saveAnswers();
             }
@@ -218,6 +230,48 @@ class TestInterface {
         }
     }
 
+    setupTiming() {
+        const active = document.querySelector('.question-container.active');
+        if (active) {
+            this.startDwell(active.dataset.questionId);
+        }
+
+        // Time in a hidden tab is not time spent on the question
+        document.addEventListener('visibilitychange', () => {
+            if (document.hidden) {
+                this.recordDwell();
+                this.activeSince = null;
+            } else if (this.activeQuestionId) {
+                this.activeSince = performance.now();
+            }
+        });
+    }
+
+    startDwell(questionId) {
+        this.recordDwell();
+        this.activeQuestionId = questionId || null;
+        this.activeSince = questionId ? performance.now() : null;
+    }
+
+    recordDwell() {
+        if (!this.activeQuestionId || this.activeSince === null) return;
+
+        const now = performance.now();
+        const questionId = this.activeQuestionId;
+        this.timingEvents.push({
+            question_id: parseInt(questionId),
+            dwell_ms: Math.round(now - this.activeSince),
+            changes: this.answerChanges[questionId] || 0
+        });
+        this.answerChanges[questionId] = 0;
+        this.activeSince = now;
+    }
+
+    takeTimingEvents() {
+        this.recordDwell();
+        return this.timingEvents.splice(0, this.timingEvents.length);
+    }
+
     saveCurrentAnswer() {
         const questionContainer = document.querySelector('.question-container.active');
         if (!questionContainer) return;
@@ -270,6 +324,7 @@ class TestInterface {
     async saveAnswers() {
         if (this.isSubmitted) return;
 
+        const timingEvents = this.takeTimingEvents();
         try {
             const response = await fetch(`/api/tests/attempts/${this.attemptId}/auto-save/`, {
                 method: 'POST',
@@ -281,18 +336,43 @@ class TestInterface {
                     answers: this.answers,
                     current_question: this.currentQuestion,
                     time_remaining: this.timeRemaining,
-                    suspicious_activity: this.suspiciousActivity
+                    suspicious_activity: this.suspiciousActivity,
+                    timing_events: timingEvents
                 })
             });
 
             if (response.ok) {
                 console.log('Answers auto-saved successfully');
+            } else {
+                this.timingEvents.unshift(...timingEvents);
             }
         } catch (error) {
+            this.timingEvents.unshift(...timingEvents);
             console.error('Auto-save failed:', error);
         }
     }
 
+    async sendTimingEvents(events) {
+        if (!events.length) return;
+
+        try {
+            const response = await fetch(`/api/tests/attempts/${this.attemptId}/timings/`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': this.getCSRFToken(),
+                },
+                body: JSON.stringify({ events: events })
+            });
+            if (!response.ok) {
+                this.timingEvents.unshift(...events);
+            }
+        } catch (error) {
+            this.timingEvents.unshift(...events);
+            console.error('Timing upload failed:', error);
+        }
+    }
+
     async sendHeartbeat() {
         if (this.isSubmitted) return;
 
@@ -326,6 +406,7 @@ class TestInterface {
         const targetQuestion = document.querySelector(`[data-question-index="${index}"]`);
         if (targetQuestion) {
             targetQuestion.classList.add('active');
+            this.startDwell(targetQuestion.dataset.questionId);
             this.currentQuestion = index;
             this.updateNavigationButtons();
             this.updateProgressBar();
@@ -424,6 +505,7 @@ class TestInterface {
         
         // Save final answers
         this.saveCurrentAnswer();
+        await this.sendTimingEvents(this.takeTimingEvents());
         
         // Clear intervals
         clearInterval(this.timerInterval);